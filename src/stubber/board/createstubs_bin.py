@@ -0,0 +1,1158 @@
+"""
+Create stubs for (all) modules on a MicroPython board, as compact binary records.
+
+    This variant of the createstubs.py script is optimised for use on low-memory devices.
+    Rather than formatting the .pyi stubs on the device, it writes a compact record for each member of a module
+    to a `.stb` file, that is rendered to a .pyi file on the host by `stubber.bulk.stub_records`.
+    It reads the list of modules from a text file `modulelist.txt` in the root or `libs` folder that should be uploaded to the device.
+    If that cannot be found then only a single module (micropython) is stubbed.
+
+This variant was generated from createstubs.py by micropython-stubber v1.25.0
+"""
+
+# Copyright (c) 2019-2024 Jos Verlinde
+
+import gc
+import os
+import sys
+from time import sleep
+
+try:
+    from time import ticks_diff, ticks_ms  # type: ignore
+except ImportError:  # testing on CPython
+    from time import time
+
+    def ticks_ms():
+        return int(time() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+
+try:
+    from ujson import dumps
+except:
+    from json import dumps
+
+try:
+    from machine import reset  # type: ignore
+except ImportError:
+    pass
+
+try:
+    from ubinascii import b2a_base64, crc32
+except ImportError:
+    try:
+        from binascii import b2a_base64, crc32
+    except ImportError:
+        crc32 = None  # streaming is not available
+
+try:
+    import deflate  # MicroPython 1.21+
+except ImportError:
+    deflate = None
+    try:
+        import zlib
+    except ImportError:
+        zlib = None
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    try:
+        from ucollections import OrderedDict  # type: ignore
+    except ImportError:
+        OrderedDict = None  # not available on all ports, see _OrderedDict
+
+__version__ = "v1.25.0"
+ENOENT = 2  # on most ports
+ENOMESSAGE = 44  # on pyscript
+_MAX_CLASS_LEVEL = 2  # Max class nesting
+_CLASS_MEM = 4 * 1024  # free memory needed to expand a class, below this only a placeholder is written
+_WRITE_BUFFER = 512  # stubs are written to the file in chunks of this size
+_REPORT_BATCH = 8  # report entries kept in memory before they are appended to modules.json
+_STREAM_FLAG = "stream_stubber.txt"  # if this file exists, the stubs are streamed to stdout rather than written to files
+_STREAM_CHUNK = 384  # bytes per streamed line, 512 characters in base64
+_PROFILE_FLAG = "profile_stubber.txt"  # if this file exists, the import time and memory use of each module are reported
+_COMPRESS_FLAG = "compress_stubber.txt"  # if this file exists, the stubs are written as .pyi.gz, when the port can compress
+_FINGERPRINTS = "modulelist.crc"  # fingerprints of the modules in a previous run, the unchanged modules are not stubbed again
+LIBS = ["lib", "/lib", "/sd/lib", "/flash/lib", "."]
+
+
+# our own logging module to avoid dependency on and interfering with logging module
+class logging:
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+    ERROR = 40
+    level = INFO
+    prnt = print
+
+    @staticmethod
+    def getLogger(name):
+        return logging()
+
+    @classmethod
+    def basicConfig(cls, level):
+        cls.level = level
+
+    def debug(self, msg):
+        if self.level <= logging.DEBUG:
+            self.prnt("DEBUG :", msg)
+
+    def info(self, msg):
+        if self.level <= logging.INFO:
+            self.prnt("INFO  :", msg)
+
+    def warning(self, msg):
+        if self.level <= logging.WARNING:
+            self.prnt("WARN  :", msg)
+
+    def error(self, msg):
+        if self.level <= logging.ERROR:
+            self.prnt("ERROR :", msg)
+
+
+log = logging.getLogger("stubber")
+logging.basicConfig(level=logging.INFO)
+# logging.basicConfig(level=logging.DEBUG)
+
+
+_DELETED = object()  # marks the position of a deleted key
+
+
+class _OrderedDict(dict):
+    """implementation of OrderedDict, for ports without a native one
+    The keys are kept in a list in insertion order, with their position in a dict.
+    A deleted key leaves a hole in the list, the list is compacted when half of it are holes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._keys = []
+        self._pos = {}
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        if key not in self._pos:
+            self._pos[key] = len(self._keys)
+            self._keys.append(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._keys[self._pos.pop(key)] = _DELETED
+        if len(self._pos) * 2 < len(self._keys):
+            self._keys = [k for k in self._keys if k is not _DELETED]
+            self._pos = {k: i for i, k in enumerate(self._keys)}
+
+    def __iter__(self):
+        for key in self._keys:
+            if key is not _DELETED:
+                yield key
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        for key in self:
+            yield key, self[key]
+
+    def values(self):
+        for key in self:
+            yield self[key]
+
+    def update(self, *args, **kwargs):
+        for other in args + (kwargs,):
+            for key, value in other.items() if isinstance(other, dict) else other:
+                self[key] = value
+
+    def pop(self, key, *default):
+        if key in self._pos:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def clear(self):
+        super().clear()
+        self._keys = []
+        self._pos = {}
+
+
+if OrderedDict is None:
+    OrderedDict = _OrderedDict
+
+
+try:
+    # MicroPython exposes the utf-8 bytes of a str through the buffer protocol, CPython does not
+    memoryview("")
+    _STR_BUFFER = True
+except TypeError:
+    _STR_BUFFER = False
+
+
+class StubWriter:
+    """
+    Collect many small writes in a fixed-size buffer and write them to the file in chunks.
+    Each write accepts multiple str/bytes parts, so no temporary strings need to be formatted.
+    On MicroPython a str is copied to the buffer from its own utf-8 bytes, CPython needs to encode it.
+    """
+
+    def __init__(self, fp, size: int = _WRITE_BUFFER):
+        self.fp = fp
+        self.size = size
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.n = 0
+        self.written = 0
+        try:
+            # binary files accept bytes, text files ( on CPython) need str
+            fp.write(b"")
+            self.text = False
+        except TypeError:
+            self.text = True
+
+    def write(self, *parts):
+        for s in parts:
+            if isinstance(s, str):
+                s = memoryview(s) if _STR_BUFFER else s.encode()
+            l = len(s)
+            if self.text and self.n + l > self.size:
+                # do not split multi-byte characters written to a text file
+                self.flush()
+                if l > self.size:
+                    self._write(s)
+                    continue
+            # fill up the buffer, and write it out when it is full
+            i = 0
+            while i < l:
+                c = min(self.size - self.n, l - i)
+                self.mv[self.n : self.n + c] = s if c == l else s[i : i + c]
+                self.n += c
+                i += c
+                if self.n == self.size:
+                    self.flush()
+
+    def flush(self):
+        if self.n:
+            self._write(self.mv[: self.n])
+            self.n = 0
+
+    def _write(self, b):
+        self.written += len(b)
+        self.fp.write(str(b, "utf-8") if self.text else b)
+
+
+class StreamFile:
+    """
+    Stream a file to the host as framed, checksummed lines on stdout:
+    ##STUB##:<w|a>:<file name>:<crc32>:<base64 data>
+    """
+
+    def __init__(self, name: str, mode: str = "w"):
+        self.name = name
+        self.op = "a" if mode[0] == "a" else "w"
+        if self.op == "w":
+            # create or truncate the file on the host
+            self._frame(b"")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+    def write(self, b):
+        if isinstance(b, str):
+            b = b.encode()
+        for i in range(0, len(b), _STREAM_CHUNK):
+            self._frame(b[i : i + _STREAM_CHUNK])
+        return len(b)
+
+    def _frame(self, b):
+        print("##STUB##:{}:{}:{:08x}:{}".format(self.op, self.name, crc32(b) & 0xFFFFFFFF, b2a_base64(b).decode().strip()))  # type: ignore
+        self.op = "a"
+
+
+class GzipFile:
+    """
+    Write a stub file compressed with gzip, using deflate on MicroPython 1.21+, or zlib.
+    Not all ports can compress, see can_compress().
+    """
+
+    def __init__(self, name: str, mode: str = "wb"):
+        self.f = open(name, mode)
+        if deflate:
+            self.z = deflate.DeflateIO(self.f, deflate.GZIP)
+        else:
+            # wbits 31: a gzip header and trailer
+            self.z = zlib.compressobj(9, zlib.DEFLATED, 31)  # type: ignore
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, b):
+        if deflate:
+            return self.z.write(b)
+        self.f.write(self.z.compress(b))
+        return len(b)
+
+    def close(self):
+        if deflate:
+            self.z.close()
+        else:
+            self.f.write(self.z.flush())
+        self.f.close()
+
+
+def can_compress() -> bool:
+    "check if this firmware can compress, deflate is often built without its compressor, and zlib only decompresses on MicroPython"
+    try:
+        if deflate:
+            from io import BytesIO
+
+            deflate.DeflateIO(BytesIO(), deflate.GZIP).write(b"#")
+            return True
+        return hasattr(zlib, "compressobj")
+    except Exception:
+        return False
+
+
+# record kinds of the binary stub format, each record is
+# kind, level, len(name), len(type), len(value) as 16 bit little endian, followed by name, type and value
+_R_MODULE = 77  # M: module header, type = stubber version, value = firmware id + newline + mcu info
+_R_CLASS = 67  # C: class, followed by the records of its members on the next level
+_R_EXCEPTION = 69  # E: exception class
+_R_INCOMPLETE = 99  # c: class that was not expanded to save memory
+_R_FUNCTION = 70  # F: function or method
+_R_CLASSMETHOD = 66  # B: bound method
+_R_VALUE = 86  # V: attribute, type = type name, value = repr of the value
+_R_OTHER = 88  # X: anything else, type = type as text
+
+
+def write_record(fp, kind: int, level: int, name: str, type_txt: str = "", value: str = ""):
+    "write a single stub record"
+    n = name.encode()[:255]
+    t = type_txt.encode()[:255]
+    v = value.encode()[:65535]
+    fp.write(bytes((kind, level, len(n), len(t), len(v) & 0xFF, len(v) >> 8)), n, t, v)
+
+
+class Stubber:
+    "Generate stubs for modules in firmware"
+
+    def __init__(self, path: str = "", firmware_id: str = ""):  # type: ignore
+        try:
+            if os.uname().release == "1.13.0" and os.uname().version < "v1.13-103":  # type: ignore
+                raise NotImplementedError("MicroPython 1.13.0 cannot be stubbed")
+        except AttributeError:
+            pass  # Allow testing on CPython 3.11
+        self.info = _info()
+        log.info("Port: {}".format(self.info["port"]))
+        log.info("Board: {}".format(self.info["board"]))
+        log.info("Board_ID: {}".format(self.info["board_id"]))
+        gc.collect()
+        if firmware_id:
+            self._fwid = firmware_id.lower()
+        else:
+            if self.info["family"] == "micropython":
+                self._fwid = "{family}-v{version}-{port}-{board_id}".format(**self.info).rstrip("-")
+            else:
+                self._fwid = "{family}-v{version}-{port}".format(**self.info)
+        self._start_free = gc.mem_free()  # type: ignore
+
+        if path:
+            if path.endswith("/"):
+                path = path[:-1]
+        else:
+            path = get_root()
+
+        self.path = "{}/stubs/{}".format(path, self.flat_fwid).replace("//", "/")
+        # log.debug(self.path)
+        # stream the stubs and the report to the host, rather than writing to files
+        self.stream = crc32 is not None and file_exists(_STREAM_FLAG)
+        # record the import time and memory use of each module in the report
+        self.profile = file_exists(_PROFILE_FLAG)
+        # compress the stub files, to reduce the transfer to the host
+        self.compress = not self.stream and file_exists(_COMPRESS_FLAG) and can_compress()
+        self._profile = None
+        self._min_free = 0
+        # the fingerprints of the modules stubbed in a previous run of this firmware
+        self.fingerprints = read_fingerprints()
+        # the folders of a previous run may have been removed
+        _folders.clear()
+        if not self.stream:
+            try:
+                ensure_folder(path + "/")
+            except OSError:
+                log.error("error creating stub folder {}".format(path))
+        self.problematic = [
+            "upip",
+            "upysh",
+            "webrepl_setup",
+            "http_client",
+            "http_client_ssl",
+            "http_server",
+            "http_server_ssl",
+        ]
+        self.excluded = [
+            "webrepl",
+            "_webrepl",
+            "port_diag",
+            "example_sub_led.py",
+            "example_pub_button.py",
+        ]
+        # there is no option to discover modules from micropython, list is read from an external file.
+        self.modules = []  # type: list[str]
+        # the top level modules that are present on this firmware, None if unknown
+        self.available = available_modules()
+        self._json_name = None
+        self._json_first = False
+        self._report = []  # type: list[str]
+        self.report_batch = _REPORT_BATCH
+        self.buffer_size = _WRITE_BUFFER
+        # number of class levels expanded in the current module
+        self._depth = _MAX_CLASS_LEVEL + 1
+
+    def get_obj_attributes(self, item_instance: object):
+        "extract information of the objects members and attributes"
+        # name_, repr_(value), type as text, item_instance, order
+        _result = []
+        _errors = []
+        for name, val, type_txt, order in self.iter_obj_attributes(item_instance, _errors):
+            _result.append((name, repr(val), type_txt, val, order))
+        gc.collect()
+        return _result, _errors
+
+    def iter_obj_attributes(self, item_instance: object, errors=None):
+        """
+        Yield the members and attributes of an object as (name, value, type as text, order),
+        ordered by: 1 = literals, 2 = functions/methods, 3 = classes, 4 = other.
+        Rather than collecting and sorting all attributes, dir() is walked once per order,
+        so only a single attribute is held at the time.
+        """
+        for bucket in (1, 2, 3, 4):
+            for name in dir(item_instance):
+                if name.startswith("__"):
+                    # remove internal __
+                    continue
+                try:
+                    val = getattr(item_instance, name)
+                except AttributeError as e:
+                    if bucket == 1:
+                        msg = "Couldn't get attribute '{}' from object '{}', Err: {}".format(name, item_instance, e)
+                        if errors is None:
+                            log.error(msg)
+                        else:
+                            errors.append(msg)
+                    continue
+                except MemoryError as e:
+                    print("MemoryError: {}".format(e))
+                    sleep(1)
+                    reset()
+                type_txt = repr(type(val))
+                try:
+                    t = type_txt.split("'")[1]
+                except IndexError:
+                    t = ""
+                if t in {"int", "float", "str", "bool", "tuple", "list", "dict"}:
+                    order = 1
+                elif t in {"function", "method"}:
+                    order = 2
+                elif t in ("class"):
+                    order = 3
+                else:
+                    order = 4
+                if order == bucket:
+                    yield name, val, type_txt, order
+
+    def add_modules(self, modules):
+        "Add additional modules to be exported"
+        self.modules = sorted(set(self.modules) | set(modules))
+
+    def create_all_stubs(self):
+        "Create stubs for all configured modules"
+        log.info("Start micropython-stubber {} on {}".format(__version__, self._fwid))
+        self.report_start()
+        gc.collect()
+        for module_name in self.modules:
+            self.create_one_stub(module_name)
+        self.report_end()
+        log.info("Finally done")
+
+    def create_one_stub(self, module_name: str):
+        if module_name in self.problematic:
+            log.warning("Skip module: {:<25}        : Known problematic".format(module_name))
+            return False
+        if module_name in self.excluded:
+            log.warning("Skip module: {:<25}        : Excluded".format(module_name))
+            return False
+        if not self.is_available(module_name):
+            # log.debug("Skip module: {:<25}        : Not available".format(module_name))
+            return False
+
+        file_name = "{}/{}.pyi".format(self.path, module_name.replace(".", "/"))
+        gc.collect()
+        result = False
+        try:
+            result = self.create_module_stub(module_name, file_name)
+        except OSError:
+            return False
+        gc.collect()
+        return result
+
+    def is_available(self, module_name: str) -> bool:
+        "check if a module can be present on this firmware, without the cost of trying to import it"
+        if self.available is None:
+            return True
+        top = module_name.replace(".", "/").split("/")[0]
+        # weak links: `import ujson` imports `json`
+        return top in self.available or (top[:1] == "u" and top[1:] in self.available)
+
+    def create_module_stub(self, module_name: str, file_name: str = None) -> bool:  # type: ignore
+        """Create the stub records of a single python module
+
+        Args:
+        - module_name (str): name of the module to document. This module will be imported.
+        - file_name (Optional[str]): the 'path/filename.stb' to write to. If omitted will be created based on the module name.
+        """
+        if file_name is None:
+            fname = module_name.replace(".", "_") + ".stb"
+            file_name = self.path + "/" + fname
+        else:
+            # the records are rendered to a .pyi on the host
+            file_name = file_name.rsplit(".", 1)[0] + ".stb"
+            fname = file_name.split("/")[-1]
+
+        if "/" in module_name:
+            # for nested modules
+            module_name = module_name.replace("/", ".")
+
+        # import the module (as new_module) to examine it
+        new_module = None
+        try:
+            m0 = gc.mem_free()  # type: ignore
+            t0 = ticks_ms()
+            new_module = __import__(module_name, None, None, ("*"))
+            t0 = ticks_diff(ticks_ms(), t0)
+            m1 = gc.mem_free()  # type: ignore
+            log.info("Stub module: {:<25} to file: {:<70} mem:{:>5}".format(module_name, fname, m1))
+
+        except ImportError:
+            return False
+
+        # the depth is reported for each module, also when it is unchanged
+        self._depth = _MAX_CLASS_LEVEL + 1
+        # the stub of a module that did not change since the previous run is not written again
+        # without the fingerprints of a previous run, the modules are not fingerprinted
+        crc = self.fingerprint(new_module) if self.fingerprints is not None else 0
+        unchanged = crc and self.fingerprints.get(module_name) == crc
+        if unchanged:
+            log.info("Unchanged module: {}".format(module_name))
+        else:
+            # Start a new file
+            if not self.stream:
+                ensure_folder(file_name)
+            with self.open_file(file_name, "wb") as f:
+                fp = StubWriter(f, self.buffer_size)
+                info_ = str(self.info).replace("OrderedDict(", "").replace("})", "}")
+                write_record(fp, _R_MODULE, 0, module_name, __version__, self._fwid + "\n" + info_)
+                self._min_free = m1
+                self.write_object_stub(fp, new_module, module_name, "")
+                fp.flush()
+            if self.profile:
+                gc.collect()
+                self._profile = (t0, m0, m1, gc.mem_free(), self._min_free, fp.written)  # type: ignore
+
+        self.report_add(module_name, file_name, crc, unchanged)
+
+        if module_name not in {"os", "sys", "logging", "gc"}:
+            # try to unload the module unless we use it
+            try:
+                del new_module
+            except (OSError, KeyError):  # lgtm [py/unreachable-statement]
+                log.warning("could not del new_module")
+        gc.collect()
+        return True
+
+    def fingerprint(self, module) -> int:
+        """A cheap fingerprint of a module: a crc over the names and types of its members,
+        the values of its literals, and the same for the members of its (nested) classes"""
+        if crc32 is None:
+            return 0
+        return self.fingerprint_members(module, crc32(__version__.encode()), 0) & 0xFFFFFFFF
+
+    def fingerprint_members(self, obj, crc: int, level: int) -> int:
+        names = dir(obj)
+        names.sort()
+        for name in names:
+            try:
+                val = getattr(obj, name)
+            except AttributeError:
+                continue
+            crc = crc32(name.encode(), crc)
+            crc = crc32(repr(type(val)).encode(), crc)
+            if type(val) in (int, float, str, bool):
+                crc = crc32(repr(val).encode(), crc)
+            elif isinstance(val, type) and level < _MAX_CLASS_LEVEL and name[:2] != "__":
+                # the classes are expanded in the stubs to the same level, if there is enough memory left
+                if gc.mem_free() < _CLASS_MEM:  # type: ignore
+                    gc.collect()
+                if gc.mem_free() >= _CLASS_MEM:  # type: ignore
+                    crc = self.fingerprint_members(val, crc, level + 1)
+        return crc
+
+    def write_object_stub(self, fp, object_expr: object, obj_name: str, indent: str, in_class: int = 0):
+        "Write the stub records of a module/object to an open file. Can be called recursive."
+        if not isinstance(fp, StubWriter):
+            # buffer all writes to a plain file object
+            w = StubWriter(fp, self.buffer_size)
+            self.write_object_stub(w, object_expr, obj_name, indent, in_class)
+            w.flush()
+            return
+        gc.collect()
+        if self.profile:
+            self._min_free = min(self._min_free, gc.mem_free())  # type: ignore
+        if object_expr in self.problematic:
+            log.warning("SKIPPING problematic module:{}".format(object_expr))
+            return
+
+        level = len(indent) // 4
+        for item_name, item_instance, item_type_txt, _ in self.iter_obj_attributes(object_expr):
+            if item_name in ["classmethod", "staticmethod", "BaseException", "Exception"]:
+                # do not create stubs for these primitives
+                continue
+            if item_name[0].isdigit():
+                log.warning("NameError: invalid name {}".format(item_name))
+                continue
+            # Class expansion only on first 3 levels (bit of a hack)
+            if item_type_txt == "<class 'type'>" and len(indent) <= _MAX_CLASS_LEVEL * 4:
+                if (
+                    item_name.endswith("Exception")
+                    or item_name.endswith("Error")
+                    or item_name in ["KeyboardInterrupt", "StopIteration", "SystemExit"]
+                ):
+                    write_record(fp, _R_EXCEPTION, level, item_name)
+                    continue
+                # only expand the class if there is enough memory left
+                if gc.mem_free() < _CLASS_MEM:  # type: ignore
+                    gc.collect()
+                if gc.mem_free() >= _CLASS_MEM:  # type: ignore
+                    write_record(fp, _R_CLASS, level, item_name)
+                    self.write_object_stub(fp, item_instance, "{0}.{1}".format(obj_name, item_name), indent + "    ", in_class + 1)
+                else:
+                    log.warning("Low memory: class {}.{} is not expanded".format(obj_name, item_name))
+                    self._depth = min(self._depth, level)
+                    write_record(fp, _R_INCOMPLETE, level, item_name)
+            elif any(word in item_type_txt for word in ["method", "function", "closure"]):
+                if "bound_method" in item_type_txt or "bound_method" in repr(item_instance):
+                    write_record(fp, _R_CLASSMETHOD, level, item_name)
+                else:
+                    write_record(fp, _R_FUNCTION, level, item_name)
+            elif item_type_txt == "<class 'module'>":
+                # Skip imported modules
+                pass
+            elif item_type_txt.startswith("<class '"):
+                t = item_type_txt[8:-2]
+                # dict, list , tuple: the value is not needed
+                write_record(fp, _R_VALUE, level, item_name, t, "" if t in ("dict", "list", "tuple") else repr(item_instance))
+            else:
+                write_record(fp, _R_OTHER, level, item_name, item_type_txt)
+
+    @property
+    def flat_fwid(self):
+        "Turn _fwid from 'v1.2.3' into '1_2_3' to be used in filename"
+        s = self._fwid
+        # path name restrictions
+        chars = " .()/\\:$"
+        for c in chars:
+            s = s.replace(c, "_")
+        return s
+
+    def clean(self, path: str = ""):  # type: ignore
+        "Remove all files from the stub folder"
+        if not path:
+            path = self.path
+        log.info("Clean/remove files in folder: {}".format(path))
+        # the removed folders need to be created again
+        _folders.clear()
+        try:
+            os.stat(path)  # TEMP workaround mpremote listdir bug -
+            items = os.listdir(path)
+        except (OSError, AttributeError):
+            # os.listdir fails on unix
+            return
+        for fn in items:
+            item = "{}/{}".format(path, fn)
+            try:
+                os.remove(item)
+            except OSError:
+                try:  # folder
+                    self.clean(item)
+                    os.rmdir(item)
+                except OSError:
+                    pass
+
+    def open_file(self, file_name: str, mode: str):
+        "Open a stub or report file, or a stream to the host"
+        if self.stream:
+            return StreamFile(file_name, mode)
+        return open(file_name, mode)
+
+    def report_start(self, filename: str = "modules.json"):
+        """Start a report of the modules that have been stubbed
+        "create json with list of exported modules"""
+        self._json_name = "{}/{}".format(self.path, filename)
+        self._json_first = True
+        self._report = []
+        if not self.stream:
+            ensure_folder(self._json_name)
+        log.info("Report file: {}".format(self._json_name))
+        gc.collect()
+        try:
+            # write json by node to reduce memory requirements
+            with self.open_file(self._json_name, "w") as f:
+                f.write("{")
+                f.write(dumps({"firmware": self.info})[1:-1])
+                f.write(",\n")
+                f.write(dumps({"stubber": {"version": __version__}, "stubtype": "firmware"})[1:-1])
+                f.write(",\n")
+                f.write('"modules" :[\n')
+
+        except OSError as e:
+            log.error("Failed to create the report.")
+            self._json_name = None
+            raise e
+
+    def report_add(self, module_name: str, stub_file: str, crc: int = 0, unchanged: bool = False):
+        "Add a module to the report"
+        # keep a few json nodes in memory, and append them to the file in one go
+        if not self._json_name:
+            raise Exception("No report file")
+        line = '{{"module": "{}", "file": "{}", "depth": {}'.format(module_name, stub_file.replace("\\", "/"), self._depth)
+        if self._profile:
+            # import time in ms, free memory before and after the import, after writing the stub,
+            # the lowest free memory while writing the stub, and the size of the stub
+            keys = ("import_ms", "mem_before", "mem_import", "mem_after", "mem_min", "size")
+            line += ', "profile": {' + ", ".join('"{}": {}'.format(k, v) for k, v in zip(keys, self._profile)) + "}"
+            self._profile = None
+        if crc:
+            line += ', "crc": "{:08x}"'.format(crc)
+        if unchanged:
+            # the stub of the previous run can be used
+            line += ', "unchanged": true'
+        line += "}"
+        self._report.append(line)
+        if self.report_batch and len(self._report) >= self.report_batch:
+            self.report_flush()
+
+    def report_flush(self):
+        """Append the pending modules to the report file.
+        Must be called before recording progress, to allow a restart to continue the report"""
+        if not self._report:
+            return
+        try:
+            with self.open_file(self._json_name, "a") as f:
+                self._report_write(f)
+        except OSError:
+            log.error("Failed to create the report.")
+
+    def _report_write(self, f):
+        for line in self._report:
+            if not self._json_first:
+                f.write(",\n")
+            else:
+                self._json_first = False
+            f.write(line)
+        self._report = []
+
+    def report_end(self):
+        if not self._json_name:
+            raise Exception("No report file")
+        with self.open_file(self._json_name, "a") as f:
+            self._report_write(f)
+            f.write("\n]}")
+        # is used as sucess indicator
+        log.info("Path: {}".format(self.path))
+
+
+# folders that are known to exist, to avoid repeated os.stat calls
+_folders = set()
+
+
+def ensure_folder(path: str):
+    "Create nested folders if needed"
+    if path[: path.rfind("/")] in _folders:
+        return
+    i = start = 0
+    while i != -1:
+        i = path.find("/", start)
+        if i != -1:
+            p = path[0] if i == 0 else path[:i]
+            # p = partial folder
+            if p not in _folders:
+                try:
+                    _ = os.stat(p)
+                    _folders.add(p)
+                except OSError as e:
+                    # folder does not exist
+                    if e.args[0] in [ENOENT, ENOMESSAGE]:
+                        try:
+                            log.debug("Create folder {}".format(p))
+                            os.mkdir(p)
+                            _folders.add(p)
+                        except OSError as e2:
+                            log.error("failed to create folder {}".format(p))
+                            raise e2
+        # next level deep
+        start = i + 1
+
+
+def _build(s):
+    # extract build from sys.version or os.uname().version if available
+    # sys.version: 'MicroPython v1.24.0-preview.6.g3d0b6276f'
+    # sys.implementation.version: 'v1.13-103-gb137d064e'
+    if not s:
+        return ""
+    s = s.split(" on ", 1)[0] if " on " in s else s
+    if s.startswith("v"):
+        if not "-" in s:
+            return ""
+        b = s.split("-")[1]
+        return b
+    if not "-preview" in s:
+        return ""
+    b = s.split("-preview")[1].split(".")[1]
+    return b
+
+
+def _info():  # type:() -> dict[str, str]
+    try:
+        fam = sys.implementation[0]  # type: ignore
+    except TypeError:
+        # testing on CPython 3.11
+        fam = sys.implementation.name
+
+    info = OrderedDict(
+        {
+            "family": fam,
+            "version": "",
+            "build": "",
+            "ver": "",
+            "port": sys.platform,  # port: esp32 / win32 / linux / stm32
+            "board": "UNKNOWN",
+            "board_id": "",
+            "variant": "",
+            "cpu": "",
+            "mpy": "",
+            "arch": "",
+        }
+    )
+    # change port names to be consistent with the repo
+    if info["port"].startswith("pyb"):
+        info["port"] = "stm32"
+    elif info["port"] == "win32":
+        info["port"] = "windows"
+    elif info["port"] == "linux":
+        info["port"] = "unix"
+    try:
+        info["version"] = version_str(sys.implementation.version)  # type: ignore
+    except AttributeError:
+        pass
+    try:
+        _machine = sys.implementation._machine if "_machine" in dir(sys.implementation) else os.uname().machine  # type: ignore
+        info["board"] = _machine.strip()
+        si_build = sys.implementation._build if "_build" in dir(sys.implementation) else ""
+        if si_build:
+            info["board"] = si_build.split("-")[0]
+            info["variant"] = si_build.split("-")[1] if "-" in si_build else ""
+        info["board_id"] = si_build
+        info["cpu"] = _machine.split("with")[-1].strip()
+        info["mpy"] = (
+            sys.implementation._mpy  # type: ignore
+            if "_mpy" in dir(sys.implementation)
+            else sys.implementation.mpy if "mpy" in dir(sys.implementation) else ""  # type: ignore
+        )
+    except (AttributeError, IndexError):
+        pass
+    if not info["board_id"]:
+        get_boardname(info)
+
+    try:
+        if "uname" in dir(os):  # old
+            # extract build from uname().version if available
+            info["build"] = _build(os.uname()[3])  # type: ignore
+            if not info["build"]:
+                # extract build from uname().release if available
+                info["build"] = _build(os.uname()[2])  # type: ignore
+        elif "version" in dir(sys):  # new
+            # extract build from sys.version if available
+            info["build"] = _build(sys.version)
+    except (AttributeError, IndexError, TypeError):
+        pass
+    # avoid  build hashes
+    # if info["build"] and len(info["build"]) > 5:
+    #     info["build"] = ""
+
+    if info["version"] == "" and sys.platform not in ("unix", "win32"):
+        try:
+            u = os.uname()  # type: ignore
+            info["version"] = u.release
+        except (IndexError, AttributeError, TypeError):
+            pass
+    # detect families
+    for fam_name, mod_name, mod_thing in [
+        ("pycopy", "pycopy", "const"),
+        ("pycom", "pycom", "FAT"),
+        ("ev3-pybricks", "pybricks.hubs", "EV3Brick"),
+    ]:
+        try:
+            _t = __import__(mod_name, None, None, (mod_thing))
+            info["family"] = fam_name
+            del _t
+            break
+        except (ImportError, KeyError):
+            pass
+
+    if info["family"] == "ev3-pybricks":
+        info["release"] = "2.0.0"
+
+    if info["family"] == "micropython":
+        info["version"]
+        if (
+            info["version"]
+            and info["version"].endswith(".0")
+            and info["version"] >= "1.10.0"  # versions from 1.10.0 to 1.24.0 do not have a micro .0
+            and info["version"] <= "1.19.9"
+        ):
+            # versions from 1.10.0 to 1.24.0 do not have a micro .0
+            info["version"] = info["version"][:-2]
+
+    # spell-checker: disable
+    if "mpy" in info and info["mpy"]:  # mpy on some v1.11+ builds
+        sys_mpy = int(info["mpy"])
+        # .mpy architecture
+        try:
+            arch = [
+                None,
+                "x86",
+                "x64",
+                "armv6",
+                "armv6m",
+                "armv7m",
+                "armv7em",
+                "armv7emsp",
+                "armv7emdp",
+                "xtensa",
+                "xtensawin",
+                "rv32imc",
+            ][sys_mpy >> 10]
+        except IndexError:
+            arch = "unknown"
+        if arch:
+            info["arch"] = arch
+        # .mpy version.minor
+        info["mpy"] = "v{}.{}".format(sys_mpy & 0xFF, sys_mpy >> 8 & 3)
+    if info["build"] and not info["version"].endswith("-preview"):
+        info["version"] = info["version"] + "-preview"
+    # simple to use version[-build] string
+    info["ver"] = f"{info['version']}-{info['build']}" if info["build"] else f"{info['version']}"
+
+    return info
+
+
+def version_str(version: tuple):  #  -> str:
+    v_str = ".".join([str(n) for n in version[:3]])
+    if len(version) > 3 and version[3]:
+        v_str += "-" + version[3]
+    return v_str
+
+
+def get_boardname(info: dict) -> str:
+    "Read the board_id from the boardname.py file that may have been created upfront"
+    try:
+        from boardname import BOARD_ID  # type: ignore
+
+        log.info("Found BOARD_ID: {}".format(BOARD_ID))
+    except ImportError:
+        log.warning("BOARD_ID not found")
+        BOARD_ID = ""
+    info["board_id"] = BOARD_ID
+    info["board"] = BOARD_ID.split("-")[0] if "-" in BOARD_ID else BOARD_ID
+    info["variant"] == BOARD_ID.split("-")[1] if "-" in BOARD_ID else ""
+
+
+def get_root() -> str:  # sourcery skip: use-assigned-variable
+    "Determine the root folder of the device"
+    try:
+        c = os.getcwd()
+    except (OSError, AttributeError):
+        # unix port
+        c = "."
+    r = c
+    for r in ["/remote", "/sd", "/flash", "/", c, "."]:
+        try:
+            _ = os.stat(r)
+            break
+        except OSError:
+            continue
+    return r
+
+
+def file_exists(filename: str):
+    try:
+        if os.stat(filename)[0] >> 14:
+            return True
+        return False
+    except OSError:
+        return False
+
+
+def available_modules():
+    """
+    Read the modules of this firmware from `modulelist.avail`, as listed by help('modules'),
+    and add the modules found in the library folders.
+    Returns a set of top level module names, or None if there is no list to read.
+    """
+    if not file_exists("modulelist.avail"):
+        return None
+    avail = set()
+    with open("modulelist.avail") as f:
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            line = line.strip()
+            if line and line[0] != "#":
+                avail.add(line.split("/")[0])
+    for p in LIBS:
+        try:
+            for name in os.listdir(p):
+                avail.add(name.split(".")[0])
+        except OSError:
+            pass
+    gc.collect()
+    return avail
+
+
+def read_fingerprints():
+    """
+    Read the fingerprints of the modules stubbed in a previous run from `modulelist.crc`,
+    with a module name and its crc as hex on each line.
+    Returns a dict of module name to crc, or None if there is no file to read.
+    """
+    if not file_exists(_FINGERPRINTS):
+        # the host did not ask to skip the unchanged modules
+        return None
+    fingerprints = {}
+    try:
+        with open(_FINGERPRINTS) as f:
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                parts = line.split()
+                if len(parts) == 2 and line[0] != "#":
+                    fingerprints[parts[0]] = int(parts[1], 16)
+    except (OSError, ValueError):
+        pass
+    gc.collect()
+    return fingerprints
+
+
+def show_help():
+    print("-p, --path   path to store the stubs in, defaults to '.'")
+    sys.exit(1)
+
+
+def read_path() -> str:
+    "get --path from cmdline. [unix/win]"
+    path = ""
+    if len(sys.argv) == 3:
+        cmd = (sys.argv[1]).lower()
+        if cmd in ("--path", "-p"):
+            path = sys.argv[2]
+        else:
+            show_help()
+    elif len(sys.argv) == 2:
+        show_help()
+    return path
+
+
+def is_micropython() -> bool:
+    "runtime test to determine full or micropython"
+    # pylint: disable=unused-variable,eval-used
+    try:
+        # either test should fail on micropython
+
+        # b) https://docs.micropython.org/en/latest/genrst/builtin_types.html#bytes-with-keywords-not-implemented
+        # Micropython: NotImplementedError
+        b = bytes("abc", encoding="utf8")  # type: ignore
+
+        # c) https://docs.micropython.org/en/latest/genrst/core_language.html#function-objects-do-not-have-the-module-attribute
+        # Micropython: AttributeError
+        c = is_micropython.__module__  # type: ignore
+        return False
+    except (NotImplementedError, AttributeError):
+        return True
+
+
+def main():
+    stubber = Stubber(path=read_path())
+    # stubber = Stubber(path="/sd")
+    # Option: Specify a firmware name & version
+    # stubber = Stubber(firmware_id='HoverBot v1.2.1')
+    stubber.clean()
+
+    # Read stubs from modulelist in the current folder or in /libs
+    # fall back to default modules
+    def get_modulelist(stubber):
+        # new
+        gc.collect()
+        stubber.modules = []  # avoid duplicates
+        for p in LIBS:
+            fname = p + "/modulelist.txt"
+            if not file_exists(fname):
+                continue
+            with open(fname) as f:
+                # print("DEBUG: list of modules: " + p + "/modulelist.txt")
+                while True:
+                    line = f.readline().strip()
+                    if not line:
+                        break
+                    if len(line) > 0 and line[0] != "#":
+                        stubber.modules.append(line)
+                gc.collect()
+                print("BREAK")
+                break
+
+        if not stubber.modules:
+            stubber.modules = ["micropython"]
+            # _log.warn("Could not find modulelist.txt, using default modules")
+        gc.collect()
+
+    stubber.modules = []  # avoid duplicates
+    get_modulelist(stubber)
+
+    gc.collect()
+
+    stubber.create_all_stubs()
+
+
+if __name__ == "__main__" or is_micropython():
+    if not file_exists("no_auto_stubber.txt"):
+        print("createstubs.py: {}".format(__version__))
+        try:
+            gc.threshold(4 * 1024)  # type: ignore
+            gc.enable()
+        except BaseException:
+            pass
+        main()
@@ -8,7 +8,7 @@ Create stubs for (all) modules on a MicroPython board.
     2) stored the already processed modules in a text file `modulelist.done` 
     3) process the modules in the database:
         - stub the module
-        - update the modulelist.done file
+        - update the modulelist.done file, every few modules or when memory runs low
         - reboots the device if it runs out of memory
     4) creates the modules.json
 
@@ -28,6 +28,18 @@ import os
 import sys
 from time import sleep
 
+try:
+    from time import ticks_diff, ticks_ms  # type: ignore
+except ImportError:  # testing on CPython
+    from time import time
+
+    def ticks_ms():
+        return int(time() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+
 try:
     from ujson import dumps
 except:
@@ -38,6 +50,23 @@ try:
 except ImportError:
     pass
 
+try:
+    from ubinascii import b2a_base64, crc32
+except ImportError:
+    try:
+        from binascii import b2a_base64, crc32
+    except ImportError:
+        crc32 = None  # streaming is not available
+
+try:
+    import deflate  # MicroPython 1.21+
+except ImportError:
+    deflate = None
+    try:
+        import zlib
+    except ImportError:
+        zlib = None
+
 try:
     from collections import OrderedDict
 except ImportError:
@@ -47,6 +76,14 @@ __version__ = "v1.25.0"
 ENOENT = 2  # on most ports
 ENOMESSAGE = 44  # on pyscript
 _MAX_CLASS_LEVEL = 2  # Max class nesting
+_CLASS_MEM = 4 * 1024  # free memory needed to expand a class, below this only a placeholder is written
+_WRITE_BUFFER = 256  # stubs are written to the file in chunks of this size
+_REPORT_BATCH = 8  # report entries kept in memory before they are appended to modules.json
+_STREAM_FLAG = "stream_stubber.txt"  # if this file exists, the stubs are streamed to stdout rather than written to files
+_STREAM_CHUNK = 384  # bytes per streamed line, 512 characters in base64
+_PROFILE_FLAG = "profile_stubber.txt"  # if this file exists, the import time and memory use of each module are reported
+_COMPRESS_FLAG = "compress_stubber.txt"  # if this file exists, the stubs are written as .pyi.gz, when the port can compress
+_FINGERPRINTS = "modulelist.crc"  # fingerprints of the modules in a previous run, the unchanged modules are not stubbed again
 LIBS = ["lib", "/lib", "/sd/lib", "/flash/lib", "."]
 
 
@@ -89,6 +126,147 @@ logging.basicConfig(level=logging.INFO)
 # logging.basicConfig(level=logging.DEBUG)
 
 
+try:
+    # MicroPython exposes the utf-8 bytes of a str through the buffer protocol, CPython does not
+    memoryview("")
+    _STR_BUFFER = True
+except TypeError:
+    _STR_BUFFER = False
+
+
+class StubWriter:
+    """
+    Collect many small writes in a fixed-size buffer and write them to the file in chunks.
+    Each write accepts multiple str/bytes parts, so no temporary strings need to be formatted.
+    On MicroPython a str is copied to the buffer from its own utf-8 bytes, CPython needs to encode it.
+    """
+
+    def __init__(self, fp, size: int = _WRITE_BUFFER):
+        self.fp = fp
+        self.size = size
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.n = 0
+        self.written = 0
+        try:
+            # binary files accept bytes, text files ( on CPython) need str
+            fp.write(b"")
+            self.text = False
+        except TypeError:
+            self.text = True
+
+    def write(self, *parts):
+        for s in parts:
+            if isinstance(s, str):
+                s = memoryview(s) if _STR_BUFFER else s.encode()
+            l = len(s)
+            if self.text and self.n + l > self.size:
+                # do not split multi-byte characters written to a text file
+                self.flush()
+                if l > self.size:
+                    self._write(s)
+                    continue
+            # fill up the buffer, and write it out when it is full
+            i = 0
+            while i < l:
+                c = min(self.size - self.n, l - i)
+                self.mv[self.n : self.n + c] = s if c == l else s[i : i + c]
+                self.n += c
+                i += c
+                if self.n == self.size:
+                    self.flush()
+
+    def flush(self):
+        if self.n:
+            self._write(self.mv[: self.n])
+            self.n = 0
+
+    def _write(self, b):
+        self.written += len(b)
+        self.fp.write(str(b, "utf-8") if self.text else b)
+
+
+class StreamFile:
+    """
+    Stream a file to the host as framed, checksummed lines on stdout:
+    ##STUB##:<w|a>:<file name>:<crc32>:<base64 data>
+    """
+
+    def __init__(self, name: str, mode: str = "w"):
+        self.name = name
+        self.op = "a" if mode[0] == "a" else "w"
+        if self.op == "w":
+            # create or truncate the file on the host
+            self._frame(b"")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+    def write(self, b):
+        if isinstance(b, str):
+            b = b.encode()
+        for i in range(0, len(b), _STREAM_CHUNK):
+            self._frame(b[i : i + _STREAM_CHUNK])
+        return len(b)
+
+    def _frame(self, b):
+        print("##STUB##:{}:{}:{:08x}:{}".format(self.op, self.name, crc32(b) & 0xFFFFFFFF, b2a_base64(b).decode().strip()))  # type: ignore
+        self.op = "a"
+
+
+class GzipFile:
+    """
+    Write a stub file compressed with gzip, using deflate on MicroPython 1.21+, or zlib.
+    Not all ports can compress, see can_compress().
+    """
+
+    def __init__(self, name: str, mode: str = "wb"):
+        self.f = open(name, mode)
+        if deflate:
+            self.z = deflate.DeflateIO(self.f, deflate.GZIP)
+        else:
+            # wbits 31: a gzip header and trailer
+            self.z = zlib.compressobj(9, zlib.DEFLATED, 31)  # type: ignore
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, b):
+        if deflate:
+            return self.z.write(b)
+        self.f.write(self.z.compress(b))
+        return len(b)
+
+    def close(self):
+        if deflate:
+            self.z.close()
+        else:
+            self.f.write(self.z.flush())
+        self.f.close()
+
+
+def can_compress() -> bool:
+    "check if this firmware can compress, deflate is often built without its compressor, and zlib only decompresses on MicroPython"
+    try:
+        if deflate:
+            from io import BytesIO
+
+            deflate.DeflateIO(BytesIO(), deflate.GZIP).write(b"#")
+            return True
+        return hasattr(zlib, "compressobj")
+    except Exception:
+        return False
+
+
 class Stubber:
     "Generate stubs for modules in firmware"
 
@@ -120,10 +298,23 @@ class Stubber:
 
         self.path = "{}/stubs/{}".format(path, self.flat_fwid).replace("//", "/")
         # log.debug(self.path)
-        try:
-            ensure_folder(path + "/")
-        except OSError:
-            log.error("error creating stub folder {}".format(path))
+        # stream the stubs and the report to the host, rather than writing to files
+        self.stream = crc32 is not None and file_exists(_STREAM_FLAG)
+        # record the import time and memory use of each module in the report
+        self.profile = file_exists(_PROFILE_FLAG)
+        # compress the stub files, to reduce the transfer to the host
+        self.compress = not self.stream and file_exists(_COMPRESS_FLAG) and can_compress()
+        self._profile = None
+        self._min_free = 0
+        # the fingerprints of the modules stubbed in a previous run of this firmware
+        self.fingerprints = read_fingerprints()
+        # the folders of a previous run may have been removed
+        _folders.clear()
+        if not self.stream:
+            try:
+                ensure_folder(path + "/")
+            except OSError:
+                log.error("error creating stub folder {}".format(path))
         self.problematic = [
             "upip",
             "upysh",
@@ -142,48 +333,67 @@ class Stubber:
         ]
         # there is no option to discover modules from micropython, list is read from an external file.
         self.modules = []  # type: list[str]
+        # the top level modules that are present on this firmware, None if unknown
+        self.available = available_modules()
         self._json_name = None
         self._json_first = False
+        self._report = []  # type: list[str]
+        self.report_batch = _REPORT_BATCH
+        self.buffer_size = _WRITE_BUFFER
+        # number of class levels expanded in the current module
+        self._depth = _MAX_CLASS_LEVEL + 1
 
     def get_obj_attributes(self, item_instance: object):
         "extract information of the objects members and attributes"
-        # name_, repr_(value), type as text, item_instance
+        # name_, repr_(value), type as text, item_instance, order
         _result = []
         _errors = []
-        # log.debug("get attributes {} {}".format(repr(item_instance), item_instance))
-        for name in dir(item_instance):
-            if name.startswith("__") and not name in self.modules:
-                continue
-            # log.debug("get attribute {}".format(name))
-            try:
-                val = getattr(item_instance, name)
-                # name , item_repr(value) , type as text, item_instance, order
-                # log.debug("attribute {}:{}".format(name, val))
+        for name, val, type_txt, order in self.iter_obj_attributes(item_instance, _errors):
+            _result.append((name, repr(val), type_txt, val, order))
+        gc.collect()
+        return _result, _errors
+
+    def iter_obj_attributes(self, item_instance: object, errors=None):
+        """
+        Yield the members and attributes of an object as (name, value, type as text, order),
+        ordered by: 1 = literals, 2 = functions/methods, 3 = classes, 4 = other.
+        Rather than collecting and sorting all attributes, dir() is walked once per order,
+        so only a single attribute is held at the time.
+        """
+        for bucket in (1, 2, 3, 4):
+            for name in dir(item_instance):
+                if name.startswith("__"):
+                    # remove internal __
+                    continue
+                try:
+                    val = getattr(item_instance, name)
+                except AttributeError as e:
+                    if bucket == 1:
+                        msg = "Couldn't get attribute '{}' from object '{}', Err: {}".format(name, item_instance, e)
+                        if errors is None:
+                            log.error(msg)
+                        else:
+                            errors.append(msg)
+                    continue
+                except MemoryError as e:
+                    print("MemoryError: {}".format(e))
+                    sleep(1)
+                    reset()
+                type_txt = repr(type(val))
                 try:
-                    type_text = repr(type(val)).split("'")[1]
+                    t = type_txt.split("'")[1]
                 except IndexError:
-                    type_text = ""
-                if type_text in {"int", "float", "str", "bool", "tuple", "list", "dict"}:
+                    t = ""
+                if t in {"int", "float", "str", "bool", "tuple", "list", "dict"}:
                     order = 1
-                elif type_text in {"function", "method"}:
+                elif t in {"function", "method"}:
                     order = 2
-                elif type_text in ("class"):
+                elif t in ("class"):
                     order = 3
                 else:
                     order = 4
-                _result.append((name, repr(val), repr(type(val)), val, order))
-            except AttributeError as e:
-                _errors.append("Couldn't get attribute '{}' from object '{}', Err: {}".format(name, item_instance, e))
-            except MemoryError as e:
-                print("MemoryError: {}".format(e))
-                sleep(1)
-                reset()
-
-        # remove internal __
-        # _result = sorted([i for i in _result if not (i[0].startswith("_"))], key=lambda x: x[4])
-        _result = sorted([i for i in _result if not (i[0].startswith("__"))], key=lambda x: x[4])
-        gc.collect()
-        return _result, _errors
+                if order == bucket:
+                    yield name, val, type_txt, order
 
     def add_modules(self, modules):
         "Add additional modules to be exported"
@@ -206,6 +416,9 @@ class Stubber:
         if module_name in self.excluded:
             log.warning("Skip module: {:<25}        : Excluded".format(module_name))
             return False
+        if not self.is_available(module_name):
+            # log.debug("Skip module: {:<25}        : Not available".format(module_name))
+            return False
 
         file_name = "{}/{}.pyi".format(self.path, module_name.replace(".", "/"))
         gc.collect()
@@ -217,6 +430,14 @@ class Stubber:
         gc.collect()
         return result
 
+    def is_available(self, module_name: str) -> bool:
+        "check if a module can be present on this firmware, without the cost of trying to import it"
+        if self.available is None:
+            return True
+        top = module_name.replace(".", "/").split("/")[0]
+        # weak links: `import ujson` imports `json`
+        return top in self.available or (top[:1] == "u" and top[1:] in self.available)
+
     def create_module_stub(self, module_name: str, file_name: str = None) -> bool:  # type: ignore
         """Create a Stub of a single python module
 
@@ -237,7 +458,10 @@ class Stubber:
         # import the module (as new_module) to examine it
         new_module = None
         try:
+            m0 = gc.mem_free()  # type: ignore
+            t0 = ticks_ms()
             new_module = __import__(module_name, None, None, ("*"))
+            t0 = ticks_diff(ticks_ms(), t0)
             m1 = gc.mem_free()  # type: ignore
             log.info("Stub module: {:<25} to file: {:<70} mem:{:>5}".format(module_name, fname, m1))
 
@@ -245,17 +469,30 @@ class Stubber:
             # log.debug("Skip module: {:<25} {:<79}".format(module_name, "Module not found."))
             return False
 
-        # Start a new file
-        # log.debug("Create file: {}".format(file_name))
-        ensure_folder(file_name)
-        with open(file_name, "w") as fp:
-            info_ = str(self.info).replace("OrderedDict(", "").replace("})", "}")
-            s = '"""\nModule: \'{0}\' on {1}\n"""\n# MCU: {2}\n# Stubber: {3}\n'.format(module_name, self._fwid, info_, __version__)
-            fp.write(s)
-            fp.write("from __future__ import annotations\nfrom typing import Any, Final, Generator\nfrom _typeshed import Incomplete\n\n")
-            self.write_object_stub(fp, new_module, module_name, "")
-
-        self.report_add(module_name, file_name)
+        # the depth is reported for each module, also when it is unchanged
+        self._depth = _MAX_CLASS_LEVEL + 1
+        # the stub of a module that did not change since the previous run is not written again
+        # without the fingerprints of a previous run, the modules are not fingerprinted
+        crc = self.fingerprint(new_module) if self.fingerprints is not None else 0
+        unchanged = crc and self.fingerprints.get(module_name) == crc
+        if unchanged:
+            log.info("Unchanged module: {}".format(module_name))
+        else:
+            # Start a new file
+            # log.debug("Create file: {}".format(file_name))
+            if not self.stream:
+                ensure_folder(file_name)
+            with GzipFile(file_name + ".gz") if self.compress else self.open_file(file_name, "wb") as f:
+                fp = StubWriter(f, self.buffer_size)
+                self.write_module_header(fp, module_name)
+                self._min_free = m1
+                self.write_object_stub(fp, new_module, module_name, "")
+                fp.flush()
+            if self.profile:
+                gc.collect()
+                self._profile = (t0, m0, m1, gc.mem_free(), self._min_free, fp.written)  # type: ignore
+
+        self.report_add(module_name, file_name, crc, unchanged)
 
         if module_name not in {"os", "sys", "logging", "gc"}:
             # try to unload the module unless we use it
@@ -267,56 +504,109 @@ class Stubber:
         gc.collect()
         return True
 
+    def write_module_header(self, fp, module_name: str):
+        "Write the docstring, the MCU info and the imports at the start of a module stub"
+        info_ = str(self.info).replace("OrderedDict(", "").replace("})", "}")
+        fp.write('"""\nModule: \'', module_name, "' on ", self._fwid, '\n"""\n')
+        fp.write("# MCU: ", info_, "\n# Stubber: ", __version__, "\n")
+        fp.write(
+            "from __future__ import annotations\nfrom typing import Any, Final, Generator\nfrom _typeshed import Incomplete\n\n"
+        )
+
+    def fingerprint(self, module) -> int:
+        """A cheap fingerprint of a module: a crc over the names and types of its members,
+        the values of its literals, and the same for the members of its (nested) classes"""
+        if crc32 is None:
+            return 0
+        return self.fingerprint_members(module, crc32(__version__.encode()), 0) & 0xFFFFFFFF
+
+    def fingerprint_members(self, obj, crc: int, level: int) -> int:
+        names = dir(obj)
+        names.sort()
+        for name in names:
+            try:
+                val = getattr(obj, name)
+            except AttributeError:
+                continue
+            crc = crc32(name.encode(), crc)
+            crc = crc32(repr(type(val)).encode(), crc)
+            if type(val) in (int, float, str, bool):
+                crc = crc32(repr(val).encode(), crc)
+            elif isinstance(val, type) and level < _MAX_CLASS_LEVEL and name[:2] != "__":
+                # the classes are expanded in the stubs to the same level, if there is enough memory left
+                if gc.mem_free() < _CLASS_MEM:  # type: ignore
+                    gc.collect()
+                if gc.mem_free() >= _CLASS_MEM:  # type: ignore
+                    crc = self.fingerprint_members(val, crc, level + 1)
+        return crc
+
     def write_object_stub(self, fp, object_expr: object, obj_name: str, indent: str, in_class: int = 0):
         "Write a module/object stub to an open file. Can be called recursive."
+        if not isinstance(fp, StubWriter):
+            # buffer all writes to a plain file object
+            w = StubWriter(fp, self.buffer_size)
+            self.write_object_stub(w, object_expr, obj_name, indent, in_class)
+            w.flush()
+            return
         gc.collect()
+        if self.profile:
+            self._min_free = min(self._min_free, gc.mem_free())  # type: ignore
         if object_expr in self.problematic:
             log.warning("SKIPPING problematic module:{}".format(object_expr))
             return
 
         # # log.debug("DUMP    : {}".format(object_expr))
-        items, errors = self.get_obj_attributes(object_expr)
+        for item_name, item_instance, item_type_txt, _ in self.iter_obj_attributes(object_expr):
+            # name_, item_instance, type as text, order
+            self.write_item_stub(fp, item_name, item_instance, item_type_txt, obj_name, indent, in_class)
 
-        if errors:
-            log.error(errors)
+        # del items
+        # del errors
+        # try:
+        #     del item_name, item_repr, item_type_txt, item_instance  # type: ignore
+        # except (OSError, KeyError, NameError):
+        #     pass
 
-        for item_name, item_repr, item_type_txt, item_instance, _ in items:
-            # name_, repr_(value), type as text, item_instance, order
-            if item_name in ["classmethod", "staticmethod", "BaseException", "Exception"]:
-                # do not create stubs for these primitives
-                continue
-            if item_name[0].isdigit():
-                log.warning("NameError: invalid name {}".format(item_name))
-                continue
-            # Class expansion only on first 3 levels (bit of a hack)
-            if (
-                item_type_txt == "<class 'type'>"
-                and len(indent) <= _MAX_CLASS_LEVEL * 4
-                # and not obj_name.endswith(".Pin")
-                # avoid expansion of Pin.cpu / Pin.board to avoid crashes on most platforms
-            ):
-                # log.debug("{0}class {1}:".format(indent, item_name))
-                superclass = ""
-                is_exception = (
-                    item_name.endswith("Exception")
-                    or item_name.endswith("Error")
-                    or item_name
-                    in [
-                        "KeyboardInterrupt",
-                        "StopIteration",
-                        "SystemExit",
-                    ]
-                )
-                if is_exception:
-                    superclass = "Exception"
-                s = "\n{}class {}({}):\n".format(indent, item_name, superclass)
-                # s += indent + "    ''\n"
-                if is_exception:
-                    s += indent + "    ...\n"
-                    fp.write(s)
-                    continue
-                # write classdef
-                fp.write(s)
+    def write_item_stub(
+        self, fp, item_name: str, item_instance: object, item_type_txt: str, obj_name: str, indent: str, in_class: int = 0
+    ):
+        "Write the stub of a single member of a module/object"
+        if item_name in ["classmethod", "staticmethod", "BaseException", "Exception"]:
+            # do not create stubs for these primitives
+            return
+        if item_name[0].isdigit():
+            log.warning("NameError: invalid name {}".format(item_name))
+            return
+        # Class expansion only on first 3 levels (bit of a hack)
+        if (
+            item_type_txt == "<class 'type'>"
+            and len(indent) <= _MAX_CLASS_LEVEL * 4
+            # and not obj_name.endswith(".Pin")
+            # avoid expansion of Pin.cpu / Pin.board to avoid crashes on most platforms
+        ):
+            # log.debug("{0}class {1}:".format(indent, item_name))
+            superclass = ""
+            is_exception = (
+                item_name.endswith("Exception")
+                or item_name.endswith("Error")
+                or item_name
+                in [
+                    "KeyboardInterrupt",
+                    "StopIteration",
+                    "SystemExit",
+                ]
+            )
+            if is_exception:
+                superclass = "Exception"
+            # write classdef
+            fp.write("\n", indent, "class ", item_name, "(", superclass, "):\n")
+            if is_exception:
+                fp.write(indent, "    ...\n")
+                return
+            # only expand the class if there is enough memory left
+            if gc.mem_free() < _CLASS_MEM:  # type: ignore
+                gc.collect()
+            if gc.mem_free() >= _CLASS_MEM:  # type: ignore
                 # first write the class literals and methods
                 # log.debug("# recursion over class {0}".format(item_name))
                 self.write_object_stub(
@@ -326,84 +616,73 @@ class Stubber:
                     indent + "    ",
                     in_class + 1,
                 )
-                # end with the __init__ method to make sure that the literals are defined
-                # Add __init__
-                s = indent + "    def __init__(self, *argv, **kwargs) -> None:\n"
-                s += indent + "        ...\n\n"
-                fp.write(s)
-            elif any(word in item_type_txt for word in ["method", "function", "closure"]):
-                # log.debug("# def {1} function/method/closure, type = '{0}'".format(item_type_txt, item_name))
-                # module Function or class method
-                # will accept any number of params
-                # return type Any/Incomplete
-                ret = "Incomplete"
-                first = ""
-                # Self parameter only on class methods/functions
-                if in_class > 0:
-                    first = "self, "
-                # class method - add function decoration
-                if "bound_method" in item_type_txt or "bound_method" in item_repr:
-                    s = "{}@classmethod\n".format(indent) + "{}def {}(cls, *args, **kwargs) -> {}:\n".format(indent, item_name, ret)
-                else:
-                    s = "{}def {}({}*args, **kwargs) -> {}:\n".format(indent, item_name, first, ret)
-                s += indent + "    ...\n\n"
-                fp.write(s)
-                # log.debug("\n" + s)
-            elif item_type_txt == "<class 'module'>":
-                # Skip imported modules
-                # fp.write("# import {}\n".format(item_name))
-                pass
-
-            elif item_type_txt.startswith("<class '"):
-                t = item_type_txt[8:-2]
-                s = ""
-
-                if t in ("str", "int", "float", "bool", "bytearray", "bytes"):
-                    # known type: use actual value
-                    if item_name.upper() == item_name:  # ALL_CAPS --> Final
-                        s = "{0}{1}: Final[{3}] = {2}\n".format(indent, item_name, item_repr, t)
-                    else:
-                        s = "{0}{1}: {3} = {2}\n".format(indent, item_name, item_repr, t)
-                elif t in ("dict", "list", "tuple"):
-                    # dict, list , tuple: use empty value
-                    ev = {"dict": "{}", "list": "[]", "tuple": "()"}
-                    # s = "{0}{1} = {2} # type: {3}\n".format(indent, item_name, ev[t], t)
-                    s = "{0}{1}: {3} = {2}\n".format(indent, item_name, ev[t], t)
-                else:
-                    # something else
-                    if t in ("object", "set", "frozenset", "Pin"):  # "FileIO"
-                        # https://docs.python.org/3/tutorial/classes.html#item_instance-objects
-                        # use these types for the attribute
-                        s = "{0}{1}: {2} ## = {4}\n".format(indent, item_name, t, item_type_txt, item_repr)
-                    elif t == "generator":
-                        # either a normal or async Generator function
-                        t = "Generator"
-                        s = "{0}def {1}(*args, **kwargs) -> Generator:  ## = {4}\n{0}    ...\n\n".format(
-                            indent, item_name, t, item_type_txt, item_repr
-                        )
-                    else:
-                        # Requires Python 3.6 syntax, which is OK for the stubs/pyi
-                        t = "Incomplete"
-                        if " at " in item_repr:
-                            item_repr = item_repr.split(" at ")[0] + " at ...>"
-                        if " at " in item_repr:
-                            item_repr = item_repr.split(" at ")[0] + " at ...>"
-                        s = "{0}{1}: {2} ## {3} = {4}\n".format(indent, item_name, t, item_type_txt, item_repr)
-                fp.write(s)
-                # log.debug("\n" + s)
             else:
-                # keep only the name
-                # log.debug("# all other, type = '{0}'".format(item_type_txt))
-                fp.write("# all other, type = '{0}'\n".format(item_type_txt))
+                # allow any member of the class, rather than running out of memory
+                log.warning("Low memory: class {}.{} is not expanded".format(obj_name, item_name))
+                self._depth = min(self._depth, len(indent) // 4)
+                fp.write(indent, "    def __getattr__(self, name: str) -> Incomplete: ...\n")
+            # end with the __init__ method to make sure that the literals are defined
+            # Add __init__
+            fp.write(indent, "    def __init__(self, *argv, **kwargs) -> None:\n")
+            fp.write(indent, "        ...\n\n")
+        elif any(word in item_type_txt for word in ["method", "function", "closure"]):
+            # log.debug("# def {1} function/method/closure, type = '{0}'".format(item_type_txt, item_name))
+            # module Function or class method
+            # will accept any number of params
+            # return type Any/Incomplete
+            first = ""
+            # Self parameter only on class methods/functions
+            if in_class > 0:
+                first = "self, "
+            # class method - add function decoration
+            if "bound_method" in item_type_txt or "bound_method" in repr(item_instance):
+                fp.write(indent, "@classmethod\n")
+                fp.write(indent, "def ", item_name, "(cls, *args, **kwargs) -> Incomplete:\n")
+            else:
+                fp.write(indent, "def ", item_name, "(", first, "*args, **kwargs) -> Incomplete:\n")
+            fp.write(indent, "    ...\n\n")
+        elif item_type_txt == "<class 'module'>":
+            # Skip imported modules
+            # fp.write("# import {}\n".format(item_name))
+            pass
 
-                fp.write(indent + item_name + " # type: Incomplete\n")
+        elif item_type_txt.startswith("<class '"):
+            t = item_type_txt[8:-2]
 
-        # del items
-        # del errors
-        # try:
-        #     del item_name, item_repr, item_type_txt, item_instance  # type: ignore
-        # except (OSError, KeyError, NameError):
-        #     pass
+            if t in ("str", "int", "float", "bool", "bytearray", "bytes"):
+                # known type: use actual value
+                item_repr = repr(item_instance)
+                if item_name.upper() == item_name:  # ALL_CAPS --> Final
+                    fp.write(indent, item_name, ": Final[", t, "] = ", item_repr, "\n")
+                else:
+                    fp.write(indent, item_name, ": ", t, " = ", item_repr, "\n")
+            elif t in ("dict", "list", "tuple"):
+                # dict, list , tuple: use empty value
+                ev = {"dict": "{}", "list": "[]", "tuple": "()"}
+                fp.write(indent, item_name, ": ", t, " = ", ev[t], "\n")
+            else:
+                # something else
+                item_repr = repr(item_instance)
+                if t in ("object", "set", "frozenset", "Pin"):  # "FileIO"
+                    # https://docs.python.org/3/tutorial/classes.html#item_instance-objects
+                    # use these types for the attribute
+                    fp.write(indent, item_name, ": ", t, " ## = ", item_repr, "\n")
+                elif t == "generator":
+                    # either a normal or async Generator function
+                    fp.write(indent, "def ", item_name, "(*args, **kwargs) -> Generator:  ## = ")
+                    fp.write(item_repr, "\n", indent, "    ...\n\n")
+                else:
+                    # Requires Python 3.6 syntax, which is OK for the stubs/pyi
+                    if " at " in item_repr:
+                        item_repr = item_repr.split(" at ")[0] + " at ...>"
+                    fp.write(indent, item_name, ": Incomplete ## ", item_type_txt, " = ")
+                    fp.write(item_repr, "\n")
+        else:
+            # keep only the name
+            # log.debug("# all other, type = '{0}'".format(item_type_txt))
+            fp.write("# all other, type = '", item_type_txt, "'\n")
+
+            fp.write(indent, item_name, " # type: Incomplete\n")
 
     @property
     def flat_fwid(self):
@@ -420,6 +699,8 @@ class Stubber:
         if not path:
             path = self.path
         log.info("Clean/remove files in folder: {}".format(path))
+        # the removed folders need to be created again
+        _folders.clear()
         try:
             os.stat(path)  # TEMP workaround mpremote listdir bug -
             items = os.listdir(path)
@@ -437,17 +718,25 @@ class Stubber:
                 except OSError:
                     pass
 
+    def open_file(self, file_name: str, mode: str):
+        "Open a stub or report file, or a stream to the host"
+        if self.stream:
+            return StreamFile(file_name, mode)
+        return open(file_name, mode)
+
     def report_start(self, filename: str = "modules.json"):
         """Start a report of the modules that have been stubbed
         "create json with list of exported modules"""
         self._json_name = "{}/{}".format(self.path, filename)
         self._json_first = True
-        ensure_folder(self._json_name)
+        self._report = []
+        if not self.stream:
+            ensure_folder(self._json_name)
         log.info("Report file: {}".format(self._json_name))
         gc.collect()
         try:
             # write json by node to reduce memory requirements
-            with open(self._json_name, "w") as f:
+            with self.open_file(self._json_name, "w") as f:
                 f.write("{")
                 f.write(dumps({"firmware": self.info})[1:-1])
                 f.write(",\n")
@@ -460,51 +749,86 @@ class Stubber:
             self._json_name = None
             raise e
 
-    def report_add(self, module_name: str, stub_file: str):
+    def report_add(self, module_name: str, stub_file: str, crc: int = 0, unchanged: bool = False):
         "Add a module to the report"
-        # write json by node to reduce memory requirements
+        # keep a few json nodes in memory, and append them to the file in one go
         if not self._json_name:
             raise Exception("No report file")
+        line = '{{"module": "{}", "file": "{}", "depth": {}'.format(module_name, stub_file.replace("\\", "/"), self._depth)
+        if self._profile:
+            # import time in ms, free memory before and after the import, after writing the stub,
+            # the lowest free memory while writing the stub, and the size of the stub
+            keys = ("import_ms", "mem_before", "mem_import", "mem_after", "mem_min", "size")
+            line += ', "profile": {' + ", ".join('"{}": {}'.format(k, v) for k, v in zip(keys, self._profile)) + "}"
+            self._profile = None
+        if crc:
+            line += ', "crc": "{:08x}"'.format(crc)
+        if unchanged:
+            # the stub of the previous run can be used
+            line += ', "unchanged": true'
+        line += "}"
+        self._report.append(line)
+        if self.report_batch and len(self._report) >= self.report_batch:
+            self.report_flush()
+
+    def report_flush(self):
+        """Append the pending modules to the report file.
+        Must be called before recording progress, to allow a restart to continue the report"""
+        if not self._report:
+            return
         try:
-            with open(self._json_name, "a") as f:
-                if not self._json_first:
-                    f.write(",\n")
-                else:
-                    self._json_first = False
-                line = '{{"module": "{}", "file": "{}"}}'.format(module_name, stub_file.replace("\\", "/"))
-                f.write(line)
-
+            with self.open_file(self._json_name, "a") as f:
+                self._report_write(f)
         except OSError:
             log.error("Failed to create the report.")
 
+    def _report_write(self, f):
+        for line in self._report:
+            if not self._json_first:
+                f.write(",\n")
+            else:
+                self._json_first = False
+            f.write(line)
+        self._report = []
+
     def report_end(self):
         if not self._json_name:
             raise Exception("No report file")
-        with open(self._json_name, "a") as f:
+        with self.open_file(self._json_name, "a") as f:
+            self._report_write(f)
             f.write("\n]}")
         # is used as sucess indicator
         log.info("Path: {}".format(self.path))
 
 
+# folders that are known to exist, to avoid repeated os.stat calls
+_folders = set()
+
+
 def ensure_folder(path: str):
     "Create nested folders if needed"
+    if path[: path.rfind("/")] in _folders:
+        return
     i = start = 0
     while i != -1:
         i = path.find("/", start)
         if i != -1:
             p = path[0] if i == 0 else path[:i]
             # p = partial folder
-            try:
-                _ = os.stat(p)
-            except OSError as e:
-                # folder does not exist
-                if e.args[0] in [ENOENT, ENOMESSAGE]:
-                    try:
-                        log.debug("Create folder {}".format(p))
-                        os.mkdir(p)
-                    except OSError as e2:
-                        log.error("failed to create folder {}".format(p))
-                        raise e2
+            if p not in _folders:
+                try:
+                    _ = os.stat(p)
+                    _folders.add(p)
+                except OSError as e:
+                    # folder does not exist
+                    if e.args[0] in [ENOENT, ENOMESSAGE]:
+                        try:
+                            log.debug("Create folder {}".format(p))
+                            os.mkdir(p)
+                            _folders.add(p)
+                        except OSError as e2:
+                            log.error("failed to create folder {}".format(p))
+                            raise e2
         # next level deep
         start = i + 1
 
@@ -709,6 +1033,58 @@ def file_exists(filename: str):
         return False
 
 
+def available_modules():
+    """
+    Read the modules of this firmware from `modulelist.avail`, as listed by help('modules'),
+    and add the modules found in the library folders.
+    Returns a set of top level module names, or None if there is no list to read.
+    """
+    if not file_exists("modulelist.avail"):
+        return None
+    avail = set()
+    with open("modulelist.avail") as f:
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            line = line.strip()
+            if line and line[0] != "#":
+                avail.add(line.split("/")[0])
+    for p in LIBS:
+        try:
+            for name in os.listdir(p):
+                avail.add(name.split(".")[0])
+        except OSError:
+            pass
+    gc.collect()
+    return avail
+
+
+def read_fingerprints():
+    """
+    Read the fingerprints of the modules stubbed in a previous run from `modulelist.crc`,
+    with a module name and its crc as hex on each line.
+    Returns a dict of module name to crc, or None if there is no file to read.
+    """
+    if not file_exists(_FINGERPRINTS):
+        # the host did not ask to skip the unchanged modules
+        return None
+    fingerprints = {}
+    try:
+        with open(_FINGERPRINTS) as f:
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                parts = line.split()
+                if len(parts) == 2 and line[0] != "#":
+                    fingerprints[parts[0]] = int(parts[1], 16)
+    except (OSError, ValueError):
+        pass
+    gc.collect()
+    return fingerprints
+
+
 def show_help():
     print("-p, --path   path to store the stubs in, defaults to '.'")
     sys.exit(1)
@@ -747,17 +1123,27 @@ def is_micropython() -> bool:
 
 
 SKIP_FILE = "modulelist.done"
-
-
-def get_modules(skip=0):
-    # new
-    for p in LIBS:
-        fname = p + "/modulelist.txt"
+# the modules in the order to stub them, with the memory they need, as scheduled by the host
+SCHEDULE_FILE = "modulelist.sched"
+# the modules that ran out of memory on a clean heap
+CRASH_FILE = "modulelist.crash"
+# write the progress after this many modules, or sooner when the free memory drops below _CHECKPOINT_MEM
+_CHECKPOINT_EVERY = 8
+_CHECKPOINT_MEM = 16 * 1024
+
+
+def get_modules(skip=0, offset=0):
+    # yield the modules to stub, with the offset of the next line in modulelist.sched or modulelist.txt
+    for fname in [SCHEDULE_FILE] + [p + "/modulelist.txt" for p in LIBS]:
         if not file_exists(fname):
             continue
         try:
             with open(fname, encoding="utf-8") as f:
                 i = 0
+                if offset:
+                    # continue directly from the last checkpoint
+                    f.seek(offset)
+                    skip = 0
                 while True:
                     line = f.readline().strip()
                     if not line:
@@ -767,33 +1153,53 @@ def get_modules(skip=0):
                     i += 1
                     if i < skip:
                         continue
-                    yield line
+                    yield line, f.tell()
                 break
         except OSError:
             pass
 
 
-def write_skip(done):
-    # write count of modules already processed to file
+def write_skip(done, offset=0, modulename=""):
+    # write count of modules already processed, the offset of the next module, and the module that is being stubbed to file
     with open(SKIP_FILE, "w") as f:
-        f.write(str(done) + "\n")
+        f.write("{} {} {}\n".format(done, offset, modulename))
+
+
+def read_need(line):
+    # split a line of the module list into the module name and the memory it needs, -1 for a module that is known to crash
+    parts = line.split()
+    try:
+        return parts[0], int(parts[1]) if len(parts) > 1 else 0
+    except ValueError:
+        return parts[0], 0
+
+
+def write_crash(modulename):
+    with open(CRASH_FILE, "a") as f:
+        f.write(modulename + "\n")
 
 
 def read_skip():
-    # read count of modules already processed from file
+    # read count of modules already processed, and the offset of the next module from file
     done = 0
+    offset = 0
     try:
         with open(SKIP_FILE) as f:
-            done = int(f.readline().strip())
-    except OSError:
+            line = f.readline().split()
+            done = int(line[0])
+            if len(line) > 1:
+                offset = int(line[1])
+    except (OSError, ValueError, IndexError):
         pass
-    return done
+    return done, offset
 
 
 def main():
     import machine  # type: ignore
 
-    was_running = file_exists(SKIP_FILE)
+    # before the first checkpoint only the module that is being stubbed is recorded, such a run starts over
+    skip, offset = read_skip()
+    was_running = skip > 0
     if was_running:
         log.info("Continue from last run")
     else:
@@ -808,31 +1214,68 @@ def main():
     stubber = Stubber(path=read_path())
 
     # f_name = "{}/{}".format(stubber.path, "modules.json")
-    skip = 0
     if not was_running:
         # Only clean folder if this is a first run
         stubber.clean()
         stubber.report_start("modules.json")
     else:
-        skip = read_skip()
         stubber._json_name = "{}/{}".format(stubber.path, "modules.json")
 
-    for modulename in get_modules(skip):
-        # ------------------------------------
-        # do epic shit
-        # but sometimes things fail / run out of memory and reboot
-        try:
-            stubber.create_one_stub(modulename)
-        except MemoryError:
-            # RESET AND HOPE THAT IN THE NEXT CYCLE WE PROGRESS FURTHER
-            machine.reset()
-        # -------------------------------------
+    # the report is only written together with the progress
+    stubber.report_batch = 0
+    checkpoint = skip
+    checkpoint_offset = offset
+    checkpointed = False
+    # the number of modules stubbed since the (re)start, and the offset of the current module
+    stubbed = 0
+    start = offset
+    for line, offset in get_modules(skip, offset):
+        modulename, need = read_need(line)
+        if need < 0:
+            log.warning("Skip module: {:<25}        : Known to crash".format(modulename))
+        else:
+            if stubbed and need > gc.mem_free():  # type: ignore
+                # start a module that needs a lot of memory with a clean heap
+                log.info("Reset before module: {:<25} needs: {:>5}".format(modulename, need))
+                stubber.report_flush()
+                write_skip(skip, start)
+                getattr(machine, "soft_reset", machine.reset)()
+            if not checkpointed:
+                # a run after a crash continues from the last checkpoint, so up to the first checkpoint
+                # the module is recorded before the import, for the host to know which module crashed the board
+                write_skip(checkpoint, checkpoint_offset, modulename)
+            # ------------------------------------
+            # do epic shit
+            # but sometimes things fail / run out of memory and reboot
+            try:
+                stubber.create_one_stub(modulename)
+            except MemoryError:
+                gc.collect()
+                stubber.report_flush()
+                if stubbed:
+                    # RESET AND HOPE THAT IN THE NEXT CYCLE WE PROGRESS FURTHER
+                    write_skip(skip, start)
+                else:
+                    # out of memory on a clean heap, continue with the next module
+                    log.warning("Skip module: {:<25}        : Out of memory".format(modulename))
+                    write_crash(modulename)
+                    write_skip(skip + 1, offset)
+                machine.reset()
+            # -------------------------------------
+            stubbed += 1
         gc.collect()
         # modules_done[modulename] = str(stubber._report[-1] if ok else "failed")
         # with open("modulelist.done", "a") as f:
         #     f.write("{}={}\n".format(modulename, "ok" if ok else "failed"))
         skip += 1
-        write_skip(skip)
+        start = offset
+        if skip - checkpoint >= _CHECKPOINT_EVERY or gc.mem_free() < _CHECKPOINT_MEM:  # type: ignore
+            # the report must be complete up to the recorded progress, to be able to continue after a reset
+            stubber.report_flush()
+            write_skip(skip, offset)
+            checkpoint = skip
+            checkpoint_offset = offset
+            checkpointed = True
 
     print("All modules have been processed, Finalizing report")
     stubber.report_end()
@@ -840,7 +1283,7 @@ def main():
 
 if __name__ == "__main__" or is_micropython():
     if not file_exists("no_auto_stubber.txt"):
-        print(f"createstubs.py: {__version__}")
+        print("createstubs.py: {}".format(__version__))
         try:
             gc.threshold(4 * 1024)  # type: ignore
             gc.enable()
@@ -1,344 +1,535 @@
-A3='No report file'
-A2='Failed to create the report.'
-A1='method'
-A0='function'
-z='str'
-y='float'
-x='int'
-w='micropython'
-v='stubber'
-u=Exception
-t=KeyError
-s=sorted
-r=MemoryError
-q=NotImplementedError
-m='variant'
-l=',\n'
-k='modules.json'
-j='{}/{}'
-i='w'
-h='dict'
-g='list'
-f='tuple'
+AN='No report file'
+AM='Failed to create the report.'
+AL='method'
+AK='function'
+AJ='micropython'
+AI='stubber'
+AH=KeyError
+AG=MemoryError
+AF=NotImplementedError
+A5='variant'
+A4=',\n'
+A3='modules.json'
+A2='{}/{}'
+A1='dict'
+A0='list'
+z='tuple'
+y=ValueError
+x=getattr
+w=Exception
+v=min
+u=memoryview
+p='-preview'
+o=set
+n=type
+m=isinstance
+i='family'
+h='board_id'
+g='board'
+f='w'
 e=TypeError
-d=str
-c=repr
-X='-preview'
-W=True
-V='family'
-U='board_id'
-T='board'
-S=len
-R=IndexError
-Q=print
-P=ImportError
-O=open
-N=dir
-M='port'
-L='.'
-J=AttributeError
-I=False
-H=None
-G='/'
-E='-'
-D=OSError
-C='version'
-B=''
-import gc as F,os,sys
+c='a'
+b=IndexError
+a=str
+Z=print
+X=repr
+W=int
+U='port'
+T=dir
+S=open
+Q='\n'
+O='.'
+N=AttributeError
+M=ImportError
+L='-'
+K=True
+J='/'
+I=len
+H=False
+G=OSError
+F='version'
+E=None
+D=''
+import gc as C,os,sys
 from time import sleep
+try:from time import ticks_diff as A6,ticks_ms as q
+except M:
+	from time import time
+	def q():return W(time()*1000)
+	def A6(a,b):return a-b
 try:from ujson import dumps
 except:from json import dumps
 try:from machine import reset
-except P:pass
-try:from collections import OrderedDict as n
-except P:from ucollections import OrderedDict as n
+except M:pass
+try:from ubinascii import b2a_base64,crc32 as P
+except M:
+	try:from binascii import b2a_base64,crc32 as P
+	except M:P=E
+try:import deflate as A
+except M:
+	A=E
+	try:import zlib as j
+	except M:j=E
+try:from collections import OrderedDict
+except M:from ucollections import OrderedDict
 __version__='v1.25.0'
-A4=2
-A5=44
-A6=2
-A7=['lib','/lib','/sd/lib','/flash/lib',L]
-class K:
-	DEBUG=10;INFO=20;WARNING=30;ERROR=40;level=INFO;prnt=Q
+AO=2
+AP=44
+k=2
+l=4096
+A7=256
+AQ=8
+AR='stream_stubber.txt'
+A8=384
+AS='profile_stubber.txt'
+AT='compress_stubber.txt'
+A9='modulelist.crc'
+AA=['lib','/lib','/sd/lib','/flash/lib',O]
+class R:
+	DEBUG=10;INFO=20;WARNING=30;ERROR=40;level=INFO;prnt=Z
 	@staticmethod
-	def getLogger(name):return K()
+	def getLogger(name):return R()
 	@classmethod
 	def basicConfig(A,level):A.level=level
 	def debug(A,msg):
-		if A.level<=K.DEBUG:A.prnt('DEBUG :',msg)
+		if A.level<=R.DEBUG:A.prnt('DEBUG :',msg)
 	def info(A,msg):
-		if A.level<=K.INFO:A.prnt('INFO  :',msg)
+		if A.level<=R.INFO:A.prnt('INFO  :',msg)
 	def warning(A,msg):
-		if A.level<=K.WARNING:A.prnt('WARN  :',msg)
+		if A.level<=R.WARNING:A.prnt('WARN  :',msg)
 	def error(A,msg):
-		if A.level<=K.ERROR:A.prnt('ERROR :',msg)
-A=K.getLogger(v)
-K.basicConfig(level=K.INFO)
+		if A.level<=R.ERROR:A.prnt('ERROR :',msg)
+B=R.getLogger(AI)
+R.basicConfig(level=R.INFO)
+try:u(D);AB=K
+except e:AB=H
+class r:
+	def __init__(A,fp,size=A7):
+		A.fp=fp;A.size=size;A.buf=bytearray(size);A.mv=u(A.buf);A.n=0;A.written=0
+		try:fp.write(b'');A.text=H
+		except e:A.text=K
+	def write(A,*F):
+		for B in F:
+			if m(B,a):B=u(B)if AB else B.encode()
+			C=I(B)
+			if A.text and A.n+C>A.size:
+				A.flush()
+				if C>A.size:A._write(B);continue
+			D=0
+			while D<C:
+				E=v(A.size-A.n,C-D);A.mv[A.n:A.n+E]=B if E==C else B[D:D+E];A.n+=E;D+=E
+				if A.n==A.size:A.flush()
+	def flush(A):
+		if A.n:A._write(A.mv[:A.n]);A.n=0
+	def _write(A,b):A.written+=I(b);A.fp.write(a(b,'utf-8')if A.text else b)
+class AU:
+	def __init__(A,name,mode=f):
+		A.name=name;A.op=c if mode[0]==c else f
+		if A.op==f:A._frame(b'')
+	def __enter__(A):return A
+	def __exit__(A,*B):0
+	def close(A):0
+	def write(B,b):
+		if m(b,a):b=b.encode()
+		for A in range(0,I(b),A8):B._frame(b[A:A+A8])
+		return I(b)
+	def _frame(A,b):Z('##STUB##:{}:{}:{:08x}:{}'.format(A.op,A.name,P(b)&4294967295,b2a_base64(b).decode().strip()));A.op=c
+class AV:
+	def __init__(B,name,mode='wb'):
+		B.f=S(name,mode)
+		if A:B.z=A.DeflateIO(B.f,A.GZIP)
+		else:B.z=j.compressobj(9,j.DEFLATED,31)
+	def __enter__(A):return A
+	def __exit__(A,*B):A.close()
+	def write(B,b):
+		if A:return B.z.write(b)
+		B.f.write(B.z.compress(b));return I(b)
+	def close(B):
+		if A:B.z.close()
+		else:B.f.write(B.z.flush())
+		B.f.close()
+def AW():
+	try:
+		if A:from io import BytesIO as B;A.DeflateIO(B(),A.GZIP).write(b'#');return K
+		return hasattr(j,'compressobj')
+	except w:return H
 class Stubber:
-	def __init__(B,path=B,firmware_id=B):
-		C=firmware_id
+	def __init__(A,path=D,firmware_id=D):
+		D=firmware_id
 		try:
-			if os.uname().release=='1.13.0'and os.uname().version<'v1.13-103':raise q('MicroPython 1.13.0 cannot be stubbed')
-		except J:pass
-		B.info=_info();A.info('Port: {}'.format(B.info[M]));A.info('Board: {}'.format(B.info[T]));A.info('Board_ID: {}'.format(B.info[U]));F.collect()
-		if C:B._fwid=C.lower()
-		elif B.info[V]==w:B._fwid='{family}-v{version}-{port}-{board_id}'.format(**B.info).rstrip(E)
-		else:B._fwid='{family}-v{version}-{port}'.format(**B.info)
-		B._start_free=F.mem_free()
+			if os.uname().release=='1.13.0'and os.uname().version<'v1.13-103':raise AF('MicroPython 1.13.0 cannot be stubbed')
+		except N:pass
+		A.info=_info();B.info('Port: {}'.format(A.info[U]));B.info('Board: {}'.format(A.info[g]));B.info('Board_ID: {}'.format(A.info[h]));C.collect()
+		if D:A._fwid=D.lower()
+		elif A.info[i]==AJ:A._fwid='{family}-v{version}-{port}-{board_id}'.format(**A.info).rstrip(L)
+		else:A._fwid='{family}-v{version}-{port}'.format(**A.info)
+		A._start_free=C.mem_free()
 		if path:
-			if path.endswith(G):path=path[:-1]
+			if path.endswith(J):path=path[:-1]
 		else:path=get_root()
-		B.path='{}/stubs/{}'.format(path,B.flat_fwid).replace('//',G)
-		try:Y(path+G)
-		except D:A.error('error creating stub folder {}'.format(path))
-		B.problematic=['upip','upysh','webrepl_setup','http_client','http_client_ssl','http_server','http_server_ssl'];B.excluded=['webrepl','_webrepl','port_diag','example_sub_led.py','example_pub_button.py'];B.modules=[];B._json_name=H;B._json_first=I
-	def get_obj_attributes(L,item_instance):
-		H=item_instance;C=[];K=[]
-		for A in N(H):
-			if A.startswith('__')and not A in L.modules:continue
-			try:
-				D=getattr(H,A)
-				try:E=c(type(D)).split("'")[1]
-				except R:E=B
-				if E in{x,y,z,'bool',f,g,h}:G=1
-				elif E in{A0,A1}:G=2
-				elif E in'class':G=3
-				else:G=4
-				C.append((A,c(D),c(type(D)),D,G))
-			except J as I:K.append("Couldn't get attribute '{}' from object '{}', Err: {}".format(A,H,I))
-			except r as I:Q('MemoryError: {}'.format(I));sleep(1);reset()
-		C=s([A for A in C if not A[0].startswith('__')],key=lambda x:x[4]);F.collect();return C,K
-	def add_modules(A,modules):A.modules=s(set(A.modules)|set(modules))
-	def create_all_stubs(B):
-		A.info('Start micropython-stubber {} on {}'.format(__version__,B._fwid));B.report_start();F.collect()
-		for C in B.modules:B.create_one_stub(C)
-		B.report_end();A.info('Finally done')
-	def create_one_stub(C,module_name):
-		B=module_name
-		if B in C.problematic:A.warning('Skip module: {:<25}        : Known problematic'.format(B));return I
-		if B in C.excluded:A.warning('Skip module: {:<25}        : Excluded'.format(B));return I
-		H='{}/{}.pyi'.format(C.path,B.replace(L,G));F.collect();E=I
-		try:E=C.create_module_stub(B,H)
-		except D:return I
-		F.collect();return E
-	def create_module_stub(J,module_name,file_name=H):
-		E=file_name;C=module_name
-		if E is H:K=C.replace(L,'_')+'.pyi';E=J.path+G+K
-		else:K=E.split(G)[-1]
-		if G in C:C=C.replace(G,L)
-		M=H
-		try:M=__import__(C,H,H,'*');Q=F.mem_free();A.info('Stub module: {:<25} to file: {:<70} mem:{:>5}'.format(C,K,Q))
-		except P:return I
-		Y(E)
-		with O(E,i)as N:R=d(J.info).replace('OrderedDict(',B).replace('})','}');S='"""\nModule: \'{0}\' on {1}\n"""\n# MCU: {2}\n# Stubber: {3}\n'.format(C,J._fwid,R,__version__);N.write(S);N.write('from __future__ import annotations\nfrom typing import Any, Final, Generator\nfrom _typeshed import Incomplete\n\n');J.write_object_stub(N,M,C,B)
-		J.report_add(C,E)
-		if C not in{'os','sys','logging','gc'}:
-			try:del M
-			except(D,t):A.warning('could not del new_module')
-		F.collect();return W
-	def write_object_stub(L,fp,object_expr,obj_name,indent,in_class=0):
-		Y=' at ...>';X='{0}{1}: {3} = {2}\n';W='bound_method';V='Incomplete';O=in_class;N='Exception';M=object_expr;K=' at ';J=fp;E=indent;F.collect()
-		if M in L.problematic:A.warning('SKIPPING problematic module:{}'.format(M));return
-		Z,P=L.get_obj_attributes(M)
-		if P:A.error(P)
-		for(C,H,I,a,c)in Z:
-			if C in['classmethod','staticmethod','BaseException',N]:continue
-			if C[0].isdigit():A.warning('NameError: invalid name {}'.format(C));continue
-			if I=="<class 'type'>"and S(E)<=A6*4:
-				Q=B;R=C.endswith(N)or C.endswith('Error')or C in['KeyboardInterrupt','StopIteration','SystemExit']
-				if R:Q=N
-				D='\n{}class {}({}):\n'.format(E,C,Q)
-				if R:D+=E+'    ...\n';J.write(D);continue
-				J.write(D);L.write_object_stub(J,a,'{0}.{1}'.format(obj_name,C),E+'    ',O+1);D=E+'    def __init__(self, *argv, **kwargs) -> None:\n';D+=E+'        ...\n\n';J.write(D)
-			elif any(A in I for A in[A1,A0,'closure']):
-				T=V;U=B
-				if O>0:U='self, '
-				if W in I or W in H:D='{}@classmethod\n'.format(E)+'{}def {}(cls, *args, **kwargs) -> {}:\n'.format(E,C,T)
-				else:D='{}def {}({}*args, **kwargs) -> {}:\n'.format(E,C,U,T)
-				D+=E+'    ...\n\n';J.write(D)
-			elif I=="<class 'module'>":0
-			elif I.startswith("<class '"):
-				G=I[8:-2];D=B
-				if G in(z,x,y,'bool','bytearray','bytes'):
-					if C.upper()==C:D='{0}{1}: Final[{3}] = {2}\n'.format(E,C,H,G)
-					else:D=X.format(E,C,H,G)
-				elif G in(h,g,f):b={h:'{}',g:'[]',f:'()'};D=X.format(E,C,b[G],G)
-				elif G in('object','set','frozenset','Pin'):D='{0}{1}: {2} ## = {4}\n'.format(E,C,G,I,H)
-				elif G=='generator':G='Generator';D='{0}def {1}(*args, **kwargs) -> Generator:  ## = {4}\n{0}    ...\n\n'.format(E,C,G,I,H)
+		A.path='{}/stubs/{}'.format(path,A.flat_fwid).replace('//',J);A.stream=P is not E and V(AR);A.profile=V(AS);A.compress=not A.stream and V(AT)and AW();A._profile=E;A._min_free=0;A.fingerprints=Aa();Y.clear()
+		if not A.stream:
+			try:s(path+J)
+			except G:B.error('error creating stub folder {}'.format(path))
+		A.problematic=['upip','upysh','webrepl_setup','http_client','http_client_ssl','http_server','http_server_ssl'];A.excluded=['webrepl','_webrepl','port_diag','example_sub_led.py','example_pub_button.py'];A.modules=[];A.available=AZ();A._json_name=E;A._json_first=H;A._report=[];A.report_batch=AQ;A.buffer_size=A7;A._depth=k+1
+	def get_obj_attributes(E,item_instance):
+		A=[];B=[]
+		for(F,D,G,H)in E.iter_obj_attributes(item_instance,B):A.append((F,X(D),G,D,H))
+		C.collect();return A,B
+	def iter_obj_attributes(O,item_instance,errors=E):
+		I=errors;G=item_instance
+		for J in(1,2,3,4):
+			for C in T(G):
+				if C.startswith('__'):continue
+				try:K=x(G,C)
+				except N as H:
+					if J==1:
+						L="Couldn't get attribute '{}' from object '{}', Err: {}".format(C,G,H)
+						if I is E:B.error(L)
+						else:I.append(L)
+					continue
+				except AG as H:Z('MemoryError: {}'.format(H));sleep(1);reset()
+				M=X(n(K))
+				try:F=M.split("'")[1]
+				except b:F=D
+				if F in{'int','float','str','bool',z,A0,A1}:A=1
+				elif F in{AK,AL}:A=2
+				elif F in'class':A=3
+				else:A=4
+				if A==J:yield(C,K,M,A)
+	def add_modules(A,modules):A.modules=sorted(o(A.modules)|o(modules))
+	def create_all_stubs(A):
+		B.info('Start micropython-stubber {} on {}'.format(__version__,A._fwid));A.report_start();C.collect()
+		for D in A.modules:A.create_one_stub(D)
+		A.report_end();B.info('Finally done')
+	def create_one_stub(D,module_name):
+		A=module_name
+		if A in D.problematic:B.warning('Skip module: {:<25}        : Known problematic'.format(A));return H
+		if A in D.excluded:B.warning('Skip module: {:<25}        : Excluded'.format(A));return H
+		if not D.is_available(A):return H
+		F='{}/{}.pyi'.format(D.path,A.replace(O,J));C.collect();E=H
+		try:E=D.create_module_stub(A,F)
+		except G:return H
+		C.collect();return E
+	def is_available(A,module_name):
+		if A.available is E:return K
+		B=module_name.replace(O,J).split(J)[0];return B in A.available or B[:1]=='u'and B[1:]in A.available
+	def create_module_stub(A,module_name,file_name=E):
+		I=file_name;F=module_name
+		if I is E:P=F.replace(O,'_')+'.pyi';I=A.path+J+P
+		else:P=I.split(J)[-1]
+		if J in F:F=F.replace(J,O)
+		L=E
+		try:U=C.mem_free();Q=q();L=__import__(F,E,E,'*');Q=A6(q(),Q);R=C.mem_free();B.info('Stub module: {:<25} to file: {:<70} mem:{:>5}'.format(F,P,R))
+		except M:return H
+		A._depth=k+1;S=A.fingerprint(L)if A.fingerprints is not E else 0;T=S and A.fingerprints.get(F)==S
+		if T:B.info('Unchanged module: {}'.format(F))
+		else:
+			if not A.stream:s(I)
+			with AV(I+'.gz')if A.compress else A.open_file(I,'wb')as V:N=r(V,A.buffer_size);A.write_module_header(N,F);A._min_free=R;A.write_object_stub(N,L,F,D);N.flush()
+			if A.profile:C.collect();A._profile=Q,U,R,C.mem_free(),A._min_free,N.written
+		A.report_add(F,I,S,T)
+		if F not in{'os','sys','logging','gc'}:
+			try:del L
+			except(G,AH):B.warning('could not del new_module')
+		C.collect();return K
+	def write_module_header(A,fp,module_name):B=a(A.info).replace('OrderedDict(',D).replace('})','}');fp.write('"""\nModule: \'',module_name,"' on ",A._fwid,'\n"""\n');fp.write('# MCU: ',B,'\n# Stubber: ',__version__,Q);fp.write('from __future__ import annotations\nfrom typing import Any, Final, Generator\nfrom _typeshed import Incomplete\n\n')
+	def fingerprint(A,module):
+		if P is E:return 0
+		return A.fingerprint_members(module,P(__version__.encode()),0)&4294967295
+	def fingerprint_members(G,obj,crc,level):
+		E=level;A=crc;F=T(obj);F.sort()
+		for D in F:
+			try:B=x(obj,D)
+			except N:continue
+			A=P(D.encode(),A);A=P(X(n(B)).encode(),A)
+			if n(B)in(W,float,a,bool):A=P(X(B).encode(),A)
+			elif m(B,n)and E<k and D[:2]!='__':
+				if C.mem_free()<l:C.collect()
+				if C.mem_free()>=l:A=G.fingerprint_members(B,A,E+1)
+		return A
+	def write_object_stub(A,fp,object_expr,obj_name,indent,in_class=0):
+		G=in_class;F=indent;E=obj_name;D=object_expr
+		if not m(fp,r):H=r(fp,A.buffer_size);A.write_object_stub(H,D,E,F,G);H.flush();return
+		C.collect()
+		if A.profile:A._min_free=v(A._min_free,C.mem_free())
+		if D in A.problematic:B.warning('SKIPPING problematic module:{}'.format(D));return
+		for(I,J,K,L)in A.iter_obj_attributes(D):A.write_item_stub(fp,I,J,K,E,F,G)
+	def write_item_stub(L,fp,item_name,item_instance,item_type_txt,obj_name,indent,in_class=0):
+		Z=' at ';Y='    ...\n\n';W='bound_method';S=in_class;R=obj_name;P=' = ';O=': ';N='def ';M='Exception';K=item_instance;J=item_type_txt;F=indent;E=item_name;A=fp
+		if E in['classmethod','staticmethod','BaseException',M]:return
+		if E[0].isdigit():B.warning('NameError: invalid name {}'.format(E));return
+		if J=="<class 'type'>"and I(F)<=k*4:
+			T=D;U=E.endswith(M)or E.endswith('Error')or E in['KeyboardInterrupt','StopIteration','SystemExit']
+			if U:T=M
+			A.write(Q,F,'class ',E,'(',T,'):\n')
+			if U:A.write(F,'    ...\n');return
+			if C.mem_free()<l:C.collect()
+			if C.mem_free()>=l:L.write_object_stub(A,K,'{0}.{1}'.format(R,E),F+'    ',S+1)
+			else:B.warning('Low memory: class {}.{} is not expanded'.format(R,E));L._depth=v(L._depth,I(F)//4);A.write(F,'    def __getattr__(self, name: str) -> Incomplete: ...\n')
+			A.write(F,'    def __init__(self, *argv, **kwargs) -> None:\n');A.write(F,'        ...\n\n')
+		elif any(A in J for A in[AL,AK,'closure']):
+			V=D
+			if S>0:V='self, '
+			if W in J or W in X(K):A.write(F,'@classmethod\n');A.write(F,N,E,'(cls, *args, **kwargs) -> Incomplete:\n')
+			else:A.write(F,N,E,'(',V,'*args, **kwargs) -> Incomplete:\n')
+			A.write(F,Y)
+		elif J=="<class 'module'>":0
+		elif J.startswith("<class '"):
+			G=J[8:-2]
+			if G in('str','int','float','bool','bytearray','bytes'):
+				H=X(K)
+				if E.upper()==E:A.write(F,E,': Final[',G,'] = ',H,Q)
+				else:A.write(F,E,O,G,P,H,Q)
+			elif G in(A1,A0,z):a={A1:'{}',A0:'[]',z:'()'};A.write(F,E,O,G,P,a[G],Q)
+			else:
+				H=X(K)
+				if G in('object','set','frozenset','Pin'):A.write(F,E,O,G,' ## = ',H,Q)
+				elif G=='generator':A.write(F,N,E,'(*args, **kwargs) -> Generator:  ## = ');A.write(H,Q,F,Y)
 				else:
-					G=V
-					if K in H:H=H.split(K)[0]+Y
-					if K in H:H=H.split(K)[0]+Y
-					D='{0}{1}: {2} ## {3} = {4}\n'.format(E,C,G,I,H)
-				J.write(D)
-			else:J.write("# all other, type = '{0}'\n".format(I));J.write(E+C+' # type: Incomplete\n')
+					if Z in H:H=H.split(Z)[0]+' at ...>'
+					A.write(F,E,': Incomplete ## ',J,P);A.write(H,Q)
+		else:A.write("# all other, type = '",J,"'\n");A.write(F,E,' # type: Incomplete\n')
 	@property
 	def flat_fwid(self):
 		A=self._fwid;B=' .()/\\:$'
 		for C in B:A=A.replace(C,'_')
 		return A
-	def clean(C,path=B):
+	def clean(C,path=D):
 		if not path:path=C.path
-		A.info('Clean/remove files in folder: {}'.format(path))
-		try:os.stat(path);E=os.listdir(path)
-		except(D,J):return
-		for F in E:
-			B=j.format(path,F)
-			try:os.remove(B)
-			except D:
-				try:C.clean(B);os.rmdir(B)
-				except D:pass
-	def report_start(B,filename=k):
-		G='firmware';B._json_name=j.format(B.path,filename);B._json_first=W;Y(B._json_name);A.info('Report file: {}'.format(B._json_name));F.collect()
+		B.info('Clean/remove files in folder: {}'.format(path));Y.clear()
+		try:os.stat(path);D=os.listdir(path)
+		except(G,N):return
+		for E in D:
+			A=A2.format(path,E)
+			try:os.remove(A)
+			except G:
+				try:C.clean(A);os.rmdir(A)
+				except G:pass
+	def open_file(B,file_name,mode):
+		A=file_name
+		if B.stream:return AU(A,mode)
+		return S(A,mode)
+	def report_start(A,filename=A3):
+		H='firmware';A._json_name=A2.format(A.path,filename);A._json_first=K;A._report=[]
+		if not A.stream:s(A._json_name)
+		B.info('Report file: {}'.format(A._json_name));C.collect()
 		try:
-			with O(B._json_name,i)as E:E.write('{');E.write(dumps({G:B.info})[1:-1]);E.write(l);E.write(dumps({v:{C:__version__},'stubtype':G})[1:-1]);E.write(l);E.write('"modules" :[\n')
-		except D as I:A.error(A2);B._json_name=H;raise I
-	def report_add(B,module_name,stub_file):
-		if not B._json_name:raise u(A3)
+			with A.open_file(A._json_name,f)as D:D.write('{');D.write(dumps({H:A.info})[1:-1]);D.write(A4);D.write(dumps({AI:{F:__version__},'stubtype':H})[1:-1]);D.write(A4);D.write('"modules" :[\n')
+		except G as I:B.error(AM);A._json_name=E;raise I
+	def report_add(A,module_name,stub_file,crc=0,unchanged=H):
+		if not A._json_name:raise w(AN)
+		B='{{"module": "{}", "file": "{}", "depth": {}'.format(module_name,stub_file.replace('\\',J),A._depth)
+		if A._profile:C='import_ms','mem_before','mem_import','mem_after','mem_min','size';B+=', "profile": {'+', '.join('"{}": {}'.format(A,B)for(A,B)in zip(C,A._profile))+'}';A._profile=E
+		if crc:B+=', "crc": "{:08x}"'.format(crc)
+		if unchanged:B+=', "unchanged": true'
+		B+='}';A._report.append(B)
+		if A.report_batch and I(A._report)>=A.report_batch:A.report_flush()
+	def report_flush(A):
+		if not A._report:return
 		try:
-			with O(B._json_name,'a')as C:
-				if not B._json_first:C.write(l)
-				else:B._json_first=I
-				E='{{"module": "{}", "file": "{}"}}'.format(module_name,stub_file.replace('\\',G));C.write(E)
-		except D:A.error(A2)
-	def report_end(B):
-		if not B._json_name:raise u(A3)
-		with O(B._json_name,'a')as C:C.write('\n]}')
-		A.info('Path: {}'.format(B.path))
-def Y(path):
-	B=E=0
-	while B!=-1:
-		B=path.find(G,E)
-		if B!=-1:
-			C=path[0]if B==0 else path[:B]
-			try:I=os.stat(C)
-			except D as F:
-				if F.args[0]in[A4,A5]:
-					try:A.debug('Create folder {}'.format(C));os.mkdir(C)
-					except D as H:A.error('failed to create folder {}'.format(C));raise H
-		E=B+1
-def Z(s):
-	C=' on '
-	if not s:return B
-	s=s.split(C,1)[0]if C in s else s
+			with A.open_file(A._json_name,c)as C:A._report_write(C)
+		except G:B.error(AM)
+	def _report_write(A,f):
+		for B in A._report:
+			if not A._json_first:f.write(A4)
+			else:A._json_first=H
+			f.write(B)
+		A._report=[]
+	def report_end(A):
+		if not A._json_name:raise w(AN)
+		with A.open_file(A._json_name,c)as C:A._report_write(C);C.write('\n]}')
+		B.info('Path: {}'.format(A.path))
+Y=o()
+def s(path):
+	if path[:path.rfind(J)]in Y:return
+	C=D=0
+	while C!=-1:
+		C=path.find(J,D)
+		if C!=-1:
+			A=path[0]if C==0 else path[:C]
+			if A not in Y:
+				try:H=os.stat(A);Y.add(A)
+				except G as E:
+					if E.args[0]in[AO,AP]:
+						try:B.debug('Create folder {}'.format(A));os.mkdir(A);Y.add(A)
+						except G as F:B.error('failed to create folder {}'.format(A));raise F
+		D=C+1
+def t(s):
+	B=' on '
+	if not s:return D
+	s=s.split(B,1)[0]if B in s else s
 	if s.startswith('v'):
-		if not E in s:return B
-		A=s.split(E)[1];return A
-	if not X in s:return B
-	A=s.split(X)[1].split(L)[1];return A
+		if not L in s:return D
+		A=s.split(L)[1];return A
+	if not p in s:return D
+	A=s.split(p)[1].split(O)[1];return A
 def _info():
-	d='ev3-pybricks';c='pycom';b='pycopy';a='unix';Y='win32';W='arch';S='cpu';Q='ver';F='mpy';D='build'
-	try:L=sys.implementation[0]
-	except e:L=sys.implementation.name
-	A=n({V:L,C:B,D:B,Q:B,M:sys.platform,T:'UNKNOWN',U:B,m:B,S:B,F:B,W:B})
-	if A[M].startswith('pyb'):A[M]='stm32'
-	elif A[M]==Y:A[M]='windows'
-	elif A[M]=='linux':A[M]=a
-	try:A[C]=A8(sys.implementation.version)
-	except J:pass
+	Y='ev3-pybricks';X='pycom';V='pycopy';S='unix';R='win32';Q='arch';P='cpu';O='ver';C='mpy';B='build'
+	try:J=sys.implementation[0]
+	except e:J=sys.implementation.name
+	A=OrderedDict({i:J,F:D,B:D,O:D,U:sys.platform,g:'UNKNOWN',h:D,A5:D,P:D,C:D,Q:D})
+	if A[U].startswith('pyb'):A[U]='stm32'
+	elif A[U]==R:A[U]='windows'
+	elif A[U]=='linux':A[U]=S
+	try:A[F]=AX(sys.implementation.version)
+	except N:pass
 	try:
-		O=sys.implementation._machine if'_machine'in N(sys.implementation)else os.uname().machine;A[T]=O.strip();G=sys.implementation._build if'_build'in N(sys.implementation)else B
-		if G:A[T]=G.split(E)[0];A[m]=G.split(E)[1]if E in G else B
-		A[U]=G;A[S]=O.split('with')[-1].strip();A[F]=sys.implementation._mpy if'_mpy'in N(sys.implementation)else sys.implementation.mpy if F in N(sys.implementation)else B
-	except(J,R):pass
-	if not A[U]:A9(A)
+		K=sys.implementation._machine if'_machine'in T(sys.implementation)else os.uname().machine;A[g]=K.strip();G=sys.implementation._build if'_build'in T(sys.implementation)else D
+		if G:A[g]=G.split(L)[0];A[A5]=G.split(L)[1]if L in G else D
+		A[h]=G;A[P]=K.split('with')[-1].strip();A[C]=sys.implementation._mpy if'_mpy'in T(sys.implementation)else sys.implementation.mpy if C in T(sys.implementation)else D
+	except(N,b):pass
+	if not A[h]:AY(A)
 	try:
-		if'uname'in N(os):
-			A[D]=Z(os.uname()[3])
-			if not A[D]:A[D]=Z(os.uname()[2])
-		elif C in N(sys):A[D]=Z(sys.version)
-	except(J,R,e):pass
-	if A[C]==B and sys.platform not in(a,Y):
-		try:f=os.uname();A[C]=f.release
-		except(R,J,e):pass
-	for(g,h,i)in[(b,b,'const'),(c,c,'FAT'),(d,'pybricks.hubs','EV3Brick')]:
-		try:j=__import__(h,H,H,i);A[V]=g;del j;break
-		except(P,t):pass
-	if A[V]==d:A['release']='2.0.0'
-	if A[V]==w:
-		A[C]
-		if A[C]and A[C].endswith('.0')and A[C]>='1.10.0'and A[C]<='1.19.9':A[C]=A[C][:-2]
-	if F in A and A[F]:
-		I=int(A[F])
-		try:K=[H,'x86','x64','armv6','armv6m','armv7m','armv7em','armv7emsp','armv7emdp','xtensa','xtensawin','rv32imc'][I>>10]
-		except R:K='unknown'
-		if K:A[W]=K
-		A[F]='v{}.{}'.format(I&255,I>>8&3)
-	if A[D]and not A[C].endswith(X):A[C]=A[C]+X
-	A[Q]=f"{A[C]}-{A[D]}"if A[D]else f"{A[C]}";return A
-def A8(version):
-	A=version;B=L.join([d(A)for A in A[:3]])
-	if S(A)>3 and A[3]:B+=E+A[3]
+		if'uname'in T(os):
+			A[B]=t(os.uname()[3])
+			if not A[B]:A[B]=t(os.uname()[2])
+		elif F in T(sys):A[B]=t(sys.version)
+	except(N,b,e):pass
+	if A[F]==D and sys.platform not in(S,R):
+		try:Z=os.uname();A[F]=Z.release
+		except(b,N,e):pass
+	for(a,c,d)in[(V,V,'const'),(X,X,'FAT'),(Y,'pybricks.hubs','EV3Brick')]:
+		try:f=__import__(c,E,E,d);A[i]=a;del f;break
+		except(M,AH):pass
+	if A[i]==Y:A['release']='2.0.0'
+	if A[i]==AJ:
+		A[F]
+		if A[F]and A[F].endswith('.0')and A[F]>='1.10.0'and A[F]<='1.19.9':A[F]=A[F][:-2]
+	if C in A and A[C]:
+		H=W(A[C])
+		try:I=[E,'x86','x64','armv6','armv6m','armv7m','armv7em','armv7emsp','armv7emdp','xtensa','xtensawin','rv32imc'][H>>10]
+		except b:I='unknown'
+		if I:A[Q]=I
+		A[C]='v{}.{}'.format(H&255,H>>8&3)
+	if A[B]and not A[F].endswith(p):A[F]=A[F]+p
+	A[O]=f"{A[F]}-{A[B]}"if A[B]else f"{A[F]}";return A
+def AX(version):
+	A=version;B=O.join([a(A)for A in A[:3]])
+	if I(A)>3 and A[3]:B+=L+A[3]
 	return B
-def A9(info):
-	D=info
-	try:from boardname import BOARD_ID as C;A.info('Found BOARD_ID: {}'.format(C))
-	except P:A.warning('BOARD_ID not found');C=B
-	D[U]=C;D[T]=C.split(E)[0]if E in C else C;D[m]==C.split(E)[1]if E in C else B
+def AY(info):
+	C=info
+	try:from boardname import BOARD_ID as A;B.info('Found BOARD_ID: {}'.format(A))
+	except M:B.warning('BOARD_ID not found');A=D
+	C[h]=A;C[g]=A.split(L)[0]if L in A else A;C[A5]==A.split(L)[1]if L in A else D
 def get_root():
 	try:A=os.getcwd()
-	except(D,J):A=L
+	except(G,N):A=O
 	B=A
-	for B in['/remote','/sd','/flash',G,A,L]:
+	for B in['/remote','/sd','/flash',J,A,O]:
 		try:C=os.stat(B);break
-		except D:continue
+		except G:continue
 	return B
-def a(filename):
+def V(filename):
+	try:
+		if os.stat(filename)[0]>>14:return K
+		return H
+	except G:return H
+def AZ():
+	D='modulelist.avail'
+	if not V(D):return
+	B=o()
+	with S(D)as E:
+		while K:
+			A=E.readline()
+			if not A:break
+			A=A.strip()
+			if A and A[0]!='#':B.add(A.split(J)[0])
+	for F in AA:
+		try:
+			for H in os.listdir(F):B.add(H.split(O)[0])
+		except G:pass
+	C.collect();return B
+def Aa():
+	if not V(A9):return
+	D={}
 	try:
-		if os.stat(filename)[0]>>14:return W
-		return I
-	except D:return I
-def o():Q("-p, --path   path to store the stubs in, defaults to '.'");sys.exit(1)
+		with S(A9)as E:
+			while K:
+				A=E.readline()
+				if not A:break
+				B=A.split()
+				if I(B)==2 and A[0]!='#':D[B[0]]=W(B[1],16)
+	except(G,y):pass
+	C.collect();return D
+def AC():Z("-p, --path   path to store the stubs in, defaults to '.'");sys.exit(1)
 def read_path():
-	path=B
-	if S(sys.argv)==3:
+	path=D
+	if I(sys.argv)==3:
 		A=sys.argv[1].lower()
 		if A in('--path','-p'):path=sys.argv[2]
-		else:o()
-	elif S(sys.argv)==2:o()
+		else:AC()
+	elif I(sys.argv)==2:AC()
 	return path
-def p():
-	try:A=bytes('abc',encoding='utf8');B=p.__module__;return I
-	except(q,J):return W
-b='modulelist.done'
-def AA(skip=0):
-	for E in A7:
-		B=E+'/modulelist.txt'
-		if not a(B):continue
+def AD():
+	try:A=bytes('abc',encoding='utf8');B=AD.__module__;return H
+	except(AF,N):return K
+AE='modulelist.done'
+Ab='modulelist.sched'
+Ac='modulelist.crash'
+Ad=8
+Ae=16384
+def Af(skip=0,offset=0):
+	C=offset
+	for D in[Ab]+[A+'/modulelist.txt'for A in AA]:
+		if not V(D):continue
 		try:
-			with O(B,encoding='utf-8')as F:
-				C=0
-				while W:
-					A=F.readline().strip()
+			with S(D,encoding='utf-8')as B:
+				E=0
+				if C:B.seek(C);skip=0
+				while K:
+					A=B.readline().strip()
 					if not A:break
-					if S(A)>0 and A[0]=='#':continue
-					C+=1
-					if C<skip:continue
-					yield A
+					if I(A)>0 and A[0]=='#':continue
+					E+=1
+					if E<skip:continue
+					yield(A,B.tell())
 				break
-		except D:pass
-def AB(done):
-	with O(b,i)as A:A.write(d(done)+'\n')
-def AC():
-	A=0
+		except G:pass
+def d(done,offset=0,modulename=D):
+	with S(AE,f)as A:A.write('{} {} {}\n'.format(done,offset,modulename))
+def Ag(line):
+	A=line.split()
+	try:return A[0],W(A[1])if I(A)>1 else 0
+	except y:return A[0],0
+def Ah(modulename):
+	with S(Ac,c)as A:A.write(modulename+Q)
+def Ai():
+	B=0;C=0
 	try:
-		with O(b)as B:A=int(B.readline().strip())
-	except D:pass
-	return A
+		with S(AE)as D:
+			A=D.readline().split();B=W(A[0])
+			if I(A)>1:C=W(A[1])
+	except(G,y,b):pass
+	return B,C
 def main():
-	import machine as D;C=a(b)
-	if C:A.info('Continue from last run')
-	else:A.info('Starting new run')
-	stubber=Stubber(path=read_path());B=0
-	if not C:stubber.clean();stubber.report_start(k)
-	else:B=AC();stubber._json_name=j.format(stubber.path,k)
-	for E in AA(B):
-		try:stubber.create_one_stub(E)
-		except r:D.reset()
-		F.collect();B+=1;AB(B)
-	Q('All modules have been processed, Finalizing report');stubber.report_end()
-if __name__=='__main__'or p():
-	if not a('no_auto_stubber.txt'):
-		Q(f"createstubs.py: {__version__}")
-		try:F.threshold(4096);F.enable()
+	import machine as F;A,D=Ai();M=A>0
+	if M:B.info('Continue from last run')
+	else:B.info('Starting new run')
+	stubber=Stubber(path=read_path())
+	if not M:stubber.clean();stubber.report_start(A3)
+	else:stubber._json_name=A2.format(stubber.path,A3)
+	stubber.report_batch=0;G=A;N=D;O=H;I=0;J=D
+	for(P,D)in Af(A,D):
+		E,L=Ag(P)
+		if L<0:B.warning('Skip module: {:<25}        : Known to crash'.format(E))
+		else:
+			if I and L>C.mem_free():B.info('Reset before module: {:<25} needs: {:>5}'.format(E,L));stubber.report_flush();d(A,J);x(F,'soft_reset',F.reset)()
+			if not O:d(G,N,E)
+			try:stubber.create_one_stub(E)
+			except AG:
+				C.collect();stubber.report_flush()
+				if I:d(A,J)
+				else:B.warning('Skip module: {:<25}        : Out of memory'.format(E));Ah(E);d(A+1,D)
+				F.reset()
+			I+=1
+		C.collect();A+=1;J=D
+		if A-G>=Ad or C.mem_free()<Ae:stubber.report_flush();d(A,D);G=A;N=D;O=K
+	Z('All modules have been processed, Finalizing report');stubber.report_end()
+if __name__=='__main__'or AD():
+	if not V('no_auto_stubber.txt'):
+		Z('createstubs.py: {}'.format(__version__))
+		try:C.threshold(4096);C.enable()
 		except BaseException:pass
 		main()
\ No newline at end of file
@@ -1,741 +1,552 @@
-"""
-Create stubs for the lvgl modules on a MicroPython board.
-
-Note that the stubs can be very large, and it may be best to directly store them on an SD card if your device supports this.
-
-This variant was generated from createstubs.py by micropython-stubber v1.16.3
-"""
-# Copyright (c) 2019-2023 Jos Verlinde
-
-import gc
-import os
-import sys
+AN='No report file'
+AM='Failed to create the report.'
+AL="<class 'type'>"
+AK='{}/{}.pyi'
+AJ='method'
+AI='function'
+AH='micropython'
+AG='stubber'
+AF=ValueError
+AE=MemoryError
+AD=NotImplementedError
+A4='variant'
+A3=',\n'
+A2='dict'
+A1='list'
+A0='tuple'
+z=memoryview
+y=KeyError
+u='-preview'
+t='wb'
+s=set
+r=type
+m='family'
+l='board_id'
+k='board'
+j='a'
+i='w'
+h=IndexError
+g=Exception
+f=TypeError
+e=isinstance
+a=open
+Z=str
+Y=print
+X=int
+V=repr
+T='\n'
+S='port'
+R=dir
+O=AttributeError
+N='-'
+M=True
+L='.'
+K=ImportError
+J=False
+I=len
+H='/'
+G=OSError
+F='version'
+C=None
+B=''
+import gc as D,os,sys
 from time import sleep
-
-try:
-    from ujson import dumps
-except:
-    from json import dumps
-
-try:
-    from machine import reset  # type: ignore
-except ImportError:
-    pass
-
-try:
-    from collections import OrderedDict
-except ImportError:
-    from ucollections import OrderedDict  # type: ignore
-
-__version__ = "v1.16.3"
-ENOENT = 2
-_MAX_CLASS_LEVEL = 2  # Max class nesting
-LIBS = ["lib", "/lib", "/sd/lib", "/flash/lib", "."]
-
-
-# our own logging module to avoid dependency on and interfering with logging module
-class logging:
-    DEBUG = 10
-    TRACE = 15
-    INFO = 20
-    WARNING = 30
-    ERROR = 40
-    CRITICAL = 50
-    level = INFO
-    prnt = print
-
-    @staticmethod
-    def getLogger(name):
-        return logging()
-
-    @classmethod
-    def basicConfig(cls, level):
-        cls.level = level
-        pass
-
-    def trace(self, msg):
-        if self.level <= logging.TRACE:
-            self.prnt("TRACE :", msg)
-
-    def debug(self, msg):
-        if self.level <= logging.DEBUG:
-            self.prnt("DEBUG :", msg)
-
-    def info(self, msg):
-        if self.level <= logging.INFO:
-            self.prnt("INFO  :", msg)
-
-    def warning(self, msg):
-        if self.level <= logging.WARNING:
-            self.prnt("WARN  :", msg)
-
-    def error(self, msg):
-        if self.level <= logging.ERROR:
-            self.prnt("ERROR :", msg)
-
-    def critical(self, msg):
-        if self.level <= logging.CRITICAL:
-            self.prnt("CRIT  :", msg)
-
-
-log = logging.getLogger("stubber")
-logging.basicConfig(level=logging.INFO)
-# logging.basicConfig(level=logging.TRACE)
-# logging.basicConfig(level=logging.DEBUG)
-
-
+try:from time import ticks_diff as A5,ticks_ms as v
+except K:
+	from time import time
+	def v():return X(time()*1000)
+	def A5(a,b):return a-b
+try:from ujson import dumps
+except:from json import dumps
+try:from machine import reset as A6
+except K:pass
+try:from ubinascii import b2a_base64,crc32 as P
+except K:
+	try:from binascii import b2a_base64,crc32 as P
+	except K:P=C
+try:import deflate as A
+except K:
+	A=C
+	try:import zlib as n
+	except K:n=C
+try:from collections import OrderedDict as b
+except K:
+	try:from ucollections import OrderedDict as b
+	except K:b=C
+__version__='v1.25.0'
+AO=2
+AP=44
+c=2
+o=4096
+A7=1024
+AQ=8
+AR='stream_stubber.txt'
+A8=384
+AS='profile_stubber.txt'
+AT='compress_stubber.txt'
+A9='modulelist.crc'
+AU=['lib','/lib','/sd/lib','/flash/lib',L]
+class Q:
+	DEBUG=10;INFO=20;WARNING=30;ERROR=40;level=INFO;prnt=Y
+	@staticmethod
+	def getLogger(name):return Q()
+	@classmethod
+	def basicConfig(A,level):A.level=level
+	def debug(A,msg):
+		if A.level<=Q.DEBUG:A.prnt('DEBUG :',msg)
+	def info(A,msg):
+		if A.level<=Q.INFO:A.prnt('INFO  :',msg)
+	def warning(A,msg):
+		if A.level<=Q.WARNING:A.prnt('WARN  :',msg)
+	def error(A,msg):
+		if A.level<=Q.ERROR:A.prnt('ERROR :',msg)
+E=Q.getLogger(AG)
+Q.basicConfig(level=Q.INFO)
+w=object()
+class AV(dict):
+	def __init__(A,*B,**C):super().__init__();A._keys=[];A._pos={};A.update(*B,**C)
+	def __setitem__(A,key,value):
+		B=key
+		if B not in A._pos:A._pos[B]=I(A._keys);A._keys.append(B)
+		super().__setitem__(B,value)
+	def __delitem__(A,key):
+		super().__delitem__(key);A._keys[A._pos.pop(key)]=w
+		if I(A._pos)*2<I(A._keys):A._keys=[A for A in A._keys if A is not w];A._pos={B:A for(A,B)in enumerate(A._keys)}
+	def __iter__(B):
+		for A in B._keys:
+			if A is not w:yield A
+	def keys(A):return iter(A)
+	def items(A):
+		for B in A:yield(B,A[B])
+	def values(A):
+		for B in A:yield A[B]
+	def update(B,*C,**D):
+		for A in C+(D,):
+			for(E,F)in A.items()if e(A,dict)else A:B[E]=F
+	def pop(B,key,*C):
+		A=key
+		if A in B._pos:D=B[A];del B[A];return D
+		if C:return C[0]
+		raise y(A)
+	def clear(A):super().clear();A._keys=[];A._pos={}
+if b is C:b=AV
+try:z(B);AA=M
+except f:AA=J
+class d:
+	def __init__(A,fp,size=A7):
+		A.fp=fp;A.size=size;A.buf=bytearray(size);A.mv=z(A.buf);A.n=0;A.written=0
+		try:fp.write(b'');A.text=J
+		except f:A.text=M
+	def write(A,*F):
+		for B in F:
+			if e(B,Z):B=z(B)if AA else B.encode()
+			C=I(B)
+			if A.text and A.n+C>A.size:
+				A.flush()
+				if C>A.size:A._write(B);continue
+			D=0
+			while D<C:
+				E=min(A.size-A.n,C-D);A.mv[A.n:A.n+E]=B if E==C else B[D:D+E];A.n+=E;D+=E
+				if A.n==A.size:A.flush()
+	def flush(A):
+		if A.n:A._write(A.mv[:A.n]);A.n=0
+	def _write(A,b):A.written+=I(b);A.fp.write(Z(b,'utf-8')if A.text else b)
+class AW:
+	def __init__(A,name,mode=i):
+		A.name=name;A.op=j if mode[0]==j else i
+		if A.op==i:A._frame(b'')
+	def __enter__(A):return A
+	def __exit__(A,*B):0
+	def close(A):0
+	def write(B,b):
+		if e(b,Z):b=b.encode()
+		for A in range(0,I(b),A8):B._frame(b[A:A+A8])
+		return I(b)
+	def _frame(A,b):Y('##STUB##:{}:{}:{:08x}:{}'.format(A.op,A.name,P(b)&4294967295,b2a_base64(b).decode().strip()));A.op=j
+class AX:
+	def __init__(B,name,mode=t):
+		B.f=a(name,mode)
+		if A:B.z=A.DeflateIO(B.f,A.GZIP)
+		else:B.z=n.compressobj(9,n.DEFLATED,31)
+	def __enter__(A):return A
+	def __exit__(A,*B):A.close()
+	def write(B,b):
+		if A:return B.z.write(b)
+		B.f.write(B.z.compress(b));return I(b)
+	def close(B):
+		if A:B.z.close()
+		else:B.f.write(B.z.flush())
+		B.f.close()
+def AY():
+	try:
+		if A:from io import BytesIO as B;A.DeflateIO(B(),A.GZIP).write(b'#');return M
+		return hasattr(n,'compressobj')
+	except g:return J
 class Stubber:
-    "Generate stubs for modules in firmware"
-
-    def __init__(self, path: str = None, firmware_id: str = None):  # type: ignore
-        try:
-            if os.uname().release == "1.13.0" and os.uname().version < "v1.13-103":  # type: ignore
-                raise NotImplementedError("MicroPython 1.13.0 cannot be stubbed")
-        except AttributeError:
-            pass
-        self._report = []  # type: list[str]
-        self.info = _info()
-        log.info("Port: {}".format(self.info["port"]))
-        log.info("Board: {}".format(self.info["board"]))
-        gc.collect()
-        if firmware_id:
-            self._fwid = firmware_id.lower()
-        else:
-            if self.info["family"] == "micropython":
-                self._fwid = "{family}-v{version}-{port}-{board}".format(**self.info).rstrip("-")
-            else:
-                self._fwid = "{family}-v{version}-{port}".format(**self.info)
-        self._start_free = gc.mem_free()  # type: ignore
-
-        if path:
-            if path.endswith("/"):
-                path = path[:-1]
-        else:
-            path = get_root()
-
-        self.path = "{}/stubs/{}".format(path, self.flat_fwid).replace("//", "/")
-        log.debug(self.path)
-        try:
-            ensure_folder(path + "/")
-        except OSError:
-            print("error creating stub folder {}".format(path))
-        self.problematic = [
-            "upip",
-            "upysh",
-            "webrepl_setup",
-            "http_client",
-            "http_client_ssl",
-            "http_server",
-            "http_server_ssl",
-        ]
-        self.excluded = [
-            "webrepl",
-            "_webrepl",
-            "port_diag",
-            "example_sub_led.py",
-            "example_pub_button.py",
-        ]
-        # there is no option to discover modules from micropython, list is read from an external file.
-        self.modules = []  # type: list[str]
-
-    def get_obj_attributes(self, item_instance: object):
-        "extract information of the objects members and attributes"
-        # name_, repr_(value), type as text, item_instance
-        _result = []
-        _errors = []
-        log.debug("get attributes {} {}".format(repr(item_instance), item_instance))
-        for name in dir(item_instance):
-            if name.startswith("_") and not name in self.modules:
-                continue
-            log.debug("get attribute {}".format(name))
-            try:
-                val = getattr(item_instance, name)
-                # name , item_repr(value) , type as text, item_instance, order
-                log.debug("attribute {}:{}".format(name, val))
-                try:
-                    type_text = repr(type(val)).split("'")[1]
-                except IndexError:
-                    type_text = ""
-                if type_text in {"int", "float", "str", "bool", "tuple", "list", "dict"}:
-                    order = 1
-                elif type_text in {"function", "method"}:
-                    order = 2
-                elif type_text in ("class"):
-                    order = 3
-                else:
-                    order = 4
-                _result.append((name, repr(val), repr(type(val)), val, order))
-            except AttributeError as e:
-                _errors.append("Couldn't get attribute '{}' from object '{}', Err: {}".format(name, item_instance, e))
-            except MemoryError as e:
-                # print("MemoryError: {}".format(e))
-                sleep(1)
-                reset()
-
-        # remove internal __
-        # _result = sorted([i for i in _result if not (i[0].startswith("_"))], key=lambda x: x[4])
-        _result = sorted([i for i in _result if not (i[0].startswith("__"))], key=lambda x: x[4])
-        gc.collect()
-        return _result, _errors
-
-    def add_modules(self, modules):
-        "Add additional modules to be exported"
-        self.modules = sorted(set(self.modules) | set(modules))
-
-    def create_all_stubs(self):
-        "Create stubs for all configured modules"
-        log.info("Start micropython-stubber v{} on {}".format(__version__, self._fwid))
-        gc.collect()
-        for module_name in self.modules:
-            self.create_one_stub(module_name)
-        log.info("Finally done")
-
-    def create_one_stub(self, module_name: str):
-        if module_name in self.problematic:
-            log.warning("Skip module: {:<25}        : Known problematic".format(module_name))
-            return False
-        if module_name in self.excluded:
-            log.warning("Skip module: {:<25}        : Excluded".format(module_name))
-            return False
-
-        file_name = "{}/{}.py".format(self.path, module_name.replace(".", "/"))
-        gc.collect()
-        result = False
-        try:
-            result = self.create_module_stub(module_name, file_name)
-        except OSError:
-            return False
-        gc.collect()
-        return result
-
-    def create_module_stub(self, module_name: str, file_name: str = None) -> bool:  # type: ignore
-        """Create a Stub of a single python module
-
-        Args:
-        - module_name (str): name of the module to document. This module will be imported.
-        - file_name (Optional[str]): the 'path/filename.py' to write to. If omitted will be created based on the module name.
-        """
-        if file_name is None:
-            fname = module_name.replace(".", "_") + ".py"
-            file_name = self.path + "/" + fname
-        else:
-            fname = file_name.split("/")[-1]
-
-        if "/" in module_name:
-            # for nested modules
-            module_name = module_name.replace("/", ".")
-
-        # import the module (as new_module) to examine it
-        new_module = None
-        try:
-            new_module = __import__(module_name, None, None, ("*"))
-            m1 = gc.mem_free()  # type: ignore
-            log.info("Stub module: {:<25} to file: {:<70} mem:{:>5}".format(module_name, fname, m1))
-
-        except ImportError:
-            log.trace("Skip module: {:<25} {:<79}".format(module_name, "Module not found."))
-            return False
-
-        # Start a new file
-        ensure_folder(file_name)
-        with open(file_name, "w") as fp:
-            # todo: improve header
-            info_ = str(self.info).replace("OrderedDict(", "").replace("})", "}")
-            s = '"""\nModule: \'{0}\' on {1}\n"""\n# MCU: {2}\n# Stubber: {3}\n'.format(module_name, self._fwid, info_, __version__)
-            fp.write(s)
-            fp.write("from __future__ import annotations\nfrom typing import Any\nfrom _typeshed import Incomplete\n\n")
-            self.write_object_stub(fp, new_module, module_name, "")
-
-        self._report.append('{{"module": "{}", "file": "{}"}}'.format(module_name, file_name.replace("\\", "/")))
-
-        if module_name not in {"os", "sys", "logging", "gc"}:
-            # try to unload the module unless we use it
-            try:
-                del new_module
-            except (OSError, KeyError):  # lgtm [py/unreachable-statement]
-                log.warning("could not del new_module")
-            # lets not try - most times it does not work anyway
-            # try:
-            #     del sys.modules[module_name]
-            # except KeyError:
-            #     log.warning("could not del sys.modules[{}]".format(module_name))
-        gc.collect()
-        return True
-
-    def write_object_stub(self, fp, object_expr: object, obj_name: str, indent: str, in_class: int = 0):
-        "Write a module/object stub to an open file. Can be called recursive."
-        gc.collect()
-        if object_expr in self.problematic:
-            log.warning("SKIPPING problematic module:{}".format(object_expr))
-            return
-
-        # log.debug("DUMP    : {}".format(object_expr))
-        items, errors = self.get_obj_attributes(object_expr)
-
-        if errors:
-            print(errors)
-
-        for item_name, item_repr, item_type_txt, item_instance, _ in items:
-            # name_, repr_(value), type as text, item_instance, order
-            if item_name in ["classmethod", "staticmethod", "BaseException", "Exception"]:
-                # do not create stubs for these primitives
-                continue
-            if item_name[0].isdigit():
-                log.warning("NameError: invalid name {}".format(item_name))
-                continue
-            # Class expansion only on first 3 levels (bit of a hack)
-            if (
-                item_type_txt == "<class 'type'>"
-                and len(indent) <= _MAX_CLASS_LEVEL * 4
-                # and not obj_name.endswith(".Pin")
-                # avoid expansion of Pin.cpu / Pin.board to avoid crashes on most platforms
-            ):
-                log.trace("{0}class {1}:".format(indent, item_name))
-                superclass = ""
-                is_exception = (
-                    item_name.endswith("Exception")
-                    or item_name.endswith("Error")
-                    or item_name
-                    in [
-                        "KeyboardInterrupt",
-                        "StopIteration",
-                        "SystemExit",
-                    ]
-                )
-                if is_exception:
-                    superclass = "Exception"
-                s = "\n{}class {}({}):\n".format(indent, item_name, superclass)
-                # s += indent + "    ''\n"
-                if is_exception:
-                    s += indent + "    ...\n"
-                    fp.write(s)
-                    continue
-                # write classdef
-                fp.write(s)
-                # first write the class literals and methods
-                log.debug("# recursion over class {0}".format(item_name))
-                self.write_object_stub(
-                    fp,
-                    item_instance,
-                    "{0}.{1}".format(obj_name, item_name),
-                    indent + "    ",
-                    in_class + 1,
-                )
-                # end with the __init__ method to make sure that the literals are defined
-                # Add __init__
-                s = indent + "    def __init__(self, *argv, **kwargs) -> None:\n"
-                s += indent + "        ...\n\n"
-                fp.write(s)
-            elif any(word in item_type_txt for word in ["method", "function", "closure"]):
-                log.debug("# def {1} function/method/closure, type = '{0}'".format(item_type_txt, item_name))
-                # module Function or class method
-                # will accept any number of params
-                # return type Any/Incomplete
-                ret = "Incomplete"
-                first = ""
-                # Self parameter only on class methods/functions
-                if in_class > 0:
-                    first = "self, "
-                # class method - add function decoration
-                if "bound_method" in item_type_txt or "bound_method" in item_repr:
-                    s = "{}@classmethod\n".format(indent) + "{}def {}(cls, *args, **kwargs) -> {}:\n".format(indent, item_name, ret)
-                else:
-                    s = "{}def {}({}*args, **kwargs) -> {}:\n".format(indent, item_name, first, ret)
-                s += indent + "    ...\n\n"
-                fp.write(s)
-                log.debug("\n" + s)
-            elif item_type_txt == "<class 'module'>":
-                # Skip imported modules
-                # fp.write("# import {}\n".format(item_name))
-                pass
-
-            elif item_type_txt.startswith("<class '"):
-                t = item_type_txt[8:-2]
-                s = ""
-
-                if t in ["str", "int", "float", "bool", "bytearray", "bytes"]:
-                    # known type: use actual value
-                    s = "{0}{1} = {2} # type: {3}\n".format(indent, item_name, item_repr, t)
-                elif t in ["dict", "list", "tuple"]:
-                    # dict, list , tuple: use empty value
-                    ev = {"dict": "{}", "list": "[]", "tuple": "()"}
-                    s = "{0}{1} = {2} # type: {3}\n".format(indent, item_name, ev[t], t)
-                else:
-                    # something else
-                    if t in ["object", "set", "frozenset", "Pin", "FileIO"]:
-                        # https://docs.python.org/3/tutorial/classes.html#item_instance-objects
-                        #  use these types for the attribute
-                        s = "{0}{1} : {2} ## = {4}\n".format(indent, item_name, t, item_type_txt, item_repr)
-                    else:
-                        # Requires Python 3.6 syntax, which is OK for the stubs/pyi
-                        t = "Incomplete"
-                        s = "{0}{1} : {2} ## {3} = {4}\n".format(indent, item_name, t, item_type_txt, item_repr)
-                fp.write(s)
-                log.debug("\n" + s)
-            else:
-                # keep only the name
-                log.debug("# all other, type = '{0}'".format(item_type_txt))
-                fp.write("# all other, type = '{0}'\n".format(item_type_txt))
-
-                fp.write(indent + item_name + " # type: Incomplete\n")
-
-        # del items
-        # del errors
-        # try:
-        #     del item_name, item_repr, item_type_txt, item_instance  # type: ignore
-        # except (OSError, KeyError, NameError):
-        #     pass
-
-    @property
-    def flat_fwid(self):
-        "Turn _fwid from 'v1.2.3' into '1_2_3' to be used in filename"
-        s = self._fwid
-        # path name restrictions
-        chars = " .()/\\:$"
-        for c in chars:
-            s = s.replace(c, "_")
-        return s
-
-    def clean(self, path: str = None):  # type: ignore
-        "Remove all files from the stub folder"
-        if path is None:
-            path = self.path
-        log.info("Clean/remove files in folder: {}".format(path))
-        try:
-            os.stat(path)  # TEMP workaround mpremote listdir bug -
-            items = os.listdir(path)
-        except (OSError, AttributeError):
-            # os.listdir fails on unix
-            return
-        for fn in items:
-            item = "{}/{}".format(path, fn)
-            try:
-                os.remove(item)
-            except OSError:
-                try:  # folder
-                    self.clean(item)
-                    os.rmdir(item)
-                except OSError:
-                    pass
-
-    def report(self, filename: str = "modules.json"):
-        "create json with list of exported modules"
-        log.info("Created stubs for {} modules on board {}\nPath: {}".format(len(self._report), self._fwid, self.path))
-        f_name = "{}/{}".format(self.path, filename)
-        log.info("Report file: {}".format(f_name))
-        gc.collect()
-        try:
-            # write json by node to reduce memory requirements
-            with open(f_name, "w") as f:
-                self.write_json_header(f)
-                first = True
-                for n in self._report:
-                    self.write_json_node(f, n, first)
-                    first = False
-                self.write_json_end(f)
-            used = self._start_free - gc.mem_free()  # type: ignore
-            log.trace("Memory used: {0} Kb".format(used // 1024))
-        except OSError:
-            print("Failed to create the report.")
-
-    def write_json_header(self, f):
-        f.write("{")
-        f.write(dumps({"firmware": self.info})[1:-1])
-        f.write(",\n")
-        f.write(dumps({"stubber": {"version": __version__}, "stubtype": "firmware"})[1:-1])
-        f.write(",\n")
-        f.write('"modules" :[\n')
-
-    def write_json_node(self, f, n, first):
-        if not first:
-            f.write(",\n")
-        f.write(n)
-
-    def write_json_end(self, f):
-        f.write("\n]}")
-
-
-def ensure_folder(path: str):
-    "Create nested folders if needed"
-    i = start = 0
-    while i != -1:
-        i = path.find("/", start)
-        if i != -1:
-            p = path[0] if i == 0 else path[:i]
-            # p = partial folder
-            try:
-                _ = os.stat(p)
-            except OSError as e:
-                # folder does not exist
-                if e.args[0] == ENOENT:
-                    try:
-                        os.mkdir(p)
-                    except OSError as e2:
-                        print("failed to create folder {}".format(p))
-                        raise e2
-        # next level deep
-        start = i + 1
-
-
-def _build(s):
-    # extract build from sys.version or os.uname().version if available
-    # sys.version: 'MicroPython v1.23.0-preview.6.g3d0b6276f'
-    # sys.implementation.version: 'v1.13-103-gb137d064e'
-    if not s:
-        return ""
-    s = s.split(" on ", 1)[0] if " on " in s else s
-    if s.startswith("v"):
-        if not "-" in s:
-            return ""
-        b = s.split("-")[1]
-        return b
-    if not "-preview" in s:
-        return ""
-    b = s.split("-preview")[1].split(".")[1]
-    return b
-
-
-def _info():  # type:() -> dict[str, str]
-    info = OrderedDict(
-        {
-            "family": sys.implementation.name,
-            "version": "",
-            "build": "",
-            "ver": "",
-            "port": sys.platform,  # port: esp32 / win32 / linux / stm32
-            "board": "UNKNOWN",
-            "cpu": "",
-            "mpy": "",
-            "arch": "",
-        }
-    )
-    # change port names to be consistent with the repo
-    if info["port"].startswith("pyb"):
-        info["port"] = "stm32"
-    elif info["port"] == "win32":
-        info["port"] = "windows"
-    elif info["port"] == "linux":
-        info["port"] = "unix"
-    try:
-        info["version"] = version_str(sys.implementation.version)  # type: ignore
-    except AttributeError:
-        pass
-    try:
-        _machine = sys.implementation._machine if "_machine" in dir(sys.implementation) else os.uname().machine  # type: ignore
-        # info["board"] = "with".join(_machine.split("with")[:-1]).strip()
-        info["board"] = _machine
-        info["cpu"] = _machine.split("with")[-1].strip()
-        info["mpy"] = (
-            sys.implementation._mpy
-            if "_mpy" in dir(sys.implementation)
-            else sys.implementation.mpy
-            if "mpy" in dir(sys.implementation)
-            else ""
-        )
-    except (AttributeError, IndexError):
-        pass
-    info["board"] = get_boardname()
-
-    try:
-        if "uname" in dir(os):  # old
-            # extract build from uname().version if available
-            info["build"] = _build(os.uname()[3])  # type: ignore
-            if not info["build"]:
-                # extract build from uname().release if available
-                info["build"] = _build(os.uname()[2])  # type: ignore
-        elif "version" in dir(sys):  # new
-            # extract build from sys.version if available
-            info["build"] = _build(sys.version)
-    except (AttributeError, IndexError, TypeError):
-        pass
-    # avoid  build hashes
-    # if info["build"] and len(info["build"]) > 5:
-    #     info["build"] = ""
-
-    if info["version"] == "" and sys.platform not in ("unix", "win32"):
-        try:
-            u = os.uname()  # type: ignore
-            info["version"] = u.release
-        except (IndexError, AttributeError, TypeError):
-            pass
-    # detect families
-    for fam_name, mod_name, mod_thing in [
-        ("pycopy", "pycopy", "const"),
-        ("pycom", "pycom", "FAT"),
-        ("ev3-pybricks", "pybricks.hubs", "EV3Brick"),
-    ]:
-        try:
-            _t = __import__(mod_name, None, None, (mod_thing))
-            info["family"] = fam_name
-            del _t
-            break
-        except (ImportError, KeyError):
-            pass
-
-    if info["family"] == "ev3-pybricks":
-        info["release"] = "2.0.0"
-
-    if info["family"] == "micropython":
-        info["version"]
-        if (
-            info["version"]
-            and info["version"].endswith(".0")
-            and info["version"] >= "1.10.0"  # versions from 1.10.0 to 1.20.0 do not have a micro .0
-            and info["version"] <= "1.19.9"
-        ):
-            # versions from 1.10.0 to 1.20.0 do not have a micro .0
-            info["version"] = info["version"][:-2]
-
-    # spell-checker: disable
-    if "mpy" in info and info["mpy"]:  # mpy on some v1.11+ builds
-        sys_mpy = int(info["mpy"])
-        # .mpy architecture
-        arch = [
-            None,
-            "x86",
-            "x64",
-            "armv6",
-            "armv6m",
-            "armv7m",
-            "armv7em",
-            "armv7emsp",
-            "armv7emdp",
-            "xtensa",
-            "xtensawin",
-        ][sys_mpy >> 10]
-        if arch:
-            info["arch"] = arch
-        # .mpy version.minor
-        info["mpy"] = "v{}.{}".format(sys_mpy & 0xFF, sys_mpy >> 8 & 3)
-    if info["build"] and not info["version"].endswith("-preview"):
-        info["version"] = info["version"] + "-preview"
-    # simple to use version[-build] string
-    info["ver"] = f"{info['version']}-{info['build']}" if info["build"] else f"{info['version']}"
-
-    return info
-
-
-def version_str(version: tuple):  #  -> str:
-    v_str = ".".join([str(n) for n in version[:3]])
-    if len(version) > 3 and version[3]:
-        v_str += "-" + version[3]
-    return v_str
-
-
-def get_boardname() -> str:
-    "Read the board name from the boardname.py file that may have been created upfront"
-    try:
-        from boardname import BOARDNAME  # type: ignore
-
-        log.info("Found BOARDNAME: {}".format(BOARDNAME))
-    except ImportError:
-        log.warning("BOARDNAME not found")
-        BOARDNAME = ""
-    return BOARDNAME
-
-
-def get_root() -> str:  # sourcery skip: use-assigned-variable
-    "Determine the root folder of the device"
-    try:
-        c = os.getcwd()
-    except (OSError, AttributeError):
-        # unix port
-        c = "."
-    r = c
-    for r in [c, "/sd", "/flash", "/", "."]:
-        try:
-            _ = os.stat(r)
-            break
-        except OSError:
-            continue
-    return r
-
-
-def file_exists(filename: str):
-    try:
-        if os.stat(filename)[0] >> 14:
-            return True
-        return False
-    except OSError:
-        return False
-
-
-def show_help():
-    # print("-p, --path   path to store the stubs in, defaults to '.'")
-    sys.exit(1)
-
-
-def read_path() -> str:
-    "get --path from cmdline. [unix/win]"
-    path = ""
-    if len(sys.argv) == 3:
-        cmd = (sys.argv[1]).lower()
-        if cmd in ("--path", "-p"):
-            path = sys.argv[2]
-        else:
-            show_help()
-    elif len(sys.argv) == 2:
-        show_help()
-    return path
-
-
-def is_micropython() -> bool:
-    "runtime test to determine full or micropython"
-    # pylint: disable=unused-variable,eval-used
-    try:
-        # either test should fail on micropython
-        # a) https://docs.micropython.org/en/latest/genrst/syntax.html#spaces
-        # Micropython : SyntaxError
-        # a = eval("1and 0")  # lgtm [py/unused-local-variable]
-        # Eval blocks some minification aspects
-
-        # b) https://docs.micropython.org/en/latest/genrst/builtin_types.html#bytes-with-keywords-not-implemented
-        # Micropython: NotImplementedError
-        b = bytes("abc", encoding="utf8")  # type: ignore # lgtm [py/unused-local-variable]
-
-        # c) https://docs.micropython.org/en/latest/genrst/core_language.html#function-objects-do-not-have-the-module-attribute
-        # Micropython: AttributeError
-        c = is_micropython.__module__  # type: ignore # lgtm [py/unused-local-variable]
-        return False
-    except (NotImplementedError, AttributeError):
-        return True
-
-
+	def __init__(A,path=B,firmware_id=B):
+		B=firmware_id
+		try:
+			if os.uname().release=='1.13.0'and os.uname().version<'v1.13-103':raise AD('MicroPython 1.13.0 cannot be stubbed')
+		except O:pass
+		A.info=_info();E.info('Port: {}'.format(A.info[S]));E.info('Board: {}'.format(A.info[k]));E.info('Board_ID: {}'.format(A.info[l]));D.collect()
+		if B:A._fwid=B.lower()
+		elif A.info[m]==AH:A._fwid='{family}-v{version}-{port}-{board_id}'.format(**A.info).rstrip(N)
+		else:A._fwid='{family}-v{version}-{port}'.format(**A.info)
+		A._start_free=D.mem_free()
+		if path:
+			if path.endswith(H):path=path[:-1]
+		else:path=get_root()
+		A.path='{}/stubs/{}'.format(path,A.flat_fwid).replace('//',H);A.stream=P is not C and U(AR);A.profile=U(AS);A.compress=not A.stream and U(AT)and AY();A._profile=C;A._min_free=0;A.fingerprints=Ac();W.clear()
+		if not A.stream:
+			try:p(path+H)
+			except G:E.error('error creating stub folder {}'.format(path))
+		A.problematic=['upip','upysh','webrepl_setup','http_client','http_client_ssl','http_server','http_server_ssl'];A.excluded=['webrepl','_webrepl','port_diag','example_sub_led.py','example_pub_button.py'];A.modules=[];A.available=Ab();A._json_name=C;A._json_first=J;A._report=[];A.report_batch=AQ;A.buffer_size=A7;A._depth=c+1
+	def get_obj_attributes(E,item_instance):
+		A=[];B=[]
+		for(F,C,G,H)in E.iter_obj_attributes(item_instance,B):A.append((F,V(C),G,C,H))
+		D.collect();return A,B
+	def iter_obj_attributes(N,item_instance,errors=C):
+		I=errors;G=item_instance
+		for J in(1,2,3,4):
+			for D in R(G):
+				if D.startswith('__'):continue
+				try:K=getattr(G,D)
+				except O as H:
+					if J==1:
+						L="Couldn't get attribute '{}' from object '{}', Err: {}".format(D,G,H)
+						if I is C:E.error(L)
+						else:I.append(L)
+					continue
+				except AE as H:Y('MemoryError: {}'.format(H));sleep(1);A6()
+				M=V(r(K))
+				try:F=M.split("'")[1]
+				except h:F=B
+				if F in{'int','float','str','bool',A0,A1,A2}:A=1
+				elif F in{AI,AJ}:A=2
+				elif F in'class':A=3
+				else:A=4
+				if A==J:yield(D,K,M,A)
+	def add_modules(A,modules):A.modules=sorted(s(A.modules)|s(modules))
+	def create_all_stubs(A):
+		E.info('Start micropython-stubber {} on {}'.format(__version__,A._fwid));A.report_start();D.collect()
+		for B in A.modules:A.create_one_stub(B)
+		A.report_end();E.info('Finally done')
+	def create_one_stub(B,module_name):
+		A=module_name
+		if A in B.problematic:E.warning('Skip module: {:<25}        : Known problematic'.format(A));return J
+		if A in B.excluded:E.warning('Skip module: {:<25}        : Excluded'.format(A));return J
+		if not B.is_available(A):return J
+		F=AK.format(B.path,A.replace(L,H));D.collect();C=J
+		try:C=B.create_module_stub(A,F)
+		except G:return J
+		D.collect();return C
+	def is_available(A,module_name):
+		if A.available is C:return M
+		B=module_name.replace(L,H).split(H)[0];return B in A.available or B[:1]=='u'and B[1:]in A.available
+	def create_module_stub(A,module_name,file_name=C):
+		I=file_name;F=module_name
+		if I is C:P=F.replace(L,'_')+'.pyi';I=A.path+H+P
+		else:P=I.split(H)[-1]
+		if H in F:F=F.replace(H,L)
+		N=C
+		try:U=D.mem_free();Q=v();N=__import__(F,C,C,'*');Q=A5(v(),Q);R=D.mem_free();E.info('Stub module: {:<25} to file: {:<70} mem:{:>5}'.format(F,P,R))
+		except K:return J
+		A._depth=c+1;S=A.fingerprint(N)if A.fingerprints is not C else 0;T=S and A.fingerprints.get(F)==S
+		if T:E.info('Unchanged module: {}'.format(F))
+		else:
+			if not A.stream:p(I)
+			with AX(I+'.gz')if A.compress else A.open_file(I,t)as V:O=d(V,A.buffer_size);A.write_module_header(O,F);A._min_free=R;A.write_object_stub(O,N,F,B);O.flush()
+			if A.profile:D.collect();A._profile=Q,U,R,D.mem_free(),A._min_free,O.written
+		A.report_add(F,I,S,T)
+		if F not in{'os','sys','logging','gc'}:
+			try:del N
+			except(G,y):E.warning('could not del new_module')
+		D.collect();return M
+	def write_module_header(A,fp,module_name):C=Z(A.info).replace('OrderedDict(',B).replace('})','}');fp.write('"""\nModule: \'',module_name,"' on ",A._fwid,'\n"""\n');fp.write('# MCU: ',C,'\n# Stubber: ',__version__,T);fp.write('from __future__ import annotations\nfrom typing import Any, Final, Generator\nfrom _typeshed import Incomplete\n\n')
+	def fingerprint(A,module):
+		if P is C:return 0
+		return A.fingerprint_members(module,P(__version__.encode()),0)&4294967295
+	def fingerprint_members(G,obj,crc,level):
+		E=level;A=crc;F=R(obj);F.sort()
+		for C in F:
+			try:B=getattr(obj,C)
+			except O:continue
+			A=P(C.encode(),A);A=P(V(r(B)).encode(),A)
+			if r(B)in(X,float,Z,bool):A=P(V(B).encode(),A)
+			elif e(B,r)and E<c and C[:2]!='__':
+				if D.mem_free()<o:D.collect()
+				if D.mem_free()>=o:A=G.fingerprint_members(B,A,E+1)
+		return A
+	def write_object_stub(A,fp,object_expr,obj_name,indent,in_class=0):
+		G=in_class;F=indent;C=obj_name;B=object_expr
+		if not e(fp,d):H=d(fp,A.buffer_size);A.write_object_stub(H,B,C,F,G);H.flush();return
+		D.collect()
+		if A.profile:A._min_free=min(A._min_free,D.mem_free())
+		if B in A.problematic:E.warning('SKIPPING problematic module:{}'.format(B));return
+		for(I,J,K,L)in A.iter_obj_attributes(B):A.write_item_stub(fp,I,J,K,C,F,G)
+	def write_item_stub(L,fp,item_name,item_instance,item_type_txt,obj_name,indent,in_class=0):
+		Z=' at ';Y='    ...\n\n';X='bound_method';R=in_class;Q=obj_name;P=' = ';O=': ';N='def ';M='Exception';K=item_instance;J=item_type_txt;F=indent;C=item_name;A=fp
+		if C in['classmethod','staticmethod','BaseException',M]:return
+		if C[0].isdigit():E.warning('NameError: invalid name {}'.format(C));return
+		if J==AL and I(F)<=c*4:
+			S=B;U=C.endswith(M)or C.endswith('Error')or C in['KeyboardInterrupt','StopIteration','SystemExit']
+			if U:S=M
+			A.write(T,F,'class ',C,'(',S,'):\n')
+			if U:A.write(F,'    ...\n');return
+			if D.mem_free()<o:D.collect()
+			if D.mem_free()>=o:L.write_object_stub(A,K,'{0}.{1}'.format(Q,C),F+'    ',R+1)
+			else:E.warning('Low memory: class {}.{} is not expanded'.format(Q,C));L._depth=min(L._depth,I(F)//4);A.write(F,'    def __getattr__(self, name: str) -> Incomplete: ...\n')
+			A.write(F,'    def __init__(self, *argv, **kwargs) -> None:\n');A.write(F,'        ...\n\n')
+		elif any(A in J for A in[AJ,AI,'closure']):
+			W=B
+			if R>0:W='self, '
+			if X in J or X in V(K):A.write(F,'@classmethod\n');A.write(F,N,C,'(cls, *args, **kwargs) -> Incomplete:\n')
+			else:A.write(F,N,C,'(',W,'*args, **kwargs) -> Incomplete:\n')
+			A.write(F,Y)
+		elif J=="<class 'module'>":0
+		elif J.startswith("<class '"):
+			G=J[8:-2]
+			if G in('str','int','float','bool','bytearray','bytes'):
+				H=V(K)
+				if C.upper()==C:A.write(F,C,': Final[',G,'] = ',H,T)
+				else:A.write(F,C,O,G,P,H,T)
+			elif G in(A2,A1,A0):a={A2:'{}',A1:'[]',A0:'()'};A.write(F,C,O,G,P,a[G],T)
+			else:
+				H=V(K)
+				if G in('object','set','frozenset','Pin'):A.write(F,C,O,G,' ## = ',H,T)
+				elif G=='generator':A.write(F,N,C,'(*args, **kwargs) -> Generator:  ## = ');A.write(H,T,F,Y)
+				else:
+					if Z in H:H=H.split(Z)[0]+' at ...>'
+					A.write(F,C,': Incomplete ## ',J,P);A.write(H,T)
+		else:A.write("# all other, type = '",J,"'\n");A.write(F,C,' # type: Incomplete\n')
+	@property
+	def flat_fwid(self):
+		A=self._fwid;B=' .()/\\:$'
+		for C in B:A=A.replace(C,'_')
+		return A
+	def clean(B,path=B):
+		if not path:path=B.path
+		E.info('Clean/remove files in folder: {}'.format(path));W.clear()
+		try:os.stat(path);C=os.listdir(path)
+		except(G,O):return
+		for D in C:
+			A='{}/{}'.format(path,D)
+			try:os.remove(A)
+			except G:
+				try:B.clean(A);os.rmdir(A)
+				except G:pass
+	def open_file(B,file_name,mode):
+		A=file_name
+		if B.stream:return AW(A,mode)
+		return a(A,mode)
+	def report_start(A,filename='modules.json'):
+		H='firmware';A._json_name='{}/{}'.format(A.path,filename);A._json_first=M;A._report=[]
+		if not A.stream:p(A._json_name)
+		E.info('Report file: {}'.format(A._json_name));D.collect()
+		try:
+			with A.open_file(A._json_name,i)as B:B.write('{');B.write(dumps({H:A.info})[1:-1]);B.write(A3);B.write(dumps({AG:{F:__version__},'stubtype':H})[1:-1]);B.write(A3);B.write('"modules" :[\n')
+		except G as I:E.error(AM);A._json_name=C;raise I
+	def report_add(A,module_name,stub_file,crc=0,unchanged=J):
+		if not A._json_name:raise g(AN)
+		B='{{"module": "{}", "file": "{}", "depth": {}'.format(module_name,stub_file.replace('\\',H),A._depth)
+		if A._profile:D='import_ms','mem_before','mem_import','mem_after','mem_min','size';B+=', "profile": {'+', '.join('"{}": {}'.format(A,B)for(A,B)in zip(D,A._profile))+'}';A._profile=C
+		if crc:B+=', "crc": "{:08x}"'.format(crc)
+		if unchanged:B+=', "unchanged": true'
+		B+='}';A._report.append(B)
+		if A.report_batch and I(A._report)>=A.report_batch:A.report_flush()
+	def report_flush(A):
+		if not A._report:return
+		try:
+			with A.open_file(A._json_name,j)as B:A._report_write(B)
+		except G:E.error(AM)
+	def _report_write(A,f):
+		for B in A._report:
+			if not A._json_first:f.write(A3)
+			else:A._json_first=J
+			f.write(B)
+		A._report=[]
+	def report_end(A):
+		if not A._json_name:raise g(AN)
+		with A.open_file(A._json_name,j)as B:A._report_write(B);B.write('\n]}')
+		E.info('Path: {}'.format(A.path))
+W=s()
+def p(path):
+	if path[:path.rfind(H)]in W:return
+	B=C=0
+	while B!=-1:
+		B=path.find(H,C)
+		if B!=-1:
+			A=path[0]if B==0 else path[:B]
+			if A not in W:
+				try:I=os.stat(A);W.add(A)
+				except G as D:
+					if D.args[0]in[AO,AP]:
+						try:E.debug('Create folder {}'.format(A));os.mkdir(A);W.add(A)
+						except G as F:E.error('failed to create folder {}'.format(A));raise F
+		C=B+1
+def x(s):
+	C=' on '
+	if not s:return B
+	s=s.split(C,1)[0]if C in s else s
+	if s.startswith('v'):
+		if not N in s:return B
+		A=s.split(N)[1];return A
+	if not u in s:return B
+	A=s.split(u)[1].split(L)[1];return A
+def _info():
+	Y='ev3-pybricks';W='pycom';V='pycopy';U='unix';T='win32';Q='arch';P='cpu';M='ver';E='mpy';D='build'
+	try:J=sys.implementation[0]
+	except f:J=sys.implementation.name
+	A=b({m:J,F:B,D:B,M:B,S:sys.platform,k:'UNKNOWN',l:B,A4:B,P:B,E:B,Q:B})
+	if A[S].startswith('pyb'):A[S]='stm32'
+	elif A[S]==T:A[S]='windows'
+	elif A[S]=='linux':A[S]=U
+	try:A[F]=AZ(sys.implementation.version)
+	except O:pass
+	try:
+		L=sys.implementation._machine if'_machine'in R(sys.implementation)else os.uname().machine;A[k]=L.strip();G=sys.implementation._build if'_build'in R(sys.implementation)else B
+		if G:A[k]=G.split(N)[0];A[A4]=G.split(N)[1]if N in G else B
+		A[l]=G;A[P]=L.split('with')[-1].strip();A[E]=sys.implementation._mpy if'_mpy'in R(sys.implementation)else sys.implementation.mpy if E in R(sys.implementation)else B
+	except(O,h):pass
+	if not A[l]:Aa(A)
+	try:
+		if'uname'in R(os):
+			A[D]=x(os.uname()[3])
+			if not A[D]:A[D]=x(os.uname()[2])
+		elif F in R(sys):A[D]=x(sys.version)
+	except(O,h,f):pass
+	if A[F]==B and sys.platform not in(U,T):
+		try:Z=os.uname();A[F]=Z.release
+		except(h,O,f):pass
+	for(a,c,d)in[(V,V,'const'),(W,W,'FAT'),(Y,'pybricks.hubs','EV3Brick')]:
+		try:e=__import__(c,C,C,d);A[m]=a;del e;break
+		except(K,y):pass
+	if A[m]==Y:A['release']='2.0.0'
+	if A[m]==AH:
+		A[F]
+		if A[F]and A[F].endswith('.0')and A[F]>='1.10.0'and A[F]<='1.19.9':A[F]=A[F][:-2]
+	if E in A and A[E]:
+		H=X(A[E])
+		try:I=[C,'x86','x64','armv6','armv6m','armv7m','armv7em','armv7emsp','armv7emdp','xtensa','xtensawin','rv32imc'][H>>10]
+		except h:I='unknown'
+		if I:A[Q]=I
+		A[E]='v{}.{}'.format(H&255,H>>8&3)
+	if A[D]and not A[F].endswith(u):A[F]=A[F]+u
+	A[M]=f"{A[F]}-{A[D]}"if A[D]else f"{A[F]}";return A
+def AZ(version):
+	A=version;B=L.join([Z(A)for A in A[:3]])
+	if I(A)>3 and A[3]:B+=N+A[3]
+	return B
+def Aa(info):
+	C=info
+	try:from boardname import BOARD_ID as A;E.info('Found BOARD_ID: {}'.format(A))
+	except K:E.warning('BOARD_ID not found');A=B
+	C[l]=A;C[k]=A.split(N)[0]if N in A else A;C[A4]==A.split(N)[1]if N in A else B
+def get_root():
+	try:A=os.getcwd()
+	except(G,O):A=L
+	B=A
+	for B in['/remote','/sd','/flash',H,A,L]:
+		try:C=os.stat(B);break
+		except G:continue
+	return B
+def U(filename):
+	try:
+		if os.stat(filename)[0]>>14:return M
+		return J
+	except G:return J
+def Ab():
+	C='modulelist.avail'
+	if not U(C):return
+	B=s()
+	with a(C)as E:
+		while M:
+			A=E.readline()
+			if not A:break
+			A=A.strip()
+			if A and A[0]!='#':B.add(A.split(H)[0])
+	for F in AU:
+		try:
+			for I in os.listdir(F):B.add(I.split(L)[0])
+		except G:pass
+	D.collect();return B
+def Ac():
+	if not U(A9):return
+	C={}
+	try:
+		with a(A9)as E:
+			while M:
+				A=E.readline()
+				if not A:break
+				B=A.split()
+				if I(B)==2 and A[0]!='#':C[B[0]]=X(B[1],16)
+	except(G,AF):pass
+	D.collect();return C
+def AB():Y("-p, --path   path to store the stubs in, defaults to '.'");sys.exit(1)
+def read_path():
+	path=B
+	if I(sys.argv)==3:
+		A=sys.argv[1].lower()
+		if A in('--path','-p'):path=sys.argv[2]
+		else:AB()
+	elif I(sys.argv)==2:AB()
+	return path
+def AC():
+	try:A=bytes('abc',encoding='utf8');B=AC.__module__;return J
+	except(AD,O):return M
+q='modulelist.parts'
+def Ad(module_name):
+	try:
+		with a(q)as B:
+			A=B.readline().split()
+			if I(A)==3 and A[0]==module_name:return X(A[1]),X(A[2])
+	except(G,AF):pass
+	return 0,0
+def Ae(module_name,item,part):
+	with a(q,i)as A:A.write('{} {} {}\n'.format(module_name,item,part))
+class Af(Stubber):
+	def __init__(A,path=B,firmware_id=B):super().__init__(path,firmware_id);A.chunked=[]
+	def create_module_stub(B,module_name,file_name=C):
+		C=file_name;A=module_name
+		if A in B.chunked:return B.create_chunked_stub(A,C or AK.format(B.path,A.replace(L,H)))
+		return super().create_module_stub(A,C)
+	def create_chunked_stub(F,module_name,file_name):
+		V='{}/{:04d}.pyi';R=file_name;L=module_name
+		try:S=__import__(L,C,C,'*')
+		except K:return J
+		P=R+'.parts';Q,N=Ad(L);E.info('Stub module: {:<25} in parts from member {} mem:{:>5}'.format(L,Q,D.mem_free()))
+		if not F.stream:p(P+H)
+		if not Q:
+			with F.open_file(V.format(P,0),t)as A:I=d(A,F.buffer_size);F.write_module_header(I,L);I.flush()
+			N=1
+		F._depth=c+1;A=I=C;O=0
+		for(W,X,T,Y)in F.iter_obj_attributes(S):
+			if O<Q:O+=1;continue
+			U=T==AL
+			if A and U:I.flush();A.close();A=C;N+=1
+			if not A:Ae(L,O,N);A=F.open_file(V.format(P,N),t);I=d(A,F.buffer_size)
+			F.write_item_stub(I,W,X,T,L,B,0)
+			if U:I.flush();A.close();A=C;N+=1;D.collect()
+			O+=1
+		if A:I.flush();A.close()
+		try:os.remove(q)
+		except G:pass
+		F.report_add(L,R);del S;D.collect();return M
 def main():
-    try:
-        import lvgl  # type: ignore
-    except Exception:
-        # print("\n\nNOTE: The `lvgl` module could not be found on this firmware\n\n")
-        return
-    # Specify firmware name & version
-    fw_id = "lvgl"
-    try:
-        fw_id = "lvgl-{0}_{1}_{2}-{3}-{4}".format(
-            lvgl.version_major(),
-            lvgl.version_minor(),
-            lvgl.version_patch(),
-            lvgl.version_info(),
-            sys.platform,
-        )
-    except Exception:
-        fw_id = "lvgl-{0}_{1}_{2}_{3}-{4}".format(8, 1, 0, "dev", sys.platform)
-    finally:
-        stubber = Stubber(firmware_id=fw_id)
-    stubber.clean()
-    # modules to stub : only lvgl specifics
-    stubber.modules = ["io", "lodepng", "rtch", "lvgl"]  # spell-checker: enable
-
-    gc.collect()
-
-    stubber.create_all_stubs()
-    stubber.report()
-
-
-if __name__ == "__main__" or is_micropython():
-    if not file_exists("no_auto_stubber.txt"):
-        try:
-            gc.threshold(4 * 1024)  # type: ignore
-            gc.enable()
-        except BaseException:
-            pass
-        main()
+	C='lvgl'
+	try:import lvgl as A
+	except g:Y('\n\nNOTE: The `lvgl` module could not be found on this firmware\n\n');return
+	B=C
+	try:B='lvgl-{0}_{1}_{2}-{3}-{4}'.format(A.version_major(),A.version_minor(),A.version_patch(),A.version_info(),sys.platform)
+	except g:B='lvgl-{0}_{1}_{2}_{3}-{4}'.format(8,1,0,'dev',sys.platform)
+	finally:stubber=Af(firmware_id=B)
+	if not U(q):stubber.clean()
+	stubber.modules=['io','lodepng','rtch',C];stubber.chunked=[C];D.collect()
+	try:stubber.create_all_stubs()
+	except AE:A6()
+if __name__=='__main__'or AC():
+	if not U('no_auto_stubber.txt'):
+		Y('createstubs.py: {}'.format(__version__))
+		try:D.threshold(4096);D.enable()
+		except BaseException:pass
+		main()
\ No newline at end of file
@@ -1,320 +1,484 @@
-z='No report file'
-y='Failed to create the report.'
-x='{}/{}'
-w='method'
-v='function'
-u='bool'
-t='str'
-s='float'
-r='int'
-q='stubber'
-p=Exception
-o=KeyError
-n=sorted
-m=NotImplementedError
-h='variant'
-g=',\n'
-f='dict'
-e='list'
-d='tuple'
-c='micropython'
-b=TypeError
-a=repr
-X='-preview'
-W=True
-V='family'
-U='board_id'
-T='board'
-S=len
-R=open
-Q=IndexError
-P=print
-O=ImportError
-N=dir
-M='port'
-L='.'
-J=AttributeError
-I=False
-H=None
-G='/'
-E='-'
-D=OSError
-C='version'
-B=''
-import gc as F,os,sys
+AG='No report file'
+AF='Failed to create the report.'
+AE='method'
+AD='function'
+AC='stubber'
+AB=KeyError
+AA=NotImplementedError
+A1='variant'
+A0=',\n'
+z='dict'
+y='list'
+x='tuple'
+w='micropython'
+v=Exception
+u=min
+t=memoryview
+o='-preview'
+n='w'
+m=set
+l=type
+k=isinstance
+j=int
+f='family'
+e='board_id'
+d='board'
+c='a'
+b=IndexError
+a=open
+Z=TypeError
+Y=str
+X=print
+V=repr
+T='\n'
+S='port'
+R=dir
+O='.'
+N=AttributeError
+M=ImportError
+L='-'
+K=True
+J=len
+I='/'
+H=False
+G=OSError
+F='version'
+E=None
+C=''
+import gc as B,os,sys
 from time import sleep
+try:from time import ticks_diff as A2,ticks_ms as p
+except M:
+	from time import time
+	def p():return j(time()*1000)
+	def A2(a,b):return a-b
 try:from ujson import dumps
 except:from json import dumps
 try:from machine import reset
-except O:pass
-try:from collections import OrderedDict as i
-except O:from ucollections import OrderedDict as i
+except M:pass
+try:from ubinascii import b2a_base64,crc32 as P
+except M:
+	try:from binascii import b2a_base64,crc32 as P
+	except M:P=E
+try:import deflate as A
+except M:
+	A=E
+	try:import zlib as g
+	except M:g=E
+try:from collections import OrderedDict
+except M:from ucollections import OrderedDict
 __version__='v1.25.0'
-A0=2
-A1=44
-A2=2
-A3=['lib','/lib','/sd/lib','/flash/lib',L]
-class K:
-	DEBUG=10;INFO=20;WARNING=30;ERROR=40;level=INFO;prnt=P
+AH=2
+AI=44
+h=2
+i=4096
+A3=512
+AJ=8
+AK='stream_stubber.txt'
+A4=384
+AL='profile_stubber.txt'
+AM='compress_stubber.txt'
+A5='modulelist.crc'
+A6=['lib','/lib','/sd/lib','/flash/lib',O]
+class Q:
+	DEBUG=10;INFO=20;WARNING=30;ERROR=40;level=INFO;prnt=X
 	@staticmethod
-	def getLogger(name):return K()
+	def getLogger(name):return Q()
 	@classmethod
 	def basicConfig(A,level):A.level=level
 	def debug(A,msg):
-		if A.level<=K.DEBUG:A.prnt('DEBUG :',msg)
+		if A.level<=Q.DEBUG:A.prnt('DEBUG :',msg)
 	def info(A,msg):
-		if A.level<=K.INFO:A.prnt('INFO  :',msg)
+		if A.level<=Q.INFO:A.prnt('INFO  :',msg)
 	def warning(A,msg):
-		if A.level<=K.WARNING:A.prnt('WARN  :',msg)
+		if A.level<=Q.WARNING:A.prnt('WARN  :',msg)
 	def error(A,msg):
-		if A.level<=K.ERROR:A.prnt('ERROR :',msg)
-A=K.getLogger(q)
-K.basicConfig(level=K.INFO)
+		if A.level<=Q.ERROR:A.prnt('ERROR :',msg)
+D=Q.getLogger(AC)
+Q.basicConfig(level=Q.INFO)
+try:t(C);A7=K
+except Z:A7=H
+class q:
+	def __init__(A,fp,size=A3):
+		A.fp=fp;A.size=size;A.buf=bytearray(size);A.mv=t(A.buf);A.n=0;A.written=0
+		try:fp.write(b'');A.text=H
+		except Z:A.text=K
+	def write(A,*F):
+		for B in F:
+			if k(B,Y):B=t(B)if A7 else B.encode()
+			C=J(B)
+			if A.text and A.n+C>A.size:
+				A.flush()
+				if C>A.size:A._write(B);continue
+			D=0
+			while D<C:
+				E=u(A.size-A.n,C-D);A.mv[A.n:A.n+E]=B if E==C else B[D:D+E];A.n+=E;D+=E
+				if A.n==A.size:A.flush()
+	def flush(A):
+		if A.n:A._write(A.mv[:A.n]);A.n=0
+	def _write(A,b):A.written+=J(b);A.fp.write(Y(b,'utf-8')if A.text else b)
+class AN:
+	def __init__(A,name,mode=n):
+		A.name=name;A.op=c if mode[0]==c else n
+		if A.op==n:A._frame(b'')
+	def __enter__(A):return A
+	def __exit__(A,*B):0
+	def close(A):0
+	def write(B,b):
+		if k(b,Y):b=b.encode()
+		for A in range(0,J(b),A4):B._frame(b[A:A+A4])
+		return J(b)
+	def _frame(A,b):X('##STUB##:{}:{}:{:08x}:{}'.format(A.op,A.name,P(b)&4294967295,b2a_base64(b).decode().strip()));A.op=c
+class AO:
+	def __init__(B,name,mode='wb'):
+		B.f=a(name,mode)
+		if A:B.z=A.DeflateIO(B.f,A.GZIP)
+		else:B.z=g.compressobj(9,g.DEFLATED,31)
+	def __enter__(A):return A
+	def __exit__(A,*B):A.close()
+	def write(B,b):
+		if A:return B.z.write(b)
+		B.f.write(B.z.compress(b));return J(b)
+	def close(B):
+		if A:B.z.close()
+		else:B.f.write(B.z.flush())
+		B.f.close()
+def AP():
+	try:
+		if A:from io import BytesIO as B;A.DeflateIO(B(),A.GZIP).write(b'#');return K
+		return hasattr(g,'compressobj')
+	except v:return H
 class Stubber:
-	def __init__(B,path=B,firmware_id=B):
+	def __init__(A,path=C,firmware_id=C):
 		C=firmware_id
 		try:
-			if os.uname().release=='1.13.0'and os.uname().version<'v1.13-103':raise m('MicroPython 1.13.0 cannot be stubbed')
-		except J:pass
-		B.info=_info();A.info('Port: {}'.format(B.info[M]));A.info('Board: {}'.format(B.info[T]));A.info('Board_ID: {}'.format(B.info[U]));F.collect()
-		if C:B._fwid=C.lower()
-		elif B.info[V]==c:B._fwid='{family}-v{version}-{port}-{board_id}'.format(**B.info).rstrip(E)
-		else:B._fwid='{family}-v{version}-{port}'.format(**B.info)
-		B._start_free=F.mem_free()
+			if os.uname().release=='1.13.0'and os.uname().version<'v1.13-103':raise AA('MicroPython 1.13.0 cannot be stubbed')
+		except N:pass
+		A.info=_info();D.info('Port: {}'.format(A.info[S]));D.info('Board: {}'.format(A.info[d]));D.info('Board_ID: {}'.format(A.info[e]));B.collect()
+		if C:A._fwid=C.lower()
+		elif A.info[f]==w:A._fwid='{family}-v{version}-{port}-{board_id}'.format(**A.info).rstrip(L)
+		else:A._fwid='{family}-v{version}-{port}'.format(**A.info)
+		A._start_free=B.mem_free()
 		if path:
-			if path.endswith(G):path=path[:-1]
+			if path.endswith(I):path=path[:-1]
 		else:path=get_root()
-		B.path='{}/stubs/{}'.format(path,B.flat_fwid).replace('//',G)
-		try:Y(path+G)
-		except D:A.error('error creating stub folder {}'.format(path))
-		B.problematic=['upip','upysh','webrepl_setup','http_client','http_client_ssl','http_server','http_server_ssl'];B.excluded=['webrepl','_webrepl','port_diag','example_sub_led.py','example_pub_button.py'];B.modules=[];B._json_name=H;B._json_first=I
-	def get_obj_attributes(L,item_instance):
-		H=item_instance;C=[];K=[]
-		for A in N(H):
-			if A.startswith('__')and not A in L.modules:continue
-			try:
-				D=getattr(H,A)
-				try:E=a(type(D)).split("'")[1]
-				except Q:E=B
-				if E in{r,s,t,u,d,e,f}:G=1
-				elif E in{v,w}:G=2
-				elif E in'class':G=3
-				else:G=4
-				C.append((A,a(D),a(type(D)),D,G))
-			except J as I:K.append("Couldn't get attribute '{}' from object '{}', Err: {}".format(A,H,I))
-			except MemoryError as I:P('MemoryError: {}'.format(I));sleep(1);reset()
-		C=n([A for A in C if not A[0].startswith('__')],key=lambda x:x[4]);F.collect();return C,K
-	def add_modules(A,modules):A.modules=n(set(A.modules)|set(modules))
-	def create_all_stubs(B):
-		A.info('Start micropython-stubber {} on {}'.format(__version__,B._fwid));B.report_start();F.collect()
-		for C in B.modules:B.create_one_stub(C)
-		B.report_end();A.info('Finally done')
+		A.path='{}/stubs/{}'.format(path,A.flat_fwid).replace('//',I);A.stream=P is not E and U(AK);A.profile=U(AL);A.compress=not A.stream and U(AM)and AP();A._profile=E;A._min_free=0;A.fingerprints=AT();W.clear()
+		if not A.stream:
+			try:r(path+I)
+			except G:D.error('error creating stub folder {}'.format(path))
+		A.problematic=['upip','upysh','webrepl_setup','http_client','http_client_ssl','http_server','http_server_ssl'];A.excluded=['webrepl','_webrepl','port_diag','example_sub_led.py','example_pub_button.py'];A.modules=[];A.available=AS();A._json_name=E;A._json_first=H;A._report=[];A.report_batch=AJ;A.buffer_size=A3;A._depth=h+1
+	def get_obj_attributes(E,item_instance):
+		A=[];C=[]
+		for(F,D,G,H)in E.iter_obj_attributes(item_instance,C):A.append((F,V(D),G,D,H))
+		B.collect();return A,C
+	def iter_obj_attributes(O,item_instance,errors=E):
+		I=errors;G=item_instance
+		for J in(1,2,3,4):
+			for B in R(G):
+				if B.startswith('__'):continue
+				try:K=getattr(G,B)
+				except N as H:
+					if J==1:
+						L="Couldn't get attribute '{}' from object '{}', Err: {}".format(B,G,H)
+						if I is E:D.error(L)
+						else:I.append(L)
+					continue
+				except MemoryError as H:X('MemoryError: {}'.format(H));sleep(1);reset()
+				M=V(l(K))
+				try:F=M.split("'")[1]
+				except b:F=C
+				if F in{'int','float','str','bool',x,y,z}:A=1
+				elif F in{AD,AE}:A=2
+				elif F in'class':A=3
+				else:A=4
+				if A==J:yield(B,K,M,A)
+	def add_modules(A,modules):A.modules=sorted(m(A.modules)|m(modules))
+	def create_all_stubs(A):
+		D.info('Start micropython-stubber {} on {}'.format(__version__,A._fwid));A.report_start();B.collect()
+		for C in A.modules:A.create_one_stub(C)
+		A.report_end();D.info('Finally done')
 	def create_one_stub(C,module_name):
-		B=module_name
-		if B in C.problematic:A.warning('Skip module: {:<25}        : Known problematic'.format(B));return I
-		if B in C.excluded:A.warning('Skip module: {:<25}        : Excluded'.format(B));return I
-		H='{}/{}.pyi'.format(C.path,B.replace(L,G));F.collect();E=I
-		try:E=C.create_module_stub(B,H)
-		except D:return I
-		F.collect();return E
-	def create_module_stub(J,module_name,file_name=H):
-		E=file_name;C=module_name
-		if E is H:K=C.replace(L,'_')+'.pyi';E=J.path+G+K
-		else:K=E.split(G)[-1]
-		if G in C:C=C.replace(G,L)
-		M=H
-		try:M=__import__(C,H,H,'*');P=F.mem_free();A.info('Stub module: {:<25} to file: {:<70} mem:{:>5}'.format(C,K,P))
-		except O:return I
-		Y(E)
-		with R(E,'w')as N:Q=str(J.info).replace('OrderedDict(',B).replace('})','}');S='"""\nModule: \'{0}\' on {1}\n"""\n# MCU: {2}\n# Stubber: {3}\n'.format(C,J._fwid,Q,__version__);N.write(S);N.write('from __future__ import annotations\nfrom typing import Any, Final, Generator\nfrom _typeshed import Incomplete\n\n');J.write_object_stub(N,M,C,B)
-		J.report_add(C,E)
-		if C not in{'os','sys','logging','gc'}:
-			try:del M
-			except(D,o):A.warning('could not del new_module')
-		F.collect();return W
-	def write_object_stub(L,fp,object_expr,obj_name,indent,in_class=0):
-		Y=' at ...>';X='{0}{1}: {3} = {2}\n';W='bound_method';V='Incomplete';O=in_class;N='Exception';M=object_expr;K=' at ';J=fp;E=indent;F.collect()
-		if M in L.problematic:A.warning('SKIPPING problematic module:{}'.format(M));return
-		Z,P=L.get_obj_attributes(M)
-		if P:A.error(P)
-		for(C,H,I,a,c)in Z:
-			if C in['classmethod','staticmethod','BaseException',N]:continue
-			if C[0].isdigit():A.warning('NameError: invalid name {}'.format(C));continue
-			if I=="<class 'type'>"and S(E)<=A2*4:
-				Q=B;R=C.endswith(N)or C.endswith('Error')or C in['KeyboardInterrupt','StopIteration','SystemExit']
-				if R:Q=N
-				D='\n{}class {}({}):\n'.format(E,C,Q)
-				if R:D+=E+'    ...\n';J.write(D);continue
-				J.write(D);L.write_object_stub(J,a,'{0}.{1}'.format(obj_name,C),E+'    ',O+1);D=E+'    def __init__(self, *argv, **kwargs) -> None:\n';D+=E+'        ...\n\n';J.write(D)
-			elif any(A in I for A in[w,v,'closure']):
-				T=V;U=B
-				if O>0:U='self, '
-				if W in I or W in H:D='{}@classmethod\n'.format(E)+'{}def {}(cls, *args, **kwargs) -> {}:\n'.format(E,C,T)
-				else:D='{}def {}({}*args, **kwargs) -> {}:\n'.format(E,C,U,T)
-				D+=E+'    ...\n\n';J.write(D)
-			elif I=="<class 'module'>":0
-			elif I.startswith("<class '"):
-				G=I[8:-2];D=B
-				if G in(t,r,s,u,'bytearray','bytes'):
-					if C.upper()==C:D='{0}{1}: Final[{3}] = {2}\n'.format(E,C,H,G)
-					else:D=X.format(E,C,H,G)
-				elif G in(f,e,d):b={f:'{}',e:'[]',d:'()'};D=X.format(E,C,b[G],G)
-				elif G in('object','set','frozenset','Pin'):D='{0}{1}: {2} ## = {4}\n'.format(E,C,G,I,H)
-				elif G=='generator':G='Generator';D='{0}def {1}(*args, **kwargs) -> Generator:  ## = {4}\n{0}    ...\n\n'.format(E,C,G,I,H)
+		A=module_name
+		if A in C.problematic:D.warning('Skip module: {:<25}        : Known problematic'.format(A));return H
+		if A in C.excluded:D.warning('Skip module: {:<25}        : Excluded'.format(A));return H
+		if not C.is_available(A):return H
+		F='{}/{}.pyi'.format(C.path,A.replace(O,I));B.collect();E=H
+		try:E=C.create_module_stub(A,F)
+		except G:return H
+		B.collect();return E
+	def is_available(A,module_name):
+		if A.available is E:return K
+		B=module_name.replace(O,I).split(I)[0];return B in A.available or B[:1]=='u'and B[1:]in A.available
+	def create_module_stub(A,module_name,file_name=E):
+		J=file_name;F=module_name
+		if J is E:P=F.replace(O,'_')+'.pyi';J=A.path+I+P
+		else:P=J.split(I)[-1]
+		if I in F:F=F.replace(I,O)
+		L=E
+		try:U=B.mem_free();Q=p();L=__import__(F,E,E,'*');Q=A2(p(),Q);R=B.mem_free();D.info('Stub module: {:<25} to file: {:<70} mem:{:>5}'.format(F,P,R))
+		except M:return H
+		A._depth=h+1;S=A.fingerprint(L)if A.fingerprints is not E else 0;T=S and A.fingerprints.get(F)==S
+		if T:D.info('Unchanged module: {}'.format(F))
+		else:
+			if not A.stream:r(J)
+			with AO(J+'.gz')if A.compress else A.open_file(J,'wb')as V:N=q(V,A.buffer_size);A.write_module_header(N,F);A._min_free=R;A.write_object_stub(N,L,F,C);N.flush()
+			if A.profile:B.collect();A._profile=Q,U,R,B.mem_free(),A._min_free,N.written
+		A.report_add(F,J,S,T)
+		if F not in{'os','sys','logging','gc'}:
+			try:del L
+			except(G,AB):D.warning('could not del new_module')
+		B.collect();return K
+	def write_module_header(A,fp,module_name):B=Y(A.info).replace('OrderedDict(',C).replace('})','}');fp.write('"""\nModule: \'',module_name,"' on ",A._fwid,'\n"""\n');fp.write('# MCU: ',B,'\n# Stubber: ',__version__,T);fp.write('from __future__ import annotations\nfrom typing import Any, Final, Generator\nfrom _typeshed import Incomplete\n\n')
+	def fingerprint(A,module):
+		if P is E:return 0
+		return A.fingerprint_members(module,P(__version__.encode()),0)&4294967295
+	def fingerprint_members(G,obj,crc,level):
+		E=level;A=crc;F=R(obj);F.sort()
+		for D in F:
+			try:C=getattr(obj,D)
+			except N:continue
+			A=P(D.encode(),A);A=P(V(l(C)).encode(),A)
+			if l(C)in(j,float,Y,bool):A=P(V(C).encode(),A)
+			elif k(C,l)and E<h and D[:2]!='__':
+				if B.mem_free()<i:B.collect()
+				if B.mem_free()>=i:A=G.fingerprint_members(C,A,E+1)
+		return A
+	def write_object_stub(A,fp,object_expr,obj_name,indent,in_class=0):
+		G=in_class;F=indent;E=obj_name;C=object_expr
+		if not k(fp,q):H=q(fp,A.buffer_size);A.write_object_stub(H,C,E,F,G);H.flush();return
+		B.collect()
+		if A.profile:A._min_free=u(A._min_free,B.mem_free())
+		if C in A.problematic:D.warning('SKIPPING problematic module:{}'.format(C));return
+		for(I,J,K,L)in A.iter_obj_attributes(C):A.write_item_stub(fp,I,J,K,E,F,G)
+	def write_item_stub(L,fp,item_name,item_instance,item_type_txt,obj_name,indent,in_class=0):
+		Z=' at ';Y='    ...\n\n';X='bound_method';R=in_class;Q=obj_name;P=' = ';O=': ';N='def ';M='Exception';K=item_instance;I=item_type_txt;F=indent;E=item_name;A=fp
+		if E in['classmethod','staticmethod','BaseException',M]:return
+		if E[0].isdigit():D.warning('NameError: invalid name {}'.format(E));return
+		if I=="<class 'type'>"and J(F)<=h*4:
+			S=C;U=E.endswith(M)or E.endswith('Error')or E in['KeyboardInterrupt','StopIteration','SystemExit']
+			if U:S=M
+			A.write(T,F,'class ',E,'(',S,'):\n')
+			if U:A.write(F,'    ...\n');return
+			if B.mem_free()<i:B.collect()
+			if B.mem_free()>=i:L.write_object_stub(A,K,'{0}.{1}'.format(Q,E),F+'    ',R+1)
+			else:D.warning('Low memory: class {}.{} is not expanded'.format(Q,E));L._depth=u(L._depth,J(F)//4);A.write(F,'    def __getattr__(self, name: str) -> Incomplete: ...\n')
+			A.write(F,'    def __init__(self, *argv, **kwargs) -> None:\n');A.write(F,'        ...\n\n')
+		elif any(A in I for A in[AE,AD,'closure']):
+			W=C
+			if R>0:W='self, '
+			if X in I or X in V(K):A.write(F,'@classmethod\n');A.write(F,N,E,'(cls, *args, **kwargs) -> Incomplete:\n')
+			else:A.write(F,N,E,'(',W,'*args, **kwargs) -> Incomplete:\n')
+			A.write(F,Y)
+		elif I=="<class 'module'>":0
+		elif I.startswith("<class '"):
+			G=I[8:-2]
+			if G in('str','int','float','bool','bytearray','bytes'):
+				H=V(K)
+				if E.upper()==E:A.write(F,E,': Final[',G,'] = ',H,T)
+				else:A.write(F,E,O,G,P,H,T)
+			elif G in(z,y,x):a={z:'{}',y:'[]',x:'()'};A.write(F,E,O,G,P,a[G],T)
+			else:
+				H=V(K)
+				if G in('object','set','frozenset','Pin'):A.write(F,E,O,G,' ## = ',H,T)
+				elif G=='generator':A.write(F,N,E,'(*args, **kwargs) -> Generator:  ## = ');A.write(H,T,F,Y)
 				else:
-					G=V
-					if K in H:H=H.split(K)[0]+Y
-					if K in H:H=H.split(K)[0]+Y
-					D='{0}{1}: {2} ## {3} = {4}\n'.format(E,C,G,I,H)
-				J.write(D)
-			else:J.write("# all other, type = '{0}'\n".format(I));J.write(E+C+' # type: Incomplete\n')
+					if Z in H:H=H.split(Z)[0]+' at ...>'
+					A.write(F,E,': Incomplete ## ',I,P);A.write(H,T)
+		else:A.write("# all other, type = '",I,"'\n");A.write(F,E,' # type: Incomplete\n')
 	@property
 	def flat_fwid(self):
 		A=self._fwid;B=' .()/\\:$'
 		for C in B:A=A.replace(C,'_')
 		return A
-	def clean(C,path=B):
-		if not path:path=C.path
-		A.info('Clean/remove files in folder: {}'.format(path))
-		try:os.stat(path);E=os.listdir(path)
-		except(D,J):return
-		for F in E:
-			B=x.format(path,F)
-			try:os.remove(B)
-			except D:
-				try:C.clean(B);os.rmdir(B)
-				except D:pass
-	def report_start(B,filename='modules.json'):
-		G='firmware';B._json_name=x.format(B.path,filename);B._json_first=W;Y(B._json_name);A.info('Report file: {}'.format(B._json_name));F.collect()
+	def clean(B,path=C):
+		if not path:path=B.path
+		D.info('Clean/remove files in folder: {}'.format(path));W.clear()
+		try:os.stat(path);C=os.listdir(path)
+		except(G,N):return
+		for E in C:
+			A='{}/{}'.format(path,E)
+			try:os.remove(A)
+			except G:
+				try:B.clean(A);os.rmdir(A)
+				except G:pass
+	def open_file(B,file_name,mode):
+		A=file_name
+		if B.stream:return AN(A,mode)
+		return a(A,mode)
+	def report_start(A,filename='modules.json'):
+		H='firmware';A._json_name='{}/{}'.format(A.path,filename);A._json_first=K;A._report=[]
+		if not A.stream:r(A._json_name)
+		D.info('Report file: {}'.format(A._json_name));B.collect()
 		try:
-			with R(B._json_name,'w')as E:E.write('{');E.write(dumps({G:B.info})[1:-1]);E.write(g);E.write(dumps({q:{C:__version__},'stubtype':G})[1:-1]);E.write(g);E.write('"modules" :[\n')
-		except D as I:A.error(y);B._json_name=H;raise I
-	def report_add(B,module_name,stub_file):
-		if not B._json_name:raise p(z)
+			with A.open_file(A._json_name,n)as C:C.write('{');C.write(dumps({H:A.info})[1:-1]);C.write(A0);C.write(dumps({AC:{F:__version__},'stubtype':H})[1:-1]);C.write(A0);C.write('"modules" :[\n')
+		except G as I:D.error(AF);A._json_name=E;raise I
+	def report_add(A,module_name,stub_file,crc=0,unchanged=H):
+		if not A._json_name:raise v(AG)
+		B='{{"module": "{}", "file": "{}", "depth": {}'.format(module_name,stub_file.replace('\\',I),A._depth)
+		if A._profile:C='import_ms','mem_before','mem_import','mem_after','mem_min','size';B+=', "profile": {'+', '.join('"{}": {}'.format(A,B)for(A,B)in zip(C,A._profile))+'}';A._profile=E
+		if crc:B+=', "crc": "{:08x}"'.format(crc)
+		if unchanged:B+=', "unchanged": true'
+		B+='}';A._report.append(B)
+		if A.report_batch and J(A._report)>=A.report_batch:A.report_flush()
+	def report_flush(A):
+		if not A._report:return
 		try:
-			with R(B._json_name,'a')as C:
-				if not B._json_first:C.write(g)
-				else:B._json_first=I
-				E='{{"module": "{}", "file": "{}"}}'.format(module_name,stub_file.replace('\\',G));C.write(E)
-		except D:A.error(y)
-	def report_end(B):
-		if not B._json_name:raise p(z)
-		with R(B._json_name,'a')as C:C.write('\n]}')
-		A.info('Path: {}'.format(B.path))
-def Y(path):
-	B=E=0
+			with A.open_file(A._json_name,c)as B:A._report_write(B)
+		except G:D.error(AF)
+	def _report_write(A,f):
+		for B in A._report:
+			if not A._json_first:f.write(A0)
+			else:A._json_first=H
+			f.write(B)
+		A._report=[]
+	def report_end(A):
+		if not A._json_name:raise v(AG)
+		with A.open_file(A._json_name,c)as B:A._report_write(B);B.write('\n]}')
+		D.info('Path: {}'.format(A.path))
+W=m()
+def r(path):
+	if path[:path.rfind(I)]in W:return
+	B=C=0
 	while B!=-1:
-		B=path.find(G,E)
+		B=path.find(I,C)
 		if B!=-1:
-			C=path[0]if B==0 else path[:B]
-			try:I=os.stat(C)
-			except D as F:
-				if F.args[0]in[A0,A1]:
-					try:A.debug('Create folder {}'.format(C));os.mkdir(C)
-					except D as H:A.error('failed to create folder {}'.format(C));raise H
-		E=B+1
-def Z(s):
-	C=' on '
-	if not s:return B
-	s=s.split(C,1)[0]if C in s else s
+			A=path[0]if B==0 else path[:B]
+			if A not in W:
+				try:H=os.stat(A);W.add(A)
+				except G as E:
+					if E.args[0]in[AH,AI]:
+						try:D.debug('Create folder {}'.format(A));os.mkdir(A);W.add(A)
+						except G as F:D.error('failed to create folder {}'.format(A));raise F
+		C=B+1
+def s(s):
+	B=' on '
+	if not s:return C
+	s=s.split(B,1)[0]if B in s else s
 	if s.startswith('v'):
-		if not E in s:return B
-		A=s.split(E)[1];return A
-	if not X in s:return B
-	A=s.split(X)[1].split(L)[1];return A
+		if not L in s:return C
+		A=s.split(L)[1];return A
+	if not o in s:return C
+	A=s.split(o)[1].split(O)[1];return A
 def _info():
-	f='ev3-pybricks';e='pycom';d='pycopy';a='unix';Y='win32';W='arch';S='cpu';R='ver';F='mpy';D='build'
-	try:L=sys.implementation[0]
-	except b:L=sys.implementation.name
-	A=i({V:L,C:B,D:B,R:B,M:sys.platform,T:'UNKNOWN',U:B,h:B,S:B,F:B,W:B})
-	if A[M].startswith('pyb'):A[M]='stm32'
-	elif A[M]==Y:A[M]='windows'
-	elif A[M]=='linux':A[M]=a
-	try:A[C]=A4(sys.implementation.version)
-	except J:pass
+	X='ev3-pybricks';W='pycom';V='pycopy';U='unix';T='win32';Q='arch';P='cpu';O='ver';D='mpy';B='build'
+	try:J=sys.implementation[0]
+	except Z:J=sys.implementation.name
+	A=OrderedDict({f:J,F:C,B:C,O:C,S:sys.platform,d:'UNKNOWN',e:C,A1:C,P:C,D:C,Q:C})
+	if A[S].startswith('pyb'):A[S]='stm32'
+	elif A[S]==T:A[S]='windows'
+	elif A[S]=='linux':A[S]=U
+	try:A[F]=AQ(sys.implementation.version)
+	except N:pass
 	try:
-		P=sys.implementation._machine if'_machine'in N(sys.implementation)else os.uname().machine;A[T]=P.strip();G=sys.implementation._build if'_build'in N(sys.implementation)else B
-		if G:A[T]=G.split(E)[0];A[h]=G.split(E)[1]if E in G else B
-		A[U]=G;A[S]=P.split('with')[-1].strip();A[F]=sys.implementation._mpy if'_mpy'in N(sys.implementation)else sys.implementation.mpy if F in N(sys.implementation)else B
-	except(J,Q):pass
-	if not A[U]:A5(A)
+		K=sys.implementation._machine if'_machine'in R(sys.implementation)else os.uname().machine;A[d]=K.strip();G=sys.implementation._build if'_build'in R(sys.implementation)else C
+		if G:A[d]=G.split(L)[0];A[A1]=G.split(L)[1]if L in G else C
+		A[e]=G;A[P]=K.split('with')[-1].strip();A[D]=sys.implementation._mpy if'_mpy'in R(sys.implementation)else sys.implementation.mpy if D in R(sys.implementation)else C
+	except(N,b):pass
+	if not A[e]:AR(A)
 	try:
-		if'uname'in N(os):
-			A[D]=Z(os.uname()[3])
-			if not A[D]:A[D]=Z(os.uname()[2])
-		elif C in N(sys):A[D]=Z(sys.version)
-	except(J,Q,b):pass
-	if A[C]==B and sys.platform not in(a,Y):
-		try:g=os.uname();A[C]=g.release
-		except(Q,J,b):pass
-	for(j,k,l)in[(d,d,'const'),(e,e,'FAT'),(f,'pybricks.hubs','EV3Brick')]:
-		try:m=__import__(k,H,H,l);A[V]=j;del m;break
-		except(O,o):pass
-	if A[V]==f:A['release']='2.0.0'
-	if A[V]==c:
-		A[C]
-		if A[C]and A[C].endswith('.0')and A[C]>='1.10.0'and A[C]<='1.19.9':A[C]=A[C][:-2]
-	if F in A and A[F]:
-		I=int(A[F])
-		try:K=[H,'x86','x64','armv6','armv6m','armv7m','armv7em','armv7emsp','armv7emdp','xtensa','xtensawin','rv32imc'][I>>10]
-		except Q:K='unknown'
-		if K:A[W]=K
-		A[F]='v{}.{}'.format(I&255,I>>8&3)
-	if A[D]and not A[C].endswith(X):A[C]=A[C]+X
-	A[R]=f"{A[C]}-{A[D]}"if A[D]else f"{A[C]}";return A
-def A4(version):
-	A=version;B=L.join([str(A)for A in A[:3]])
-	if S(A)>3 and A[3]:B+=E+A[3]
+		if'uname'in R(os):
+			A[B]=s(os.uname()[3])
+			if not A[B]:A[B]=s(os.uname()[2])
+		elif F in R(sys):A[B]=s(sys.version)
+	except(N,b,Z):pass
+	if A[F]==C and sys.platform not in(U,T):
+		try:Y=os.uname();A[F]=Y.release
+		except(b,N,Z):pass
+	for(a,c,g)in[(V,V,'const'),(W,W,'FAT'),(X,'pybricks.hubs','EV3Brick')]:
+		try:h=__import__(c,E,E,g);A[f]=a;del h;break
+		except(M,AB):pass
+	if A[f]==X:A['release']='2.0.0'
+	if A[f]==w:
+		A[F]
+		if A[F]and A[F].endswith('.0')and A[F]>='1.10.0'and A[F]<='1.19.9':A[F]=A[F][:-2]
+	if D in A and A[D]:
+		H=j(A[D])
+		try:I=[E,'x86','x64','armv6','armv6m','armv7m','armv7em','armv7emsp','armv7emdp','xtensa','xtensawin','rv32imc'][H>>10]
+		except b:I='unknown'
+		if I:A[Q]=I
+		A[D]='v{}.{}'.format(H&255,H>>8&3)
+	if A[B]and not A[F].endswith(o):A[F]=A[F]+o
+	A[O]=f"{A[F]}-{A[B]}"if A[B]else f"{A[F]}";return A
+def AQ(version):
+	A=version;B=O.join([Y(A)for A in A[:3]])
+	if J(A)>3 and A[3]:B+=L+A[3]
 	return B
-def A5(info):
-	D=info
-	try:from boardname import BOARD_ID as C;A.info('Found BOARD_ID: {}'.format(C))
-	except O:A.warning('BOARD_ID not found');C=B
-	D[U]=C;D[T]=C.split(E)[0]if E in C else C;D[h]==C.split(E)[1]if E in C else B
+def AR(info):
+	B=info
+	try:from boardname import BOARD_ID as A;D.info('Found BOARD_ID: {}'.format(A))
+	except M:D.warning('BOARD_ID not found');A=C
+	B[e]=A;B[d]=A.split(L)[0]if L in A else A;B[A1]==A.split(L)[1]if L in A else C
 def get_root():
 	try:A=os.getcwd()
-	except(D,J):A=L
+	except(G,N):A=O
 	B=A
-	for B in['/remote','/sd','/flash',G,A,L]:
+	for B in['/remote','/sd','/flash',I,A,O]:
 		try:C=os.stat(B);break
-		except D:continue
+		except G:continue
 	return B
-def j(filename):
+def U(filename):
+	try:
+		if os.stat(filename)[0]>>14:return K
+		return H
+	except G:return H
+def AS():
+	D='modulelist.avail'
+	if not U(D):return
+	C=m()
+	with a(D)as E:
+		while K:
+			A=E.readline()
+			if not A:break
+			A=A.strip()
+			if A and A[0]!='#':C.add(A.split(I)[0])
+	for F in A6:
+		try:
+			for H in os.listdir(F):C.add(H.split(O)[0])
+		except G:pass
+	B.collect();return C
+def AT():
+	if not U(A5):return
+	D={}
 	try:
-		if os.stat(filename)[0]>>14:return W
-		return I
-	except D:return I
-def k():P("-p, --path   path to store the stubs in, defaults to '.'");sys.exit(1)
+		with a(A5)as E:
+			while K:
+				A=E.readline()
+				if not A:break
+				C=A.split()
+				if J(C)==2 and A[0]!='#':D[C[0]]=j(C[1],16)
+	except(G,ValueError):pass
+	B.collect();return D
+def A8():X("-p, --path   path to store the stubs in, defaults to '.'");sys.exit(1)
 def read_path():
-	path=B
-	if S(sys.argv)==3:
+	path=C
+	if J(sys.argv)==3:
 		A=sys.argv[1].lower()
 		if A in('--path','-p'):path=sys.argv[2]
-		else:k()
-	elif S(sys.argv)==2:k()
+		else:A8()
+	elif J(sys.argv)==2:A8()
 	return path
-def l():
-	try:A=bytes('abc',encoding='utf8');B=l.__module__;return I
-	except(m,J):return W
+def A9():
+	try:A=bytes('abc',encoding='utf8');B=A9.__module__;return H
+	except(AA,N):return K
 def main():
 	stubber=Stubber(path=read_path());stubber.clean()
 	def A(stubber):
-		F.collect();stubber.modules=[]
-		for C in A3:
-			B=C+'/modulelist.txt'
-			if not j(B):continue
-			with R(B)as D:
-				while W:
-					A=D.readline().strip()
+		B.collect();stubber.modules=[]
+		for D in A6:
+			C=D+'/modulelist.txt'
+			if not U(C):continue
+			with a(C)as E:
+				while K:
+					A=E.readline().strip()
 					if not A:break
-					if S(A)>0 and A[0]!='#':stubber.modules.append(A)
-				F.collect();P('BREAK');break
-		if not stubber.modules:stubber.modules=[c]
-		F.collect()
-	stubber.modules=[];A(stubber);F.collect();stubber.create_all_stubs()
-if __name__=='__main__'or l():
-	if not j('no_auto_stubber.txt'):
-		P(f"createstubs.py: {__version__}")
-		try:F.threshold(4096);F.enable()
+					if J(A)>0 and A[0]!='#':stubber.modules.append(A)
+				B.collect();X('BREAK');break
+		if not stubber.modules:stubber.modules=[w]
+		B.collect()
+	stubber.modules=[];A(stubber);B.collect();stubber.create_all_stubs()
+if __name__=='__main__'or A9():
+	if not U('no_auto_stubber.txt'):
+		X(f"createstubs.py: {__version__}")
+		try:B.threshold(4096);B.enable()
 		except BaseException:pass
 		main()
\ No newline at end of file
@@ -1,309 +1,502 @@
-A2='windows'
-A1='No report file'
-A0='Failed to create the report.'
-z='{}/{}'
-y='logging'
-x='sys'
-w='method'
-v='function'
-u='bool'
-t='str'
-s='float'
-r='int'
-q='stubber'
-p=Exception
-o=KeyError
-n=sorted
-m=NotImplementedError
-i='unix'
-h='variant'
-g=',\n'
-f='dict'
-e='list'
-d='tuple'
-c='micropython'
+AK='windows'
+AJ='No report file'
+AI='Failed to create the report.'
+AH='logging'
+AG='method'
+AF='function'
+AE='stubber'
+AD=NotImplementedError
+A5='unix'
+A4='variant'
+A3=',\n'
+A2='dict'
+A1='list'
+A0='tuple'
+z='micropython'
+y=Exception
+x=min
+w=memoryview
+v=KeyError
+p='-preview'
+o='w'
+n=set
+m=type
+l=open
+k=int
+g='family'
+f='board_id'
+e='board'
+d='a'
+c=IndexError
 b=TypeError
-a=repr
-X='-preview'
-W=True
-V=len
-U=open
-T=print
-S='family'
-R='board_id'
-Q='board'
-P=IndexError
-O=ImportError
-N=dir
-M='port'
-L='.'
-J=AttributeError
+a=isinstance
+Z=print
+X=str
+U=repr
+T='\n'
+S='port'
+R=dir
+O=True
+N='.'
+M=AttributeError
+L='-'
+K=ImportError
+J='/'
 I=False
-H=None
-G='/'
-E='-'
-D=OSError
-C='version'
+H=OSError
+G=len
+F='version'
+E=None
 B=''
-import gc as F,os,sys
+import gc as C,os,sys
 from time import sleep
+try:from time import ticks_diff as A6,ticks_ms as q
+except K:
+	from time import time
+	def q():return k(time()*1000)
+	def A6(a,b):return a-b
 try:from ujson import dumps
 except:from json import dumps
 try:from machine import reset
-except O:pass
-try:from collections import OrderedDict as j
-except O:from ucollections import OrderedDict as j
+except K:pass
+try:from ubinascii import b2a_base64,crc32 as P
+except K:
+	try:from binascii import b2a_base64,crc32 as P
+	except K:P=E
+try:import deflate as A
+except K:
+	A=E
+	try:import zlib as h
+	except K:h=E
+try:from collections import OrderedDict as Y
+except K:
+	try:from ucollections import OrderedDict as Y
+	except K:Y=E
 __version__='v1.25.0'
-A3=2
-A4=44
-A5=2
-A9=['lib','/lib','/sd/lib','/flash/lib',L]
-class K:
-	DEBUG=10;INFO=20;WARNING=30;ERROR=40;level=INFO;prnt=T
+AL=2
+AM=44
+i=2
+j=4096
+A7=512
+AN=8
+AO='stream_stubber.txt'
+A8=384
+AP='profile_stubber.txt'
+AQ='compress_stubber.txt'
+A9='modulelist.crc'
+AR=['lib','/lib','/sd/lib','/flash/lib',N]
+class Q:
+	DEBUG=10;INFO=20;WARNING=30;ERROR=40;level=INFO;prnt=Z
 	@staticmethod
-	def getLogger(name):return K()
+	def getLogger(name):return Q()
 	@classmethod
 	def basicConfig(A,level):A.level=level
 	def debug(A,msg):
-		if A.level<=K.DEBUG:A.prnt('DEBUG :',msg)
+		if A.level<=Q.DEBUG:A.prnt('DEBUG :',msg)
 	def info(A,msg):
-		if A.level<=K.INFO:A.prnt('INFO  :',msg)
+		if A.level<=Q.INFO:A.prnt('INFO  :',msg)
 	def warning(A,msg):
-		if A.level<=K.WARNING:A.prnt('WARN  :',msg)
+		if A.level<=Q.WARNING:A.prnt('WARN  :',msg)
 	def error(A,msg):
-		if A.level<=K.ERROR:A.prnt('ERROR :',msg)
-A=K.getLogger(q)
-K.basicConfig(level=K.INFO)
+		if A.level<=Q.ERROR:A.prnt('ERROR :',msg)
+D=Q.getLogger(AE)
+Q.basicConfig(level=Q.INFO)
+r=object()
+class AS(dict):
+	def __init__(A,*B,**C):super().__init__();A._keys=[];A._pos={};A.update(*B,**C)
+	def __setitem__(A,key,value):
+		B=key
+		if B not in A._pos:A._pos[B]=G(A._keys);A._keys.append(B)
+		super().__setitem__(B,value)
+	def __delitem__(A,key):
+		super().__delitem__(key);A._keys[A._pos.pop(key)]=r
+		if G(A._pos)*2<G(A._keys):A._keys=[A for A in A._keys if A is not r];A._pos={B:A for(A,B)in enumerate(A._keys)}
+	def __iter__(B):
+		for A in B._keys:
+			if A is not r:yield A
+	def keys(A):return iter(A)
+	def items(A):
+		for B in A:yield(B,A[B])
+	def values(A):
+		for B in A:yield A[B]
+	def update(B,*C,**D):
+		for A in C+(D,):
+			for(E,F)in A.items()if a(A,dict)else A:B[E]=F
+	def pop(B,key,*C):
+		A=key
+		if A in B._pos:D=B[A];del B[A];return D
+		if C:return C[0]
+		raise v(A)
+	def clear(A):super().clear();A._keys=[];A._pos={}
+if Y is E:Y=AS
+try:w(B);AA=O
+except b:AA=I
+class s:
+	def __init__(A,fp,size=A7):
+		A.fp=fp;A.size=size;A.buf=bytearray(size);A.mv=w(A.buf);A.n=0;A.written=0
+		try:fp.write(b'');A.text=I
+		except b:A.text=O
+	def write(A,*F):
+		for B in F:
+			if a(B,X):B=w(B)if AA else B.encode()
+			C=G(B)
+			if A.text and A.n+C>A.size:
+				A.flush()
+				if C>A.size:A._write(B);continue
+			D=0
+			while D<C:
+				E=x(A.size-A.n,C-D);A.mv[A.n:A.n+E]=B if E==C else B[D:D+E];A.n+=E;D+=E
+				if A.n==A.size:A.flush()
+	def flush(A):
+		if A.n:A._write(A.mv[:A.n]);A.n=0
+	def _write(A,b):A.written+=G(b);A.fp.write(X(b,'utf-8')if A.text else b)
+class AT:
+	def __init__(A,name,mode=o):
+		A.name=name;A.op=d if mode[0]==d else o
+		if A.op==o:A._frame(b'')
+	def __enter__(A):return A
+	def __exit__(A,*B):0
+	def close(A):0
+	def write(B,b):
+		if a(b,X):b=b.encode()
+		for A in range(0,G(b),A8):B._frame(b[A:A+A8])
+		return G(b)
+	def _frame(A,b):Z('##STUB##:{}:{}:{:08x}:{}'.format(A.op,A.name,P(b)&4294967295,b2a_base64(b).decode().strip()));A.op=d
+class AU:
+	def __init__(B,name,mode='wb'):
+		B.f=l(name,mode)
+		if A:B.z=A.DeflateIO(B.f,A.GZIP)
+		else:B.z=h.compressobj(9,h.DEFLATED,31)
+	def __enter__(A):return A
+	def __exit__(A,*B):A.close()
+	def write(B,b):
+		if A:return B.z.write(b)
+		B.f.write(B.z.compress(b));return G(b)
+	def close(B):
+		if A:B.z.close()
+		else:B.f.write(B.z.flush())
+		B.f.close()
+def AV():
+	try:
+		if A:from io import BytesIO as B;A.DeflateIO(B(),A.GZIP).write(b'#');return O
+		return hasattr(h,'compressobj')
+	except y:return I
 class Stubber:
-	def __init__(B,path=B,firmware_id=B):
-		C=firmware_id
+	def __init__(A,path=B,firmware_id=B):
+		B=firmware_id
 		try:
-			if os.uname().release=='1.13.0'and os.uname().version<'v1.13-103':raise m('MicroPython 1.13.0 cannot be stubbed')
-		except J:pass
-		B.info=_info();A.info('Port: {}'.format(B.info[M]));A.info('Board: {}'.format(B.info[Q]));A.info('Board_ID: {}'.format(B.info[R]));F.collect()
-		if C:B._fwid=C.lower()
-		elif B.info[S]==c:B._fwid='{family}-v{version}-{port}-{board_id}'.format(**B.info).rstrip(E)
-		else:B._fwid='{family}-v{version}-{port}'.format(**B.info)
-		B._start_free=F.mem_free()
+			if os.uname().release=='1.13.0'and os.uname().version<'v1.13-103':raise AD('MicroPython 1.13.0 cannot be stubbed')
+		except M:pass
+		A.info=_info();D.info('Port: {}'.format(A.info[S]));D.info('Board: {}'.format(A.info[e]));D.info('Board_ID: {}'.format(A.info[f]));C.collect()
+		if B:A._fwid=B.lower()
+		elif A.info[g]==z:A._fwid='{family}-v{version}-{port}-{board_id}'.format(**A.info).rstrip(L)
+		else:A._fwid='{family}-v{version}-{port}'.format(**A.info)
+		A._start_free=C.mem_free()
 		if path:
-			if path.endswith(G):path=path[:-1]
+			if path.endswith(J):path=path[:-1]
 		else:path=get_root()
-		B.path='{}/stubs/{}'.format(path,B.flat_fwid).replace('//',G)
-		try:Y(path+G)
-		except D:A.error('error creating stub folder {}'.format(path))
-		B.problematic=['upip','upysh','webrepl_setup','http_client','http_client_ssl','http_server','http_server_ssl'];B.excluded=['webrepl','_webrepl','port_diag','example_sub_led.py','example_pub_button.py'];B.modules=[];B._json_name=H;B._json_first=I
-	def get_obj_attributes(L,item_instance):
-		H=item_instance;C=[];K=[]
-		for A in N(H):
-			if A.startswith('__')and not A in L.modules:continue
-			try:
-				D=getattr(H,A)
-				try:E=a(type(D)).split("'")[1]
-				except P:E=B
-				if E in{r,s,t,u,d,e,f}:G=1
-				elif E in{v,w}:G=2
-				elif E in'class':G=3
-				else:G=4
-				C.append((A,a(D),a(type(D)),D,G))
-			except J as I:K.append("Couldn't get attribute '{}' from object '{}', Err: {}".format(A,H,I))
-			except MemoryError as I:T('MemoryError: {}'.format(I));sleep(1);reset()
-		C=n([A for A in C if not A[0].startswith('__')],key=lambda x:x[4]);F.collect();return C,K
-	def add_modules(A,modules):A.modules=n(set(A.modules)|set(modules))
-	def create_all_stubs(B):
-		A.info('Start micropython-stubber {} on {}'.format(__version__,B._fwid));B.report_start();F.collect()
-		for C in B.modules:B.create_one_stub(C)
-		B.report_end();A.info('Finally done')
-	def create_one_stub(C,module_name):
-		B=module_name
-		if B in C.problematic:A.warning('Skip module: {:<25}        : Known problematic'.format(B));return I
-		if B in C.excluded:A.warning('Skip module: {:<25}        : Excluded'.format(B));return I
-		H='{}/{}.pyi'.format(C.path,B.replace(L,G));F.collect();E=I
-		try:E=C.create_module_stub(B,H)
-		except D:return I
-		F.collect();return E
-	def create_module_stub(J,module_name,file_name=H):
-		E=file_name;C=module_name
-		if E is H:K=C.replace(L,'_')+'.pyi';E=J.path+G+K
-		else:K=E.split(G)[-1]
-		if G in C:C=C.replace(G,L)
-		M=H
-		try:M=__import__(C,H,H,'*');P=F.mem_free();A.info('Stub module: {:<25} to file: {:<70} mem:{:>5}'.format(C,K,P))
-		except O:return I
-		Y(E)
-		with U(E,'w')as N:Q=str(J.info).replace('OrderedDict(',B).replace('})','}');R='"""\nModule: \'{0}\' on {1}\n"""\n# MCU: {2}\n# Stubber: {3}\n'.format(C,J._fwid,Q,__version__);N.write(R);N.write('from __future__ import annotations\nfrom typing import Any, Final, Generator\nfrom _typeshed import Incomplete\n\n');J.write_object_stub(N,M,C,B)
-		J.report_add(C,E)
-		if C not in{'os',x,y,'gc'}:
-			try:del M
-			except(D,o):A.warning('could not del new_module')
-		F.collect();return W
-	def write_object_stub(L,fp,object_expr,obj_name,indent,in_class=0):
-		Y=' at ...>';X='{0}{1}: {3} = {2}\n';W='bound_method';U='Incomplete';O=in_class;N='Exception';M=object_expr;K=' at ';J=fp;E=indent;F.collect()
-		if M in L.problematic:A.warning('SKIPPING problematic module:{}'.format(M));return
-		Z,P=L.get_obj_attributes(M)
-		if P:A.error(P)
-		for(C,H,I,a,c)in Z:
-			if C in['classmethod','staticmethod','BaseException',N]:continue
-			if C[0].isdigit():A.warning('NameError: invalid name {}'.format(C));continue
-			if I=="<class 'type'>"and V(E)<=A5*4:
-				Q=B;R=C.endswith(N)or C.endswith('Error')or C in['KeyboardInterrupt','StopIteration','SystemExit']
-				if R:Q=N
-				D='\n{}class {}({}):\n'.format(E,C,Q)
-				if R:D+=E+'    ...\n';J.write(D);continue
-				J.write(D);L.write_object_stub(J,a,'{0}.{1}'.format(obj_name,C),E+'    ',O+1);D=E+'    def __init__(self, *argv, **kwargs) -> None:\n';D+=E+'        ...\n\n';J.write(D)
-			elif any(A in I for A in[w,v,'closure']):
-				S=U;T=B
-				if O>0:T='self, '
-				if W in I or W in H:D='{}@classmethod\n'.format(E)+'{}def {}(cls, *args, **kwargs) -> {}:\n'.format(E,C,S)
-				else:D='{}def {}({}*args, **kwargs) -> {}:\n'.format(E,C,T,S)
-				D+=E+'    ...\n\n';J.write(D)
-			elif I=="<class 'module'>":0
-			elif I.startswith("<class '"):
-				G=I[8:-2];D=B
-				if G in(t,r,s,u,'bytearray','bytes'):
-					if C.upper()==C:D='{0}{1}: Final[{3}] = {2}\n'.format(E,C,H,G)
-					else:D=X.format(E,C,H,G)
-				elif G in(f,e,d):b={f:'{}',e:'[]',d:'()'};D=X.format(E,C,b[G],G)
-				elif G in('object','set','frozenset','Pin'):D='{0}{1}: {2} ## = {4}\n'.format(E,C,G,I,H)
-				elif G=='generator':G='Generator';D='{0}def {1}(*args, **kwargs) -> Generator:  ## = {4}\n{0}    ...\n\n'.format(E,C,G,I,H)
+		A.path='{}/stubs/{}'.format(path,A.flat_fwid).replace('//',J);A.stream=P is not E and W(AO);A.profile=W(AP);A.compress=not A.stream and W(AQ)and AV();A._profile=E;A._min_free=0;A.fingerprints=AZ();V.clear()
+		if not A.stream:
+			try:t(path+J)
+			except H:D.error('error creating stub folder {}'.format(path))
+		A.problematic=['upip','upysh','webrepl_setup','http_client','http_client_ssl','http_server','http_server_ssl'];A.excluded=['webrepl','_webrepl','port_diag','example_sub_led.py','example_pub_button.py'];A.modules=[];A.available=AY();A._json_name=E;A._json_first=I;A._report=[];A.report_batch=AN;A.buffer_size=A7;A._depth=i+1
+	def get_obj_attributes(E,item_instance):
+		A=[];B=[]
+		for(F,D,G,H)in E.iter_obj_attributes(item_instance,B):A.append((F,U(D),G,D,H))
+		C.collect();return A,B
+	def iter_obj_attributes(O,item_instance,errors=E):
+		I=errors;G=item_instance
+		for J in(1,2,3,4):
+			for C in R(G):
+				if C.startswith('__'):continue
+				try:K=getattr(G,C)
+				except M as H:
+					if J==1:
+						L="Couldn't get attribute '{}' from object '{}', Err: {}".format(C,G,H)
+						if I is E:D.error(L)
+						else:I.append(L)
+					continue
+				except MemoryError as H:Z('MemoryError: {}'.format(H));sleep(1);reset()
+				N=U(m(K))
+				try:F=N.split("'")[1]
+				except c:F=B
+				if F in{'int','float','str','bool',A0,A1,A2}:A=1
+				elif F in{AF,AG}:A=2
+				elif F in'class':A=3
+				else:A=4
+				if A==J:yield(C,K,N,A)
+	def add_modules(A,modules):A.modules=sorted(n(A.modules)|n(modules))
+	def create_all_stubs(A):
+		D.info('Start micropython-stubber {} on {}'.format(__version__,A._fwid));A.report_start();C.collect()
+		for B in A.modules:A.create_one_stub(B)
+		A.report_end();D.info('Finally done')
+	def create_one_stub(B,module_name):
+		A=module_name
+		if A in B.problematic:D.warning('Skip module: {:<25}        : Known problematic'.format(A));return I
+		if A in B.excluded:D.warning('Skip module: {:<25}        : Excluded'.format(A));return I
+		if not B.is_available(A):return I
+		F='{}/{}.pyi'.format(B.path,A.replace(N,J));C.collect();E=I
+		try:E=B.create_module_stub(A,F)
+		except H:return I
+		C.collect();return E
+	def is_available(A,module_name):
+		if A.available is E:return O
+		B=module_name.replace(N,J).split(J)[0];return B in A.available or B[:1]=='u'and B[1:]in A.available
+	def create_module_stub(A,module_name,file_name=E):
+		G=file_name;F=module_name
+		if G is E:P=F.replace(N,'_')+'.pyi';G=A.path+J+P
+		else:P=G.split(J)[-1]
+		if J in F:F=F.replace(J,N)
+		L=E
+		try:U=C.mem_free();Q=q();L=__import__(F,E,E,'*');Q=A6(q(),Q);R=C.mem_free();D.info('Stub module: {:<25} to file: {:<70} mem:{:>5}'.format(F,P,R))
+		except K:return I
+		A._depth=i+1;S=A.fingerprint(L)if A.fingerprints is not E else 0;T=S and A.fingerprints.get(F)==S
+		if T:D.info('Unchanged module: {}'.format(F))
+		else:
+			if not A.stream:t(G)
+			with AU(G+'.gz')if A.compress else A.open_file(G,'wb')as V:M=s(V,A.buffer_size);A.write_module_header(M,F);A._min_free=R;A.write_object_stub(M,L,F,B);M.flush()
+			if A.profile:C.collect();A._profile=Q,U,R,C.mem_free(),A._min_free,M.written
+		A.report_add(F,G,S,T)
+		if F not in{'os','sys',AH,'gc'}:
+			try:del L
+			except(H,v):D.warning('could not del new_module')
+		C.collect();return O
+	def write_module_header(A,fp,module_name):C=X(A.info).replace('OrderedDict(',B).replace('})','}');fp.write('"""\nModule: \'',module_name,"' on ",A._fwid,'\n"""\n');fp.write('# MCU: ',C,'\n# Stubber: ',__version__,T);fp.write('from __future__ import annotations\nfrom typing import Any, Final, Generator\nfrom _typeshed import Incomplete\n\n')
+	def fingerprint(A,module):
+		if P is E:return 0
+		return A.fingerprint_members(module,P(__version__.encode()),0)&4294967295
+	def fingerprint_members(G,obj,crc,level):
+		E=level;A=crc;F=R(obj);F.sort()
+		for D in F:
+			try:B=getattr(obj,D)
+			except M:continue
+			A=P(D.encode(),A);A=P(U(m(B)).encode(),A)
+			if m(B)in(k,float,X,bool):A=P(U(B).encode(),A)
+			elif a(B,m)and E<i and D[:2]!='__':
+				if C.mem_free()<j:C.collect()
+				if C.mem_free()>=j:A=G.fingerprint_members(B,A,E+1)
+		return A
+	def write_object_stub(A,fp,object_expr,obj_name,indent,in_class=0):
+		G=in_class;F=indent;E=obj_name;B=object_expr
+		if not a(fp,s):H=s(fp,A.buffer_size);A.write_object_stub(H,B,E,F,G);H.flush();return
+		C.collect()
+		if A.profile:A._min_free=x(A._min_free,C.mem_free())
+		if B in A.problematic:D.warning('SKIPPING problematic module:{}'.format(B));return
+		for(I,J,K,L)in A.iter_obj_attributes(B):A.write_item_stub(fp,I,J,K,E,F,G)
+	def write_item_stub(L,fp,item_name,item_instance,item_type_txt,obj_name,indent,in_class=0):
+		Z=' at ';Y='    ...\n\n';X='bound_method';R=in_class;Q=obj_name;P=' = ';O=': ';N='def ';M='Exception';K=item_instance;J=item_type_txt;F=indent;E=item_name;A=fp
+		if E in['classmethod','staticmethod','BaseException',M]:return
+		if E[0].isdigit():D.warning('NameError: invalid name {}'.format(E));return
+		if J=="<class 'type'>"and G(F)<=i*4:
+			S=B;V=E.endswith(M)or E.endswith('Error')or E in['KeyboardInterrupt','StopIteration','SystemExit']
+			if V:S=M
+			A.write(T,F,'class ',E,'(',S,'):\n')
+			if V:A.write(F,'    ...\n');return
+			if C.mem_free()<j:C.collect()
+			if C.mem_free()>=j:L.write_object_stub(A,K,'{0}.{1}'.format(Q,E),F+'    ',R+1)
+			else:D.warning('Low memory: class {}.{} is not expanded'.format(Q,E));L._depth=x(L._depth,G(F)//4);A.write(F,'    def __getattr__(self, name: str) -> Incomplete: ...\n')
+			A.write(F,'    def __init__(self, *argv, **kwargs) -> None:\n');A.write(F,'        ...\n\n')
+		elif any(A in J for A in[AG,AF,'closure']):
+			W=B
+			if R>0:W='self, '
+			if X in J or X in U(K):A.write(F,'@classmethod\n');A.write(F,N,E,'(cls, *args, **kwargs) -> Incomplete:\n')
+			else:A.write(F,N,E,'(',W,'*args, **kwargs) -> Incomplete:\n')
+			A.write(F,Y)
+		elif J=="<class 'module'>":0
+		elif J.startswith("<class '"):
+			H=J[8:-2]
+			if H in('str','int','float','bool','bytearray','bytes'):
+				I=U(K)
+				if E.upper()==E:A.write(F,E,': Final[',H,'] = ',I,T)
+				else:A.write(F,E,O,H,P,I,T)
+			elif H in(A2,A1,A0):a={A2:'{}',A1:'[]',A0:'()'};A.write(F,E,O,H,P,a[H],T)
+			else:
+				I=U(K)
+				if H in('object','set','frozenset','Pin'):A.write(F,E,O,H,' ## = ',I,T)
+				elif H=='generator':A.write(F,N,E,'(*args, **kwargs) -> Generator:  ## = ');A.write(I,T,F,Y)
 				else:
-					G=U
-					if K in H:H=H.split(K)[0]+Y
-					if K in H:H=H.split(K)[0]+Y
-					D='{0}{1}: {2} ## {3} = {4}\n'.format(E,C,G,I,H)
-				J.write(D)
-			else:J.write("# all other, type = '{0}'\n".format(I));J.write(E+C+' # type: Incomplete\n')
+					if Z in I:I=I.split(Z)[0]+' at ...>'
+					A.write(F,E,': Incomplete ## ',J,P);A.write(I,T)
+		else:A.write("# all other, type = '",J,"'\n");A.write(F,E,' # type: Incomplete\n')
 	@property
 	def flat_fwid(self):
 		A=self._fwid;B=' .()/\\:$'
 		for C in B:A=A.replace(C,'_')
 		return A
-	def clean(C,path=B):
-		if not path:path=C.path
-		A.info('Clean/remove files in folder: {}'.format(path))
-		try:os.stat(path);E=os.listdir(path)
-		except(D,J):return
-		for F in E:
-			B=z.format(path,F)
-			try:os.remove(B)
-			except D:
-				try:C.clean(B);os.rmdir(B)
-				except D:pass
-	def report_start(B,filename='modules.json'):
-		G='firmware';B._json_name=z.format(B.path,filename);B._json_first=W;Y(B._json_name);A.info('Report file: {}'.format(B._json_name));F.collect()
+	def clean(B,path=B):
+		if not path:path=B.path
+		D.info('Clean/remove files in folder: {}'.format(path));V.clear()
+		try:os.stat(path);C=os.listdir(path)
+		except(H,M):return
+		for E in C:
+			A='{}/{}'.format(path,E)
+			try:os.remove(A)
+			except H:
+				try:B.clean(A);os.rmdir(A)
+				except H:pass
+	def open_file(B,file_name,mode):
+		A=file_name
+		if B.stream:return AT(A,mode)
+		return l(A,mode)
+	def report_start(A,filename='modules.json'):
+		G='firmware';A._json_name='{}/{}'.format(A.path,filename);A._json_first=O;A._report=[]
+		if not A.stream:t(A._json_name)
+		D.info('Report file: {}'.format(A._json_name));C.collect()
 		try:
-			with U(B._json_name,'w')as E:E.write('{');E.write(dumps({G:B.info})[1:-1]);E.write(g);E.write(dumps({q:{C:__version__},'stubtype':G})[1:-1]);E.write(g);E.write('"modules" :[\n')
-		except D as I:A.error(A0);B._json_name=H;raise I
-	def report_add(B,module_name,stub_file):
-		if not B._json_name:raise p(A1)
+			with A.open_file(A._json_name,o)as B:B.write('{');B.write(dumps({G:A.info})[1:-1]);B.write(A3);B.write(dumps({AE:{F:__version__},'stubtype':G})[1:-1]);B.write(A3);B.write('"modules" :[\n')
+		except H as I:D.error(AI);A._json_name=E;raise I
+	def report_add(A,module_name,stub_file,crc=0,unchanged=I):
+		if not A._json_name:raise y(AJ)
+		B='{{"module": "{}", "file": "{}", "depth": {}'.format(module_name,stub_file.replace('\\',J),A._depth)
+		if A._profile:C='import_ms','mem_before','mem_import','mem_after','mem_min','size';B+=', "profile": {'+', '.join('"{}": {}'.format(A,B)for(A,B)in zip(C,A._profile))+'}';A._profile=E
+		if crc:B+=', "crc": "{:08x}"'.format(crc)
+		if unchanged:B+=', "unchanged": true'
+		B+='}';A._report.append(B)
+		if A.report_batch and G(A._report)>=A.report_batch:A.report_flush()
+	def report_flush(A):
+		if not A._report:return
 		try:
-			with U(B._json_name,'a')as C:
-				if not B._json_first:C.write(g)
-				else:B._json_first=I
-				E='{{"module": "{}", "file": "{}"}}'.format(module_name,stub_file.replace('\\',G));C.write(E)
-		except D:A.error(A0)
-	def report_end(B):
-		if not B._json_name:raise p(A1)
-		with U(B._json_name,'a')as C:C.write('\n]}')
-		A.info('Path: {}'.format(B.path))
-def Y(path):
-	B=E=0
+			with A.open_file(A._json_name,d)as B:A._report_write(B)
+		except H:D.error(AI)
+	def _report_write(A,f):
+		for B in A._report:
+			if not A._json_first:f.write(A3)
+			else:A._json_first=I
+			f.write(B)
+		A._report=[]
+	def report_end(A):
+		if not A._json_name:raise y(AJ)
+		with A.open_file(A._json_name,d)as B:A._report_write(B);B.write('\n]}')
+		D.info('Path: {}'.format(A.path))
+V=n()
+def t(path):
+	if path[:path.rfind(J)]in V:return
+	B=C=0
 	while B!=-1:
-		B=path.find(G,E)
+		B=path.find(J,C)
 		if B!=-1:
-			C=path[0]if B==0 else path[:B]
-			try:I=os.stat(C)
-			except D as F:
-				if F.args[0]in[A3,A4]:
-					try:A.debug('Create folder {}'.format(C));os.mkdir(C)
-					except D as H:A.error('failed to create folder {}'.format(C));raise H
-		E=B+1
-def Z(s):
+			A=path[0]if B==0 else path[:B]
+			if A not in V:
+				try:G=os.stat(A);V.add(A)
+				except H as E:
+					if E.args[0]in[AL,AM]:
+						try:D.debug('Create folder {}'.format(A));os.mkdir(A);V.add(A)
+						except H as F:D.error('failed to create folder {}'.format(A));raise F
+		C=B+1
+def u(s):
 	C=' on '
 	if not s:return B
 	s=s.split(C,1)[0]if C in s else s
 	if s.startswith('v'):
-		if not E in s:return B
-		A=s.split(E)[1];return A
-	if not X in s:return B
-	A=s.split(X)[1].split(L)[1];return A
+		if not L in s:return B
+		A=s.split(L)[1];return A
+	if not p in s:return B
+	A=s.split(p)[1].split(N)[1];return A
 def _info():
-	e='ev3-pybricks';d='pycom';a='pycopy';Y='win32';W='arch';V='cpu';U='ver';F='mpy';D='build'
-	try:L=sys.implementation[0]
-	except b:L=sys.implementation.name
-	A=j({S:L,C:B,D:B,U:B,M:sys.platform,Q:'UNKNOWN',R:B,h:B,V:B,F:B,W:B})
-	if A[M].startswith('pyb'):A[M]='stm32'
-	elif A[M]==Y:A[M]=A2
-	elif A[M]=='linux':A[M]=i
-	try:A[C]=A6(sys.implementation.version)
-	except J:pass
+	W='ev3-pybricks';V='pycom';U='pycopy';T='win32';Q='arch';P='cpu';O='ver';D='mpy';C='build'
+	try:J=sys.implementation[0]
+	except b:J=sys.implementation.name
+	A=Y({g:J,F:B,C:B,O:B,S:sys.platform,e:'UNKNOWN',f:B,A4:B,P:B,D:B,Q:B})
+	if A[S].startswith('pyb'):A[S]='stm32'
+	elif A[S]==T:A[S]=AK
+	elif A[S]=='linux':A[S]=A5
+	try:A[F]=AW(sys.implementation.version)
+	except M:pass
 	try:
-		T=sys.implementation._machine if'_machine'in N(sys.implementation)else os.uname().machine;A[Q]=T.strip();G=sys.implementation._build if'_build'in N(sys.implementation)else B
-		if G:A[Q]=G.split(E)[0];A[h]=G.split(E)[1]if E in G else B
-		A[R]=G;A[V]=T.split('with')[-1].strip();A[F]=sys.implementation._mpy if'_mpy'in N(sys.implementation)else sys.implementation.mpy if F in N(sys.implementation)else B
-	except(J,P):pass
-	if not A[R]:A7(A)
+		N=sys.implementation._machine if'_machine'in R(sys.implementation)else os.uname().machine;A[e]=N.strip();G=sys.implementation._build if'_build'in R(sys.implementation)else B
+		if G:A[e]=G.split(L)[0];A[A4]=G.split(L)[1]if L in G else B
+		A[f]=G;A[P]=N.split('with')[-1].strip();A[D]=sys.implementation._mpy if'_mpy'in R(sys.implementation)else sys.implementation.mpy if D in R(sys.implementation)else B
+	except(M,c):pass
+	if not A[f]:AX(A)
 	try:
-		if'uname'in N(os):
-			A[D]=Z(os.uname()[3])
-			if not A[D]:A[D]=Z(os.uname()[2])
-		elif C in N(sys):A[D]=Z(sys.version)
-	except(J,P,b):pass
-	if A[C]==B and sys.platform not in(i,Y):
-		try:f=os.uname();A[C]=f.release
-		except(P,J,b):pass
-	for(g,k,l)in[(a,a,'const'),(d,d,'FAT'),(e,'pybricks.hubs','EV3Brick')]:
-		try:m=__import__(k,H,H,l);A[S]=g;del m;break
-		except(O,o):pass
-	if A[S]==e:A['release']='2.0.0'
-	if A[S]==c:
-		A[C]
-		if A[C]and A[C].endswith('.0')and A[C]>='1.10.0'and A[C]<='1.19.9':A[C]=A[C][:-2]
-	if F in A and A[F]:
-		I=int(A[F])
-		try:K=[H,'x86','x64','armv6','armv6m','armv7m','armv7em','armv7emsp','armv7emdp','xtensa','xtensawin','rv32imc'][I>>10]
-		except P:K='unknown'
-		if K:A[W]=K
-		A[F]='v{}.{}'.format(I&255,I>>8&3)
-	if A[D]and not A[C].endswith(X):A[C]=A[C]+X
-	A[U]=f"{A[C]}-{A[D]}"if A[D]else f"{A[C]}";return A
-def A6(version):
-	A=version;B=L.join([str(A)for A in A[:3]])
-	if V(A)>3 and A[3]:B+=E+A[3]
+		if'uname'in R(os):
+			A[C]=u(os.uname()[3])
+			if not A[C]:A[C]=u(os.uname()[2])
+		elif F in R(sys):A[C]=u(sys.version)
+	except(M,c,b):pass
+	if A[F]==B and sys.platform not in(A5,T):
+		try:X=os.uname();A[F]=X.release
+		except(c,M,b):pass
+	for(Z,a,d)in[(U,U,'const'),(V,V,'FAT'),(W,'pybricks.hubs','EV3Brick')]:
+		try:h=__import__(a,E,E,d);A[g]=Z;del h;break
+		except(K,v):pass
+	if A[g]==W:A['release']='2.0.0'
+	if A[g]==z:
+		A[F]
+		if A[F]and A[F].endswith('.0')and A[F]>='1.10.0'and A[F]<='1.19.9':A[F]=A[F][:-2]
+	if D in A and A[D]:
+		H=k(A[D])
+		try:I=[E,'x86','x64','armv6','armv6m','armv7m','armv7em','armv7emsp','armv7emdp','xtensa','xtensawin','rv32imc'][H>>10]
+		except c:I='unknown'
+		if I:A[Q]=I
+		A[D]='v{}.{}'.format(H&255,H>>8&3)
+	if A[C]and not A[F].endswith(p):A[F]=A[F]+p
+	A[O]=f"{A[F]}-{A[C]}"if A[C]else f"{A[F]}";return A
+def AW(version):
+	A=version;B=N.join([X(A)for A in A[:3]])
+	if G(A)>3 and A[3]:B+=L+A[3]
 	return B
-def A7(info):
-	D=info
-	try:from boardname import BOARD_ID as C;A.info('Found BOARD_ID: {}'.format(C))
-	except O:A.warning('BOARD_ID not found');C=B
-	D[R]=C;D[Q]=C.split(E)[0]if E in C else C;D[h]==C.split(E)[1]if E in C else B
+def AX(info):
+	C=info
+	try:from boardname import BOARD_ID as A;D.info('Found BOARD_ID: {}'.format(A))
+	except K:D.warning('BOARD_ID not found');A=B
+	C[f]=A;C[e]=A.split(L)[0]if L in A else A;C[A4]==A.split(L)[1]if L in A else B
 def get_root():
 	try:A=os.getcwd()
-	except(D,J):A=L
+	except(H,M):A=N
 	B=A
-	for B in['/remote','/sd','/flash',G,A,L]:
+	for B in['/remote','/sd','/flash',J,A,N]:
 		try:C=os.stat(B);break
-		except D:continue
+		except H:continue
 	return B
-def A8(filename):
+def W(filename):
 	try:
-		if os.stat(filename)[0]>>14:return W
+		if os.stat(filename)[0]>>14:return O
 		return I
-	except D:return I
-def k():T("-p, --path   path to store the stubs in, defaults to '.'");sys.exit(1)
+	except H:return I
+def AY():
+	D='modulelist.avail'
+	if not W(D):return
+	B=n()
+	with l(D)as E:
+		while O:
+			A=E.readline()
+			if not A:break
+			A=A.strip()
+			if A and A[0]!='#':B.add(A.split(J)[0])
+	for F in AR:
+		try:
+			for G in os.listdir(F):B.add(G.split(N)[0])
+		except H:pass
+	C.collect();return B
+def AZ():
+	if not W(A9):return
+	D={}
+	try:
+		with l(A9)as E:
+			while O:
+				A=E.readline()
+				if not A:break
+				B=A.split()
+				if G(B)==2 and A[0]!='#':D[B[0]]=k(B[1],16)
+	except(H,ValueError):pass
+	C.collect();return D
+def AB():Z("-p, --path   path to store the stubs in, defaults to '.'");sys.exit(1)
 def read_path():
 	path=B
-	if V(sys.argv)==3:
+	if G(sys.argv)==3:
 		A=sys.argv[1].lower()
 		if A in('--path','-p'):path=sys.argv[2]
-		else:k()
-	elif V(sys.argv)==2:k()
+		else:AB()
+	elif G(sys.argv)==2:AB()
 	return path
-def l():
-	try:A=bytes('abc',encoding='utf8');B=l.__module__;return I
-	except(m,J):return W
-def main():stubber=Stubber(path=read_path());stubber.clean();stubber.modules=['WM8960','_asyncio','_boot_fat','_espnow','_onewire','_rp2','_thread','_uasyncio','abc','adcfft','aioble/__init__','aioble/central','aioble/client','aioble/core','aioble/device','aioble/l2cap','aioble/peripheral','aioble/security','aioble/server','aioespnow','ak8963','apa102','apa106','argparse','array','asyncio/__init__','asyncio/core','asyncio/event','asyncio/funcs','asyncio/lock','asyncio/stream','base64','binascii','bluetooth','breakout_as7262','breakout_bh1745','breakout_bme280','breakout_bme68x','breakout_bmp280','breakout_dotmatrix','breakout_encoder','breakout_icp10125','breakout_ioexpander','breakout_ltr559','breakout_matrix11x7','breakout_mics6814','breakout_msa301','breakout_paa5100','breakout_pmw3901','breakout_potentiometer','breakout_rgbmatrix5x5','breakout_rtc','breakout_scd41','breakout_sgp30','breakout_trackball','breakout_vl53l5cx','btree','builtins','cc3200','cmath','collections','collections/__init__','collections/defaultdict','copy','crypto','cryptolib','curl','datetime','deflate','dht','display','display_driver_utils','ds18x20','embed','encoder','errno','esp','esp32','esp8266','espidf','espnow','ffi','flashbdev','fnmatch','framebuf','freesans20','fs_driver','functools','galactic','gc','gfx_pack','gsm','gzip','hashlib','heapq','hmac','html/__init__','hub75','ili9341','ili9XXX','imagetools','inisetup','inspect','interstate75','io','itertools','jpegdec','js','jsffi','json','lcd160cr','locale','lodepng',y,'lsm6dsox','lv_colors','lv_utils','lvgl','lwip','machine','marshal','math','microWebSocket','microWebSrv','microWebTemplate',c,'mimxrt','mip','mip/__init__','mip/__main__','motor','mpu6500','mpu9250','neopixel','network','nrf','ntptime','onewire','openamp','operator','os','os/__init__','os/path','pathlib','pcf85063a','pic16bit','picoexplorer','picographics','picokeypad','picoscroll','picounicorn','picowireless','pimoroni','pimoroni_bus','pimoroni_i2c','plasma','platform','powerpc','pyb','pye','pyscript','pyscript/__init__','pyscript/fs','qemu','qrcode','random','renesas','renesas-ra','requests','requests/__init__','rp2','rtch','samd','select','servo','socket','ssd1306','ssh','ssl','stat','stm','stm32','string','struct',x,'tarfile/__init__','tarfile/write','termios','time','tls','tpcalib','types','uarray','uasyncio/__init__','uasyncio/core','uasyncio/event','uasyncio/funcs','uasyncio/lock','uasyncio/stream','uasyncio/tasks','ubinascii','ubluetooth','ucollections','ucryptolib','uctypes','uerrno','uftpd','uhashlib','uheapq','uio','ujson','ulab','ulab/approx','ulab/compare','ulab/fft','ulab/filter','ulab/linalg','ulab/numerical','ulab/poly','ulab/user','ulab/vector','umachine','umqtt/__init__','umqtt/robust','umqtt/simple','unittest/__init__',i,'uos','uplatform','urandom','ure','urequests','urllib/urequest','usb/device','usb/device/cdc','usb/device/hid','usb/device/keyboard','usb/device/midi','usb/device/mouse','uselect','usocket','ussl','ustruct','usys','utelnetserver','utime','utimeq','uu','uwebsocket','uzlib',C,'vfs','webassembly','websocket','websocket_helper',A2,'wipy','writer','xpt2046','ymodem','zephyr','zlib'];F.collect();stubber.create_all_stubs()
-if __name__=='__main__'or l():
-	if not A8('no_auto_stubber.txt'):
-		T(f"createstubs.py: {__version__}")
-		try:F.threshold(4096);F.enable()
+def AC():
+	try:A=bytes('abc',encoding='utf8');B=AC.__module__;return I
+	except(AD,M):return O
+def main():stubber=Stubber(path=read_path());stubber.clean();stubber.modules=['WM8960','_asyncio','_boot_fat','_espnow','_onewire','_rp2','_thread','_uasyncio','abc','adcfft','aioble/__init__','aioble/central','aioble/client','aioble/core','aioble/device','aioble/l2cap','aioble/peripheral','aioble/security','aioble/server','aioespnow','ak8963','apa102','apa106','argparse','array','asyncio/__init__','asyncio/core','asyncio/event','asyncio/funcs','asyncio/lock','asyncio/stream','base64','binascii','bluetooth','breakout_as7262','breakout_bh1745','breakout_bme280','breakout_bme68x','breakout_bmp280','breakout_dotmatrix','breakout_encoder','breakout_icp10125','breakout_ioexpander','breakout_ltr559','breakout_matrix11x7','breakout_mics6814','breakout_msa301','breakout_paa5100','breakout_pmw3901','breakout_potentiometer','breakout_rgbmatrix5x5','breakout_rtc','breakout_scd41','breakout_sgp30','breakout_trackball','breakout_vl53l5cx','btree','builtins','cc3200','cmath','collections','collections/__init__','collections/defaultdict','copy','crypto','cryptolib','curl','datetime','deflate','dht','display','display_driver_utils','ds18x20','embed','encoder','errno','esp','esp32','esp8266','espidf','espnow','ffi','flashbdev','fnmatch','framebuf','freesans20','fs_driver','functools','galactic','gc','gfx_pack','gsm','gzip','hashlib','heapq','hmac','html/__init__','hub75','ili9341','ili9XXX','imagetools','inisetup','inspect','interstate75','io','itertools','jpegdec','js','jsffi','json','lcd160cr','locale','lodepng',AH,'lsm6dsox','lv_colors','lv_utils','lvgl','lwip','machine','marshal','math','microWebSocket','microWebSrv','microWebTemplate',z,'mimxrt','mip','mip/__init__','mip/__main__','motor','mpu6500','mpu9250','neopixel','network','nrf','ntptime','onewire','openamp','operator','os','os/__init__','os/path','pathlib','pcf85063a','pic16bit','picoexplorer','picographics','picokeypad','picoscroll','picounicorn','picowireless','pimoroni','pimoroni_bus','pimoroni_i2c','plasma','platform','powerpc','pyb','pye','pyscript','pyscript/__init__','pyscript/fs','qemu','qrcode','random','renesas','renesas-ra','requests','requests/__init__','rp2','rtch','samd','select','servo','socket','ssd1306','ssh','ssl','stat','stm','stm32','string','struct','sys','tarfile/__init__','tarfile/write','termios','time','tls','tpcalib','types','uarray','uasyncio/__init__','uasyncio/core','uasyncio/event','uasyncio/funcs','uasyncio/lock','uasyncio/stream','uasyncio/tasks','ubinascii','ubluetooth','ucollections','ucryptolib','uctypes','uerrno','uftpd','uhashlib','uheapq','uio','ujson','ulab','ulab/approx','ulab/compare','ulab/fft','ulab/filter','ulab/linalg','ulab/numerical','ulab/poly','ulab/user','ulab/vector','umachine','umqtt/__init__','umqtt/robust','umqtt/simple','unittest/__init__',A5,'uos','uplatform','urandom','ure','urequests','urllib/urequest','usb/device','usb/device/cdc','usb/device/hid','usb/device/keyboard','usb/device/midi','usb/device/mouse','uselect','usocket','ussl','ustruct','usys','utelnetserver','utime','utimeq','uu','uwebsocket','uzlib',F,'vfs','webassembly','websocket','websocket_helper',AK,'wipy','writer','xpt2046','ymodem','zephyr','zlib'];C.collect();stubber.create_all_stubs()
+if __name__=='__main__'or AC():
+	if not W('no_auto_stubber.txt'):
+		Z('createstubs.py: {}'.format(__version__))
+		try:C.threshold(4096);C.enable()
 		except BaseException:pass
 		main()
\ No newline at end of file
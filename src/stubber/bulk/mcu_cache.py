@@ -0,0 +1,102 @@
+"""
+Remember the connected boards between runs, to avoid probing each board before stubbing.
+
+The boards are identified by their USB identity, `vid:pid:serial number`, and the cache keeps per board:
+    {"serialport": "/dev/ttyUSB0", "sys_version": "3.4.0; MicroPython v1.24.0 on 2024-10-25", "family": "micropython", ... "toml": {}}
+A cached board is only probed again when it does not answer a short ping, or when the ping shows other firmware.
+Boards without a USB serial number cannot be told apart, and are always probed.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from mpflash.common import filtered_portinfos, find_serial_by_path
+from mpflash.logger import log
+from mpflash.mpremoteboard import OK, MPRemoteBoard
+from serial.tools.list_ports_common import ListPortInfo
+
+from stubber.utils.config import CONFIG
+
+CACHE_FILE = "mcu_cache.json"
+CACHED_FIELDS = ("family", "version", "port", "board_id", "cpu", "arch", "mpy", "build", "description", "toml")
+# the build date in sys.version changes when a board is flashed with other firmware
+PING = "import sys;print(sys.version)"
+
+
+def cache_path() -> Path:
+    return CONFIG.repo_path / CACHE_FILE
+
+
+def usb_identity(portinfo: ListPortInfo) -> Optional[str]:
+    """The USB identity of the board on a port, or None if the port has no serial number"""
+    if not (portinfo.vid and portinfo.pid and portinfo.serial_number):
+        return None
+    return f"{portinfo.vid:04x}:{portinfo.pid:04x}:{portinfo.serial_number}"
+
+
+def load_cache(path: Path) -> Dict[str, dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        log.debug(f"No board cache in {path}: {e}")
+        return {}
+
+
+def save_cache(path: Path, cache: Dict[str, dict]) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(cache, indent=4), encoding="utf-8")
+    return path
+
+
+def ping(mcu: MPRemoteBoard) -> str:
+    """The sys.version of the board, or an empty string if the board does not answer"""
+    try:
+        rc, out = mcu.run_command(["exec", PING], timeout=2, no_info=True, log_errors=False)
+    except Exception as e:
+        log.debug(f"No answer from {mcu.serialport}: {e}")
+        return ""
+    return out[-1].strip() if rc == OK and out else ""
+
+
+def restore_board(mcu: MPRemoteBoard, entry: dict):
+    """Set the board information from the cache, as if the board was probed"""
+    for field in CACHED_FIELDS:
+        if field in entry:
+            setattr(mcu, field, entry[field])
+    mcu.connected = True
+
+
+def cache_entry(mcu: MPRemoteBoard, sys_version: str) -> dict:
+    return {"serialport": mcu.serialport, "sys_version": sys_version, **{field: getattr(mcu, field) for field in CACHED_FIELDS}}
+
+
+def list_cached_mcus(*, ignore: List[str], include: List[str], bluetooth: bool = False, refresh: bool = False) -> List[MPRemoteBoard]:
+    """
+    List the connected boards, in the same way as mpflash's list_mcus, but only probe the boards that are not in the cache.
+    With refresh all boards are probed, and the cache is rebuilt.
+    """
+    path = cache_path()
+    cache = {} if refresh else load_cache(path)
+    mcus: List[MPRemoteBoard] = []
+    for portinfo in filtered_portinfos(ignore=ignore, include=include, bluetooth=bluetooth):
+        mcu = MPRemoteBoard(portinfo.device, location=find_serial_by_path(portinfo.device) or portinfo.location or portinfo.hwid or "?")
+        mcus.append(mcu)
+        key = usb_identity(portinfo)
+        sys_version = ping(mcu) if key else ""
+        entry = cache.get(key, {}) if key else {}
+        if sys_version and entry.get("sys_version") == sys_version:
+            log.debug(f"Using the cached information of {key} on {mcu.serialport}")
+            restore_board(mcu, entry)
+            # the board may be connected to another port since the last run
+            entry["serialport"] = mcu.serialport
+            continue
+        try:
+            mcu.get_mcu_info()
+        except ConnectionError as e:
+            log.error(f"Error: {e}")
+            continue
+        if key and sys_version and mcu.connected:
+            cache[key] = cache_entry(mcu, sys_version)
+    save_cache(path, cache)
+    return mcus
@@ -2,16 +2,18 @@
 This script creates stubs on and for a connected micropython MCU board.
 """
 
+import hashlib
 import json
 import shutil
 import sys
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
-from tempfile import mkdtemp
-from typing import List, Optional, Tuple, Union
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Optional, Tuple, Union
 
-from mpflash.connected import list_mcus
 from mpflash.list import show_mcus
 from mpflash.logger import log
 from mpflash.mpremoteboard import ERROR, OK, MPRemoteBoard
@@ -19,7 +21,26 @@ from rich.console import Console
 from rich.table import Table
 from tenacity import retry, stop_after_attempt, wait_fixed
 
-from stubber import utils
+from stubber import __version__, utils
+from stubber.bulk.stub_compress import COMPRESS_FLAG, decompress_stubs
+from stubber.bulk.stub_parts import join_stub_parts
+from stubber.bulk.stub_profile import (
+    CRASH_FILE,
+    PROFILE_FILE,
+    PROFILE_FLAG,
+    SCHEDULE_FILE,
+    cost_table,
+    load_cost_table,
+    load_crashed,
+    print_cost_table,
+    save_cost_table,
+    schedule_modules,
+    write_schedule,
+)
+from stubber.bulk.mcu_cache import list_cached_mcus, load_cache, save_cache
+from stubber.bulk.repl_stubber import stub_over_repl
+from stubber.bulk.stub_records import render_stub_folder
+from stubber.bulk.stub_stream import STREAM_FLAG, read_stub_stream
 from stubber.publish.merge_docstubs import merge_all_docstubs
 from stubber.publish.pathnames import board_folder_name
 from stubber.publish.publish import build_multiple
@@ -32,6 +53,19 @@ reset_before = True
 TESTING = False
 ###############################################################################################
 
+FINGERPRINTS = "modulelist.crc"
+PROGRESS_FILE = "modulelist.done"
+FIRMWARE_FILE = "mcu_firmware.json"  # per firmware the folder of its stubs and the crashed modules, next to the board cache
+INSTALL_MARKER = "/lib/createstubs.sha"  # the hash of the installed scripts, see package_hash
+RETRY_ATTEMPTS = 20  # the most runs of createstubs on a board, as long as it makes progress
+RETRY_STUCK = 3  # runs without progress before createstubs gives up
+RETRY_BACKOFF = (1, 8)  # the first and longest wait in seconds before a run that continues after progress
+RETRY_WAIT = 15  # seconds to wait for the board after a run without progress
+HOST_WORKERS = 2  # boards that are post-processed and published at the same time
+HOST_QUEUE = 4  # boards queued for post-processing and publishing, a stubbed board waits while the queue is full
+# the boards that are stubbed at the same time update the same firmware records
+_firmware_lock = threading.Lock()
+
 
 ###############################################################################################
 
@@ -42,6 +76,8 @@ class Variant(str, Enum):
     full = "full"
     mem = "mem"
     db = "db"
+    bin = "bin"
+    host = "host"  # no createstubs on the board, the board is introspected over the REPL
 
 
 class Form(str, Enum):
@@ -61,52 +97,148 @@ def hard_reset(board: MPRemoteBoard) -> bool:
     return rc == OK
 
 
-@retry(stop=stop_after_attempt(10), wait=wait_fixed(15))
 def run_createstubs(
     dest: Path,
     mcu: MPRemoteBoard,
     variant: Variant = Variant.db,
     mount_vfs: bool = True,
+    stream: bool = False,
+    profile: bool = False,
+    compress: bool = False,
+    attempts: Optional[List[float]] = None,
 ):
     """
-    Run a createstubs[variant]  on the provided board.
-    Retry running the command up to 10 times, with a 15 second timeout between retries.
-    this should allow for the boards with little memory to complete even if they run out of memory.
+    Run a createstubs[variant]  on the provided board, and run it again as long as it makes progress.
+    createstubs_db continues from its progress in modulelist.done after it ran out of memory,
+    this allows the boards with little memory to complete in multiple runs.
+    - After a run that made progress, the next run starts after a short backoff of 1, 2, 4 and up to 8 seconds.
+    - After a run without progress the board is reset, and createstubs gives up after 3 such runs.
+      The module that failed is added to the crashed modules of the firmware, so that the next run skips it.
+    The duration of each run is appended to `attempts`.
+    When streaming, createstubs writes the stubs to stdout, rather than to files.
+    When profiling, createstubs reports the import time and memory use of each module.
+    When compressing, createstubs writes the stubs as .pyi.gz, if the firmware can compress.
     """
-    # add the lib folder to the path
-    cmd_path = [
-        "exec",
-        'import sys;sys.path.append("/lib") if "/lib" not in sys.path else "/lib already in path"',
-    ]
-    mcu.run_command(cmd_path, timeout=5)
-
-    if reset_before:
-        log.info(f"Resetting {mcu.serialport} {mcu.description}")
-        mcu.run_command("reset", timeout=5)
-        time.sleep(2)
-
     log.info(f"Running createstubs {variant.value} on {mcu.serialport} {mcu.description} using temp path: {dest}")
+    set_flag(mcu, dest, PROFILE_FLAG, profile, mount_vfs=mount_vfs)
+    set_flag(mcu, dest, COMPRESS_FLAG, compress and not stream, mount_vfs=mount_vfs)
+    # start a new run, later runs continue from the progress of the earlier runs
     if mount_vfs:
+        (dest / PROGRESS_FILE).unlink(missing_ok=True)
         cmd = build_cmd(dest, variant)
     else:
-        mcu.run_command(["rm", ":modulelist.done"], log_errors=False)
+        mcu.run_command(["rm", f":{PROGRESS_FILE}"], log_errors=False)
+        set_flag(mcu, dest, STREAM_FLAG, stream, mount_vfs=False)
         cmd = build_cmd(None, variant)
-    log.info(f"Running : mpremote {' '.join(cmd)}")
     mcu.run_command.retry.wait = wait_fixed(15)
     # some boards need 2-3 minutes to run createstubs - so increase the default timeout
     # esp32s3 > 240 seconds with mounted fs
     #  but slows down esp8266 restarts so keep that to 90 seconds
     timeout = 90 if mcu.port == "esp8266" else 6 * 60  # type: ignore
-    rc, out = mcu.run_command(cmd, timeout=timeout)
-    # check last line for exception or error and raise that if found
-    if rc != OK and out and ":" in out[-1] and not out[-1].startswith("INFO") and not out[-1].startswith("WARN"):
+
+    attempts = [] if attempts is None else attempts
+    done, stuck, backoff = 0, 0, RETRY_BACKOFF[0]
+    while True:
+        start = time.perf_counter()
+        # reset before the first run, and after a run without progress as the board may hang
+        rc, out = run_createstubs_once(mcu, cmd, timeout, stream=stream, reset=reset_before and (not attempts or stuck > 0))
+        attempts.append(time.perf_counter() - start)
+        if not needs_retry(rc, out, variant):
+            return rc, out
+        progress = read_progress(mcu, dest, mount_vfs=mount_vfs)
+        if progress > done:
+            done, stuck = progress, 0
+            wait, backoff = backoff, min(backoff * 2, RETRY_BACKOFF[1])
+        else:
+            stuck += 1
+            wait, backoff = RETRY_WAIT, RETRY_BACKOFF[0]
+        if stuck >= RETRY_STUCK or len(attempts) >= RETRY_ATTEMPTS:
+            # only createstubs_db skips the crashed modules
+            if stuck and variant == Variant.db and (module := failed_module(mcu, dest, mount_vfs=mount_vfs)):
+                log.error(f"createstubs failed {stuck} times on module {module}, it is skipped in the next run")
+                record_crashed(mcu, [module])
+            log.error(f"createstubs gave up after {len(attempts)} runs, {done} modules done")
+            return rc, out
+        log.warning(f"createstubs stopped after {done} modules done, run {len(attempts) + 1} starts in {wait} seconds")
+        time.sleep(wait)
+
+
+def run_createstubs_once(mcu: MPRemoteBoard, cmd: List[str], timeout: int, stream: bool = False, reset: bool = False):
+    """Run createstubs once, returns the return code and the output"""
+    if reset:
+        log.info(f"Resetting {mcu.serialport} {mcu.description}")
+        mcu.run_command("reset", timeout=5)
+        time.sleep(2)
+
+    # add the lib folder to the path, also after createstubs reset the board
+    cmd_path = [
+        "exec",
+        'import sys;sys.path.append("/lib") if "/lib" not in sys.path else "/lib already in path"',
+    ]
+    mcu.run_command(cmd_path, timeout=5)
+
+    log.info(f"Running : mpremote {' '.join(cmd)}")
+    # do not log each of the streamed lines
+    return mcu.run_command(cmd, timeout=timeout, no_info=stream)
+
+
+def needs_retry(rc: int, out: List[str], variant: Variant) -> bool:
+    """Check if createstubs failed in a way that another run may fix"""
+    if rc == OK:
+        return False
+    # check last line for exception or error
+    if out and ":" in out[-1] and not out[-1].startswith("INFO") and not out[-1].startswith("WARN"):
         log.warning(f"createstubs: {out[-1]}")
-        raise RuntimeError(out[-1]) from eval(out[-1].split(":")[0])
+        return True
+    # assume createstubs_db ran out of memory
+    return variant == Variant.db
+
 
-    if rc != OK and variant == Variant.db:
-        # assume createstubs ran out of memory and try again
-        raise MemoryError("Memory error, try again")
-    return rc, out
+def read_progress_file(mcu: MPRemoteBoard, dest: Path, mount_vfs: bool = True) -> List[str]:
+    """The lines of modulelist.done, `<modules done> <offset> [<module being stubbed>]`, empty without progress"""
+    if mount_vfs:
+        progress_file = dest / PROGRESS_FILE
+        return progress_file.read_text(encoding="utf-8").splitlines() if progress_file.exists() else []
+    rc, lines = mcu.run_command(["cat", f":{PROGRESS_FILE}"], log_errors=False)
+    return lines if rc == OK else []
+
+
+def read_progress(mcu: MPRemoteBoard, dest: Path, mount_vfs: bool = True) -> int:
+    """The number of modules that createstubs_db recorded as done in modulelist.done, 0 without progress"""
+    for line in read_progress_file(mcu, dest, mount_vfs=mount_vfs):
+        try:
+            return int(line.split()[0])
+        except (ValueError, IndexError):
+            continue
+    return 0
+
+
+def failed_module(mcu: MPRemoteBoard, dest: Path, mount_vfs: bool = True) -> Optional[str]:
+    """
+    The module that createstubs_db was stubbing when it failed.
+    createstubs_db records the module in modulelist.done before it is imported, as a crash during the import is not logged.
+    """
+    for line in read_progress_file(mcu, dest, mount_vfs=mount_vfs):
+        parts = line.split()
+        if len(parts) > 2 and parts[0].isdigit():
+            return parts[2]
+    return None
+
+
+def set_flag(mcu: MPRemoteBoard, dest: Path, flag: str, enabled: bool, mount_vfs: bool = True):
+    """
+    Create or remove a flag file that switches an option of createstubs.
+    With a mounted vfs the flag is in the destination folder, otherwise on the board.
+    """
+    if mount_vfs:
+        if enabled:
+            (dest / flag).touch()
+        else:
+            (dest / flag).unlink(missing_ok=True)
+    elif enabled:
+        mcu.run_command(["exec", f"open('{flag}', 'w').close()"], timeout=5)
+    else:
+        mcu.run_command(["rm", f":{flag}"], log_errors=False)
 
 
 def build_cmd(dest: Union[Path, None], variant: Variant = Variant.db) -> List[str]:
@@ -116,6 +248,8 @@ def build_cmd(dest: Union[Path, None], variant: Variant = Variant.db) -> List[st
         cmd += ["exec", "import createstubs_db"]
     elif variant == Variant.mem:
         cmd += ["exec", "import createstubs_mem"]
+    elif variant == Variant.bin:
+        cmd += ["exec", "import createstubs_bin"]
     else:
         cmd += ["exec", "import createstubs"]
     return cmd
@@ -127,6 +261,13 @@ def generate_board_stubs(
     variant: Variant = Variant.db,
     form: Form = Form.mpy,
     mount_vfs: bool = True,
+    stream: bool = False,
+    profile: bool = False,
+    skip_unchanged: bool = True,
+    schedule: bool = True,
+    compress: bool = True,
+    post_process: bool = True,
+    attempts: Optional[List[float]] = None,
 ) -> Tuple[int, Optional[Path]]:
     """
     Generate the MCU stubs for this MCU board.
@@ -136,14 +277,39 @@ def generate_board_stubs(
         The destination folder for the stubs
     port : str
         The port the board is connected to
+    stream : bool
+        Stream the stubs over the serial connection, rather than using a mounted vfs or the flash of the board
+    profile : bool
+        Record the import time and memory use of each module, and save these as a cost table
+    skip_unchanged : bool
+        Do not stub the modules that did not change since the previous stubs of this firmware
+    schedule : bool
+        Order the modules by the memory they needed in the previous run of this firmware, and skip the modules that crashed (db variant)
+    compress : bool
+        Compress the stubs on the board to reduce the transfer to the host, if the firmware can compress
+    post_process : bool
+        Run stubgen, black and autoflake on the stubs, or leave that to the caller, see post_process_stubs
+    attempts : list
+        The duration of each run of createstubs is appended to this list
     """
+    if stream and variant == Variant.db:
+        log.warning("The db variant uses the board filesystem to continue after a reset, the stubs are not streamed")
+        stream = False
+    if stream:
+        # no need for a vfs, and nothing is written to the flash of the board
+        mount_vfs = False
     # TODO: use remaining free memory to determine if we can afford to mount the vfs
     if mcu.cpu.lower() == "esp8266":
         # insuficcient memory on the board also mount a remote fs
         mount_vfs = False
-    if not mount_vfs:
+    if not mount_vfs and not stream:
         # remove prio stubs folder to avoid running out of flash space
         mcu.run_command(["rm", "-rv", ":stubs"], log_errors=False)
+    if variant == Variant.host:
+        return generate_repl_stubs(dest, mcu, post_process=post_process)
+    if variant == Variant.bin and form != Form.py:
+        # the bin variant is only packaged as python source
+        form = Form.py
     # HOST -> MCU : mip install createstubs to board
     ok = install_scripts_to_board(mcu, form)
     if not ok and not TESTING:
@@ -152,8 +318,25 @@ def generate_board_stubs(
     # the MCU board may not have a board id,so lets just provide it so
     # createstubs can use it if needed.
     copy_boardname_to_board(mcu)
+    # only try to stub the modules that are present in the firmware
+    copy_modulelist_avail(mcu, dest, mount_vfs=mount_vfs)
+    previous = previous_stubs(mcu)
+    # the cost table and the crashed modules of the firmware are kept, also when a previous run failed
+    known = stubs_folder(mcu)
+    # only stub the modules that changed since the previous run
+    copy_fingerprints(mcu, dest, mount_vfs=mount_vfs, previous=previous, skip_unchanged=skip_unchanged)
+    # stub the modules that need the most memory first, and skip the modules that are known to crash
+    if schedule and variant == Variant.db:
+        copy_schedule(mcu, dest, mount_vfs=mount_vfs, previous=known, crashed=recorded_crashed(mcu))
+    else:
+        copy_schedule(mcu, dest, mount_vfs=mount_vfs)
 
-    rc, out = run_createstubs(dest, mcu, variant, mount_vfs=mount_vfs)
+    rc, out = run_createstubs(dest, mcu, variant, mount_vfs=mount_vfs, stream=stream, profile=profile, compress=compress, attempts=attempts)
+    if profile:
+        set_flag(mcu, dest, PROFILE_FLAG, False, mount_vfs=mount_vfs)
+    if compress and not stream:
+        set_flag(mcu, dest, COMPRESS_FLAG, False, mount_vfs=mount_vfs)
+    crashed = read_crashed(mcu, dest, mount_vfs=mount_vfs) if variant == Variant.db else []
 
     if rc != OK:
         log.warning("Error running createstubs: %s", out)
@@ -161,6 +344,13 @@ def generate_board_stubs(
 
     if mount_vfs:
         folder = get_stubfolder(out)
+    elif stream:
+        set_flag(mcu, dest, STREAM_FLAG, False, mount_vfs=False)
+        reader = read_stub_stream(out, dest)
+        if reader.errors:
+            log.warning(f"Error receiving the stubs, {len(reader.errors)} corrupt lines")
+            return ERROR, None
+        folder = get_stubfolder(out).lstrip("/")
     else:
         # Waiting for MPRemote to support copying folder from board to host
         cmd = f"cp -r :stubs {dest.as_posix()}"
@@ -185,15 +375,64 @@ def generate_board_stubs(
         log.warning("Could not load modules.json, Assuming error in createstubs")
         return ERROR, None
 
-    # check the number of stubs generated
-    if len(list(stubs_path.glob("*.p*"))) < 10:
+    if variant == Variant.bin:
+        # the bin variant writes binary records, that are rendered to .pyi files on the host
+        render_stub_folder(stubs_path)
+
+    # large modules, such as lvgl, are stubbed in parts that are joined on the host
+    join_stub_parts(stubs_path)
+    decompress_stubs(stubs_path)
+
+    if table := cost_table(modules_json):
+        print_cost_table(table)
+    elif known:
+        # keep the costs of the previous run to schedule the next run
+        table = load_cost_table(known / PROFILE_FILE)
+    # the modules that crashed a previous run are skipped in the next runs
+    crashed = sorted(set(crashed) | set(recorded_crashed(mcu)) | set(load_crashed(known / PROFILE_FILE) if known else []))
+    if table or crashed:
+        # keep the cost table with the stubs of this firmware
+        save_cost_table(stubs_path / PROFILE_FILE, mcu.firmware, table, crashed)
+
+    # check the number of stubs generated, the unchanged stubs are copied from the previous run later
+    unchanged = sum(1 for m in modules_json.get("modules", []) if m.get("unchanged"))
+    if unchanged:
+        log.info(f"{unchanged} modules did not change since the previous run")
+    if len(list(stubs_path.glob("*.p*"))) + unchanged < 10:
         log.warning("Error generating stubs, too few (<10)stubs were generated")
         return ERROR, None
     log.debug(f"Found {len(list(stubs_path.glob('*.p*')))} stubs")
 
+    if post_process:
+        post_process_stubs(stubs_path)
+    return OK, stubs_path
+
+
+def post_process_stubs(stubs_path: Path):
+    """Generate the .pyi files from the .py stubs, and format them"""
     stubgen_needed = any(stubs_path.glob("*.py"))
-    utils.do_post_processing([stubs_path], stubgen=stubgen_needed, format=True, autoflake=True)
+    # each stub is read and written once, and the .py stubs are not rewritten
+    # stubgen runs one board at the time, see stubmaker.run_stubgen
+    utils.do_post_processing([stubs_path], stubgen=stubgen_needed, format=True, autoflake=True, in_memory=True)
 
+
+def generate_repl_stubs(dest: Path, mcu: MPRemoteBoard, post_process: bool = True) -> Tuple[int, Optional[Path]]:
+    """
+    Generate the MCU stubs from the host, over the REPL of the board.
+    Nothing is installed on the board, the stubs are formatted on the host.
+    """
+    modules = read_modulelist()
+    if available := {m.replace("/", ".").split(".")[0] for m in probe_modules(mcu)}:
+        # only the modules of the packages that are present in the firmware
+        modules = [m for m in modules if m.replace("/", ".").split(".")[0] in available]
+    log.info(f"Stubbing {len(modules)} modules over the REPL of {mcu.serialport} {mcu.description}")
+    stubs_path = stub_over_repl(mcu, dest, modules)
+    if not stubs_path:
+        return ERROR, None
+    mcu.path = stubs_path
+    mcu.firmware = json.loads((stubs_path / "modules.json").read_text(encoding="utf-8"))["firmware"]
+    if post_process:
+        post_process_stubs(stubs_path)
     return OK, stubs_path
 
 
@@ -220,9 +459,232 @@ def copy_boardname_to_board(mcu: MPRemoteBoard):
         log.error(f"Error during copy createstubs running command: {cmd}")
 
 
+def probe_modules(mcu: MPRemoteBoard) -> List[str]:
+    """
+    List the modules that are built-in or frozen into the firmware, using help('modules').
+
+    Returns:
+        List[str]: The sorted module names, or an empty list if the board could not be probed.
+    """
+    rc, out = mcu.run_command(["exec", "help('modules')"], timeout=10, log_errors=False)
+    if rc != OK:
+        return []
+    return parse_help_modules(out)
+
+
+def parse_help_modules(out: List[str]) -> List[str]:
+    """
+    Parse the output of help('modules') into a sorted list of module names.
+    Returns an empty list if the output is not a module listing, such as on ports built without help('modules').
+    """
+    modules = set()
+    for line in out:
+        if line.startswith("Plus any modules"):
+            return sorted(modules)
+        modules.update(name for name in line.split() if all(c.isalnum() or c in "_/" for c in name))
+    return []
+
+
+def copy_modulelist_avail(mcu: MPRemoteBoard, dest: Path, mount_vfs: bool = True) -> int:
+    """
+    Probe the modules of the firmware, and provide them to createstubs as `modulelist.avail`.
+    createstubs will skip the modules that are not listed, or found in the lib folders.
+    If the board cannot be probed, any previous list is removed so that all modules are tried.
+
+    Returns:
+        int: The number of modules listed.
+    """
+    avail = dest / "modulelist.avail"
+    modules = probe_modules(mcu)
+    if modules:
+        avail.write_text("\n".join(modules) + "\n", encoding="utf-8")
+        log.info(f"Found {len(modules)} modules in the firmware")
+    else:
+        avail.unlink(missing_ok=True)
+        log.warning("Could not list the modules in the firmware, trying all modules")
+    if not mount_vfs:
+        if modules:
+            mcu.run_command(["cp", str(avail), ":modulelist.avail"], timeout=10)
+        else:
+            mcu.run_command(["rm", ":modulelist.avail"], log_errors=False)
+    return len(modules)
+
+
+def firmware_key(mcu: MPRemoteBoard) -> Optional[str]:
+    """The firmware of this board, named as its folder in the stubs repo"""
+    fw = {"family": mcu.family, "version": mcu.version, "port": mcu.port, "board": mcu.board}
+    try:
+        return board_folder_name(fw)
+    except (KeyError, ValueError):
+        return None
+
+
+def stubs_folder(mcu: MPRemoteBoard) -> Optional[Path]:
+    """
+    The folder in the stubs repo with the stubs of the firmware of this board, None before its first stubs are copied.
+    The folder is named by copy_to_repo after the firmware in modules.json, and recorded for the firmware of the board.
+    """
+    folder = firmware_record(mcu).get("folder")
+    return CONFIG.stub_path / folder if folder else None
+
+
+def previous_stubs(mcu: MPRemoteBoard) -> Optional[Path]:
+    """The folder with the stubs of a previous run for the firmware of this board, if there is one."""
+    path = stubs_folder(mcu)
+    return path if path and (path / "modules.json").exists() else None
+
+
+def known_firmware(mcu: MPRemoteBoard) -> Optional[dict]:
+    """
+    The firmware in modules.json of the stubs in the repo, if these were created from the same firmware as the board,
+    by the same version of stubber. Returns None if the board should be stubbed.
+    """
+    if not (previous := previous_stubs(mcu)):
+        return None
+    try:
+        report = json.loads((previous / "modules.json").read_text(encoding="utf-8"))
+        firmware = report["firmware"]
+        stubber_version = report.get("stubber", {}).get("version", "")
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+    board = {"family": mcu.family, "version": mcu.version, "build": mcu.build, "port": mcu.port, "board": mcu.board}
+    # createstubs reports the versions with or without a leading v
+    same = all(str(value).lstrip("v") == str(firmware.get(key, "")).lstrip("v") for key, value in board.items())
+    return firmware if same and stubber_version.lstrip("v") == __version__.lstrip("v") else None
+
+
+def report_fingerprints(modules_json: Path) -> Dict[str, str]:
+    """The fingerprints of the modules in a modules.json report, as module name: crc"""
+    try:
+        report = json.loads(modules_json.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return {m["module"]: m["crc"] for m in report.get("modules", []) if m.get("crc")}
+
+
+def copy_fingerprints(
+    mcu: MPRemoteBoard, dest: Path, mount_vfs: bool = True, previous: Optional[Path] = None, skip_unchanged: bool = True
+) -> int:
+    """
+    Provide the fingerprints of the modules in the previous stubs to createstubs as `modulelist.crc`.
+    createstubs does not stub the modules with the same fingerprint, and marks these as unchanged in modules.json.
+    Without previous stubs the list is empty, so that all modules are stubbed and fingerprinted for the next run.
+    Without skip_unchanged any previous list is removed, and createstubs does not fingerprint the modules.
+
+    Returns:
+        int: The number of fingerprints.
+    """
+    crc_file = dest / FINGERPRINTS
+    fingerprints = report_fingerprints(previous / "modules.json") if previous and skip_unchanged else {}
+    if skip_unchanged:
+        lines = "".join(f"{module} {crc}\n" for module, crc in fingerprints.items())
+        crc_file.write_text(f"# fingerprints of the previous stubs\n{lines}", encoding="utf-8")
+        if fingerprints:
+            log.info(f"Found the fingerprints of {len(fingerprints)} modules in {previous}")
+    else:
+        crc_file.unlink(missing_ok=True)
+    if not mount_vfs:
+        if skip_unchanged:
+            mcu.run_command(["cp", str(crc_file), f":{FINGERPRINTS}"], timeout=10)
+        else:
+            mcu.run_command(["rm", f":{FINGERPRINTS}"], log_errors=False)
+    return len(fingerprints)
+
+
+def read_modulelist() -> List[str]:
+    """The modules to stub, from the modulelist.txt that is installed with createstubs"""
+    lines = (HERE.parent / "board" / "modulelist.txt").read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def copy_schedule(
+    mcu: MPRemoteBoard, dest: Path, mount_vfs: bool = True, previous: Optional[Path] = None, crashed: Optional[List[str]] = None
+) -> int:
+    """
+    Schedule the modules in modulelist.txt by the cost table of the previous stubs, and provide the schedule to createstubs_db
+    as `modulelist.sched`. Without a previous cost table, any previous schedule is removed so that modulelist.txt is used.
+    The modules that are known to crash, in the previous stubs or in `crashed`, are skipped.
+
+    Returns:
+        int: The number of modules with a known cost, or that are known to crash.
+    """
+    sched_file = dest / SCHEDULE_FILE
+    table = load_cost_table(previous / PROFILE_FILE) if previous else []
+    crashed = sorted(set(load_crashed(previous / PROFILE_FILE) if previous else []) | set(crashed or []))
+    if table or crashed:
+        modules = read_modulelist()
+        write_schedule(sched_file, schedule_modules(modules, table, crashed))
+        log.info(f"Scheduled {len(modules)} modules by the cost of {len(table)} modules, skipping {len(crashed)} modules")
+    else:
+        sched_file.unlink(missing_ok=True)
+    if not mount_vfs:
+        if table or crashed:
+            mcu.run_command(["cp", str(sched_file), f":{SCHEDULE_FILE}"], timeout=10)
+        else:
+            mcu.run_command(["rm", f":{SCHEDULE_FILE}"], log_errors=False)
+    return len(table) + len(crashed)
+
+
+def read_crashed(mcu: MPRemoteBoard, dest: Path, mount_vfs: bool = True) -> List[str]:
+    """Read and remove the list of modules that createstubs_db could not stub on a clean heap"""
+    crash_file = dest / CRASH_FILE
+    if mount_vfs:
+        lines = crash_file.read_text(encoding="utf-8").splitlines() if crash_file.exists() else []
+        crash_file.unlink(missing_ok=True)
+    else:
+        rc, lines = mcu.run_command(["cat", f":{CRASH_FILE}"], log_errors=False)
+        lines = lines if rc == OK else []
+        mcu.run_command(["rm", f":{CRASH_FILE}"], log_errors=False)
+    crashed = sorted({line.strip() for line in lines if line.strip()})
+    if crashed:
+        log.warning(f"Modules that ran out of memory: {', '.join(crashed)}")
+    return crashed
+
+
+def firmware_path() -> Path:
+    return CONFIG.repo_path / FIRMWARE_FILE
+
+
+def firmware_record(mcu: MPRemoteBoard) -> dict:
+    """The record of the firmware of this board: the folder of its stubs, and the modules that crash createstubs"""
+    key = firmware_key(mcu)
+    return load_cache(firmware_path()).get(key, {}) if key else {}
+
+
+def update_firmware_record(mcu: MPRemoteBoard, folder: str = "", crashed: Optional[List[str]] = None) -> Optional[Path]:
+    """Set the folder of the stubs, and add crashed modules to the record of the firmware of this board"""
+    if not (key := firmware_key(mcu)):
+        return None
+    with _firmware_lock:
+        path = firmware_path()
+        records = load_cache(path)
+        record = records.setdefault(key, {})
+        if folder:
+            record["folder"] = folder
+        if crashed:
+            record["crashed"] = sorted(set(record.get("crashed", [])) | set(crashed))
+        return save_cache(path, records)
+
+
+def recorded_crashed(mcu: MPRemoteBoard) -> List[str]:
+    """The modules that crashed createstubs in an earlier run on the firmware of this board"""
+    return firmware_record(mcu).get("crashed", [])
+
+
+def record_crashed(mcu: MPRemoteBoard, modules: List[str]) -> Optional[Path]:
+    """
+    Add modules to the crashed modules of the firmware of this board, also when there are no stubs yet.
+    The record is kept next to the board cache, as a folder in the stubs repo without stubs would be merged and published.
+    The next run of createstubs_db skips these modules.
+    """
+    return update_firmware_record(mcu, crashed=modules)
+
+
 def install_scripts_to_board(mcu: MPRemoteBoard, form: Form):
     """
-    Copy scripts to the board.
+    Copy scripts to the board, unless the board has the same scripts installed.
+    The scripts are installed from the board folder of this package, rather than from github.
+    After an install the hash of the package is written to /lib/createstubs.sha on the board.
 
     Args:
         mcu (str): The microcontroller unit.
@@ -238,9 +700,58 @@ def install_scripts_to_board(mcu: MPRemoteBoard, form: Form):
         location = "pkg_minified.json"
     else:
         location = "pkg_full.json"
-    location = f"{HERE.parent.absolute().as_posix()}/board/{location}"
-    log.info(f"Installing {location} to {mcu.serialport} {mcu.description}")
-    return mcu.mip_install(location)
+    package = HERE.parent.absolute() / "board" / location
+    # skip the transfer if the board has the same scripts from an earlier run
+    sha = package_hash(package)
+    if sha and read_install_marker(mcu) == sha:
+        log.info(f"createstubs {sha} is already installed on {mcu.serialport} {mcu.description}")
+        return True
+    with TemporaryDirectory(prefix="createstubs") as temp:
+        if sha:
+            # mip installs the same scripts that are hashed
+            package = local_package(package, Path(temp))
+        log.info(f"Installing {package} to {mcu.serialport} {mcu.description}")
+        if not mcu.mip_install(package.as_posix()):
+            return False
+    if sha:
+        mcu.run_command(["exec", f"with open('{INSTALL_MARKER}', 'w') as f: f.write('{sha}')"], timeout=5)
+    return True
+
+
+def package_scripts(package: Path) -> List[Tuple[str, Path]]:
+    """The target names and the local files of the board scripts of a mip package json, the urls refer to github"""
+    urls = json.loads(package.read_text(encoding="utf-8")).get("urls", [])
+    return [(target, package.parent / url.split("/")[-1]) for target, url in urls]
+
+
+def package_hash(package: Path) -> str:
+    """A hash of a mip package json and of the board scripts that it installs, empty if the package or a script cannot be read"""
+    try:
+        sha = hashlib.sha256(package.read_bytes())
+        for target, script in package_scripts(package):
+            sha.update(target.encode("utf-8"))
+            sha.update(script.read_bytes())
+    except (OSError, ValueError) as e:
+        log.debug(f"Could not hash {package}: {e}")
+        return ""
+    return sha.hexdigest()[:16]
+
+
+def local_package(package: Path, folder: Path) -> Path:
+    """A copy of a mip package json and its board scripts in folder, that mip installs from the local files"""
+    urls = []
+    for target, script in package_scripts(package):
+        shutil.copyfile(script, folder / target)
+        urls.append([target, target])
+    local = folder / "package.json"
+    local.write_text(json.dumps({"urls": urls, "version": json.loads(package.read_text(encoding="utf-8")).get("version", "")}))
+    return local
+
+
+def read_install_marker(mcu: MPRemoteBoard) -> str:
+    """The hash of the createstubs scripts that were installed on the board, empty if there is none"""
+    rc, lines = mcu.run_command(["cat", f":{INSTALL_MARKER}"], timeout=5, log_errors=False)
+    return lines[0].strip() if rc == OK and lines else ""
 
 
 def get_stubfolder(out: List[str]):
@@ -280,6 +791,8 @@ def copy_to_repo(source: Path, fw: dict) -> Optional[Path]:
     destination = CONFIG.stub_path / board_folder_name(fw)
     try:
         if destination.exists() and destination.is_dir():
+            # keep the stubs of the modules that did not change
+            reuse_unchanged(source, destination)
             # first clean the destination folder
             shutil.rmtree(destination)
         # copy all files and folder from the source to the destination
@@ -290,6 +803,47 @@ def copy_to_repo(source: Path, fw: dict) -> Optional[Path]:
         return None
 
 
+def reuse_unchanged(source: Path, previous: Path) -> int:
+    """
+    Copy the stubs of the modules that createstubs marked as unchanged from the previous stubs,
+    and keep their depth and profile from the previous report.
+    An unchanged module without a previous stub loses its fingerprint, so it is stubbed in the next run.
+
+    Returns:
+        int: The number of reused stubs.
+    """
+    report_path = source / "modules.json"
+    try:
+        report = json.loads(report_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return 0
+    try:
+        old_report = json.loads((previous / "modules.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        old_report = {}
+    old_modules = {m["module"]: m for m in old_report.get("modules", [])}
+    unchanged = [m for m in report.get("modules", []) if m.get("unchanged")]
+    reused = 0
+    for module in unchanged:
+        stub = Path(*module["module"].split(".")).with_suffix(".pyi")
+        old = old_modules.get(module["module"])
+        if old and (previous / stub).exists():
+            (source / stub).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(previous / stub, source / stub)
+            for key in ("depth", "profile"):
+                if key in old:
+                    module[key] = old[key]
+            reused += 1
+        else:
+            log.warning(f"No previous stub for unchanged module {module['module']}")
+            module.pop("crc", None)
+            module.pop("unchanged", None)
+    if unchanged:
+        report_path.write_text(json.dumps(report, indent=4), encoding="utf-8")
+        log.info(f"Reused {reused} stubs of unchanged modules from {previous}")
+    return reused
+
+
 def stub_connected_mcus(
     variant: str,
     format: str,
@@ -297,6 +851,14 @@ def stub_connected_mcus(
     serial: List[str],
     ignore: List[str],
     bluetooth: bool,
+    stream: bool = False,
+    profile: bool = False,
+    skip_unchanged: bool = True,
+    schedule: bool = True,
+    compress: bool = True,
+    workers: int = 0,
+    cache: bool = True,
+    skip_known: bool = False,
 ) -> int:
     """
     Runs the stubber to generate stubs for connected MicroPython boards.
@@ -305,6 +867,10 @@ def stub_connected_mcus(
         variant (str): The variant of the createstubs script.
         format (str): The format of the createstubs script.
         debug (bool): Flag indicating whether to enable debug mode.
+        workers (int): The number of boards to stub at the same time, 0 for all boards.
+        cache (bool): Only probe the boards that changed since the previous run, otherwise probe all boards.
+        skip_known (bool): Skip the boards with firmware that is already in the stubs repo,
+            rather than only merging and building the stubs of these boards.
 
     Returns:
         None
@@ -316,13 +882,11 @@ def stub_connected_mcus(
         set_loglevel(0)
     variant = Variant(variant.lower())
     form = Form(format.lower())
-    tempdir = mkdtemp(prefix="board_stubber")
-    temp_path = Path(tempdir)
 
     all_built = []
 
     # scan boards and just work with the ones that respond with understandable data
-    connected_mcus = list_mcus(ignore=ignore, include=serial, bluetooth=bluetooth)
+    connected_mcus = list_cached_mcus(ignore=ignore, include=serial, bluetooth=bluetooth, refresh=not cache)
     # ignore boards that have the [micropython-stubber] ignore flag set
     connected_mcus = [item for item in connected_mcus if not (item.toml.get("micropython-stubber", {}).get("ignore", False))]
 
@@ -332,50 +896,151 @@ def stub_connected_mcus(
 
     show_mcus(connected_mcus, refresh=False)
 
-    # scan boards and generate stubs
-    for board in connected_mcus:
+    # the boards are stubbed in parallel, and the stubs of a board are processed on the host while the boards continue.
+    # Only the stubs repo and the packages are updated one board at the time
+    repo_lock = threading.Lock()
+    # a board waits for a place in the host queue, rather than piling up stubs faster than the host can process them
+    host_queue = threading.BoundedSemaphore(HOST_QUEUE)
+    timings: Dict[str, Dict[str, float]] = {board.serialport: {} for board in connected_mcus}
+    # the duration of each run of createstubs on a board
+    attempts: Dict[str, List[float]] = {board.serialport: [] for board in connected_mcus}
+    # the boards with firmware that is already in the stubs repo, and that are skipped
+    skipped: List[str] = []
+
+    def stub_board(board: MPRemoteBoard) -> Optional[Future]:
+        # a profile needs a new run of createstubs
+        if not profile and (firmware := known_firmware(board)):
+            board.firmware = firmware
+            if skip_known:
+                log.info(f"Skipping {board.serialport}, the stubs of {board.port}-{board.board} {board.version} are in the repo")
+                skipped.append(board.serialport)
+                return None
+            log.info(f"The stubs of {board.port}-{board.board} {board.version} are in the repo, only merging and building")
+            host_queue.acquire()
+            return host_executor.submit(process_board, board, None)
         log.info(f"Connecting using {board.serialport} to {board.port} {board.board} {board.version}: {board.description}")
-        # remove the modulelist.done file before starting createstubs on each board
-        (temp_path / "modulelist.done").unlink(missing_ok=True)
+        # each board has its own temp folder, with its own modulelist.done, removed once its stubs are published
+        temp = TemporaryDirectory(prefix="board_stubber")
+        temp_path = Path(temp.name)
+        start = time.perf_counter()
+        try:
+            rc, my_stubs = generate_board_stubs(
+                temp_path,
+                board,
+                variant,
+                form,
+                stream=stream,
+                profile=profile,
+                skip_unchanged=skip_unchanged,
+                schedule=schedule,
+                compress=compress,
+                post_process=False,
+                attempts=attempts[board.serialport],
+            )
+        except Exception as e:
+            # do not stop stubbing the other boards
+            log.error(f"Error stubbing {board.serialport}: {e}")
+            rc, my_stubs = ERROR, None
+        timings[board.serialport]["board"] = time.perf_counter() - start
+        if rc != OK or not my_stubs:
+            if rc != OK:
+                log.error(f"Failed to generate stubs for {board.serialport}")
+            temp.cleanup()
+            return None
+        log.success(f"Stubs generated for {board.firmware['port']}-{board.firmware['board']}")
+        host_queue.acquire()
+        return host_executor.submit(process_board, board, my_stubs, temp)
 
-        rc, my_stubs = generate_board_stubs(temp_path, board, variant, form)
-        if rc != OK:
-            log.error(f"Failed to generate stubs for {board.serialport}")
-            continue
-        if my_stubs:
-            log.success(f"Stubs generated for {board.firmware['port']}-{board.firmware['board']}")
-            if destination := copy_to_repo(my_stubs, board.firmware):
-                log.success(f"Stubs copied to {destination}")
-                # Also merge the stubs with the docstubs
-                log.info(f"Merging stubs with docstubs : {board.firmware}")
-
-                merged = merge_all_docstubs(
-                    versions=board.firmware["version"],
-                    family=board.firmware["family"],
-                    boards=board.firmware["board"],
-                    ports=board.firmware["port"],
-                )
-                if not merged:
-                    log.error(f"Failed to merge stubs for {board.serialport}")
-                    continue
-                # Then Build the package
-                log.info(f"Building package for {board.firmware}")
-                built = build_multiple(
-                    versions=board.firmware["version"],
-                    family=board.firmware["family"],
-                    boards=board.firmware["board"],
-                    ports=board.firmware["port"],
-                )
-                all_built.extend(built)
+    def process_board(board: MPRemoteBoard, my_stubs: Optional[Path], temp: Optional[TemporaryDirectory] = None) -> List:
+        try:
+            if my_stubs:
+                start = time.perf_counter()
+                post_process_stubs(my_stubs)
+                timings[board.serialport]["post"] = time.perf_counter() - start
+            with repo_lock:
+                start = time.perf_counter()
+                built = publish_board_stubs(my_stubs, board) if my_stubs else merge_and_build(board)
+                timings[board.serialport]["publish"] = time.perf_counter() - start
+            return built
+        except Exception as e:
+            log.error(f"Error processing the stubs of {board.serialport}: {e}")
+            return []
+        finally:
+            host_queue.release()
+            if temp:
+                temp.cleanup()
+
+    with ThreadPoolExecutor(max_workers=HOST_WORKERS, thread_name_prefix="host") as host_executor:
+        with ThreadPoolExecutor(max_workers=workers or len(connected_mcus), thread_name_prefix="board") as board_executor:
+            processing = list(board_executor.map(stub_board, connected_mcus))
+        for future in processing:
+            if future:
+                all_built.extend(future.result())
+    print_timing_table(timings, attempts=attempts)
 
     if all_built:
         print_result_table(all_built)
         log.success("Done")
         return OK
-    log.error(f"Failed to generate stubs for {board.serialport}")
+    if skipped and len(skipped) == len(connected_mcus):
+        log.success("The stubs of all boards are in the repo")
+        return OK
+    log.error("Failed to generate stubs for the connected boards")
     return ERROR
 
 
+def publish_board_stubs(my_stubs: Path, board: MPRemoteBoard) -> List:
+    """Copy the stubs of a board to the stubs repo, merge them with the docstubs and build the package"""
+    if not (destination := copy_to_repo(my_stubs, board.firmware)):
+        return []
+    # the next run finds the stubs of this firmware by the folder name, rather than from the board
+    update_firmware_record(board, folder=destination.name)
+    log.success(f"Stubs copied to {destination}")
+    return merge_and_build(board)
+
+
+def merge_and_build(board: MPRemoteBoard) -> List:
+    """Merge the stubs of a board in the stubs repo with the docstubs, and build the package"""
+    # Also merge the stubs with the docstubs
+    log.info(f"Merging stubs with docstubs : {board.firmware}")
+
+    merged = merge_all_docstubs(
+        versions=board.firmware["version"],
+        family=board.firmware["family"],
+        boards=board.firmware["board"],
+        ports=board.firmware["port"],
+    )
+    if not merged:
+        log.error(f"Failed to merge stubs for {board.serialport}")
+        return []
+    # Then Build the package
+    log.info(f"Building package for {board.firmware}")
+    return build_multiple(
+        versions=board.firmware["version"],
+        family=board.firmware["family"],
+        boards=board.firmware["board"],
+        ports=board.firmware["port"],
+    )
+
+
+def print_timing_table(
+    timings: Dict[str, Dict[str, float]], console: Optional[Console] = None, attempts: Optional[Dict[str, List[float]]] = None
+):
+    """Print the time each board spent in each stage, and in each run of createstubs"""
+    if not console:
+        console = Console()
+    attempts = attempts or {}
+    table = Table(title="Timing (seconds)")
+    table.add_column("Board", style="cyan")
+    for stage in ("Board", "Post", "Publish"):
+        table.add_column(stage, justify="right", style="green")
+    table.add_column("Runs", style="green")
+    for serialport, stages in timings.items():
+        runs = ", ".join(f"{run:.1f}" for run in attempts.get(serialport, [])) or "-"
+        table.add_row(serialport, *(f"{stages[stage]:.1f}" if stage in stages else "-" for stage in ("board", "post", "publish")), runs)
+    console.print(table)
+
+
 def print_result_table(all_built: List, console: Optional[Console] = None):
     if not console:
         console = Console()
@@ -0,0 +1,265 @@
+"""
+Create the stubs of a board from the host, without installing createstubs on the board.
+
+A small helper is pasted to the board over the raw REPL, and stays resident while the board is not reset.
+For each module the helper prints a listing of the members, one line per member:
+    <depth>\t<name>\t<type as text>\t<repr of the value>
+The stubs are formatted on the host, in the same way as createstubs formats them on the board.
+"""
+
+import json
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Protocol
+
+from mpflash.logger import log
+from mpflash.mpremoteboard import MPRemoteBoard
+from mpremote.transport import TransportError, TransportExecError
+from mpremote.transport_serial import SerialTransport
+
+from stubber import __version__
+from stubber.publish.pathnames import board_folder_name
+
+MAX_CLASS_LEVEL = 2  # the same class nesting as createstubs
+MIN_STUBS = 10  # fewer stubs mean that the board was lost, as in generate_board_stubs
+END = "##END##"
+NOT_FOUND = "##NONE##"
+
+# MicroPython code, walks the members in the same order as Stubber.iter_obj_attributes in createstubs
+HELPER = """
+import gc
+
+
+def _stb_walk(o, d):
+    for b in (1, 2, 3, 4):
+        for n in dir(o):
+            if n.startswith("__"):
+                continue
+            try:
+                v = getattr(o, n)
+            except AttributeError:
+                continue
+            t = repr(type(v))
+            try:
+                k = t.split("'")[1]
+            except IndexError:
+                k = ""
+            if k in {"int", "float", "str", "bool", "tuple", "list", "dict"}:
+                k = 1
+            elif k in {"function", "method"}:
+                k = 2
+            elif k in ("class"):
+                k = 3
+            else:
+                k = 4
+            if k != b:
+                continue
+            if t in ("<class 'module'>", "<class 'dict'>", "<class 'list'>", "<class 'tuple'>"):
+                print("{}\\t{}\\t{}\\t".format(d, n, t))
+            else:
+                print("{}\\t{}\\t{}\\t{}".format(d, n, t, repr(v).replace("\\n", " ")))
+            if t == "<class 'type'>" and d <= 2 and n[-5:] != "Error" and n[-9:] != "Exception":
+                _stb_walk(v, d + 1)
+
+
+def _stb(m):
+    gc.collect()
+    try:
+        o = __import__(m, None, None, ("*",))
+    except ImportError:
+        print("##NONE##")
+        return
+    _stb_walk(o, 0)
+    del o
+    gc.collect()
+    print("##END##")
+"""
+
+
+class Repl(Protocol):
+    """The raw REPL of a board, such as mpremote's SerialTransport"""
+
+    def exec(self, command, data_consumer=None) -> bytes: ...
+
+
+class Member(NamedTuple):
+    """A member of a module or class, as listed by the helper"""
+
+    name: str
+    type_txt: str
+    value: str
+    members: List["Member"]
+
+
+def parse_listing(lines: Iterable[str]) -> List[Member]:
+    """Build the tree of members from the lines that the helper printed"""
+    root: List[Member] = []
+    # the members of the last class at each depth
+    stack = [root]
+    for line in lines:
+        fields = line.rstrip("\r").split("\t", 3)
+        if len(fields) != 4 or not fields[0].isdigit():
+            continue
+        depth = int(fields[0])
+        if depth >= len(stack):
+            log.warning(f"Skipping member without a class: {line}")
+            continue
+        del stack[depth + 1 :]
+        member = Member(fields[1], fields[2], fields[3], [])
+        stack[depth].append(member)
+        stack.append(member.members)
+    return root
+
+
+def write_members(out: List[str], members: List[Member], indent: str = "", in_class: int = 0) -> None:
+    """Write the stub of the members, in the same way as Stubber.write_object_stub in createstubs"""
+    for m in members:
+        if m.name in ["classmethod", "staticmethod", "BaseException", "Exception"]:
+            # do not create stubs for these primitives
+            continue
+        if m.name[0].isdigit():
+            log.warning(f"NameError: invalid name {m.name}")
+            continue
+        if m.type_txt == "<class 'type'>" and len(indent) <= MAX_CLASS_LEVEL * 4:
+            is_exception = (
+                m.name.endswith("Exception") or m.name.endswith("Error") or m.name in ["KeyboardInterrupt", "StopIteration", "SystemExit"]
+            )
+            out.append(f"\n{indent}class {m.name}({'Exception' if is_exception else ''}):\n")
+            if is_exception:
+                out.append(f"{indent}    ...\n")
+                continue
+            write_members(out, m.members, indent + "    ", in_class + 1)
+            out.append(f"{indent}    def __init__(self, *argv, **kwargs) -> None:\n{indent}        ...\n\n")
+        elif any(word in m.type_txt for word in ["method", "function", "closure"]):
+            if "bound_method" in m.type_txt or "bound_method" in m.value:
+                out.append(f"{indent}@classmethod\n{indent}def {m.name}(cls, *args, **kwargs) -> Incomplete:\n")
+            else:
+                first = "self, " if in_class > 0 else ""
+                out.append(f"{indent}def {m.name}({first}*args, **kwargs) -> Incomplete:\n")
+            out.append(f"{indent}    ...\n\n")
+        elif m.type_txt == "<class 'module'>":
+            # Skip imported modules
+            pass
+        elif m.type_txt.startswith("<class '"):
+            t = m.type_txt[8:-2]
+            if t in ("str", "int", "float", "bool", "bytearray", "bytes"):
+                out.append(
+                    f"{indent}{m.name}: Final[{t}] = {m.value}\n" if m.name.upper() == m.name else f"{indent}{m.name}: {t} = {m.value}\n"
+                )
+            elif t in ("dict", "list", "tuple"):
+                out.append(f"{indent}{m.name}: {t} = {dict(dict='{}', list='[]', tuple='()')[t]}\n")
+            elif t in ("object", "set", "frozenset", "Pin"):
+                out.append(f"{indent}{m.name}: {t} ## = {m.value}\n")
+            elif t == "generator":
+                out.append(f"{indent}def {m.name}(*args, **kwargs) -> Generator:  ## = {m.value}\n{indent}    ...\n\n")
+            else:
+                value = m.value.split(" at ")[0] + " at ...>" if " at " in m.value else m.value
+                out.append(f"{indent}{m.name}: Incomplete ## {m.type_txt} = {value}\n")
+        else:
+            out.append(f"# all other, type = '{m.type_txt}'\n{indent}{m.name} # type: Incomplete\n")
+
+
+def format_stub(module: str, members: List[Member], firmware: dict) -> str:
+    """The stub of a module, with the same header as createstubs"""
+    out = [
+        f'"""\nModule: \'{module}\' on {board_folder_name(firmware)}\n"""\n',
+        f"# MCU: {firmware}\n# Stubber: {__version__}\n",
+        "from __future__ import annotations\nfrom typing import Any, Final, Generator\nfrom _typeshed import Incomplete\n\n",
+    ]
+    write_members(out, members)
+    return "".join(out)
+
+
+def helper_missing(e: TransportExecError) -> bool:
+    """True if the board raised a NameError for the helper, rather than an error while running it"""
+    lines = e.error_output.strip().splitlines()
+    return bool(lines) and lines[-1].startswith("NameError") and "'_stb'" in lines[-1]
+
+
+class ReplStubber:
+    """
+    Stub the modules of a board over its raw REPL.
+    Only the helper is sent to the board, the stubs are formatted and written on the host.
+    """
+
+    def __init__(self, repl: Repl, firmware: dict):
+        self.repl = repl
+        self.firmware = firmware
+        self.installed = False
+
+    def install_helper(self):
+        self.repl.exec(HELPER)
+        self.installed = True
+
+    def list_module(self, module: str) -> Optional[List[Member]]:
+        """The members of a module, or None if the module is not available on the board"""
+        if not self.installed:
+            self.install_helper()
+        try:
+            out = self.repl.exec(f"_stb({module!r})")
+        except TransportExecError as e:
+            if not helper_missing(e):
+                raise
+            # the board was reset since the helper was installed
+            self.install_helper()
+            out = self.repl.exec(f"_stb({module!r})")
+        lines = out.decode("utf-8", errors="replace").splitlines()
+        if NOT_FOUND in lines:
+            return None
+        if END not in lines:
+            log.warning(f"Incomplete listing of module {module}")
+            return None
+        return parse_listing(lines)
+
+    def create_all_stubs(self, modules: Iterable[str], dest: Path) -> Path:
+        """Write the stubs of the modules that are available on the board, and a modules.json report"""
+        path = dest / board_folder_name(self.firmware)
+        path.mkdir(parents=True, exist_ok=True)
+        report = []
+        for module in modules:
+            module = module.replace("/", ".")
+            try:
+                members = self.list_module(module)
+            except TransportExecError as e:
+                # an error on the board, such as running out of memory, a lost connection is raised
+                log.warning(f"Could not list module {module}: {e.error_output.strip()}")
+                continue
+            if members is None:
+                continue
+            stub_file = path / (module.replace(".", "/") + ".pyi")
+            stub_file.parent.mkdir(parents=True, exist_ok=True)
+            stub_file.write_text(format_stub(module, members, self.firmware), encoding="utf-8")
+            log.info(f"Stub module: {module:<25} to file: {stub_file.name}")
+            report.append({"module": module, "file": stub_file.relative_to(dest).as_posix()})
+        modules_json = {"firmware": self.firmware, "stubber": {"version": __version__}, "stubtype": "firmware", "modules": report}
+        (path / "modules.json").write_text(json.dumps(modules_json, indent=4), encoding="utf-8")
+        return path
+
+
+def stub_over_repl(mcu: MPRemoteBoard, dest: Path, modules: Iterable[str]) -> Optional[Path]:
+    """
+    Stub a board over its serial port, after a soft reset to start with a clean heap.
+    Returns the folder with the stubs, or None if the board could not be reached, or was lost while stubbing.
+    """
+    firmware = {key: getattr(mcu, key) for key in ("family", "version", "port", "board", "cpu", "arch", "mpy", "build")}
+    try:
+        transport = SerialTransport(mcu.serialport, baudrate=115200)
+    except TransportError as e:
+        log.error(f"Could not connect to {mcu.serialport}: {e}")
+        return None
+    try:
+        transport.enter_raw_repl(soft_reset=True)
+        path = ReplStubber(transport, firmware).create_all_stubs(modules, dest)
+    except TransportError as e:
+        log.error(f"Lost the REPL of {mcu.serialport}: {e}")
+        return None
+    finally:
+        try:
+            transport.exit_raw_repl()
+        except (TransportError, OSError) as e:
+            # the port may be gone with the board
+            log.debug(f"Could not leave the raw REPL of {mcu.serialport}: {e}")
+        transport.close()
+    if (stubbed := len(list(path.rglob("*.pyi")))) < MIN_STUBS:
+        log.error(f"Error stubbing {mcu.serialport} over the REPL, too few (<{MIN_STUBS}) stubs were generated: {stubbed}")
+        return None
+    return path
@@ -0,0 +1,38 @@
+"""
+Decompress the stubs that createstubs writes as gzip, to reduce the transfer from the board to the host.
+
+createstubs compresses the stub files to `<module>.pyi.gz` when the board has a `compress_stubber.txt` file,
+and the firmware can compress: deflate on MicroPython 1.21+, with its compressor enabled.
+Boards that cannot compress write plain `.pyi` files, so a folder may contain both.
+"""
+
+import gzip
+import zlib
+from pathlib import Path
+from typing import List
+
+from mpflash.logger import log
+
+COMPRESS_FLAG = "compress_stubber.txt"
+
+
+def decompress_stubs(path: Path) -> List[Path]:
+    """
+    Decompress all `.gz` files below path, and remove the compressed files.
+    A corrupt file is logged and left in place.
+    Returns the decompressed files.
+    """
+    files: List[Path] = []
+    for gz in sorted(path.rglob("*.gz")):
+        try:
+            data = gzip.decompress(gz.read_bytes())
+        except (OSError, EOFError, zlib.error) as e:
+            log.error(f"Could not decompress {gz}: {e}")
+            continue
+        target = gz.with_suffix("")
+        target.write_bytes(data)
+        gz.unlink()
+        files.append(target)
+    if files:
+        log.debug(f"Decompressed {len(files)} stubs in {path}")
+    return files
@@ -0,0 +1,40 @@
+"""
+Join the stubs of large modules that createstubs writes in parts, to a single stub file per module.
+
+createstubs_lvgl stubs `lvgl` in numbered parts, to limit the memory that is needed on the board:
+    stubs/<firmware>/lvgl.pyi.parts/0000.pyi  (the module header)
+    stubs/<firmware>/lvgl.pyi.parts/0001.pyi  (the members before the first class)
+    stubs/<firmware>/lvgl.pyi.parts/0002.pyi  (a single class)
+    ...
+"""
+
+import shutil
+from pathlib import Path
+from typing import List
+
+from mpflash.logger import log
+
+PARTS_SUFFIX = ".parts"
+
+
+def join_stub_parts(path: Path, keep: bool = False) -> List[Path]:
+    """
+    Join the parts in all `<stub file>.parts` folders below path, in the order of their names.
+
+    The parts folders are removed after joining, unless keep is set.
+    Returns the joined stub files.
+    """
+    joined: List[Path] = []
+    for folder in sorted(path.rglob(f"*{PARTS_SUFFIX}")):
+        if not folder.is_dir():
+            continue
+        parts = sorted(p for p in folder.iterdir() if p.is_file())
+        target = folder.with_name(folder.name[: -len(PARTS_SUFFIX)])
+        with open(target, "wb") as out:
+            for part in parts:
+                out.write(part.read_bytes())
+        log.debug(f"Joined {len(parts)} parts to {target}")
+        if not keep:
+            shutil.rmtree(folder)
+        joined.append(target)
+    return joined
@@ -0,0 +1,118 @@
+"""
+Aggregate the import cost that createstubs records per module into a cost table for the firmware.
+
+createstubs adds a `profile` to each module in modules.json when the board has a `profile_stubber.txt` file:
+    {"import_ms": 12, "mem_before": 90000, "mem_import": 85000, "mem_after": 89000, "mem_min": 80000, "size": 2345}
+
+The cost table of the previous run of a firmware is used to schedule the modules for createstubs_db, in `modulelist.sched`:
+    <module> <memory needed>
+The modules that need the most memory are stubbed first, and createstubs_db resets the board before a module
+that needs more memory than is free. Modules that are known to crash are listed with -1, and are skipped.
+"""
+
+import json
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from mpflash.logger import log
+from rich.console import Console
+from rich.table import Table
+
+PROFILE_FLAG = "profile_stubber.txt"
+PROFILE_FILE = "profile.json"
+SCHEDULE_FILE = "modulelist.sched"
+CRASH_FILE = "modulelist.crash"
+
+
+class ModuleCost(NamedTuple):
+    """The cost of stubbing a single module"""
+
+    module: str
+    import_ms: int
+    import_mem: int  # memory used by importing the module
+    peak_mem: int  # the highest memory use while writing the stub
+    retained_mem: int  # memory not freed after the stub was written
+    size: int  # size of the stub file
+
+    @property
+    def cost(self) -> int:
+        return self.peak_mem
+
+
+def cost_table(modules_json: dict) -> List[ModuleCost]:
+    """The cost of the profiled modules in the report, the most expensive first"""
+    table: List[ModuleCost] = []
+    for module in modules_json.get("modules", []):
+        profile = module.get("profile")
+        if not profile:
+            continue
+        before = profile.get("mem_before", 0)
+        table.append(
+            ModuleCost(
+                module=module["module"],
+                import_ms=profile.get("import_ms", 0),
+                import_mem=before - profile.get("mem_import", before),
+                peak_mem=before - profile.get("mem_min", before),
+                retained_mem=before - profile.get("mem_after", before),
+                size=profile.get("size", 0),
+            )
+        )
+    return sorted(table, key=lambda m: (m.cost, m.import_ms), reverse=True)
+
+
+def save_cost_table(path: Path, firmware: dict, table: List[ModuleCost], crashed: Iterable[str] = ()) -> Path:
+    """Save the cost table of a firmware as json, together with the modules that are known to crash"""
+    data = {"firmware": firmware, "modules": [m._asdict() for m in table], "crashed": sorted(set(crashed))}
+    path.write_text(json.dumps(data, indent=4), encoding="utf-8")
+    log.debug(f"Saved the cost of {len(table)} modules to {path}")
+    return path
+
+
+def load_cost_table(path: Path) -> List[ModuleCost]:
+    """Load a saved cost table, returns an empty table if there is none"""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return [ModuleCost(**m) for m in data.get("modules", [])]
+    except (OSError, ValueError, TypeError) as e:
+        log.debug(f"No cost table in {path}: {e}")
+        return []
+
+
+def load_crashed(path: Path) -> List[str]:
+    """Load the modules that are known to crash from a saved cost table"""
+    try:
+        return list(json.loads(path.read_text(encoding="utf-8")).get("crashed", []))
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+def schedule_modules(modules: List[str], table: List[ModuleCost], crashed: Iterable[str] = ()) -> List[Tuple[str, int]]:
+    """
+    Order the modules to stub by the memory they need, the most first while the heap is not yet fragmented.
+    The modules without a known cost follow in their original order.
+    Returns (module, memory needed) for each module, with -1 for the modules that are known to crash.
+    """
+    # modulelist.txt lists nested modules as `package/module`, the report as `package.module`
+    need = {m.module.replace("/", "."): m.cost for m in table}
+    need.update((module.replace("/", "."), -1) for module in crashed)
+    schedule = [(module, need.get(module.replace("/", "."), 0)) for module in modules]
+    return sorted(schedule, key=lambda m: max(m[1], 0), reverse=True)
+
+
+def write_schedule(path: Path, schedule: List[Tuple[str, int]]) -> Path:
+    """Write the scheduled modules for createstubs, a module and the memory it needs per line"""
+    path.write_text("".join(f"{module} {need}\n" for module, need in schedule), encoding="utf-8")
+    return path
+
+
+def print_cost_table(table: List[ModuleCost], console: Optional[Console] = None, top: int = 20):
+    """Print the most expensive modules"""
+    if not console:
+        console = Console()
+    rich_table = Table(title=f"Module cost (top {min(top, len(table))} of {len(table)})")
+    rich_table.add_column("Module", style="cyan")
+    for column in ("Import ms", "Import mem", "Peak mem", "Retained mem", "Size"):
+        rich_table.add_column(column, justify="right", style="green")
+    for m in table[:top]:
+        rich_table.add_row(m.module, str(m.import_ms), str(m.import_mem), str(m.peak_mem), str(m.retained_mem), str(m.size))
+    console.print(rich_table)
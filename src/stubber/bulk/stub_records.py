@@ -0,0 +1,150 @@
+"""
+Render the binary stub records written by createstubs_bin.py to .pyi files.
+
+Each record consists of a 6 byte header:
+    kind, level, len(name), len(type), len(value) as 16 bit little endian
+followed by the utf-8 encoded name, type and value.
+"""
+
+import json
+from pathlib import Path
+from typing import Iterator, List, NamedTuple
+
+from mpflash.logger import log
+
+R_MODULE = ord("M")
+R_CLASS = ord("C")
+R_EXCEPTION = ord("E")
+R_INCOMPLETE = ord("c")
+R_FUNCTION = ord("F")
+R_CLASSMETHOD = ord("B")
+R_VALUE = ord("V")
+R_OTHER = ord("X")
+
+_HEADER_SIZE = 6
+
+
+class StubRecord(NamedTuple):
+    """A single member of a module or class"""
+
+    kind: int
+    level: int
+    name: str
+    type: str
+    value: str
+
+
+def read_records(data: bytes) -> Iterator[StubRecord]:
+    """Read the stub records from the binary data"""
+    pos = 0
+    while pos + _HEADER_SIZE <= len(data):
+        kind, level, n_len, t_len, v_low, v_high = data[pos : pos + _HEADER_SIZE]
+        pos += _HEADER_SIZE
+        v_len = v_low + (v_high << 8)
+        name = data[pos : pos + n_len].decode("utf-8", errors="replace")
+        pos += n_len
+        type_ = data[pos : pos + t_len].decode("utf-8", errors="replace")
+        pos += t_len
+        value = data[pos : pos + v_len].decode("utf-8", errors="replace")
+        pos += v_len
+        yield StubRecord(kind, level, name, type_, value)
+    if pos != len(data):
+        raise ValueError(f"Incomplete stub record at offset {pos}")
+
+
+def _render_record(rec: StubRecord, indent: str) -> str:
+    """Render a single record, in the same way as createstubs.py writes it"""
+    if rec.kind == R_EXCEPTION:
+        return f"\n{indent}class {rec.name}(Exception):\n{indent}    ...\n"
+    if rec.kind == R_CLASS:
+        return f"\n{indent}class {rec.name}():\n"
+    if rec.kind == R_INCOMPLETE:
+        return (
+            f"\n{indent}class {rec.name}():\n"
+            f"{indent}    def __getattr__(self, name: str) -> Incomplete: ...\n"
+            + _class_end(indent)
+        )
+    if rec.kind == R_CLASSMETHOD:
+        return f"{indent}@classmethod\n{indent}def {rec.name}(cls, *args, **kwargs) -> Incomplete:\n{indent}    ...\n\n"
+    if rec.kind == R_FUNCTION:
+        first = "self, " if rec.level > 0 else ""
+        return f"{indent}def {rec.name}({first}*args, **kwargs) -> Incomplete:\n{indent}    ...\n\n"
+    if rec.kind == R_VALUE:
+        return _render_value(rec, indent)
+    if rec.kind == R_OTHER:
+        return f"# all other, type = '{rec.type}'\n{indent}{rec.name} # type: Incomplete\n"
+    raise ValueError(f"Unknown stub record kind {rec.kind} for {rec.name}")
+
+
+def _render_value(rec: StubRecord, indent: str) -> str:
+    t, value = rec.type, rec.value
+    if t in ("str", "int", "float", "bool", "bytearray", "bytes"):
+        if rec.name.upper() == rec.name:  # ALL_CAPS --> Final
+            return f"{indent}{rec.name}: Final[{t}] = {value}\n"
+        return f"{indent}{rec.name}: {t} = {value}\n"
+    if t in ("dict", "list", "tuple"):
+        ev = {"dict": "{}", "list": "[]", "tuple": "()"}
+        return f"{indent}{rec.name}: {t} = {ev[t]}\n"
+    if t in ("object", "set", "frozenset", "Pin"):
+        return f"{indent}{rec.name}: {t} ## = {value}\n"
+    if t == "generator":
+        return f"{indent}def {rec.name}(*args, **kwargs) -> Generator:  ## = {value}\n{indent}    ...\n\n"
+    if " at " in value:
+        value = value.split(" at ")[0] + " at ...>"
+    return f"{indent}{rec.name}: Incomplete ## <class '{t}'> = {value}\n"
+
+
+def _class_end(indent: str) -> str:
+    return f"{indent}    def __init__(self, *argv, **kwargs) -> None:\n{indent}        ...\n\n"
+
+
+def render_stub(data: bytes) -> str:
+    """Render the binary stub records of a module to the text of a .pyi file"""
+    parts: List[str] = []
+    open_classes: List[int] = []
+    for rec in read_records(data):
+        if rec.kind == R_MODULE:
+            fwid, _, info = rec.value.partition("\n")
+            parts.append(f"\"\"\"\nModule: '{rec.name}' on {fwid}\n\"\"\"\n")
+            parts.append(f"# MCU: {info}\n# Stubber: {rec.type}\n")
+            parts.append("from __future__ import annotations\nfrom typing import Any, Final, Generator\nfrom _typeshed import Incomplete\n\n")
+            continue
+        # end the classes that the previous records were part of
+        while open_classes and open_classes[-1] >= rec.level:
+            parts.append(_class_end("    " * open_classes.pop()))
+        parts.append(_render_record(rec, "    " * rec.level))
+        if rec.kind == R_CLASS:
+            open_classes.append(rec.level)
+    while open_classes:
+        parts.append(_class_end("    " * open_classes.pop()))
+    return "".join(parts)
+
+
+def render_stub_folder(path: Path, *, keep: bool = False) -> int:
+    """
+    Render all .stb files in the folder (recursive) to .pyi files,
+    and update the file names in modules.json.
+    Returns the number of rendered files.
+    """
+    count = 0
+    for stb in sorted(path.rglob("*.stb")):
+        try:
+            stb.with_suffix(".pyi").write_text(render_stub(stb.read_bytes()), encoding="utf-8")
+        except ValueError as e:
+            log.warning(f"Could not render {stb.name}: {e}")
+            continue
+        if not keep:
+            stb.unlink()
+        count += 1
+    modules_json = path / "modules.json"
+    if modules_json.exists():
+        # also for unchanged modules, that have no .stb file in this run
+        report = json.loads(modules_json.read_text(encoding="utf-8"))
+        stb = [m for m in report.get("modules", []) if m.get("file", "").endswith(".stb")]
+        for module in stb:
+            module["file"] = module["file"][:-4] + ".pyi"
+        if stb:
+            modules_json.write_text(json.dumps(report, indent=4), encoding="utf-8")
+    log.debug(f"Rendered {count} stub files in {path}")
+    return count
+
@@ -0,0 +1,89 @@
+"""
+Read the stubs that createstubs streams to stdout, rather than writing them to files on the board.
+
+Each streamed line contains a chunk of a file:
+    ##STUB##:<w|a>:<file name>:<crc32>:<base64 data>
+where `w` starts a new file, and `a` appends to it.
+"""
+
+import base64
+import binascii
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterable, List, Optional, Set
+
+from mpflash.logger import log
+
+STREAM_FLAG = "stream_stubber.txt"
+FRAME_PREFIX = "##STUB##:"
+
+
+class StubStreamReader:
+    """Demultiplex the streamed lines into files in the destination folder"""
+
+    def __init__(self, dest: Path):
+        self.dest = dest
+        self.files: Set[Path] = set()
+        self.errors: List[str] = []
+        self.frames = 0
+        self._name = ""
+        self._file: Optional[BinaryIO] = None
+
+    def feed(self, line: str) -> bool:
+        """Process a line of output, returns True if it was a streamed chunk"""
+        if not line.startswith(FRAME_PREFIX):
+            return False
+        try:
+            op, rest = line[len(FRAME_PREFIX) :].rstrip("\r\n").split(":", 1)
+            name, crc, data = rest.rsplit(":", 2)
+            chunk = base64.b64decode(data, validate=True)
+            if zlib.crc32(chunk) != int(crc, 16):
+                raise ValueError("checksum mismatch")
+            self._write(op, name, chunk)
+        except (ValueError, binascii.Error) as e:
+            self.errors.append(f"{e}: {line[:80].strip()}")
+        return True
+
+    def _write(self, op: str, name: str, chunk: bytes):
+        if op == "w" or name != self._name or not self._file:
+            self._close()
+            path = self._target(name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, "wb" if op == "w" else "ab")
+            self._name = name
+            self.files.add(path)
+        self._file.write(chunk)
+        self.frames += 1
+
+    def _target(self, name: str) -> Path:
+        """The file in the destination folder, for the file name on the board"""
+        parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".")]
+        if not parts or ".." in parts:
+            raise ValueError(f"invalid file name {name}")
+        return self.dest.joinpath(*parts)
+
+    def _close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+            self._name = ""
+
+    def close(self):
+        self._close()
+
+
+def read_stub_stream(lines: Iterable[str], dest: Path) -> StubStreamReader:
+    """
+    Write the stubs streamed by createstubs to the destination folder.
+    The file names on the board are used relative to the destination folder.
+    """
+    reader = StubStreamReader(dest)
+    try:
+        for line in lines:
+            reader.feed(line)
+    finally:
+        reader.close()
+    log.debug(f"Received {reader.frames} chunks for {len(reader.files)} files")
+    for error in reader.errors:
+        log.warning(f"Error in streamed stubs: {error}")
+    return reader
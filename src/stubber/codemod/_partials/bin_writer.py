@@ -0,0 +1,188 @@
+# type: ignore
+"""
+This file contains the binary record writer for the bin variant of createstubs.py
+- the functions with a `self` parameter replace the methods of the same name in the Stubber class
+- all other statements are added before the Stubber class
+- type_check_only is used to avoid circular imports
+The partial is enclosed in ###PARTIAL### and ###PARTIALEND### markers
+
+The records are rendered to .pyi files on the host by `stubber.bulk.stub_records`
+"""
+
+# sourcery skip: require-parameter-annotation
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import gc
+
+    class logging:
+        def getLogger(self, name: str) -> "logging": ...
+
+        def info(self, msg: str) -> None: ...
+
+        def warning(self, msg: str) -> None: ...
+
+    log = logging()
+
+    class StubWriter:
+        def __init__(self, fp, size: int = 0) -> None: ...
+
+        def write(self, *parts) -> None: ...
+
+        def flush(self) -> None: ...
+
+    def ensure_folder(path: str) -> None: ...
+
+    def ticks_ms() -> int: ...
+
+    def ticks_diff(a: int, b: int) -> int: ...
+
+    __version__ = ""
+    _MAX_CLASS_LEVEL = 2
+    _CLASS_MEM = 4 * 1024
+
+
+###PARTIAL###
+# record kinds of the binary stub format, each record is
+# kind, level, len(name), len(type), len(value) as 16 bit little endian, followed by name, type and value
+_R_MODULE = 77  # M: module header, type = stubber version, value = firmware id + newline + mcu info
+_R_CLASS = 67  # C: class, followed by the records of its members on the next level
+_R_EXCEPTION = 69  # E: exception class
+_R_INCOMPLETE = 99  # c: class that was not expanded to save memory
+_R_FUNCTION = 70  # F: function or method
+_R_CLASSMETHOD = 66  # B: bound method
+_R_VALUE = 86  # V: attribute, type = type name, value = repr of the value
+_R_OTHER = 88  # X: anything else, type = type as text
+
+
+def write_record(fp, kind: int, level: int, name: str, type_txt: str = "", value: str = ""):
+    "write a single stub record"
+    n = name.encode()[:255]
+    t = type_txt.encode()[:255]
+    v = value.encode()[:65535]
+    fp.write(bytes((kind, level, len(n), len(t), len(v) & 0xFF, len(v) >> 8)), n, t, v)
+
+
+def create_module_stub(self, module_name: str, file_name: str = None) -> bool:  # type: ignore
+    """Create the stub records of a single python module
+
+    Args:
+    - module_name (str): name of the module to document. This module will be imported.
+    - file_name (Optional[str]): the 'path/filename.stb' to write to. If omitted will be created based on the module name.
+    """
+    if file_name is None:
+        fname = module_name.replace(".", "_") + ".stb"
+        file_name = self.path + "/" + fname
+    else:
+        # the records are rendered to a .pyi on the host
+        file_name = file_name.rsplit(".", 1)[0] + ".stb"
+        fname = file_name.split("/")[-1]
+
+    if "/" in module_name:
+        # for nested modules
+        module_name = module_name.replace("/", ".")
+
+    # import the module (as new_module) to examine it
+    new_module = None
+    try:
+        m0 = gc.mem_free()  # type: ignore
+        t0 = ticks_ms()
+        new_module = __import__(module_name, None, None, ("*"))
+        t0 = ticks_diff(ticks_ms(), t0)
+        m1 = gc.mem_free()  # type: ignore
+        log.info("Stub module: {:<25} to file: {:<70} mem:{:>5}".format(module_name, fname, m1))
+
+    except ImportError:
+        return False
+
+    # the depth is reported for each module, also when it is unchanged
+    self._depth = _MAX_CLASS_LEVEL + 1
+    # the stub of a module that did not change since the previous run is not written again
+    # without the fingerprints of a previous run, the modules are not fingerprinted
+    crc = self.fingerprint(new_module) if self.fingerprints is not None else 0
+    unchanged = crc and self.fingerprints.get(module_name) == crc
+    if unchanged:
+        log.info("Unchanged module: {}".format(module_name))
+    else:
+        # Start a new file
+        if not self.stream:
+            ensure_folder(file_name)
+        with self.open_file(file_name, "wb") as f:
+            fp = StubWriter(f, self.buffer_size)
+            info_ = str(self.info).replace("OrderedDict(", "").replace("})", "}")
+            write_record(fp, _R_MODULE, 0, module_name, __version__, self._fwid + "\n" + info_)
+            self._min_free = m1
+            self.write_object_stub(fp, new_module, module_name, "")
+            fp.flush()
+        if self.profile:
+            gc.collect()
+            self._profile = (t0, m0, m1, gc.mem_free(), self._min_free, fp.written)  # type: ignore
+
+    self.report_add(module_name, file_name, crc, unchanged)
+
+    if module_name not in {"os", "sys", "logging", "gc"}:
+        # try to unload the module unless we use it
+        try:
+            del new_module
+        except (OSError, KeyError):  # lgtm [py/unreachable-statement]
+            log.warning("could not del new_module")
+    gc.collect()
+    return True
+
+
+def write_object_stub(self, fp, object_expr: object, obj_name: str, indent: str, in_class: int = 0):
+    "Write the stub records of a module/object to an open file. Can be called recursive."
+    if not isinstance(fp, StubWriter):
+        # buffer all writes to a plain file object
+        w = StubWriter(fp, self.buffer_size)
+        self.write_object_stub(w, object_expr, obj_name, indent, in_class)
+        w.flush()
+        return
+    gc.collect()
+    if self.profile:
+        self._min_free = min(self._min_free, gc.mem_free())  # type: ignore
+    if object_expr in self.problematic:
+        log.warning("SKIPPING problematic module:{}".format(object_expr))
+        return
+
+    level = len(indent) // 4
+    for item_name, item_instance, item_type_txt, _ in self.iter_obj_attributes(object_expr):
+        if item_name in ["classmethod", "staticmethod", "BaseException", "Exception"]:
+            # do not create stubs for these primitives
+            continue
+        if item_name[0].isdigit():
+            log.warning("NameError: invalid name {}".format(item_name))
+            continue
+        # Class expansion only on first 3 levels (bit of a hack)
+        if item_type_txt == "<class 'type'>" and len(indent) <= _MAX_CLASS_LEVEL * 4:
+            if item_name.endswith("Exception") or item_name.endswith("Error") or item_name in ["KeyboardInterrupt", "StopIteration", "SystemExit"]:
+                write_record(fp, _R_EXCEPTION, level, item_name)
+                continue
+            # only expand the class if there is enough memory left
+            if gc.mem_free() < _CLASS_MEM:  # type: ignore
+                gc.collect()
+            if gc.mem_free() >= _CLASS_MEM:  # type: ignore
+                write_record(fp, _R_CLASS, level, item_name)
+                self.write_object_stub(fp, item_instance, "{0}.{1}".format(obj_name, item_name), indent + "    ", in_class + 1)
+            else:
+                log.warning("Low memory: class {}.{} is not expanded".format(obj_name, item_name))
+                self._depth = min(self._depth, level)
+                write_record(fp, _R_INCOMPLETE, level, item_name)
+        elif any(word in item_type_txt for word in ["method", "function", "closure"]):
+            if "bound_method" in item_type_txt or "bound_method" in repr(item_instance):
+                write_record(fp, _R_CLASSMETHOD, level, item_name)
+            else:
+                write_record(fp, _R_FUNCTION, level, item_name)
+        elif item_type_txt == "<class 'module'>":
+            # Skip imported modules
+            pass
+        elif item_type_txt.startswith("<class '"):
+            t = item_type_txt[8:-2]
+            # dict, list , tuple: the value is not needed
+            write_record(fp, _R_VALUE, level, item_name, t, "" if t in ("dict", "list", "tuple") else repr(item_instance))
+        else:
+            write_record(fp, _R_OTHER, level, item_name, item_type_txt)
+
+
+###PARTIALEND###
@@ -25,6 +25,7 @@ if TYPE_CHECKING:
         _report: List[str]
         modules = []
         _json_name: str
+        report_batch: int
 
         def __init__(self, path: str = "", firmware_id: str = "") -> None: ...
 
@@ -34,6 +35,8 @@ if TYPE_CHECKING:
 
         def report_start(self, filename: str = "modules.json"): ...
 
+        def report_flush(self): ...
+
         def report_end(self): ...
 
         def create_all_stubs(self): ...
@@ -43,6 +46,8 @@ if TYPE_CHECKING:
     class _gc:
         def collect(self) -> None: ...
 
+        def mem_free(self) -> int: ...
+
     gc: _gc
     log = logging.getLogger("stubber")
 
@@ -53,17 +58,27 @@ if TYPE_CHECKING:
 
 ###PARTIAL###
 SKIP_FILE = "modulelist.done"
-
-
-def get_modules(skip=0):
-    # new
-    for p in LIBS:
-        fname = p + "/modulelist.txt"
+# the modules in the order to stub them, with the memory they need, as scheduled by the host
+SCHEDULE_FILE = "modulelist.sched"
+# the modules that ran out of memory on a clean heap
+CRASH_FILE = "modulelist.crash"
+# write the progress after this many modules, or sooner when the free memory drops below _CHECKPOINT_MEM
+_CHECKPOINT_EVERY = 8
+_CHECKPOINT_MEM = 16 * 1024
+
+
+def get_modules(skip=0, offset=0):
+    # yield the modules to stub, with the offset of the next line in modulelist.sched or modulelist.txt
+    for fname in [SCHEDULE_FILE] + [p + "/modulelist.txt" for p in LIBS]:
         if not file_exists(fname):
             continue
         try:
             with open(fname, encoding="utf-8") as f:
                 i = 0
+                if offset:
+                    # continue directly from the last checkpoint
+                    f.seek(offset)
+                    skip = 0
                 while True:
                     line = f.readline().strip()
                     if not line:
@@ -73,33 +88,53 @@ def get_modules(skip=0):
                     i += 1
                     if i < skip:
                         continue
-                    yield line
+                    yield line, f.tell()
                 break
         except OSError:
             pass
 
 
-def write_skip(done):
-    # write count of modules already processed to file
+def write_skip(done, offset=0, modulename=""):
+    # write count of modules already processed, the offset of the next module, and the module that is being stubbed to file
     with open(SKIP_FILE, "w") as f:
-        f.write(str(done) + "\n")
+        f.write("{} {} {}\n".format(done, offset, modulename))
+
+
+def read_need(line):
+    # split a line of the module list into the module name and the memory it needs, -1 for a module that is known to crash
+    parts = line.split()
+    try:
+        return parts[0], int(parts[1]) if len(parts) > 1 else 0
+    except ValueError:
+        return parts[0], 0
+
+
+def write_crash(modulename):
+    with open(CRASH_FILE, "a") as f:
+        f.write(modulename + "\n")
 
 
 def read_skip():
-    # read count of modules already processed from file
+    # read count of modules already processed, and the offset of the next module from file
     done = 0
+    offset = 0
     try:
         with open(SKIP_FILE) as f:
-            done = int(f.readline().strip())
-    except OSError:
+            line = f.readline().split()
+            done = int(line[0])
+            if len(line) > 1:
+                offset = int(line[1])
+    except (OSError, ValueError, IndexError):
         pass
-    return done
+    return done, offset
 
 
 def main():
     import machine  # type: ignore
 
-    was_running = file_exists(SKIP_FILE)
+    # before the first checkpoint only the module that is being stubbed is recorded, such a run starts over
+    skip, offset = read_skip()
+    was_running = skip > 0
     if was_running:
         log.info("Continue from last run")
     else:
@@ -114,31 +149,68 @@ def main():
     stubber = Stubber(path=read_path())
 
     # f_name = "{}/{}".format(stubber.path, "modules.json")
-    skip = 0
     if not was_running:
         # Only clean folder if this is a first run
         stubber.clean()
         stubber.report_start("modules.json")
     else:
-        skip = read_skip()
         stubber._json_name = "{}/{}".format(stubber.path, "modules.json")
 
-    for modulename in get_modules(skip):
-        # ------------------------------------
-        # do epic shit
-        # but sometimes things fail / run out of memory and reboot
-        try:
-            stubber.create_one_stub(modulename)
-        except MemoryError:
-            # RESET AND HOPE THAT IN THE NEXT CYCLE WE PROGRESS FURTHER
-            machine.reset()
-        # -------------------------------------
+    # the report is only written together with the progress
+    stubber.report_batch = 0
+    checkpoint = skip
+    checkpoint_offset = offset
+    checkpointed = False
+    # the number of modules stubbed since the (re)start, and the offset of the current module
+    stubbed = 0
+    start = offset
+    for line, offset in get_modules(skip, offset):
+        modulename, need = read_need(line)
+        if need < 0:
+            log.warning("Skip module: {:<25}        : Known to crash".format(modulename))
+        else:
+            if stubbed and need > gc.mem_free():  # type: ignore
+                # start a module that needs a lot of memory with a clean heap
+                log.info("Reset before module: {:<25} needs: {:>5}".format(modulename, need))
+                stubber.report_flush()
+                write_skip(skip, start)
+                getattr(machine, "soft_reset", machine.reset)()
+            if not checkpointed:
+                # a run after a crash continues from the last checkpoint, so up to the first checkpoint
+                # the module is recorded before the import, for the host to know which module crashed the board
+                write_skip(checkpoint, checkpoint_offset, modulename)
+            # ------------------------------------
+            # do epic shit
+            # but sometimes things fail / run out of memory and reboot
+            try:
+                stubber.create_one_stub(modulename)
+            except MemoryError:
+                gc.collect()
+                stubber.report_flush()
+                if stubbed:
+                    # RESET AND HOPE THAT IN THE NEXT CYCLE WE PROGRESS FURTHER
+                    write_skip(skip, start)
+                else:
+                    # out of memory on a clean heap, continue with the next module
+                    log.warning("Skip module: {:<25}        : Out of memory".format(modulename))
+                    write_crash(modulename)
+                    write_skip(skip + 1, offset)
+                machine.reset()
+            # -------------------------------------
+            stubbed += 1
         gc.collect()
         # modules_done[modulename] = str(stubber._report[-1] if ok else "failed")
         # with open("modulelist.done", "a") as f:
         #     f.write("{}={}\n".format(modulename, "ok" if ok else "failed"))
         skip += 1
-        write_skip(skip)
+        start = offset
+        if skip - checkpoint >= _CHECKPOINT_EVERY or gc.mem_free() < _CHECKPOINT_MEM:  # type: ignore
+            # the report must be complete up to the recorded progress, to be able to continue after a reset
+            stubber.report_flush()
+            write_skip(skip, offset)
+            checkpoint = skip
+            checkpoint_offset = offset
+            checkpointed = True
 
     print("All modules have been processed, Finalizing report")
     stubber.report_end()
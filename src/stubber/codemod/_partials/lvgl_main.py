@@ -3,47 +3,168 @@ This file contains the `def main()` funcion for the lvgl variant of createstubs.
 - type_check_only is used to avoid circular imports
 The partial is enclosed in ###PARTIAL### and ###PARTIALEND### markers
 """
+
 from typing import TYPE_CHECKING, List, type_check_only
 
 if TYPE_CHECKING:
+    import os
     import sys
     import logging
 
+    _MAX_CLASS_LEVEL: int
+
+    @type_check_only
+    class StubWriter:
+        def __init__(self, fp, size: int = 0) -> None: ...
+
+        def write(self, *parts) -> None: ...
+
+        def flush(self) -> None: ...
+
     @type_check_only
     class Stubber:
         path: str
         _report: List[str]
         modules = []
+        stream: bool
+        buffer_size: int
+        _depth: int
 
-        def __init__(self, path: str = "", firmware_id: str = "") -> None:
-            ...
+        def __init__(self, path: str = "", firmware_id: str = "") -> None: ...
 
-        def clean(self) -> None:
-            ...
+        def clean(self) -> None: ...
 
-        def create_one_stub(self, modulename: str) -> bool:
-            ...
+        def create_all_stubs(self): ...
 
-        def report(self, filename: str = "modules.json"):
-            ...
+        def create_module_stub(self, module_name: str, file_name: str = None) -> bool: ...  # type: ignore
 
-        def create_all_stubs(self):
-            ...
+        def iter_obj_attributes(self, item_instance: object, errors=None): ...
+
+        def write_module_header(self, fp, module_name: str): ...
+
+        def write_item_stub(
+            self, fp, item_name: str, item_instance: object, item_type_txt: str, obj_name: str, indent: str, in_class: int = 0
+        ): ...
+
+        def open_file(self, file_name: str, mode: str): ...
+
+        def report_add(self, module_name: str, stub_file: str, crc: int = 0, unchanged: bool = False): ...
 
     @type_check_only
-    def read_path() -> str:
-        ...
+    def ensure_folder(path: str) -> None: ...
+
+    @type_check_only
+    def file_exists(filename: str) -> bool: ...
+
+    @type_check_only
+    def reset() -> None: ...
 
     @type_check_only
     class _gc:
-        def collect(self) -> None:
-            ...
+        def collect(self) -> None: ...
+
+        def mem_free(self) -> int: ...
 
     gc: _gc
-    _log = logging.getLogger("stubber")
+    log = logging.getLogger("stubber")
 
 
 ###PARTIAL###
+_PARTS_PROGRESS = "modulelist.parts"  # the module that is stubbed in parts, the next member and the next part
+
+
+def read_parts_progress(module_name: str):
+    "read the next member and the next part of a module that is stubbed in parts, (0, 0) to start from the beginning"
+    try:
+        with open(_PARTS_PROGRESS) as f:
+            line = f.readline().split()
+            if len(line) == 3 and line[0] == module_name:
+                return int(line[1]), int(line[2])
+    except (OSError, ValueError):
+        pass
+    return 0, 0
+
+
+def write_parts_progress(module_name: str, item: int, part: int):
+    "record the next member and the next part of a module that is stubbed in parts"
+    with open(_PARTS_PROGRESS, "w") as f:
+        f.write("{} {} {}\n".format(module_name, item, part))
+
+
+class ChunkedStubber(Stubber):  # type: ignore
+    "A Stubber that writes the stubs of the modules in `chunked` in parts, that can be continued after a reset"
+
+    def __init__(self, path: str = "", firmware_id: str = ""):  # type: ignore
+        super().__init__(path, firmware_id)
+        self.chunked = []  # type: list[str]
+
+    def create_module_stub(self, module_name: str, file_name: str = None) -> bool:  # type: ignore
+        if module_name in self.chunked:
+            return self.create_chunked_stub(module_name, file_name or "{}/{}.pyi".format(self.path, module_name.replace(".", "/")))
+        return super().create_module_stub(module_name, file_name)
+
+    def create_chunked_stub(self, module_name: str, file_name: str) -> bool:
+        """Create the stub of a large module in numbered parts, in the folder `<file_name>.parts`
+
+        Each class is written to its own part, and the other members between the classes to a shared part.
+        Only a single member is held in memory, and the memory is released after each class.
+        The progress is recorded before each part, to continue from that part after a reset.
+        The parts are joined to a single stub on the host.
+        """
+        try:
+            new_module = __import__(module_name, None, None, ("*"))
+        except ImportError:
+            return False
+        folder = file_name + ".parts"
+        next_item, part = read_parts_progress(module_name)
+        log.info("Stub module: {:<25} in parts from member {} mem:{:>5}".format(module_name, next_item, gc.mem_free()))  # type: ignore
+        if not self.stream:
+            ensure_folder(folder + "/")
+        if not next_item:
+            with self.open_file("{}/{:04d}.pyi".format(folder, 0), "wb") as f:
+                fp = StubWriter(f, self.buffer_size)
+                self.write_module_header(fp, module_name)
+                fp.flush()
+            part = 1
+        self._depth = _MAX_CLASS_LEVEL + 1
+        f = fp = None
+        item = 0
+        for item_name, item_instance, item_type_txt, _ in self.iter_obj_attributes(new_module):
+            if item < next_item:
+                item += 1
+                continue
+            is_class = item_type_txt == "<class 'type'>"
+            if f and is_class:
+                # end the part with the members before this class
+                fp.flush()  # type: ignore
+                f.close()
+                f = None
+                part += 1
+            if not f:
+                write_parts_progress(module_name, item, part)
+                f = self.open_file("{}/{:04d}.pyi".format(folder, part), "wb")
+                fp = StubWriter(f, self.buffer_size)
+            self.write_item_stub(fp, item_name, item_instance, item_type_txt, module_name, "", 0)
+            if is_class:
+                fp.flush()  # type: ignore
+                f.close()
+                f = None
+                part += 1
+                gc.collect()
+            item += 1
+        if f:
+            fp.flush()  # type: ignore
+            f.close()
+        try:
+            os.remove(_PARTS_PROGRESS)
+        except OSError:
+            pass
+        self.report_add(module_name, file_name)
+        del new_module
+        gc.collect()
+        return True
+
+
 def main():
     try:
         import lvgl  # type: ignore
@@ -63,15 +184,23 @@ def main():
     except Exception:
         fw_id = "lvgl-{0}_{1}_{2}_{3}-{4}".format(8, 1, 0, "dev", sys.platform)
     finally:
-        stubber = Stubber(firmware_id=fw_id) # type: ignore
-    stubber.clean()
+        stubber = ChunkedStubber(firmware_id=fw_id)
+    if not file_exists(_PARTS_PROGRESS):
+        # continue with the parts of lvgl after a reset, or start with a clean folder
+        stubber.clean()
     # modules to stub : only lvgl specifics
     stubber.modules = ["io", "lodepng", "rtch", "lvgl"]  # spell-checker: enable
+    # lvgl has too many classes to stub in one go on most boards
+    stubber.chunked = ["lvgl"]
 
-    gc.collect() # type: ignore
+    gc.collect()
 
-    stubber.create_all_stubs()
-    stubber.report()
+    try:
+        # the report is written by create_all_stubs
+        stubber.create_all_stubs()
+    except MemoryError:
+        # start over with a clean memory, and continue with the next part
+        reset()
 
 
 ###PARTIALEND###
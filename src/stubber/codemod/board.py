@@ -5,7 +5,7 @@ Codemods to create the different variants of createstubs.py
 from __future__ import annotations
 
 from enum import Enum
-from typing import Iterator, Optional
+from typing import Iterator, Optional, Union
 
 import libcst as cst
 import libcst.codemod as codemod
@@ -43,6 +43,12 @@ _MODULES_MATCHER = m.Assign(
 # matches on `def main():`
 _DEF_MAIN_MATCHER = m.FunctionDef(name=m.Name(value="main"))
 
+# matches on `class Stubber:`
+_STUBBER_CLASS_MATCHER = m.ClassDef(name=m.Name(value="Stubber"))
+
+# matches on `def method(self, ...):`
+_METHOD_MATCHER = m.FunctionDef(params=m.Parameters(params=[m.Param(name=m.Name("self")), m.ZeroOrMore()]))
+
 # matches on `self.problematic = []`
 _PROBLEMATIC_MATCHER = m.Assign(
     targets=[
@@ -93,7 +99,7 @@ Create stubs for (all) modules on a MicroPython board.
     2) stored the already processed modules in a text file `modulelist.done` 
     3) process the modules in the database:
         - stub the module
-        - update the modulelist.done file
+        - update the modulelist.done file, every few modules or when memory runs low
         - reboots the device if it runs out of memory
     4) creates the modules.json
 
@@ -113,6 +119,24 @@ Note that the stubs can be very large, and it may be best to directly store them
 """
 '''
 
+_BIN_MODULE_DOC = '''
+"""
+Create stubs for (all) modules on a MicroPython board, as compact binary records.
+
+    This variant of the createstubs.py script is optimised for use on low-memory devices.
+    Rather than formatting the .pyi stubs on the device, it writes a compact record for each member of a module
+    to a `.stb` file, that is rendered to a .pyi file on the host by `stubber.bulk.stub_records`.
+    It reads the list of modules from a text file `modulelist.txt` in the root or `libs` folder that should be uploaded to the device.
+    If that cannot be found then only a single module (micropython) is stubbed.
+"""
+'''
+
+
+# the constants that differ from createstubs.py
+_DB_CONSTANTS = {"_WRITE_BUFFER": "256"}  # smaller chunks for the very-low-memory devices
+_LVGL_CONSTANTS = {"_WRITE_BUFFER": "1024"}  # the lvgl stubs are large
+_BIN_REMOVED_METHODS = ("write_module_header", "write_item_stub")  # the text writers, not used by the record writer
+
 
 class CreateStubsVariant(str, Enum):
     """Dictates create stubs target variant."""
@@ -121,6 +145,7 @@ class CreateStubsVariant(str, Enum):
     MEM = "mem"
     DB = "db"
     LVGL = "lvgl"
+    BIN = "bin"
 
 
 class ReadModulesCodemod(codemod.Codemod):
@@ -197,6 +222,27 @@ class ModulesUpdateCodemod(codemod.Codemod):
         return tree
 
 
+class SetConstantsTransformer(cst.CSTTransformer):
+    """Sets the value of module level constants, such as `_WRITE_BUFFER = 512`."""
+
+    def __init__(self, constants: dict[str, str]):
+        super().__init__()
+        self.constants = constants
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> bool:
+        return False
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> bool:
+        return False
+
+    def leave_Assign(self, original_node: cst.Assign, updated_node: cst.Assign) -> cst.Assign:
+        if m.matches(updated_node, m.Assign(targets=[m.AssignTarget(target=m.Name())])):
+            name = updated_node.targets[0].target.value  # type: ignore
+            if name in self.constants:
+                return updated_node.with_changes(value=cst.parse_expression(self.constants[name]))
+        return updated_node
+
+
 class LVGLCodemod(codemod.Codemod):
     """Generates createstubs.py LVGL variant."""
 
@@ -224,6 +270,7 @@ class LVGLCodemod(codemod.Codemod):
         matches = m.findall(work_tree, _DEF_MAIN_MATCHER, metadata_resolver=self)
 
         entry_tree = work_tree.deep_replace(matches[0], def_main_tree)
+        entry_tree = entry_tree.visit(SetConstantsTransformer(_LVGL_CONSTANTS))
         return tree.with_deep_changes(tree, body=(*entry_tree.body,))
 
 
@@ -266,9 +313,69 @@ class DBCodemod(codemod.Codemod):
         matches = m.findall(work_tree, _DEF_MAIN_MATCHER, metadata_resolver=self)
 
         entry_tree = work_tree.deep_replace(matches[0], def_main_tree)
+        entry_tree = entry_tree.visit(SetConstantsTransformer(_DB_CONSTANTS))
         return tree.with_deep_changes(tree, body=(*entry_tree.body,))
 
 
+class ReplaceMethodsTransformer(cst.CSTTransformer):
+    """Replaces the methods of the Stubber class with the functions of the same name, and removes the unused methods."""
+
+    def __init__(self, methods: dict[str, cst.FunctionDef], removed: tuple[str, ...] = ()):
+        super().__init__()
+        self.methods = methods
+        self.removed = removed
+        self.in_stubber = False
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> bool:
+        self.in_stubber = m.matches(node, _STUBBER_CLASS_MATCHER)
+        return True
+
+    def leave_ClassDef(self, original_node: cst.ClassDef, updated_node: cst.ClassDef) -> cst.ClassDef:
+        self.in_stubber = False
+        return updated_node
+
+    def leave_FunctionDef(
+        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
+    ) -> Union[cst.FunctionDef, cst.RemovalSentinel]:
+        if self.in_stubber and original_node.name.value in self.methods:
+            return self.methods[original_node.name.value].with_changes(leading_lines=original_node.leading_lines)
+        if self.in_stubber and original_node.name.value in self.removed:
+            return cst.RemoveFromParent()
+        return updated_node
+
+
+class BinCodemod(codemod.Codemod):
+    """Generates createstubs.py binary records variant."""
+
+    def __init__(self, context: codemod.CodemodContext):
+        super().__init__(context)
+
+    def transform_module_impl(self, tree: cst.Module) -> cst.Module:
+        """
+        Generates createstubs.py binary records variant.
+        - replace the static module list with the low-memory variant (read from file)
+        - replace the Stubber methods that write the stubs with the binary record writer
+        - add the other statements of the record writer before the Stubber class
+        """
+        docstr_transformer = ModuleDocCodemod(self.context, _BIN_MODULE_DOC)
+        read_mods_transformer = ReadModulesCodemod(self.context)
+        writer_tree = cst.parse_module(
+            Partial.BIN_WRITER.contents(),  # type: ignore
+        )
+        methods = {n.name.value: n for n in writer_tree.body if m.matches(n, _METHOD_MATCHER)}  # type: ignore
+        others = [n for n in writer_tree.body if not m.matches(n, _METHOD_MATCHER)]
+        # keep the comments at the start of the partial
+        others[0] = others[0].with_changes(leading_lines=(*writer_tree.header, *others[0].leading_lines))
+
+        work_tree = docstr_transformer.transform_module_impl(tree)
+        work_tree = read_mods_transformer.transform_module_impl(work_tree)
+        work_tree = work_tree.visit(ReplaceMethodsTransformer(methods, _BIN_REMOVED_METHODS))  # type: ignore
+        body = list(work_tree.body)
+        stubber_index = next(i for i, n in enumerate(body) if m.matches(n, _STUBBER_CLASS_MATCHER))
+        body[stubber_index:stubber_index] = others
+        return tree.with_deep_changes(tree, body=(*body,))
+
+
 class CreateStubsCodemod(codemod.Codemod):
     """Generates createstubs.py variant based on provided variant."""
 
@@ -307,6 +414,7 @@ class CreateStubsCodemod(codemod.Codemod):
             CreateStubsVariant.LVGL: LVGLCodemod,
             CreateStubsVariant.MEM: LowMemoryCodemod,
             CreateStubsVariant.DB: DBCodemod,
+            CreateStubsVariant.BIN: BinCodemod,
         }
         if self.variant in mod_variants:
             # get the appropriate codemod for the variant and transform the tree
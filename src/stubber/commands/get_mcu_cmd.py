@@ -26,10 +26,10 @@ from stubber.utils.config import CONFIG
 @click.option(
     "--variant",
     # "-v",
-    type=click.Choice(["Full", "Mem", "DB"], case_sensitive=False),
+    type=click.Choice(["Full", "Mem", "DB", "Bin", "Host"], case_sensitive=False),
     default="DB",
     show_default=True,
-    help="Variant of createstubs to run",
+    help="Variant of createstubs to run, Host stubs the board over the REPL without installing createstubs.",
 )
 @click.option(
     "--format",
@@ -69,6 +69,56 @@ from stubber.utils.config import CONFIG
     show_default=True,
     help="""Include bluetooth ports in the list""",
 )
+@click.option(
+    "--stream/--no-stream",
+    default=False,
+    show_default=True,
+    help="Stream the stubs over the serial connection, rather than writing them to a mounted folder or the board.",
+)
+@click.option(
+    "--profile/--no-profile",
+    default=False,
+    show_default=True,
+    help="Record the import time and memory use of each module, and save these as a cost table for the firmware.",
+)
+@click.option(
+    "--skip-unchanged/--no-skip-unchanged",
+    default=True,
+    show_default=True,
+    help="Reuse the stubs of the modules that did not change since the previous stubs of the same firmware.",
+)
+@click.option(
+    "--schedule/--no-schedule",
+    default=True,
+    show_default=True,
+    help="Stub the modules in the order of the memory they needed before, and skip the modules that ran out of memory (db variant).",
+)
+@click.option(
+    "--compress/--no-compress",
+    default=True,
+    show_default=True,
+    help="Compress the stubs on the board to reduce the transfer to the host, on firmware that can compress.",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=int,
+    default=0,
+    show_default=True,
+    help="The number of boards to stub at the same time, 0 to stub all connected boards at the same time.",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    show_default=True,
+    help="Reuse the board information of the previous run for boards with the same USB serial number and firmware, --no-cache probes all boards.",
+)
+@click.option(
+    "--skip-known/--no-skip-known",
+    default=False,
+    show_default=True,
+    help="Skip the boards with firmware that is already in the stubs repo, rather than only merging and building their stubs.",
+)
 @click.option("--debug/--no-debug", default=False, show_default=True, help="Debug mode.")
 def cli_create_mcu_stubs(
     variant: str,
@@ -77,6 +127,14 @@ def cli_create_mcu_stubs(
     serial: List[str],
     ignore: List[str],
     bluetooth: bool,
+    stream: bool,
+    profile: bool,
+    skip_unchanged: bool,
+    schedule: bool,
+    compress: bool,
+    workers: int,
+    cache: bool,
+    skip_known: bool,
 ) -> int:
     """Run createstubs on one or more MCUs, and add the stubs to the micropython-stub repo."""
     # check if all repos have been cloned
@@ -85,9 +143,7 @@ def cli_create_mcu_stubs(
 
     for repo in CONFIG.repos:
         if not repo.exists():
-            log.error(
-                f"Repo {repo} not found, use 'stubber clone --add-stubs' to clone the repos."
-            )
+            log.error(f"Repo {repo} not found, use 'stubber clone --add-stubs' to clone the repos.")
             exit(1)
 
     exit(
@@ -98,5 +154,13 @@ def cli_create_mcu_stubs(
             serial=serial,
             ignore=ignore,
             bluetooth=bluetooth,
+            stream=stream,
+            profile=profile,
+            skip_unchanged=skip_unchanged,
+            schedule=schedule,
+            compress=compress,
+            workers=workers,
+            cache=cache,
+            skip_known=skip_known,
         )
     )
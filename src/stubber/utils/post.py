@@ -1,83 +1,361 @@
 """Pre/Post Processing for createstubs.py"""
 
-import subprocess
-import sys
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 import autoflake
+import black
+from black.cache import Cache
+from black.const import DEFAULT_EXCLUDES
+from cachetools import LRUCache
 from mpflash.logger import log
 
-from .stubmaker import generate_pyi_files
+from .stubmaker import generate_pyi_files, generate_pyi_in_memory
 
+BLACK_LINE_LENGTH = 140
+FORMAT_WORKERS = os.cpu_count() or 1
+POOL_MIN_FILES = 32  # smaller folders are formatted in this process, as starting a process pool takes longer
+AUTOFLAKE_CHUNK = 64  # the files per task for autoflake in the process pool
 
-def do_post_processing(stub_paths: List[Path], stubgen: bool, format: bool, autoflake: bool):
-    "Common post processing"
+# build an argument list
+AUTOFLAKE_ARGS = {
+    "write_to_stdout": False,  # print changed text to stdout
+    "in_place": True,  # make changes to files instead of printing diffs
+    "remove_all_unused_imports": False,
+    "ignore_init_module_imports": False,  # exclude __init__.py when removing unused imports
+    "expand_star_imports": False,
+    "remove_duplicate_keys": False,
+    "remove_unused_variables": False,  # remove all unused imports (not just those from the standard library)
+    "remove_rhs_for_unused_variables": False,
+    "ignore_pass_statements": False,  # remove pass when superfluous
+    "ignore_pass_after_docstring": False,  # ignore pass statements after a newline ending on '"""'
+    "check": False,  # return error code if changes are needed
+    "check_diff": False,
+    "quiet": False,
+}
+
+# the output of black by the hash of the mode and the input, shared by all runs of black in this process
+# black's own cache on disk tracks the files that are already formatted, across processes
+_black_cache: LRUCache = LRUCache(maxsize=64 * 1024 * 1024, getsizeof=lambda formatted: len(formatted) + 1)
+# the boards are post-processed in threads, and the cache reorders its entries on every read
+_black_lock = threading.Lock()
+# the pools are started from threads, a forked worker could inherit a lock that another thread holds, such as the lock of the logger
+_POOL_CONTEXT = multiprocessing.get_context("spawn")
+
+
+class AutoflakeSummary(NamedTuple):
+    """The result of running autoflake on a folder"""
+
+    exit_status: int
+    files: int  # the number of files processed
+    changed: List[Path]
+    seconds: float
+
+
+def do_post_processing(stub_paths: List[Path], stubgen: bool, format: bool, autoflake: bool, in_memory: bool = False):
+    "Common post processing, or in memory see post_process_in_memory"
     for path in stub_paths:
+        if in_memory and post_process_in_memory(path, stubgen=stubgen, format=format, autoflake=autoflake) >= 0:
+            continue
         if stubgen:
             log.debug("Generate type hint files (pyi) in folder: {}".format(path))
             generate_pyi_files(path)
+        if not path.exists():
+            log.warning(f"Path does not exist: {path}")
+            continue
+        # black and autoflake do not add or remove files, so walk the folder once
+        files = list_source_files(path)
         if format:
-            run_black(path)
+            run_black(path, files=files)
         if autoflake:
-            run_autoflake(path, process_pyi=True)
+            run_autoflake(path, process_pyi=True, files=files)
 
 
-def run_black(path: Path, capture_output: bool = False):
+def post_process_in_memory(path: Path, stubgen: bool, format: bool, autoflake: bool) -> int:
+    """
+    Post process a folder in a single pass, each module is read once and each stub is written once.
+    - the const() fix and stubgen work on the text of the .py modules, the modules are not rewritten
+    - autoflake and black work on the text of the stubs, and a stub is only written if its content changed
+    Returns the number of stubs written, or -1 if stubgen failed and the folder needs the post processing on file.
+    """
+    if not path.exists():
+        log.warning(f"Path does not exist: {path}")
+        return 0
+    start = time.perf_counter()
+    files = list_source_files(path)
+    stubs: Dict[Path, str] = {}
+    if stubgen:
+        modules = {f: f.read_text(encoding="utf-8") for f in files if f.suffix == ".py"}
+        try:
+            stubs = generate_pyi_in_memory(path, modules)
+        except (Exception, SystemExit) as e:
+            log.warning(f"Could not run stubgen in memory on {path}: {e}")
+            return -1
+    current = {f: f.read_text(encoding="utf-8") for f in files if f.suffix == ".pyi"}
+    mode = black_mode(black_config(path)) if format else None
+    written = 0
+    for pyi in sorted(set(stubs) | set(current)):
+        text = stubs.get(pyi, current.get(pyi, ""))
+        # do not process umodules as that would remove all imports
+        if autoflake and not pyi.name.startswith("u"):
+            text = autoflake_code(text)
+        if format:
+            text = format_cached(text, is_pyi=True, name=str(pyi), mode=mode)
+        if text != current.get(pyi):
+            pyi.write_text(text, encoding="utf-8")
+            written += 1
+    if mode:
+        # the stubs are formatted now, a later run of black does not need to format them again
+        Cache.read(mode).write(sorted(set(stubs) | set(current)))
+    log.info(
+        f"Post processed {path}: {len(stubs)} stubs generated, {written} of {len(set(stubs) | set(current))} written in {time.perf_counter() - start:.2f}s"
+    )
+    return written
+
+
+def autoflake_code(source: str) -> str:
+    """Remove the unused imports from the source, with the same options as run_autoflake"""
+    return autoflake.fix_code(
+        source,
+        expand_star_imports=AUTOFLAKE_ARGS["expand_star_imports"],
+        remove_all_unused_imports=AUTOFLAKE_ARGS["remove_all_unused_imports"],
+        remove_duplicate_keys=AUTOFLAKE_ARGS["remove_duplicate_keys"],
+        remove_unused_variables=AUTOFLAKE_ARGS["remove_unused_variables"],
+        remove_rhs_for_unused_variables=AUTOFLAKE_ARGS["remove_rhs_for_unused_variables"],
+        ignore_init_module_imports=AUTOFLAKE_ARGS["ignore_init_module_imports"],
+        ignore_pass_statements=AUTOFLAKE_ARGS["ignore_pass_statements"],
+        ignore_pass_after_docstring=AUTOFLAKE_ARGS["ignore_pass_after_docstring"],
+    )
+
+
+def format_cached(source: str, is_pyi: bool = False, name: str = "", mode: Optional[black.Mode] = None) -> str:
+    """Format the source with black, using the cache of run_black. Returns the source if black cannot format it"""
+    mode = replace(mode or black_mode(), is_pyi=is_pyi)
+    key = black_key(mode, source)
+    cached = cached_black(key)
+    if cached is not None:
+        return cached or source
+    _, formatted, error = format_job((name, source, mode))
+    if formatted is None:
+        log.warning(f"black could not format {name}: {error}")
+        return source
+    cache_black(key, source, formatted, mode)
+    return formatted
+
+
+def black_config(path: Path) -> Dict[str, Any]:
+    """The [tool.black] settings of the project of a path, as black reads them from its pyproject.toml"""
+    pyproject = black.find_pyproject_toml((str(path.absolute()),))
+    if not pyproject:
+        return {}
+    try:
+        return black.parse_pyproject_toml(pyproject)
+    except (OSError, ValueError) as e:
+        log.warning(f"Could not read the settings of black from {pyproject}: {e}")
+        return {}
+
+
+def black_mode(config: Optional[Dict[str, Any]] = None) -> black.Mode:
+    """The mode of black for the settings of a project, the stubs always use a line length of 140"""
+    config = config or {}
+    return black.Mode(
+        target_versions={black.TargetVersion[v.upper()] for v in config.get("target_version", [])},
+        line_length=BLACK_LINE_LENGTH,
+        string_normalization=not config.get("skip_string_normalization", False),
+        magic_trailing_comma=not config.get("skip_magic_trailing_comma", False),
+        preview=config.get("preview", False),
+    )
+
+
+def black_excluded(files: List[Path], path: Path, config: Dict[str, Any]) -> List[Path]:
+    """The files in a folder that black excludes, by the exclude settings of the project or black's default excludes"""
+    patterns = [config.get("exclude", DEFAULT_EXCLUDES), config.get("extend_exclude"), config.get("force_exclude")]
+    regexes = [re.compile(p, re.VERBOSE if "\n" in p else 0) for p in patterns if p]
+    root, _ = black.find_project_root((str(path.absolute()),))
+    excluded = []
+    for f in files:
+        try:
+            relative = "/" + f.absolute().relative_to(root).as_posix()
+        except ValueError:
+            relative = "/" + f.absolute().relative_to(path.absolute()).as_posix()
+        if any(regex.search(relative) for regex in regexes):
+            excluded.append(f)
+    return excluded
+
+
+def black_key(mode: black.Mode, source: str) -> str:
+    """The key of a source in the cache of black's output, the same source is formatted differently in another mode"""
+    return content_hash(mode.get_cache_key() + source)
+
+
+def cached_black(key: str) -> Optional[str]:
+    """The cached output of black for the hash of a source, an empty string if the source was formatted, or None"""
+    with _black_lock:
+        return _black_cache.get(key)
+
+
+def cache_black(key: str, source: str, formatted: str, mode: black.Mode):
+    """Cache the output of black for the hash of a source, the formatted source is not formatted again"""
+    with _black_lock:
+        _black_cache[key] = "" if formatted == source else formatted
+        if formatted != source:
+            _black_cache[black_key(mode, formatted)] = ""
+
+
+def list_source_files(path: Path) -> List[Path]:
+    """The python files and stubs in a folder, or the file itself"""
+    if path.is_file():
+        return [path]
+    return sorted(f for f in path.rglob("*.py*") if f.suffix in (".py", ".pyi"))
+
+
+def run_black(path: Path, capture_output: bool = False, files: Optional[List[Path]] = None):
     """
     run black to format the code / stubs
+    The files are formatted in this process, or in a process pool for larger folders.
+    The mode and the excludes are read from the black settings of the project, as black does.
+    Files that black's cache on disk records as formatted are skipped, and the output of black
+    is cached by the hash of the input, so copies of a formatted file are not formatted again.
+    The files can be provided, to share the walk of the folder with autoflake.
+    Returns 0, or 123 if a file could not be formatted, as black does.
     """
+    if not path.exists():
+        log.warning(f"Path does not exist: {path}")
+        return -1
     log.debug("Running black on: {}".format(path))
-    cmd = [
-        sys.executable,
-        "-m",
-        "black",
-        path.as_posix(),
-        "--line-length",
-        "140",
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8")
+    start = time.perf_counter()
+    config = black_config(path)
+    mode = black_mode(config)
+    files = list_source_files(path) if files is None else files
+    if path.is_dir():
+        excluded = black_excluded(files, path, config)
+        files = [f for f in files if f not in excluded]
+    cache = Cache.read(mode)
+    changed, _ = cache.filtered_cached(files)
+    formatted_files = [f for f in files if f not in changed]
+    jobs: List[Tuple[str, str, black.Mode]] = []
+    sources: Dict[str, Tuple[str, str, str, str]] = {}
+    for f in sorted(changed):
+        source, encoding, newline = black.decode_bytes(f.read_bytes())
+        file_mode = replace(mode, is_pyi=f.suffix == ".pyi")
+        key = black_key(file_mode, source)
+        cached = cached_black(key)
+        if cached is not None:
+            # an empty output means the file was already formatted
+            formatted = cached or source
+            if formatted != source:
+                write_source(f, formatted, encoding, newline)
+            formatted_files.append(f)
+            continue
+        sources[str(f)] = (source, encoding, newline, key)
+        jobs.append((str(f), source, file_mode))
+
+    if len(jobs) < POOL_MIN_FILES:
+        jobs_done = [format_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(FORMAT_WORKERS, len(jobs) // POOL_MIN_FILES + 1), mp_context=_POOL_CONTEXT) as pool:
+            jobs_done = list(pool.map(format_job, jobs, chunksize=8))
+
+    returncode = 0
+    for filename, formatted, error in jobs_done:
+        source, encoding, newline, key = sources[filename]
+        if formatted is None:
+            log.warning(f"black could not format {filename}: {error}")
+            returncode = 123
+            continue
+        cache_black(key, source, formatted, replace(mode, is_pyi=filename.endswith(".pyi")))
+        if formatted != source:
+            write_source(Path(filename), formatted, encoding, newline)
+        formatted_files.append(Path(filename))
+    cache.write(formatted_files)
+    # with capture_output, black is as quiet as it was in a subprocess
+    (log.debug if capture_output else log.info)(
+        f"black formatted {len(jobs_done)} files in {path} in {time.perf_counter() - start:.2f}s, {len(files) - len(jobs)} from cache"
+    )
+    return returncode
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-    return result.returncode
 
+def format_source(source: str, is_pyi: bool = False, mode: Optional[black.Mode] = None) -> str:
+    """Format python source or a stub with black, returns the source if it is already formatted"""
+    try:
+        return black.format_file_contents(source, fast=False, mode=replace(mode or black_mode(), is_pyi=is_pyi))
+    except black.NothingChanged:
+        return source
 
-def run_autoflake(path: Path, capture_output: bool = False, process_pyi: bool = False):
+
+def format_job(job: Tuple[str, str, black.Mode]) -> Tuple[str, Optional[str], str]:
+    """Format the source of a file in a mode, returns the filename, the formatted source or None, and the error"""
+    filename, source, mode = job
+    try:
+        return filename, format_source(source, mode.is_pyi, mode), ""
+    except Exception as e:
+        return filename, None, str(e)
+
+
+def write_source(path: Path, source: str, encoding: str, newline: str):
+    with open(path, "w", encoding=encoding, newline=newline) as f:
+        f.write(source)
+
+
+def run_autoflake(path: Path, capture_output: bool = False, process_pyi: bool = False, files: Optional[List[Path]] = None) -> int:
     """
     run autoflake to remove unused imports
     needs to be run BEFORE black otherwise it does not recognize long import from`s.
-    note: is run file-by-file to include processing .pyi files
+    note: is run file-by-file to include processing .pyi files, in a process pool for larger folders.
+    The files can be provided, to share the walk of the folder with black.
+    Returns the exit status of autoflake, or -1 if the path does not exist, see autoflake_summary for the changed files.
     """
+    return autoflake_summary(path, process_pyi=process_pyi, files=files).exit_status
+
+
+def autoflake_summary(path: Path, process_pyi: bool = False, files: Optional[List[Path]] = None) -> AutoflakeSummary:
+    """Run autoflake as run_autoflake does, returns a summary of the processed and the changed files"""
     if not path.exists():
         log.warning(f"Path does not exist: {path}")
-        return -1
+        return AutoflakeSummary(-1, 0, [], 0.0)
     log.info(f"Running autoflake on: {path}")
+    start = time.perf_counter()
     # create a list of files to be formatted
-    files: List[Path] = []
-    files.extend(path.rglob("*.py"))
-    if process_pyi:
-        files.extend(path.rglob("*.pyi"))
+    files = list_source_files(path) if files is None else files
+    if not process_pyi:
+        files = [f for f in files if f.suffix == ".py"]
 
     # do not process umodules as that would remove all imports
-    files = [f for f in files if not f.name.startswith("u")]
-
-    # build an argument list
-    autoflake_args = {
-        "write_to_stdout": False,  # print changed text to stdout
-        "in_place": True,  # make changes to files instead of printing diffs
-        "remove_all_unused_imports": False,
-        "ignore_init_module_imports": False,  # exclude __init__.py when removing unused imports
-        "expand_star_imports": False,
-        "remove_duplicate_keys": False,
-        "remove_unused_variables": False,  # remove all unused imports (not just those from the standard library)
-        "remove_rhs_for_unused_variables": False,
-        "ignore_pass_statements": False,  # remove pass when superfluous
-        "ignore_pass_after_docstring": False,  # ignore pass statements after a newline ending on '"""'
-        "check": False,  # return error code if changes are needed
-        "check_diff": False,
-        "quiet": False,
-    }
+    filenames = [str(f) for f in files if not f.name.startswith("u")]
+
     # format the files
+    if len(filenames) < POOL_MIN_FILES:
+        results = autoflake_files(filenames)
+    else:
+        chunks = [filenames[n : n + AUTOFLAKE_CHUNK] for n in range(0, len(filenames), AUTOFLAKE_CHUNK)]
+        with ProcessPoolExecutor(max_workers=min(FORMAT_WORKERS, len(chunks)), mp_context=_POOL_CONTEXT) as pool:
+            results = [result for chunk in pool.map(autoflake_files, chunks) for result in chunk]
     exit_status = 0
-    for f in files:
-        log.debug(f"Running autoflake on: {f}")
-        exit_status |= autoflake.fix_file(str(f), args=autoflake_args)
+    for _, status, _ in results:
+        exit_status |= status
+    summary = AutoflakeSummary(exit_status, len(filenames), [Path(f) for f, _, changed in results if changed], time.perf_counter() - start)
+    log.info(f"autoflake changed {len(summary.changed)} of {summary.files} files in {path} in {summary.seconds:.2f}s")
+    return summary
+
+
+def autoflake_files(filenames: List[str]) -> List[Tuple[str, int, bool]]:
+    """Run autoflake on a list of files, returns the filename, exit status and if the file changed, per file"""
+    results = []
+    for filename in filenames:
+        log.debug(f"Running autoflake on: {filename}")
+        before = Path(filename).read_bytes()
+        status = autoflake.fix_file(filename, args=AUTOFLAKE_ARGS)
+        results.append((filename, status, Path(filename).read_bytes() != before))
+    return results
@@ -2,14 +2,17 @@
 
 import re
 import sys
+import threading
 from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, List
 
 from mpflash.logger import log
 import mypy.stubgen as stubgen
 from mypy.errors import CompileError
 
-# default stubgen options
-STUBGEN_OPT = stubgen.Options(
+# default stubgen options, a run gets its own Options, see stubgen_options
+STUBGEN_ARGS = dict(
     pyversion=(
         3,
         8,
@@ -32,22 +35,43 @@ STUBGEN_OPT = stubgen.Options(
     include_docstrings=True,  # include existing docstrings with the stubs
 )
 
+# the mypy build of stubgen is not thread-safe, and the stubs of the boards are post-processed in threads
+_stubgen_lock = threading.Lock()
+
+
+# rx_const = re.compile(r"const\(([\w_\"']+)\)")
+RX_CONST = re.compile(r"const\(([-*<.,:/\(\) \w_\"']+)\)")
+
+
+def replace_const(data: str) -> str:
+    """replace `const(foo)` with `foo`"""
+    # regex Search for const\(([\w_"']+)\) and replace with (\1)
+    return RX_CONST.sub(r"\1", data)
+
+
+def stubgen_options(files: List[str], output_dir: str) -> stubgen.Options:
+    """New stubgen options for a single run"""
+    return stubgen.Options(**{**STUBGEN_ARGS, "files": files, "output_dir": output_dir})
+
+
+def run_stubgen(files: List[str], output_dir: str):
+    """Run stubgen on the files or folders, one run at the time"""
+    with _stubgen_lock:
+        stubgen.generate_stubs(stubgen_options(files, output_dir))
+
 
 def generate_pyi_from_file(file: Path) -> bool:
     """Generate a .pyi stubfile from a single .py module using mypy/stubgen"""
 
-    sg_opt = STUBGEN_OPT
     # Deal with generator passed in
     assert isinstance(file, Path)
 
-    sg_opt.files = [str(file)]
-    sg_opt.output_dir = str(file.parent)
     try:
         log.debug(f"Calling stubgen on {str(file)}")
         # TDOD: Stubgen.generate_stubs does not provide a way to return the errors
         # such as `cannot perform relative import`
 
-        stubgen.generate_stubs(sg_opt)
+        run_stubgen([str(file)], str(file.parent))
         return True
     except (Exception, CompileError, SystemExit) as e:
         # the only way to know if an error was encountered by generate_stubs
@@ -69,17 +93,14 @@ def generate_pyi_files(modules_folder: Path) -> bool:
         with open(modules_folder / "umqtt" / "__init__.py", "a") as f:
             f.write("")
 
-    # rx_const = re.compile(r"const\(([\w_\"']+)\)")
-    rx_const = re.compile(r"const\(([-*<.,:/\(\) \w_\"']+)\)")
     # FIX 2 - replace `const(foo)` with `foo`
     for f in modules_folder.rglob("*.py"):
         if f.is_file():
             with open(f, "r") as file:
                 data = file.read()
-            # regex Search for const\(([\w_"']+)\) and replace with (\1)
-            if rx_const.search(data):
+            if RX_CONST.search(data):
                 log.debug(f"replace const() in {f}")
-                data = rx_const.sub(r"\1", data)
+                data = replace_const(data)
                 with open(f, "w") as file:
                     file.write(data)
 
@@ -95,11 +116,8 @@ def generate_pyi_files(modules_folder: Path) -> bool:
         log.debug("::group::[stubgen] running stubgen on {0}".format(modules_folder))
 
         run_per_file = False
-        sg_opt = STUBGEN_OPT
-        sg_opt.files = [str(modules_folder)]
-        sg_opt.output_dir = str(modules_folder)
         try:
-            stubgen.generate_stubs(sg_opt)
+            run_stubgen([str(modules_folder)], str(modules_folder))
         except (Exception, CompileError, SystemExit) as e:
             if isinstance(e, KeyboardInterrupt):
                 raise e
@@ -137,3 +155,71 @@ def generate_pyi_files(modules_folder: Path) -> bool:
             # todo: report failures by adding to module manifest
 
     return r
+
+
+def generate_pyi_in_memory(modules_folder: Path, sources: Dict[Path, str]) -> Dict[Path, str]:
+    """
+    Generate the stubs for the .py modules in a folder from their source text, in the same way as generate_pyi_files,
+    but without writing the modules or the stubs.
+    The stubs are generated from a copy of the source text, so the `const()` fix does not need to rewrite the modules.
+
+    Returns: the text of the stub per .pyi path
+    Raises: SystemExit or CompileError if stubgen cannot process a single module
+    """
+    module_list = list(modules_folder.glob("**/modules.json"))
+    if len(module_list) > 1:
+        # process each module separately
+        stubs: Dict[Path, str] = {}
+        for mod_manifest in module_list:
+            folder = mod_manifest.parent
+            stubs.update(generate_pyi_in_memory(folder, {f: text for f, text in sources.items() if folder in f.parents}))
+        return stubs
+
+    by_path = {str(f): text for f, text in sources.items()}
+    # FIX 1 add __init__.py to umqtt, stubgen finds the packages on disk
+    init = modules_folder / "umqtt" / "__init__.py"
+    if str(modules_folder / "umqtt" / "robust.py") in by_path and str(init) not in by_path:
+        log.debug("add missing : umqtt/__init__.py")
+        init.touch()
+        by_path[str(init)] = ""
+    try:
+        return stubgen_sources(modules_folder, by_path)
+    except (Exception, CompileError, SystemExit) as e:
+        if isinstance(e, KeyboardInterrupt) or len(by_path) <= 1:
+            raise e
+        log.warning(e.args[0])
+    # in case of failure ( duplicate module in subfolder) then Plan B
+    # - run stubgen on each module
+    log.debug("::group::[stubgen] Failure on folder, attempt to run stubgen per module")
+    stubs = {}
+    for path, text in by_path.items():
+        try:
+            stubs.update(stubgen_sources(modules_folder, {path: text}))
+        except (Exception, CompileError, SystemExit) as e:
+            log.warning(e.args[0])
+    return stubs
+
+
+def stubgen_sources(modules_folder: Path, by_path: Dict[str, str]) -> Dict[Path, str]:
+    """
+    Run stubgen on the source text of the modules in a folder, by path. Returns the text of the stub per .pyi path
+    The text with the `const()` fix is written to a temp folder, and stubgen runs on that folder in the same way as on the modules.
+    """
+    with TemporaryDirectory(prefix="stubgen") as temp:
+        root = Path(temp)
+        sources: Dict[str, Path] = {}
+        for path, text in by_path.items():
+            source = sources[path] = root / Path(path).relative_to(modules_folder)
+            source.parent.mkdir(parents=True, exist_ok=True)
+            source.write_text(replace_const(text), encoding="utf-8")
+        if len(sources) > 1:
+            run_stubgen([str(root)], str(root))
+        for source in sources.values():
+            # as generate_pyi_files, the modules in a subfolder without __init__.py are stubbed per file
+            if not source.with_suffix(".pyi").exists():
+                run_stubgen([str(source)], str(source.parent))
+        return {
+            Path(path).with_suffix(".pyi"): source.with_suffix(".pyi").read_text(encoding="utf-8")
+            for path, source in sources.items()
+            if source.with_suffix(".pyi").exists()
+        }
@@ -26,7 +26,7 @@ def create_variants(
     *,
     target_path: Optional[Path] = None,
     version: str = "",
-    make_variants: List[CreateStubsVariant] = ALL_VARIANTS[:3],
+    make_variants: List[CreateStubsVariant] = [*ALL_VARIANTS[:3], CreateStubsVariant.BIN],
     update_modules: bool = True,
 ):
     """
@@ -0,0 +1,88 @@
+import json
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from stubber.bulk.mcu_stubber import FINGERPRINTS, copy_fingerprints, report_fingerprints, reuse_unchanged
+from stubber.bulk.stub_records import render_stub_folder
+
+pytestmark = [pytest.mark.stubber]
+
+
+def write_report(folder: Path, modules: list):
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / "modules.json").write_text(json.dumps({"firmware": {}, "modules": modules}))
+
+
+@pytest.fixture
+def previous(tmp_path: Path) -> Path:
+    "the stubs of a previous run in the stubs repo"
+    path = tmp_path / "repo" / "micropython-v1_24_0-esp32"
+    write_report(
+        path,
+        [
+            {"module": "sys", "file": "stubs/sys.pyi", "depth": 3, "crc": "0000abcd"},
+            {"module": "umqtt.simple", "file": "stubs/umqtt/simple.pyi", "depth": 2, "crc": "00001234", "profile": {"size": 10}},
+            {"module": "gone", "file": "stubs/gone.pyi", "depth": 3, "crc": "00005678"},
+            {"module": "old", "file": "stubs/old.pyi", "depth": 3},
+        ],
+    )
+    (path / "sys.pyi").write_text("# previous sys")
+    (path / "umqtt").mkdir()
+    (path / "umqtt" / "simple.pyi").write_text("# previous umqtt.simple")
+    return path
+
+
+def test_report_fingerprints(previous: Path):
+    assert report_fingerprints(previous / "modules.json") == {"sys": "0000abcd", "umqtt.simple": "00001234", "gone": "00005678"}
+    assert report_fingerprints(previous / "missing.json") == {}
+
+
+@pytest.mark.parametrize("mount_vfs", [True, False])
+def test_copy_fingerprints(previous: Path, tmp_path: Path, mocker: MockerFixture, mount_vfs: bool):
+    mcu = mocker.MagicMock()
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    assert copy_fingerprints(mcu, dest, mount_vfs=mount_vfs, previous=previous) == 3
+    assert "umqtt.simple 00001234\n" in (dest / FINGERPRINTS).read_text()
+    copied = [c for c in mcu.run_command.call_args_list if c.args[0][0] == "cp"]
+    assert len(copied) == (0 if mount_vfs else 1)
+
+    # without previous stubs all modules are stubbed, and fingerprinted for the next run
+    assert copy_fingerprints(mcu, dest, mount_vfs=mount_vfs, previous=None) == 0
+    assert (dest / FINGERPRINTS).read_text() == "# fingerprints of the previous stubs\n"
+
+    # without skip_unchanged the modules are not fingerprinted
+    assert copy_fingerprints(mcu, dest, mount_vfs=mount_vfs, previous=previous, skip_unchanged=False) == 0
+    assert not (dest / FINGERPRINTS).exists()
+
+
+def test_reuse_unchanged(previous: Path, tmp_path: Path):
+    source = tmp_path / "stubs" / "micropython-v1_24_0-esp32"
+    write_report(
+        source,
+        [
+            {"module": "sys", "file": "stubs/sys.pyi", "depth": 3, "crc": "0000abcd", "unchanged": True},
+            {"module": "umqtt.simple", "file": "stubs/umqtt/simple.pyi", "depth": 3, "crc": "00001234", "unchanged": True},
+            {"module": "gone", "file": "stubs/gone.pyi", "depth": 3, "crc": "00005678", "unchanged": True},
+            {"module": "json", "file": "stubs/json.pyi", "depth": 3, "crc": "00009999"},
+        ],
+    )
+    assert reuse_unchanged(source, previous) == 2
+    assert (source / "sys.pyi").read_text() == "# previous sys"
+    assert (source / "umqtt" / "simple.pyi").read_text() == "# previous umqtt.simple"
+    modules = {m["module"]: m for m in json.loads((source / "modules.json").read_text())["modules"]}
+    assert modules["umqtt.simple"]["depth"] == 2
+    assert modules["umqtt.simple"]["profile"] == {"size": 10}
+    # no previous stub: stubbed again in the next run
+    assert "crc" not in modules["gone"] and "unchanged" not in modules["gone"]
+    assert modules["json"]["crc"] == "00009999"
+
+
+def test_render_unchanged_bin(tmp_path: Path):
+    "the unchanged modules of the bin variant have no .stb file, but are reported as .pyi"
+    write_report(tmp_path, [{"module": "sys", "file": "stubs/sys.stb", "crc": "0000abcd", "unchanged": True}])
+    assert render_stub_folder(tmp_path) == 0
+    report = json.loads((tmp_path / "modules.json").read_text())
+    assert report["modules"][0]["file"] == "stubs/sys.pyi"
@@ -0,0 +1,108 @@
+import json
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from stubber.bulk.mcu_stubber import INSTALL_MARKER, OK, Form, install_scripts_to_board, local_package, package_hash
+
+pytestmark = [pytest.mark.stubber]
+
+BOARD = Path(__file__).parents[2] / "src/stubber/board"
+
+
+class BoardFile:
+    "a file on the board, that is only written"
+
+    def __init__(self, files: dict, path: str):
+        self.files = files
+        self.path = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.files[self.path] = self.files.pop(self.path + "~")
+
+    def write(self, data: str):
+        self.files[self.path + "~"] = data
+
+
+def fake_board(mocker: MockerFixture):
+    """A board that keeps the files written with exec"""
+    files = {}
+    mcu = mocker.MagicMock(serialport="/dev/ttyUSB0")
+
+    def run_command(cmd, **kwargs):
+        if cmd[0] == "cat":
+            path = cmd[1].lstrip(":")
+            return (OK, [files[path]]) if path in files else (1, [])
+        if cmd[0] == "exec":
+            exec(cmd[1], {"open": lambda path, mode: BoardFile(files, path)})
+        return OK, []
+
+    mcu.run_command.side_effect = run_command
+    mcu.mip_install.return_value = True
+    return mcu, files
+
+
+def test_skip_install_of_same_scripts(mocker: MockerFixture):
+    mcu, files = fake_board(mocker)
+    assert install_scripts_to_board(mcu, Form.mpy)
+    assert mcu.mip_install.call_count == 1
+    assert files[INSTALL_MARKER] == package_hash(BOARD / "pkg_mpy.json")
+    # the same scripts are not installed again
+    assert install_scripts_to_board(mcu, Form.mpy)
+    assert mcu.mip_install.call_count == 1
+    # other scripts are
+    assert install_scripts_to_board(mcu, Form.py)
+    assert mcu.mip_install.call_count == 2
+    assert files[INSTALL_MARKER] == package_hash(BOARD / "pkg_full.json")
+
+
+def test_failed_install_keeps_marker(mocker: MockerFixture):
+    mcu, files = fake_board(mocker)
+    mcu.mip_install.return_value = False
+    assert not install_scripts_to_board(mcu, Form.mpy)
+    assert INSTALL_MARKER not in files
+
+
+def test_install_from_local_scripts(mocker: MockerFixture):
+    "mip installs the scripts of this package that are hashed, rather than the scripts on github"
+    mcu, files = fake_board(mocker)
+    installed = {}
+
+    def mip_install(name: str) -> bool:
+        package = json.loads(Path(name).read_text())
+        for target, url in package["urls"]:
+            installed[target] = (Path(name).parent / url).read_bytes()
+        return True
+
+    mcu.mip_install.side_effect = mip_install
+    assert install_scripts_to_board(mcu, Form.min)
+    assert installed["createstubs.py"] == (BOARD / "createstubs_min.py").read_bytes()
+    assert sorted(installed) == ["createstubs.py", "createstubs_db.py", "createstubs_mem.py", "modulelist.txt"]
+    # the marker is written and closed
+    assert files[INSTALL_MARKER] == package_hash(BOARD / "pkg_minified.json")
+
+
+def test_local_package(tmp_path: Path):
+    package = local_package(BOARD / "pkg_mpy.json", tmp_path)
+    urls = json.loads(package.read_text())["urls"]
+    assert ["createstubs.mpy", "createstubs.mpy"] in urls
+    assert (tmp_path / "createstubs.mpy").read_bytes() == (BOARD / "createstubs_mpy.mpy").read_bytes()
+
+
+def test_package_hash_changes_with_script(tmp_path: Path):
+    package = tmp_path / "pkg.json"
+    package.write_text('{"urls": [["createstubs.py", "github:Josverl/micropython-stubber/src/stubber/board/createstubs.py"]]}')
+    script = tmp_path / "createstubs.py"
+    script.write_text("__version__ = 1")
+    first = package_hash(package)
+    assert first and first == package_hash(package)
+    script.write_text("__version__ = 2")
+    assert package_hash(package) != first
+    # a script that cannot be installed from the local files
+    script.unlink()
+    assert package_hash(package) == ""
+    assert package_hash(tmp_path / "missing.json") == ""
@@ -0,0 +1,87 @@
+from pathlib import Path
+from typing import Dict
+
+import pytest
+from pytest_mock import MockerFixture
+from serial.tools.list_ports_common import ListPortInfo
+
+from stubber.bulk import mcu_cache
+from stubber.bulk.mcu_cache import OK, list_cached_mcus, load_cache, usb_identity
+
+pytestmark = [pytest.mark.stubber]
+
+
+def portinfo(device: str, serial_number: str = "") -> ListPortInfo:
+    info = ListPortInfo(device, skip_link_detection=True)
+    info.vid, info.pid, info.serial_number, info.location = 0x10C4, 0xEA60, serial_number, "1-1"
+    return info
+
+
+@pytest.fixture
+def rack(tmp_path: Path, mocker: MockerFixture) -> Dict[str, str]:
+    """Boards that answer the ping with their sys.version, and count the probes"""
+    versions = {"/dev/ttyUSB0": "3.4.0; MicroPython v1.24.0 on 2024-10-25", "/dev/ttyUSB1": "3.4.0; MicroPython v1.23.0 on 2024-06-02"}
+    mocker.patch.object(mcu_cache, "cache_path", return_value=tmp_path / "mcu_cache.json")
+    mocker.patch.object(mcu_cache, "find_serial_by_path", return_value=None)
+
+    def run_command(self, cmd, **kwargs):
+        return (OK, [versions[self.serialport]]) if self.serialport in versions else (1, [])
+
+    def get_mcu_info(self, timeout: int = 2):
+        self.family, self.port, self.board_id = "micropython", "esp32", "ESP32_GENERIC"
+        self.version = versions[self.serialport].split(" v")[1].split()[0]
+        self.toml = {"micropython-stubber": {"ignore": False}}
+        self.connected = True
+
+    mocker.patch.object(mcu_cache.MPRemoteBoard, "run_command", run_command)
+    mocker.patch.object(mcu_cache.MPRemoteBoard, "get_mcu_info", side_effect=get_mcu_info, autospec=True)
+    return versions
+
+
+def test_probe_only_changed_boards(rack: Dict[str, str], mocker: MockerFixture, tmp_path: Path):
+    ports = [portinfo("/dev/ttyUSB0", "A1"), portinfo("/dev/ttyUSB1", "B2")]
+    mocker.patch.object(mcu_cache, "filtered_portinfos", return_value=ports)
+    probe = mcu_cache.MPRemoteBoard.get_mcu_info
+
+    mcus = list_cached_mcus(ignore=[], include=["*"])
+    assert probe.call_count == 2
+    assert len(load_cache(tmp_path / "mcu_cache.json")) == 2
+
+    # same boards and firmware, nothing is probed
+    mcus = list_cached_mcus(ignore=[], include=["*"])
+    assert probe.call_count == 2
+    assert [(m.version, m.board, m.connected) for m in mcus] == [("1.24.0", "ESP32_GENERIC", True), ("1.23.0", "ESP32_GENERIC", True)]
+    assert mcus[0].toml == {"micropython-stubber": {"ignore": False}}
+
+    # one board flashed with other firmware
+    rack["/dev/ttyUSB1"] = "3.4.0; MicroPython v1.24.1 on 2024-11-29"
+    mcus = list_cached_mcus(ignore=[], include=["*"])
+    assert probe.call_count == 3
+    assert mcus[1].version == "1.24.1"
+
+    # refresh probes all boards
+    list_cached_mcus(ignore=[], include=["*"], refresh=True)
+    assert probe.call_count == 5
+
+
+def test_moved_board_and_unknown_serial(rack: Dict[str, str], mocker: MockerFixture, tmp_path: Path):
+    mocker.patch.object(mcu_cache, "filtered_portinfos", return_value=[portinfo("/dev/ttyUSB0", "A1")])
+    list_cached_mcus(ignore=[], include=["*"])
+    probe = mcu_cache.MPRemoteBoard.get_mcu_info
+    # the same board on another port
+    rack["/dev/ttyUSB2"] = rack["/dev/ttyUSB0"]
+    mocker.patch.object(mcu_cache, "filtered_portinfos", return_value=[portinfo("/dev/ttyUSB2", "A1")])
+    (mcu,) = list_cached_mcus(ignore=[], include=["*"])
+    assert probe.call_count == 1
+    assert mcu.serialport == "/dev/ttyUSB2" and mcu.version == "1.24.0"
+    assert load_cache(tmp_path / "mcu_cache.json")["10c4:ea60:A1"]["serialport"] == "/dev/ttyUSB2"
+    # without a serial number a board is always probed
+    mocker.patch.object(mcu_cache, "filtered_portinfos", return_value=[portinfo("/dev/ttyUSB1")])
+    list_cached_mcus(ignore=[], include=["*"])
+    list_cached_mcus(ignore=[], include=["*"])
+    assert probe.call_count == 3
+
+
+def test_usb_identity():
+    assert usb_identity(portinfo("/dev/ttyUSB0", "0001")) == "10c4:ea60:0001"
+    assert usb_identity(portinfo("/dev/ttyUSB0")) is None
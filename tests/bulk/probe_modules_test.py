@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from stubber.bulk.mcu_stubber import copy_modulelist_avail, parse_help_modules
+
+pytestmark = [pytest.mark.stubber]
+
+HELP_MODULES = """\
+__main__          cmath             json              struct
+_asyncio          collections       machine           sys
+asyncio/__init__  deflate           math              time
+asyncio/core      framebuf          micropython       uasyncio
+Plus any modules on the filesystem
+"""
+
+
+def test_parse_help_modules():
+    modules = parse_help_modules(HELP_MODULES.splitlines())
+    assert len(modules) == 16
+    assert "asyncio/core" in modules
+    assert "json" in modules
+    assert "Plus" not in modules
+
+
+def test_parse_help_modules_not_supported():
+    # help() of a port built without help('modules') describes the str
+    out = ["object modules is of type str", "  find -- <function>", "  rfind -- <function>", "  index -- <function>"]
+    assert parse_help_modules(out) == []
+    # the listing was cut off
+    assert parse_help_modules(HELP_MODULES.splitlines()[:-1]) == []
+
+
+@pytest.mark.parametrize("mount_vfs", [True, False])
+def test_copy_modulelist_avail(tmp_path: Path, mocker: MockerFixture, mount_vfs: bool):
+    mcu = mocker.MagicMock()
+    mcu.run_command.return_value = (0, HELP_MODULES.splitlines())
+    assert copy_modulelist_avail(mcu, tmp_path, mount_vfs=mount_vfs) == 16
+    assert "machine\n" in (tmp_path / "modulelist.avail").read_text()
+    copied = [c for c in mcu.run_command.call_args_list if c.args[0][0] == "cp"]
+    assert len(copied) == (0 if mount_vfs else 1)
+
+    # a stale list is removed when the board cannot be probed
+    mcu.run_command.return_value = (1, [])
+    assert copy_modulelist_avail(mcu, tmp_path, mount_vfs=mount_vfs) == 0
+    assert not (tmp_path / "modulelist.avail").exists()
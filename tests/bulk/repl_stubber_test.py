@@ -0,0 +1,168 @@
+# type: ignore reportGeneralTypeIssues
+import io
+import json
+from contextlib import redirect_stdout
+from importlib import import_module
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from mpremote.transport import TransportError, TransportExecError
+
+from stubber.bulk import mcu_stubber, repl_stubber
+from stubber.bulk.repl_stubber import ReplStubber, parse_listing
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+FIRMWARE = {"family": "micropython", "version": "1.24.0", "port": "esp32", "board": "ESP32_GENERIC"}
+MODULES = ["json", "collections", "machine", "os/path"]
+
+
+class FakeRepl:
+    "the raw REPL of a board, that runs the snippets in CPython"
+
+    def __init__(self):
+        self.globals = {}
+        self.commands = []
+
+    def exec(self, command, data_consumer=None) -> bytes:
+        self.commands.append(command)
+        out = io.StringIO()
+        try:
+            with redirect_stdout(out):
+                exec(command, self.globals)
+        except Exception as e:
+            raise TransportExecError(1, f"Traceback (most recent call last):\n{type(e).__name__}: {e}\n") from e
+        return out.getvalue().encode()
+
+
+def stub_body(stub: str) -> str:
+    "the stub without the header, that differs between the board and the host"
+    return stub.split("from _typeshed import Incomplete\n", 1)[1]
+
+
+@pytest.fixture
+def repl(mock_micropython_path: Generator[str, None, None]) -> FakeRepl:
+    return FakeRepl()
+
+
+def test_repl_same_as_createstubs(repl: FakeRepl, tmp_path: Path, monkeypatch):
+    "the stubs formatted on the host are the same as the stubs formatted by createstubs on the board"
+    path = ReplStubber(repl, FIRMWARE).create_all_stubs(MODULES + ["not_a_module"], tmp_path / "host")
+    report = json.loads((path / "modules.json").read_text())
+    assert report["firmware"] == FIRMWARE
+    assert [m["module"] for m in report["modules"]] == ["json", "collections", "machine", "os.path"]
+
+    createstubs = import_module("stubber.board.createstubs_mem")
+    monkeypatch.chdir(tmp_path)
+    stubber = createstubs.Stubber(path="board", firmware_id="MyCustomID")
+    stubber.modules = MODULES
+    stubber.create_all_stubs()
+    for module in report["modules"]:
+        host = (tmp_path / "host" / module["file"]).read_text()
+        board = Path(stubber.path, module["file"].split("/", 1)[1]).read_text()
+        assert stub_body(host) == stub_body(board), module["module"]
+
+
+def test_repl_helper_sent_once(repl: FakeRepl, tmp_path: Path):
+    stubber = ReplStubber(repl, FIRMWARE)
+    stubber.create_all_stubs(["json", "collections"], tmp_path)
+    assert len(repl.commands) == 3
+    assert all(len(c) < 30 for c in repl.commands[1:])
+    # the helper is sent again after a reset of the board
+    repl.globals.clear()
+    assert stubber.list_module("json")
+    assert len(repl.commands) == 6
+
+
+def test_repl_error_in_helper(repl: FakeRepl, tmp_path: Path, monkeypatch):
+    "an error while running the helper is raised, rather than sending the helper again"
+    stubber = ReplStubber(repl, FIRMWARE)
+    stubber.install_helper()
+    error = TransportExecError(
+        1, 'Traceback (most recent call last):\n  File "<stdin>", line 9, in _stb\nMemoryError: memory allocation failed\n'
+    )
+    sent = []
+
+    def exec(command, data_consumer=None):
+        sent.append(command)
+        raise error
+
+    monkeypatch.setattr(repl, "exec", exec)
+    with pytest.raises(TransportExecError):
+        stubber.list_module("json")
+    assert sent == ["_stb('json')"]
+
+
+def test_stub_over_repl_port_lost(tmp_path: Path, mocker):
+    "a board that is gone while stubbing is reported, also when the raw REPL cannot be left"
+    transport = mocker.MagicMock()
+    transport.enter_raw_repl.side_effect = TransportError("could not enter raw repl")
+    transport.exit_raw_repl.side_effect = TransportError("could not exit raw repl")
+    mocker.patch.object(repl_stubber, "SerialTransport", return_value=transport)
+    mcu = mocker.MagicMock(serialport="COM99")
+    assert repl_stubber.stub_over_repl(mcu, tmp_path, ["json"]) is None
+    assert transport.close.called
+
+
+def test_repl_module_errors(repl: FakeRepl, tmp_path: Path, monkeypatch):
+    "an error in a module skips the module, a lost connection stops the stubbing"
+    stubber = ReplStubber(repl, FIRMWARE)
+    repl_exec = repl.exec
+
+    def exec(command, data_consumer=None):
+        if command == "_stb('collections')":
+            raise TransportExecError(1, "Traceback (most recent call last):\nMemoryError: memory allocation failed\n")
+        if command == "_stb('machine')":
+            raise TransportError("could not read from the board")
+        return repl_exec(command, data_consumer)
+
+    monkeypatch.setattr(repl, "exec", exec)
+    path = stubber.create_all_stubs(["json", "collections"], tmp_path)
+    assert [m["module"] for m in json.loads((path / "modules.json").read_text())["modules"]] == ["json"]
+    with pytest.raises(TransportError):
+        stubber.create_all_stubs(MODULES, tmp_path)
+
+
+def test_stub_over_repl_too_few(repl: FakeRepl, tmp_path: Path, mocker):
+    "a board that stubs only a few modules is reported"
+    transport = mocker.MagicMock(exec=repl.exec)
+    mocker.patch.object(repl_stubber, "SerialTransport", return_value=transport)
+    mcu = mocker.MagicMock(serialport="COM99", cpu="", arch="", mpy="", build="", **FIRMWARE)
+    assert repl_stubber.stub_over_repl(mcu, tmp_path, ["json"]) is None
+    modules = ["array", "binascii", "collections", "errno", "gc", "io", "json", "math", "os", "struct", "sys", "time"]
+    assert repl_stubber.stub_over_repl(mcu, tmp_path, modules) is not None
+
+
+def test_parse_listing():
+    lines = [
+        "0\tA\t<class 'int'>\t1",
+        "0\tPin\t<class 'type'>\t<class 'Pin'>",
+        "1\tIN\t<class 'int'>\t1",
+        "1\ton\t<class 'function'>\t<function>",
+    ]
+    lines += ["garbage", "0\tinit\t<class 'function'>\t<function init>", "3\torphan\t<class 'int'>\t1"]
+    members = parse_listing(lines)
+    assert [m.name for m in members] == ["A", "Pin", "init"]
+    assert [m.name for m in members[1].members] == ["IN", "on"]
+
+
+def test_generate_repl_stubs(repl: FakeRepl, tmp_path: Path, mocker):
+    "the host variant installs nothing on the board, and only stubs the modules in the firmware"
+    mcu = mocker.MagicMock(family="micropython", version="1.24.0", port="esp32", board="ESP32_GENERIC")
+    mocker.patch.object(mcu_stubber, "probe_modules", return_value=["json", "aioble/core", "machine"])
+    mocker.patch.object(
+        mcu_stubber, "stub_over_repl", lambda mcu, dest, modules: ReplStubber(repl, FIRMWARE).create_all_stubs(modules, dest)
+    )
+    post = mocker.patch.object(mcu_stubber.utils, "do_post_processing")
+    install = mocker.patch.object(mcu_stubber, "install_scripts_to_board")
+
+    rc, path = mcu_stubber.generate_board_stubs(tmp_path, mcu, mcu_stubber.Variant.host)
+    assert rc == mcu_stubber.OK
+    assert not install.called
+    assert post.call_args.kwargs["stubgen"] is False
+    assert mcu.firmware == FIRMWARE
+    modules = [m["module"] for m in json.loads((path / "modules.json").read_text())["modules"]]
+    assert modules == ["json", "machine"]
+    stubbed = [c for c in repl.commands if c.startswith("_stb(")]
+    assert all(c.split("'")[1].split(".")[0] in ("aioble", "json", "machine") for c in stubbed)
@@ -0,0 +1,94 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+from pytest_mock import MockerFixture
+from rich.console import Console
+
+from stubber.bulk import mcu_stubber
+from stubber.bulk.mcu_stubber import ERROR, OK, Variant, failed_module, read_progress, recorded_crashed, run_createstubs
+
+pytestmark = [pytest.mark.stubber]
+
+
+def fake_board(mocker: MockerFixture, dest: Path, runs: List[tuple]):
+    """
+    A board that runs createstubs_db with a mounted vfs.
+    Each run records its progress and the module it stopped at in modulelist.done, and returns its return code and output.
+    """
+    mcu = mocker.MagicMock(serialport="/dev/ttyUSB0", family="micropython", version="1.24.0", port="esp32", board="GENERIC")
+    results = iter(runs)
+
+    def run_command(cmd, **kwargs):
+        if isinstance(cmd, list) and cmd[-1] == "import createstubs_db":
+            done, rc, out, *module = next(results)
+            (dest / mcu_stubber.PROGRESS_FILE).write_text(f"{done} {done * 10} {' '.join(module)}\n")
+            return rc, out
+        return OK, []
+
+    mcu.run_command.side_effect = run_command
+    return mcu
+
+
+@pytest.fixture
+def sleep(mocker: MockerFixture):
+    return mocker.patch.object(mcu_stubber.time, "sleep")
+
+
+def test_retry_with_backoff_while_progressing(tmp_path: Path, mocker: MockerFixture, sleep):
+    oom = ["INFO  : Stub module: network                   to file: network.pyi"]
+    mcu = fake_board(mocker, tmp_path, [(8, ERROR, oom), (16, ERROR, oom), (24, ERROR, oom), (30, OK, ["Path: stubs/fw"])])
+    attempts = []
+    rc, out = run_createstubs(tmp_path, mcu, Variant.db, attempts=attempts)
+    assert rc == OK and out == ["Path: stubs/fw"]
+    assert len(attempts) == 4
+    # 2 seconds after the reset, and a backoff between the runs
+    assert [c.args[0] for c in sleep.call_args_list] == [2, 1, 2, 4]
+    # only reset before the first run, the db variant continues after a reset
+    assert sum(1 for c in mcu.run_command.call_args_list if c.args[0] == "reset") == 1
+
+
+def test_give_up_on_module_that_keeps_failing(tmp_path: Path, mocker: MockerFixture, sleep):
+    # the board crashes while importing espnow, after the log of the previous module
+    crash = ["INFO  : Stub module: esp32                     to file: esp32.pyi", "Guru Meditation Error"]
+    mcu = fake_board(mocker, tmp_path, [(8, ERROR, crash, "espnow")] * 10)
+    records = tmp_path / "repo" / mcu_stubber.FIRMWARE_FILE
+    mocker.patch.object(mcu_stubber, "firmware_path", return_value=records)
+    attempts = []
+    rc, _ = run_createstubs(tmp_path, mcu, Variant.db, attempts=attempts)
+    assert rc == ERROR
+    # one run with progress, then 3 runs that fail at the same module
+    assert len(attempts) == 1 + mcu_stubber.RETRY_STUCK
+    assert recorded_crashed(mcu) == ["espnow"]
+    # no folder without stubs in the stubs repo
+    assert list(tmp_path.glob("repo/*")) == [records]
+    # reset before the first run, and after each run without progress
+    assert sum(1 for c in mcu.run_command.call_args_list if c.args[0] == "reset") == mcu_stubber.RETRY_STUCK
+
+
+def test_read_progress(tmp_path: Path, mocker: MockerFixture):
+    mcu = mocker.MagicMock()
+    assert read_progress(mcu, tmp_path) == 0
+    (tmp_path / mcu_stubber.PROGRESS_FILE).write_text("42 1234\n")
+    assert read_progress(mcu, tmp_path) == 42
+    mcu.run_command.return_value = (OK, ["17 345"])
+    assert read_progress(mcu, tmp_path, mount_vfs=False) == 17
+
+
+def test_failed_module(tmp_path: Path, mocker: MockerFixture):
+    mcu = mocker.MagicMock()
+    assert failed_module(mcu, tmp_path) is None
+    (tmp_path / mcu_stubber.PROGRESS_FILE).write_text("16 160 bluetooth\n")
+    assert failed_module(mcu, tmp_path) == "bluetooth"
+    # after a checkpoint no module is being stubbed
+    (tmp_path / mcu_stubber.PROGRESS_FILE).write_text("24 240 \n")
+    assert failed_module(mcu, tmp_path) is None
+    mcu.run_command.return_value = (OK, ["17 345 espnow"])
+    assert failed_module(mcu, tmp_path, mount_vfs=False) == "espnow"
+
+
+def test_print_timing_table_runs():
+    console = Console(record=True, width=120)
+    mcu_stubber.print_timing_table({"/dev/ttyUSB0": {"board": 90.0}}, console, attempts={"/dev/ttyUSB0": [61.25, 28.75]})
+    output = console.export_text()
+    assert "61.2, 28.8" in output
@@ -0,0 +1,22 @@
+import gzip
+from pathlib import Path
+
+import pytest
+
+from stubber.bulk.stub_compress import decompress_stubs
+
+pytestmark = [pytest.mark.stubber]
+
+
+def test_decompress_stubs(tmp_path: Path):
+    (tmp_path / "umqtt").mkdir()
+    (tmp_path / "sys.pyi.gz").write_bytes(gzip.compress(b"# sys\n"))
+    (tmp_path / "umqtt" / "simple.pyi.gz").write_bytes(gzip.compress(b"# umqtt.simple\n"))
+    (tmp_path / "json.pyi").write_text("# json\n")
+    (tmp_path / "corrupt.pyi.gz").write_bytes(b"not compressed")
+
+    assert decompress_stubs(tmp_path) == [tmp_path / "sys.pyi", tmp_path / "umqtt" / "simple.pyi"]
+    assert (tmp_path / "sys.pyi").read_text() == "# sys\n"
+    assert (tmp_path / "umqtt" / "simple.pyi").read_text() == "# umqtt.simple\n"
+    assert (tmp_path / "json.pyi").read_text() == "# json\n"
+    assert sorted(p.name for p in tmp_path.rglob("*.gz")) == ["corrupt.pyi.gz"]
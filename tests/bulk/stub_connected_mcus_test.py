@@ -0,0 +1,209 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+from pytest_mock import MockerFixture
+from rich.console import Console
+
+from stubber.bulk import mcu_stubber
+
+pytestmark = [pytest.mark.stubber]
+
+BOARDS = 6
+DURATION = 0.3
+
+
+@pytest.fixture
+def boards(mocker: MockerFixture) -> List:
+    boards = [
+        mocker.MagicMock(serialport=f"/dev/ttyUSB{n}", toml={}, firmware={"port": "esp32", "board": f"BOARD_{n}"}) for n in range(BOARDS)
+    ]
+    mocker.patch.object(mcu_stubber, "list_cached_mcus", return_value=boards)
+    mocker.patch.object(mcu_stubber, "show_mcus")
+    mocker.patch.object(mcu_stubber, "print_result_table")
+    mocker.patch.object(mcu_stubber, "print_timing_table")
+    mocker.patch.object(mcu_stubber, "post_process_stubs")
+    mocker.patch.object(mcu_stubber, "known_firmware", return_value=None)
+    return boards
+
+
+def test_stub_boards_in_parallel(boards: List, mocker: MockerFixture):
+    """Benchmark: the boards are stubbed at the same time, in their own temp folder, and published one at the time."""
+    temp_paths = set()
+    publishing = []
+
+    def generate_board_stubs(dest: Path, board, *args, **kwargs):
+        temp_paths.add(dest)
+        time.sleep(DURATION)
+        return mcu_stubber.OK, dest
+
+    def publish_board_stubs(stubs: Path, board) -> List:
+        publishing.append(threading.current_thread().name)
+        assert len(publishing) == 1, "only one board is published at the time"
+        time.sleep(0.01)
+        publishing.pop()
+        return [board.serialport]
+
+    mocker.patch.object(mcu_stubber, "generate_board_stubs", generate_board_stubs)
+    mocker.patch.object(mcu_stubber, "publish_board_stubs", publish_board_stubs)
+
+    start = time.perf_counter()
+    rc = mcu_stubber.stub_connected_mcus("db", "py", False, ["*"], [], False)
+    elapsed = time.perf_counter() - start
+    print(f"\n{BOARDS} boards of {DURATION}s: {elapsed:.2f}s")
+    assert rc == mcu_stubber.OK
+    assert len(temp_paths) == BOARDS
+    # the temp folders are removed after the stubs are published
+    assert not any(path.exists() for path in temp_paths)
+    assert elapsed < BOARDS * DURATION / 2
+    # all results are collected in one table, in the order of the boards
+    built = mcu_stubber.print_result_table.call_args.args[0]
+    assert built == [b.serialport for b in boards]
+
+
+def test_stub_boards_limited_workers(boards: List, mocker: MockerFixture):
+    running = []
+    most = []
+
+    temp_paths = []
+
+    def generate_board_stubs(dest: Path, board, *args, **kwargs):
+        temp_paths.append(dest)
+        running.append(board)
+        most.append(len(running))
+        time.sleep(0.05)
+        running.remove(board)
+        # a failing board does not stop the others
+        if board is boards[0]:
+            return mcu_stubber.ERROR, None
+        if board is boards[1]:
+            raise RuntimeError("board disconnected")
+        return mcu_stubber.OK, dest
+
+    mocker.patch.object(mcu_stubber, "generate_board_stubs", generate_board_stubs)
+    mocker.patch.object(mcu_stubber, "publish_board_stubs", lambda stubs, board: [board.serialport])
+    assert mcu_stubber.stub_connected_mcus("db", "py", False, ["*"], [], False, workers=2) == mcu_stubber.OK
+    assert max(most) == 2
+    # also the temp folders of the failed boards are removed
+    assert len(temp_paths) == BOARDS and not any(path.exists() for path in temp_paths)
+    assert len(mcu_stubber.print_result_table.call_args.args[0]) == BOARDS - 2
+
+
+def test_host_stages_overlap_board_stubbing(boards: List, mocker: MockerFixture):
+    """Benchmark: the stubs of a board are processed on the host while the next board is stubbed."""
+    stage = 0.1
+    queued = []
+    most = []
+
+    def generate_board_stubs(dest: Path, board, *args, **kwargs):
+        assert kwargs["post_process"] is False
+        time.sleep(stage)
+        queued.append(board)
+        return mcu_stubber.OK, dest
+
+    def post_process_stubs(stubs: Path):
+        most.append(len(queued))
+        time.sleep(stage)
+
+    def publish_board_stubs(stubs: Path, board) -> List:
+        queued.remove(board)
+        return [board.serialport]
+
+    mocker.patch.object(mcu_stubber, "generate_board_stubs", generate_board_stubs)
+    mocker.patch.object(mcu_stubber, "post_process_stubs", post_process_stubs)
+    mocker.patch.object(mcu_stubber, "publish_board_stubs", publish_board_stubs)
+
+    start = time.perf_counter()
+    # one board at the time, as with a single board worker
+    assert mcu_stubber.stub_connected_mcus("db", "py", False, ["*"], [], False, workers=1) == mcu_stubber.OK
+    elapsed = time.perf_counter() - start
+    print(f"\n{BOARDS} boards with {stage}s per stage: {elapsed:.2f}s")
+    assert elapsed < BOARDS * stage * 2 * 0.75
+    assert max(most) <= mcu_stubber.HOST_QUEUE
+    assert mcu_stubber.print_result_table.call_args.args[0] == [b.serialport for b in boards]
+    timings = mcu_stubber.print_timing_table.call_args.args[0]
+    assert sorted(timings[boards[0].serialport]) == ["board", "post", "publish"]
+
+
+def test_known_firmware_is_only_merged_and_built(boards: List, mocker: MockerFixture):
+    known = {b.serialport: {"port": "esp32", "board": "KNOWN"} for b in boards[:4]}
+    mocker.patch.object(mcu_stubber, "known_firmware", lambda board: known.get(board.serialport))
+    stubbed = []
+
+    def generate_board_stubs(dest: Path, board, *args, **kwargs):
+        stubbed.append(board.serialport)
+        return mcu_stubber.OK, dest
+
+    mocker.patch.object(mcu_stubber, "generate_board_stubs", generate_board_stubs)
+    mocker.patch.object(mcu_stubber, "publish_board_stubs", lambda stubs, board: [f"new {board.serialport}"])
+    mocker.patch.object(mcu_stubber, "merge_and_build", lambda board: [f"known {board.serialport}"])
+
+    assert mcu_stubber.stub_connected_mcus("db", "py", False, ["*"], [], False) == mcu_stubber.OK
+    assert sorted(stubbed) == [b.serialport for b in boards[4:]]
+    assert mcu_stubber.print_result_table.call_args.args[0] == [f"known {b.serialport}" for b in boards[:4]] + [
+        f"new {b.serialport}" for b in boards[4:]
+    ]
+    assert boards[0].firmware == {"port": "esp32", "board": "KNOWN"}
+
+    # skipped entirely
+    stubbed.clear()
+    mcu_stubber.print_result_table.reset_mock()
+    assert mcu_stubber.stub_connected_mcus("db", "py", False, ["*"], [], False, skip_known=True) == mcu_stubber.OK
+    assert mcu_stubber.print_result_table.call_args.args[0] == [f"new {b.serialport}" for b in boards[4:]]
+    # a profile needs a new run on all boards
+    stubbed.clear()
+    assert mcu_stubber.stub_connected_mcus("db", "py", False, ["*"], [], False, profile=True) == mcu_stubber.OK
+    assert sorted(stubbed) == [b.serialport for b in boards]
+
+
+def test_all_boards_known(boards: List, mocker: MockerFixture):
+    mocker.patch.object(mcu_stubber, "known_firmware", return_value={"port": "esp32", "board": "KNOWN"})
+    generate = mocker.patch.object(mcu_stubber, "generate_board_stubs")
+    assert mcu_stubber.stub_connected_mcus("db", "py", False, ["*"], [], False, skip_known=True) == mcu_stubber.OK
+    generate.assert_not_called()
+
+
+def test_known_firmware(tmp_path: Path, mocker: MockerFixture):
+    mcu = mocker.MagicMock(family="micropython", version="1.24.1", build="", port="rp2", board="RPI_PICO")
+    mocker.patch.object(mcu_stubber, "stubs_folder", return_value=tmp_path)
+    assert mcu_stubber.known_firmware(mcu) is None
+    firmware = {"family": "micropython", "version": "v1.24.1", "build": "", "port": "rp2", "board": "RPI_PICO", "cpu": "RP2040"}
+    report = {"firmware": firmware, "stubber": {"version": f"v{mcu_stubber.__version__}"}, "modules": []}
+    (tmp_path / "modules.json").write_text(json.dumps(report))
+    assert mcu_stubber.known_firmware(mcu) == firmware
+    # other build of the firmware
+    mcu.build = "123"
+    assert mcu_stubber.known_firmware(mcu) is None
+    mcu.build = ""
+    # stubs of an older stubber
+    report["stubber"]["version"] = "v1.0.0"
+    (tmp_path / "modules.json").write_text(json.dumps(report))
+    assert mcu_stubber.known_firmware(mcu) is None
+
+
+def test_stubs_folder_of_published_stubs(tmp_path: Path, mocker: MockerFixture):
+    "the folder is named after the firmware in modules.json, and found again from the board in the next run"
+    mcu = mocker.MagicMock(family="micropython", version="1.24.1", port="rp2", board="RPI_PICO", firmware={"board": "RPI_PICO_W"})
+    mocker.patch.object(mcu_stubber, "firmware_path", return_value=tmp_path / mcu_stubber.FIRMWARE_FILE)
+    mocker.patch.object(mcu_stubber, "copy_to_repo", return_value=tmp_path / "micropython-v1_24_1-rp2-RPI_PICO_W")
+    mocker.patch.object(mcu_stubber, "merge_and_build", return_value=["built"])
+    assert mcu_stubber.stubs_folder(mcu) is None
+    assert mcu_stubber.publish_board_stubs(tmp_path / "stubs", mcu) == ["built"]
+    assert mcu_stubber.stubs_folder(mcu) == mcu_stubber.CONFIG.stub_path / "micropython-v1_24_1-rp2-RPI_PICO_W"
+    # the crashed modules are kept in the same record
+    mcu_stubber.record_crashed(mcu, ["espnow"])
+    assert mcu_stubber.recorded_crashed(mcu) == ["espnow"]
+    assert mcu_stubber.stubs_folder(mcu).name == "micropython-v1_24_1-rp2-RPI_PICO_W"
+
+
+def test_print_timing_table():
+    console = Console(record=True, width=120)
+    mcu_stubber.print_timing_table(
+        {"/dev/ttyUSB0": {"board": 61.25, "post": 12.5, "publish": 30.0}, "/dev/ttyUSB1": {"board": 2.0}}, console
+    )
+    output = console.export_text()
+    assert "61.2" in output and "12.5" in output
+    assert "ttyUSB1" in output
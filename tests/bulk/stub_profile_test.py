@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+from rich.console import Console
+
+from stubber.bulk.mcu_stubber import copy_schedule, read_crashed, set_flag
+from stubber.bulk.stub_profile import (
+    CRASH_FILE,
+    PROFILE_FILE,
+    PROFILE_FLAG,
+    SCHEDULE_FILE,
+    ModuleCost,
+    cost_table,
+    load_cost_table,
+    load_crashed,
+    print_cost_table,
+    save_cost_table,
+    schedule_modules,
+)
+
+pytestmark = [pytest.mark.stubber]
+
+FIRMWARE = {"family": "micropython", "version": "1.24.0", "port": "esp32", "board": "ESP32_GENERIC"}
+MODULES_JSON = {
+    "firmware": FIRMWARE,
+    "modules": [
+        {"module": "sys", "file": "stubs/sys.pyi", "depth": 3},
+        {
+            "module": "json",
+            "file": "stubs/json.pyi",
+            "depth": 3,
+            "profile": {"import_ms": 2, "mem_before": 9000, "mem_import": 8900, "mem_after": 9000, "mem_min": 8000, "size": 500},
+        },
+        {
+            "module": "network",
+            "file": "stubs/network.pyi",
+            "depth": 2,
+            "profile": {"import_ms": 40, "mem_before": 9000, "mem_import": 6000, "mem_after": 8500, "mem_min": 3000, "size": 4000},
+        },
+    ],
+}
+
+
+def test_cost_table():
+    table = cost_table(MODULES_JSON)
+    assert [m.module for m in table] == ["network", "json"]
+    network = table[0]
+    assert network.import_ms == 40
+    assert network.import_mem == 3000
+    assert network.peak_mem == 6000
+    assert network.retained_mem == 500
+    assert network.size == 4000
+    assert cost_table({"modules": [{"module": "sys", "file": "sys.pyi"}]}) == []
+
+
+def test_save_load_cost_table(tmp_path: Path):
+    table = cost_table(MODULES_JSON)
+    path = save_cost_table(tmp_path / "profile.json", FIRMWARE, table)
+    assert load_cost_table(path) == table
+    assert load_cost_table(tmp_path / "missing.json") == []
+    assert load_crashed(path) == []
+    save_cost_table(path, FIRMWARE, table, crashed=["espnow", "bluetooth", "espnow"])
+    assert load_crashed(path) == ["bluetooth", "espnow"]
+    assert load_crashed(tmp_path / "missing.json") == []
+
+
+def test_schedule_modules():
+    "the modules that need the most memory first, then the others in their original order"
+    table = cost_table(MODULES_JSON) + [ModuleCost("aioble.core", 10, 100, 7000, 0, 100)]
+    modules = ["aioble/core", "array", "json", "espnow", "network", "sys"]
+    assert schedule_modules(modules, table, crashed=["espnow"]) == [
+        ("aioble/core", 7000),
+        ("network", 6000),
+        ("json", 1000),
+        ("array", 0),
+        ("espnow", -1),
+        ("sys", 0),
+    ]
+    assert schedule_modules(modules, []) == [(m, 0) for m in modules]
+
+
+@pytest.mark.parametrize("mount_vfs", [True, False])
+def test_copy_schedule(tmp_path: Path, mocker: MockerFixture, mount_vfs: bool):
+    mcu = mocker.MagicMock()
+    previous = tmp_path / "previous"
+    previous.mkdir()
+    save_cost_table(previous / PROFILE_FILE, FIRMWARE, cost_table(MODULES_JSON), crashed=["espnow"])
+    assert copy_schedule(mcu, tmp_path, mount_vfs=mount_vfs, previous=previous) == 3
+    lines = (tmp_path / SCHEDULE_FILE).read_text().splitlines()
+    assert lines[:2] == ["network 6000", "json 1000"]
+    assert "espnow -1" in lines
+    assert mcu.run_command.call_count == (0 if mount_vfs else 1)
+    # the modules that crashed before there were stubs
+    assert copy_schedule(mcu, tmp_path, mount_vfs=mount_vfs, previous=None, crashed=["bluetooth"]) == 1
+    assert "bluetooth -1" in (tmp_path / SCHEDULE_FILE).read_text().splitlines()
+    # without a previous cost table, createstubs uses modulelist.txt
+    assert copy_schedule(mcu, tmp_path, mount_vfs=mount_vfs, previous=None) == 0
+    assert not (tmp_path / SCHEDULE_FILE).exists()
+
+
+def test_read_crashed(tmp_path: Path, mocker: MockerFixture):
+    mcu = mocker.MagicMock()
+    (tmp_path / CRASH_FILE).write_text("espnow\nbluetooth\nespnow\n")
+    assert read_crashed(mcu, tmp_path, mount_vfs=True) == ["bluetooth", "espnow"]
+    assert not (tmp_path / CRASH_FILE).exists()
+    mcu.run_command.return_value = (0, ["network"])
+    assert read_crashed(mcu, tmp_path, mount_vfs=False) == ["network"]
+
+
+def test_print_cost_table():
+    console = Console(record=True, width=120)
+    print_cost_table(cost_table(MODULES_JSON), console=console, top=1)
+    output = console.export_text()
+    assert "network" in output
+    assert "json" not in output
+
+
+@pytest.mark.parametrize("mount_vfs", [True, False])
+def test_set_flag(tmp_path: Path, mocker: MockerFixture, mount_vfs: bool):
+    mcu = mocker.MagicMock()
+    set_flag(mcu, tmp_path, PROFILE_FLAG, True, mount_vfs=mount_vfs)
+    assert (tmp_path / PROFILE_FLAG).exists() == mount_vfs
+    set_flag(mcu, tmp_path, PROFILE_FLAG, False, mount_vfs=mount_vfs)
+    assert not (tmp_path / PROFILE_FLAG).exists()
+    assert mcu.run_command.call_count == (0 if mount_vfs else 2)
@@ -0,0 +1,122 @@
+# type: ignore reportGeneralTypeIssues
+import io
+import json
+import sys
+from importlib import import_module
+from pathlib import Path
+from types import ModuleType
+from typing import Generator
+
+import pytest
+
+from stubber.bulk.stub_records import read_records, render_stub, render_stub_folder
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+
+def sample_module() -> ModuleType:
+    "a module with all kinds of members"
+
+    class Inner:
+        VALUE = 1
+
+        def method(self):
+            pass
+
+    class Outer:
+        name = "outer"
+
+        def method(self):
+            pass
+
+        @classmethod
+        def create(cls):
+            pass
+
+    class CustomError(Exception):
+        pass
+
+    def gen():
+        yield 1
+
+    Outer.Inner = Inner
+    mod = ModuleType("sample")
+    mod.Outer = Outer
+    mod.CustomError = CustomError
+    mod.MAX_SIZE = 1024
+    mod.ratio = 0.5
+    mod.flag = True
+    mod.label = "naïve 'quoted' text"
+    mod.data = b"\x00\x01"
+    mod.table = {"a": 1}
+    mod.items = [1, 2]
+    mod.pair = (1, 2)
+    mod.members = {1, 2}
+    mod.generator = gen()
+    mod.func = len
+    mod.other = range(3)
+    mod.json = json
+    return mod
+
+
+@pytest.fixture
+def variants(mock_micropython_path: Generator[str, None, None]):
+    text = import_module("stubber.board.createstubs_mem")
+    binary = import_module("stubber.board.createstubs_bin")
+    return text, binary
+
+
+def new_stubber(createstubs):
+    stubber = object.__new__(createstubs.Stubber)
+    stubber.problematic = []
+    stubber.modules = []
+    stubber.buffer_size = 128
+    stubber._depth = 3
+    stubber.profile = False
+    return stubber
+
+
+@pytest.mark.parametrize("name", ["sample", "sys", "io", "machine"])
+def test_render_golden(variants, name: str):
+    "the rendered records are identical to the stubs written by createstubs_mem"
+    text, binary = variants
+    obj = sample_module() if name == "sample" else import_module(name)
+
+    expected = io.StringIO()
+    new_stubber(text).write_object_stub(expected, obj, name, "")
+    records = io.BytesIO()
+    new_stubber(binary).write_object_stub(records, obj, name, "")
+    data = records.getvalue()
+
+    assert render_stub(data) == expected.getvalue()
+    print(f"\n{name}: {len(data)} bytes of records, {len(expected.getvalue().encode())} bytes of text")
+    assert len(data) < len(expected.getvalue().encode())
+
+
+def test_create_module_stub(variants, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    "the header and the report of a complete module, compared to createstubs.py that the bin variant is generated from"
+    _, binary = variants
+    text = import_module("stubber.board.createstubs")
+    # both read the board_id from the QuecPython uname, which is not available on CPython
+    monkeypatch.setattr(binary, "get_boardname", lambda info: info.update(board_id="", board=""))
+    monkeypatch.setattr(text, "get_boardname", lambda info: info.update(board_id="", board=""))
+    results = []
+    for createstubs in (text, binary):
+        stubber = createstubs.Stubber(path=str(tmp_path / createstubs.__name__), firmware_id="MyCustomID")
+        stubber.report_start()
+        assert stubber.create_one_stub("json")
+        stubber.report_end()
+        results.append(Path(stubber.path))
+    text_path, bin_path = results
+    assert (bin_path / "json.stb").exists()
+    assert render_stub_folder(bin_path) == 1
+    assert not (bin_path / "json.stb").exists()
+    assert (bin_path / "json.pyi").read_text() == (text_path / "json.pyi").read_text()
+    report = json.loads((bin_path / "modules.json").read_text())
+    assert report["modules"][0]["file"].endswith("/json.pyi")
+
+
+def test_read_records_incomplete():
+    data = bytes((ord("F"), 0, 4, 0, 0, 0)) + b"func" + bytes((ord("V"), 0, 3))
+    with pytest.raises(ValueError):
+        list(read_records(data))
@@ -0,0 +1,81 @@
+# type: ignore reportGeneralTypeIssues
+import json
+from importlib import import_module
+from pathlib import Path
+from typing import Generator, List
+
+import pytest
+
+from stubber.bulk.stub_stream import FRAME_PREFIX, STREAM_FLAG, read_stub_stream
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+MODULES = ["sys", "json", "collections"]
+
+
+def run_stubber(createstubs, folder: Path, monkeypatch, stream: bool) -> None:
+    "run createstubs in the folder, as if it were the filesystem of the board"
+    folder.mkdir(parents=True, exist_ok=True)
+    monkeypatch.chdir(folder)
+    if stream:
+        (folder / STREAM_FLAG).touch()
+    stubber = createstubs.Stubber(path="stubs", firmware_id="MyCustomID")
+    assert stubber.stream == stream
+    stubber.modules = MODULES
+    stubber.create_all_stubs()
+
+
+@pytest.fixture
+def createstubs_mem(mock_micropython_path: Generator[str, None, None]):
+    return import_module("stubber.board.createstubs_mem")
+
+
+@pytest.fixture
+def streamed(createstubs_mem, tmp_path: Path, monkeypatch, capsys) -> List[str]:
+    "the lines that a board prints when streaming the stubs"
+    capsys.readouterr()
+    run_stubber(createstubs_mem, tmp_path / "board", monkeypatch, stream=True)
+    return capsys.readouterr().out.splitlines()
+
+
+def test_stream_same_as_files(createstubs_mem, streamed: List[str], tmp_path: Path, monkeypatch):
+    "the streamed stubs are identical to the files written by createstubs"
+    assert not (tmp_path / "board" / "stubs").exists(), "nothing should be written to the board"
+    assert any(line.startswith(FRAME_PREFIX) for line in streamed)
+
+    reader = read_stub_stream(streamed, tmp_path / "host")
+    assert not reader.errors
+
+    run_stubber(createstubs_mem, tmp_path / "files", monkeypatch, stream=False)
+    expected = sorted(p.relative_to(tmp_path / "files") for p in (tmp_path / "files" / "stubs").rglob("*") if p.is_file())
+    received = sorted(p.relative_to(tmp_path / "host") for p in reader.files)
+    assert received == expected
+    for file in expected:
+        assert (tmp_path / "host" / file).read_bytes() == (tmp_path / "files" / file).read_bytes(), file
+    report = json.loads(next((tmp_path / "host").rglob("modules.json")).read_text())
+    assert {m["module"] for m in report["modules"]} == set(MODULES)
+
+
+def test_stream_detects_corruption(streamed: List[str], tmp_path: Path):
+    lines = list(streamed)
+    n = next(i for i, line in enumerate(lines) if line.startswith(FRAME_PREFIX + "a:") and len(line.rsplit(":", 1)[1]) > 16)
+    # change a character in the base64 data
+    data = lines[n]
+    lines[n] = data[:-10] + ("A" if data[-10] != "A" else "B") + data[-9:]
+    reader = read_stub_stream(lines, tmp_path / "host")
+    assert len(reader.errors) == 1
+
+
+@pytest.mark.parametrize("name", ["../outside.pyi", "stubs/../../outside.pyi", ""])
+def test_stream_rejects_paths(tmp_path: Path, name: str):
+    line = f"{FRAME_PREFIX}w:{name}:00000000:"
+    reader = read_stub_stream([line], tmp_path / "host")
+    assert reader.errors
+    assert not reader.files
+    assert not (tmp_path / "outside.pyi").exists()
+
+
+def test_stream_ignores_other_output(tmp_path: Path):
+    reader = read_stub_stream(["INFO  : createstubs : Stub module: sys", "", "##STUB##"], tmp_path / "host")
+    assert not reader.errors
+    assert reader.frames == 0
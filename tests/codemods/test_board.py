@@ -1,4 +1,6 @@
 from __future__ import annotations
+import ast
+import builtins
 import pytest
 import libcst as cst
 import libcst.codemod as codemod
@@ -155,3 +157,72 @@ def test_db_module_doc(db_result):
 
 def test_db_entry(db_result):
     assert compare_lines("was_running = True", db_result.code)
+
+
+def test_variant_constants(db_result, low_memory_result, context, create_stubs):
+    # the buffer size of the variants is set by the codemod, not in the generated files
+    assert compare_lines("_WRITE_BUFFER = 256  #", db_result.code)
+    assert compare_lines("_WRITE_BUFFER = 512  #", low_memory_result.code)
+    lvgl_result = CreateStubsCodemod(context, variant=CreateStubsVariant.LVGL).transform_module(create_stubs)
+    assert compare_lines("_WRITE_BUFFER = 1024  #", lvgl_result.code)
+    # only the module level constant is changed
+    assert compare_lines("def __init__(self, fp, size: int = _WRITE_BUFFER):", db_result.code)
+
+
+@pytest.fixture
+def bin_result(create_stubs, context) -> cst.Module:
+    return CreateStubsCodemod(context, variant=CreateStubsVariant.BIN).transform_module(create_stubs)
+
+
+def test_bin_module_doc(bin_result):
+    assert compare_lines("as compact binary records", bin_result.code)
+
+
+def test_bin_writer(bin_result):
+    # the record writer is added before the Stubber class, and replaces the Stubber methods
+    code = bin_result.code
+    assert code.index("def write_record(") < code.index("class Stubber:")
+    assert compare_lines("write_record(fp, _R_MODULE, 0, module_name, __version__", code)
+    assert code.count("def write_object_stub(") == 1
+    assert code.count("def create_module_stub(") == 1
+    assert not compare_lines("fp.write(indent, \"def \", item_name", code)
+    # and reads the modules from modulelist.txt
+    assert compare_lines(Partial.MODULES_READER.contents(), code)
+
+
+def module_names(tree: ast.Module) -> set[str]:
+    "the names that are defined at the module level, also in try/except and if blocks"
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((a.asname or a.name).split(".")[0] for a in node.names)
+        elif isinstance(node, ast.Assign) and node.col_offset == 0:
+            names.update(t.id for t in node.targets if isinstance(t, ast.Name))
+    return names
+
+
+def test_lvgl_partial_names(context, create_stubs):
+    # the lvgl partial only uses names that are defined in createstubs.py or in the partial
+    lvgl_result = CreateStubsCodemod(context, variant=CreateStubsVariant.LVGL).transform_module(create_stubs)
+    tree = ast.parse(lvgl_result.code)
+    defined = module_names(tree) | set(dir(builtins)) | {"self"}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in {"main", "ChunkedStubber"}:
+            local = {n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+            local |= {a.arg for n in ast.walk(node) if isinstance(n, ast.FunctionDef) for a in n.args.args}
+            used = {n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load)}
+            assert used - defined - local == set(), node.name
+    # the stubber of the partial extends the Stubber of createstubs.py
+    assert compare_lines("class ChunkedStubber(Stubber):", lvgl_result.code)
+    assert compare_lines("stubber = ChunkedStubber(firmware_id=fw_id)", lvgl_result.code)
+
+
+def test_db_partial_same_as_variant(db_result):
+    # the scheduling of the db variant is generated from the db partial, not edited in createstubs_db.py
+    path = Path(__file__).parent.parent.parent / "src" / "stubber" / "board" / "createstubs_db.py"
+    committed = {n.name: ast.dump(n) for n in ast.parse(path.read_text()).body if isinstance(n, ast.FunctionDef)}
+    generated = {n.name: ast.dump(n) for n in ast.parse(db_result.code).body if isinstance(n, ast.FunctionDef)}
+    for name in ["get_modules", "write_skip", "read_need", "write_crash", "read_skip", "main"]:
+        assert generated[name] == committed[name], name
@@ -1,4 +1,5 @@
 import pytest
+
 pytestmark = [pytest.mark.stubber]
 
 from stubber.utils.post import run_black
@@ -45,3 +46,164 @@ def test_run_black_capture_output(tmp_path, capsys):
 
     # Clean up the temporary file
     test_file.unlink()
+
+
+def test_run_black_folder_cached(tmp_path, mocker):
+    from stubber.utils import post
+
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "mod.pyi").write_text("def foo(a) -> int:\n\n\n    ...\nclass Bar:\n    x : int\n")
+    (tmp_path / "main.py").write_bytes(b"x = {'a':1}\r\n")
+    (tmp_path / "readme.md").write_text("x = {'a':1}\n")
+    assert run_black(tmp_path) == 0
+    assert (tmp_path / "pkg" / "mod.pyi").read_text() == "def foo(a) -> int: ...\n\nclass Bar:\n    x: int\n"
+    # the line endings are kept
+    assert (tmp_path / "main.py").read_bytes() == b'x = {"a": 1}\r\n'
+    assert (tmp_path / "readme.md").read_text() == "x = {'a':1}\n"
+
+    # the formatted files, and a copy of an unformatted file, are not formatted again
+    format_source = mocker.spy(post, "format_source")
+    (tmp_path / "copy.py").write_text("x = {'a':1}\n")
+    assert run_black(tmp_path) == 0
+    assert (tmp_path / "copy.py").read_text() == 'x = {"a": 1}\n'
+    format_source.assert_not_called()
+
+
+def test_run_black_project_config(tmp_path, mocker):
+    "the settings and the excludes of black are read from the project, and black's cache skips the formatted files"
+    from stubber.utils import post
+
+    (tmp_path / "pyproject.toml").write_text("[tool.black]\nline-length = 80\nskip-string-normalization = true\nexclude = '/skipped/'\n")
+    (tmp_path / "skipped").mkdir()
+    (tmp_path / "skipped" / "mod.py").write_text("x = {'a':1}\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "mod.py").write_text("x = {'a':1}\n")
+    long_call = "foo(" + ", ".join(f"argument_{n}" for n in range(8)) + ")\n"
+    (tmp_path / "main.py").write_text("x = {'a':1}\n" + long_call)
+    assert run_black(tmp_path) == 0
+    # the stubs keep their line length of 140
+    assert (tmp_path / "main.py").read_text() == "x = {'a': 1}\n" + long_call
+    assert (tmp_path / "skipped" / "mod.py").read_text() == "x = {'a':1}\n"
+    # the project excludes replace the default excludes of black
+    assert (tmp_path / "build" / "mod.py").read_text() == "x = {'a': 1}\n"
+
+    cached_black = mocker.spy(post, "cached_black")
+    assert run_black(tmp_path) == 0
+    cached_black.assert_not_called()
+
+
+def test_run_black_invalid(tmp_path):
+    (tmp_path / "good.py").write_text("x  = 1\n")
+    (tmp_path / "bad.py").write_text("def foo(:\n")
+    assert run_black(tmp_path) == 123
+    assert (tmp_path / "good.py").read_text() == "x = 1\n"
+    assert (tmp_path / "bad.py").read_text() == "def foo(:\n"
+
+
+def test_run_black_process_pool(tmp_path, mocker):
+    """Benchmark: a large folder is formatted in a process pool, a second run comes from the cache"""
+    import time
+
+    from stubber.utils import post
+
+    for n in range(4 * post.POOL_MIN_FILES):
+        (tmp_path / f"mod_{n}.py").write_text(f"def foo_{n}(a,b = {n}):\n    return {{'a':a,'b':b}}\nclass Bar_{n}( object ):\n    x=1\n")
+    pool = mocker.spy(post, "ProcessPoolExecutor")
+    start = time.perf_counter()
+    assert run_black(tmp_path) == 0
+    first = time.perf_counter() - start
+    assert pool.call_count == 1
+    # the workers are spawned, a pool that is started from a thread cannot fork
+    assert pool.call_args.kwargs["mp_context"].get_start_method() == "spawn"
+    assert (tmp_path / "mod_7.py").read_text() == 'def foo_7(a, b=7):\n    return {"a": a, "b": b}\n\n\nclass Bar_7(object):\n    x = 1\n'
+    start = time.perf_counter()
+    assert run_black(tmp_path) == 0
+    second = time.perf_counter() - start
+    print(f"\n{4 * post.POOL_MIN_FILES} files: {first:.2f}s, cached: {second:.2f}s")
+    assert pool.call_count == 1
+    assert second < first
+
+
+def test_format_cached_threads(mocker):
+    "the boards are post-processed in threads, that share the cache of black"
+    from concurrent.futures import ThreadPoolExecutor
+
+    from cachetools import LRUCache
+
+    from stubber.utils import post
+
+    # a small cache, so the threads also evict the entries of each other
+    mocker.patch.object(post, "_black_cache", LRUCache(maxsize=2048, getsizeof=lambda formatted: len(formatted) + 1))
+    sources = [f"x_{n}  =  {{'a':{n}}}\n" for n in range(200)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(3):
+            formatted = list(pool.map(lambda source: post.format_cached(source, is_pyi=True), sources))
+            assert formatted == [f'x_{n} = {{"a": {n}}}\n' for n in range(200)]
+
+
+UNUSED_IMPORT = "import os\nimport sys\n\nprint(sys.path)\n"
+
+
+def test_autoflake_summary(tmp_path):
+    from stubber.utils.post import autoflake_summary, run_autoflake
+
+    (tmp_path / "mod.py").write_text(UNUSED_IMPORT)
+    (tmp_path / "mod.pyi").write_text(UNUSED_IMPORT)
+    (tmp_path / "clean.py").write_text("import sys\n\nprint(sys.path)\n")
+    # umodules keep their imports
+    (tmp_path / "ujson.py").write_text(UNUSED_IMPORT)
+    summary = autoflake_summary(tmp_path)
+    assert summary.exit_status == 0
+    assert summary.files == 2
+    assert summary.changed == [tmp_path / "mod.py"]
+    assert (tmp_path / "mod.py").read_text() == "import sys\n\nprint(sys.path)\n"
+    summary = autoflake_summary(tmp_path, process_pyi=True)
+    assert summary.changed == [tmp_path / "mod.pyi"]
+    assert (tmp_path / "ujson.py").read_text() == UNUSED_IMPORT
+    assert autoflake_summary(tmp_path / "missing").exit_status == -1
+    # run_autoflake returns the exit status
+    assert run_autoflake(tmp_path) == 0
+    assert run_autoflake(tmp_path / "missing") == -1
+
+
+def test_run_autoflake_process_pool(tmp_path, mocker):
+    from stubber.utils import post
+
+    count = 3 * post.AUTOFLAKE_CHUNK
+    for n in range(count):
+        (tmp_path / f"mod_{n}.py").write_text(UNUSED_IMPORT if n % 2 else "import sys\n\nprint(sys.path)\n")
+    pool = mocker.spy(post, "ProcessPoolExecutor")
+    summary = post.autoflake_summary(tmp_path)
+    assert pool.call_count == 1
+    assert pool.call_args.kwargs["mp_context"].get_start_method() == "spawn"
+    assert summary.files == count
+    assert len(summary.changed) == count // 2
+    assert (tmp_path / "mod_7.py").read_text() == "import sys\n\nprint(sys.path)\n"
+    print(f"\n{count} files: {summary.seconds:.2f}s")
+
+
+def test_post_processing_walks_once(tmp_path, mocker):
+    from stubber.utils import post
+
+    (tmp_path / "mod.py").write_text("import os\nimport sys\nprint( sys.path )\n")
+    walk = mocker.spy(post, "list_source_files")
+    post.do_post_processing([tmp_path], stubgen=False, format=True, autoflake=True)
+    assert walk.call_count == 1
+    assert (tmp_path / "mod.py").read_text() == "import sys\n\nprint(sys.path)\n"
+
+
+def test_post_processing_in_memory(tmp_path):
+    from stubber.utils import post
+
+    module = "import os\nfrom micropython import const\n\n_X = const(3)\n\n\ndef foo(a = _X):\n    return a\n"
+    (tmp_path / "mod.py").write_text(module)
+    (tmp_path / "board.pyi").write_text("import os\nimport sys\ndef bar( a ) -> int: ...\n")
+    assert post.post_process_in_memory(tmp_path, stubgen=True, format=True, autoflake=True) == 2
+    # the module is not rewritten
+    assert (tmp_path / "mod.py").read_text() == module
+    assert (tmp_path / "mod.pyi").read_text() == "from micropython import const as const\n\n_X: int\n\ndef foo(a=...): ...\n"
+    assert (tmp_path / "board.pyi").read_text() == "def bar(a) -> int: ...\n"
+    # the unchanged stubs are not written again
+    mtime = (tmp_path / "mod.pyi").stat().st_mtime_ns
+    assert post.post_process_in_memory(tmp_path, stubgen=True, format=True, autoflake=True) == 0
+    assert (tmp_path / "mod.pyi").stat().st_mtime_ns == mtime
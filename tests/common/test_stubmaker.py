@@ -0,0 +1,65 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from stubber.utils import stubmaker
+
+pytestmark = [pytest.mark.stubber]
+
+
+def test_run_stubgen_threads(tmp_path: Path, mocker):
+    "the boards are post-processed in threads, each run of stubgen has its own options and runs alone"
+    running = []
+    most = []
+    options = []
+
+    def generate_stubs(opt):
+        running.append(opt)
+        most.append(len(running))
+        options.append((opt.files, opt.output_dir))
+        time.sleep(0.02)
+        running.remove(opt)
+
+    mocker.patch.object(stubmaker.stubgen, "generate_stubs", generate_stubs)
+    folders = [tmp_path / f"board_{n}" for n in range(6)]
+    threads = [threading.Thread(target=stubmaker.run_stubgen, args=([str(f)], str(f))) for f in folders]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(most) == 1
+    assert sorted(options) == [([str(f)], str(f)) for f in folders]
+
+
+def test_generate_pyi_files(tmp_path: Path):
+    (tmp_path / "mod.py").write_text("X = const(1)\n\ndef foo(a, b=2):\n    return a\n")
+    assert stubmaker.generate_pyi_files(tmp_path)
+    assert "def foo(a, b: int = 2): ..." in (tmp_path / "mod.pyi").read_text()
+    # the defaults are not changed by a run
+    assert stubmaker.STUBGEN_ARGS["files"] == []
+
+
+def test_generate_pyi_in_memory_same_as_on_file(tmp_path: Path):
+    "the stubs in memory are the same as the stubs of generate_pyi_files, and the modules are not rewritten"
+    modules = {
+        "top.py": "X = const(1)\n\ndef foo(a, b=2):\n    return a\n",
+        "pkg/__init__.py": "",
+        "pkg/mod.py": "def bar(x: int) -> int:\n    return x\n",
+        "sub/loose.py": "Z = const(3)\n",
+    }
+    for folder in ("memory", "file"):
+        for name, text in modules.items():
+            (tmp_path / folder / name).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / folder / name).write_text(text)
+    memory = tmp_path / "memory"
+    stubs = stubmaker.generate_pyi_in_memory(memory, {f: f.read_text() for f in memory.rglob("*.py")})
+    assert sorted(stubs) == sorted(memory / name.replace(".py", ".pyi") for name in modules)
+    assert not list(memory.rglob("*.pyi"))
+    assert (memory / "top.py").read_text() == modules["top.py"]
+
+    assert stubmaker.generate_pyi_files(tmp_path / "file")
+    for pyi, text in stubs.items():
+        assert text == (tmp_path / "file" / pyi.relative_to(memory)).read_text(), pyi.name
+    assert "Z: int" in stubs[memory / "sub" / "loose.pyi"]
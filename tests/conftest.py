@@ -2,6 +2,8 @@
 Shared Test Fixtures
 """
 
+import builtins
+import gc
 import logging
 import os
 import sys
@@ -63,11 +65,21 @@ def mock_micropython_path(pytestconfig: Config):
     "Add micropython-CPython and machine to path  temporarily"
     source_path = str(pytestconfig.rootpath / "tests" / "mocks" / "micropython-cpython_core")
     machine_path = str(pytestconfig.rootpath / "tests" / "mocks" / "machine")
+    # the mock micropython module replaces open and adds to gc, and the mocks shadow the modules of CPython
+    saved_open = builtins.open
+    saved_gc = set(dir(gc))
+    saved_modules = set(sys.modules)
     if not source_path in sys.path:
         sys.path[1:1] = [source_path, machine_path]
     yield source_path
     sys.path.remove(source_path)
     sys.path.remove(machine_path)
+    builtins.open = saved_open
+    for name in set(dir(gc)) - saved_gc:
+        delattr(gc, name)
+    # also the modules that imported the mocks, such as the createstubs variants
+    for name in set(sys.modules) - saved_modules:
+        del sys.modules[name]
     return
 
 
@@ -0,0 +1,59 @@
+# type: ignore reportGeneralTypeIssues
+import tracemalloc
+from types import ModuleType
+from typing import Generator
+
+import pytest
+
+from shared import VARIANTS, import_variant, no_boardname
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+
+def make_module(count: int) -> ModuleType:
+    "create a module with many attributes of different kinds"
+    mod = ModuleType("many_attributes")
+    for n in range(count):
+        setattr(mod, "CONST_{}".format(n), "value {}".format(n) * 4)
+        setattr(mod, "func_{}".format(n), len)
+    return mod
+
+
+def peak_allocation(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_iter_obj_attributes_order(variant: str, tmp_path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    stubber = createstubs.Stubber(path=str(tmp_path), firmware_id="MyCustomID")
+    mod = make_module(50)
+    items, errors = stubber.get_obj_attributes(mod)
+    assert not errors
+    streamed = list(stubber.iter_obj_attributes(mod))
+    assert [i[0] for i in streamed] == [i[0] for i in items]
+    assert [i[3] for i in streamed] == sorted(i[3] for i in streamed)
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_iter_obj_attributes_peak_memory(variant: str, tmp_path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    """Benchmark: peak allocation of streaming the attributes vs collecting them in a list."""
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    stubber = createstubs.Stubber(path=str(tmp_path), firmware_id="MyCustomID")
+    mod = make_module(2000)
+
+    def consume():
+        for _ in stubber.iter_obj_attributes(mod):
+            pass
+
+    streamed = peak_allocation(consume)
+    collected = peak_allocation(lambda: stubber.get_obj_attributes(mod))
+    print("\npeak allocation streamed: {}, collected: {}".format(streamed, collected))
+    assert streamed < collected / 2
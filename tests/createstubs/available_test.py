@@ -0,0 +1,45 @@
+# type: ignore reportGeneralTypeIssues
+import builtins
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from pytest_mock import MockerFixture
+
+from shared import VARIANTS, import_variant, no_boardname
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_available_modules(
+    variant: str,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    mocker: MockerFixture,
+    mock_micropython_path: Generator[str, None, None],
+):
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    monkeypatch.chdir(tmp_path)
+    assert createstubs.available_modules() is None, "no list, so all modules are tried"
+
+    (tmp_path / "modulelist.avail").write_text("# from help('modules')\njson\n\nasyncio/__init__\nasyncio/core\nsys\n")
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "lib" / "mylib.py").write_text("")
+    stubber = createstubs.Stubber(path=str(tmp_path), firmware_id="MyCustomID")
+    assert {"json", "asyncio", "sys", "mylib"} <= stubber.available
+
+    assert stubber.is_available("json")
+    assert stubber.is_available("ujson"), "weak link to json"
+    assert stubber.is_available("asyncio/event")
+    assert stubber.is_available("mylib")
+    assert not stubber.is_available("lvgl")
+    assert not stubber.is_available("umqtt/simple")
+
+    # absent modules are skipped without trying to import them
+    spy = mocker.spy(builtins, "__import__")
+    stubber.report_start()
+    assert not stubber.create_one_stub("lvgl")
+    assert not [c for c in spy.call_args_list if c.args[0] == "lvgl"]
+    assert stubber.create_one_stub("json")
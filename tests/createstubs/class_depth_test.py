@@ -0,0 +1,90 @@
+# type: ignore reportGeneralTypeIssues
+import json
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Generator
+
+import pytest
+from pytest_mock import MockerFixture
+
+from shared import VARIANTS, import_variant, no_boardname
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+
+@pytest.fixture
+def nested_module(monkeypatch: pytest.MonkeyPatch):
+    "a module with nested classes"
+
+    class Inner:
+        VALUE = 1
+
+        def method(self):
+            pass
+
+    class Outer:
+        def method(self):
+            pass
+
+    Outer.Inner = Inner
+    mod = ModuleType("nested_classes")
+    mod.Outer = Outer
+    monkeypatch.setitem(sys.modules, "nested_classes", mod)
+    return mod
+
+
+def stub_module(createstubs, tmp_path: Path):
+    stubber = createstubs.Stubber(path=str(tmp_path), firmware_id="MyCustomID")
+    stubber.report_start()
+    stubber.create_one_stub("nested_classes")
+    stubber.report_end()
+    report = json.loads(Path(stubber._json_name).read_text())
+    return (Path(stubber.path) / "nested_classes.pyi").read_text(), report["modules"][0]
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+@pytest.mark.parametrize("free, depth", [(1_000_000, 3), (0, 0)])
+def test_class_depth(
+    variant: str,
+    free: int,
+    depth: int,
+    nested_module,
+    tmp_path: Path,
+    mocker: MockerFixture,
+    monkeypatch: pytest.MonkeyPatch,
+    mock_micropython_path: Generator[str, None, None],
+):
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    mocker.patch.object(createstubs.gc, "mem_free", return_value=free, create=True)
+    stub, entry = stub_module(createstubs, tmp_path)
+    assert entry["depth"] == depth
+    assert "class Outer():" in stub
+    assert ("def __getattr__(self, name: str) -> Incomplete: ..." in stub) == (depth == 0)
+    assert ("class Inner():" in stub) == (depth > 0)
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_class_depth_low_memory_nested(
+    variant: str,
+    nested_module,
+    tmp_path: Path,
+    mocker: MockerFixture,
+    monkeypatch: pytest.MonkeyPatch,
+    mock_micropython_path: Generator[str, None, None],
+):
+    "the memory runs out after expanding the outer class"
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+
+    def mem_free():
+        # only low on memory while writing the members of class Outer, however often it is asked
+        obj_name = sys._getframe(1).f_locals.get("obj_name", "")
+        return 0 if obj_name.endswith(".Outer") else 1_000_000
+
+    mocker.patch.object(createstubs.gc, "mem_free", mem_free, create=True)
+    stub, entry = stub_module(createstubs, tmp_path)
+    assert entry["depth"] == 1
+    assert "    class Inner():\n        def __getattr__(self, name: str) -> Incomplete: ...\n" in stub
+    assert "    def method(self, *args, **kwargs) -> Incomplete:" in stub
@@ -0,0 +1,65 @@
+# type: ignore reportGeneralTypeIssues
+import gzip
+from pathlib import Path
+from typing import Generator
+
+import pytest
+
+from shared import VARIANTS, import_variant, no_boardname
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+MODULES = ["sys", "json", "collections", "os.path"]
+
+
+def run_stubber(createstubs, folder: Path, monkeypatch, compress: bool):
+    "run createstubs in the folder, as if it were the filesystem of the board"
+    folder.mkdir(parents=True, exist_ok=True)
+    monkeypatch.chdir(folder)
+    if compress:
+        (folder / createstubs._COMPRESS_FLAG).touch()
+    stubber = createstubs.Stubber(path="stubs", firmware_id="MyCustomID")
+    stubber.modules = MODULES
+    stubber.create_all_stubs()
+    return stubber
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_compressed_same_as_plain(variant: str, tmp_path: Path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    stubber = run_stubber(createstubs, tmp_path / "compressed", monkeypatch, compress=True)
+    assert stubber.compress
+    run_stubber(createstubs, tmp_path / "plain", monkeypatch, compress=False)
+
+    plain = sorted(p.relative_to(tmp_path / "plain") for p in (tmp_path / "plain" / "stubs").rglob("*.pyi"))
+    compressed = sorted(p.relative_to(tmp_path / "compressed") for p in (tmp_path / "compressed" / "stubs").rglob("*.pyi.gz"))
+    assert len(plain) == len(MODULES)
+    assert [p.with_suffix("") for p in compressed] == plain
+    for stub in plain:
+        data = (tmp_path / "plain" / stub).read_bytes()
+        gz = (tmp_path / "compressed" / stub).with_suffix(".pyi.gz").read_bytes()
+        assert gzip.decompress(gz) == data
+        print("\n{}: {} -> {} bytes".format(stub.name, len(data), len(gz)))
+        assert len(gz) < len(data) / 2
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_compress_not_supported(variant: str, tmp_path: Path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    "a port with the deflate module, but without its compressor, writes plain stubs"
+
+    class DeflateIO:
+        def __init__(self, stream, format):
+            pass
+
+        def write(self, b):
+            raise OSError(1)
+
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    monkeypatch.setattr(createstubs, "deflate", type("deflate", (), {"GZIP": 3, "DeflateIO": DeflateIO}))
+    assert not createstubs.can_compress()
+    stubber = run_stubber(createstubs, tmp_path, monkeypatch, compress=True)
+    assert not stubber.compress
+    assert len(list((tmp_path / "stubs").rglob("*.pyi"))) == len(MODULES)
+    assert not list((tmp_path / "stubs").rglob("*.gz"))
@@ -345,7 +345,7 @@ def test_unavailable_modules(
         ("3.4.0; MicroPython v1.22.0 on 2023-12-27", ""),
     ],
 )
-def test_build(input: str, expected: str):
+def test_build(input: str, expected: str, mock_micropython_path: Generator[str, None, None]):
     """build function should be able to extract from
     - sys.version
     - sys.implementation.version
@@ -0,0 +1,148 @@
+# type: ignore reportGeneralTypeIssues
+import json
+from pathlib import Path
+from typing import Generator
+
+import pytest
+from pytest_mock import MockerFixture
+
+from shared import import_variant
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+MODULES = ["array", "binascii", "errno", "gc", "io", "json", "math", "os", "select", "struct", "sys", "time"]
+
+
+@pytest.fixture
+def db_stubs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, mock_micropython_path: Generator[str, None, None]):
+    "the db variant, running in a folder with a modulelist.txt"
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "modulelist.txt").write_text("# modules to stub\n" + "\n".join(MODULES) + "\n")
+    createstubs = import_variant("board", "createstubs_db")
+    monkeypatch.setattr(createstubs, "read_path", lambda: str(tmp_path))
+    return createstubs
+
+
+def test_get_modules_resume_from_offset(db_stubs):
+    modules = list(db_stubs.get_modules())
+    assert [m for m, _ in modules] == MODULES
+    for n in range(1, len(MODULES)):
+        offset = modules[n - 1][1]
+        assert [m for m, _ in db_stubs.get_modules(n, offset)] == MODULES[n:]
+
+
+def test_read_skip(db_stubs, tmp_path: Path):
+    assert db_stubs.read_skip() == (0, 0)
+    db_stubs.write_skip(3, 42)
+    assert db_stubs.read_skip() == (3, 42)
+    # the module that is being stubbed is only for the host
+    db_stubs.write_skip(3, 42, "json")
+    assert (tmp_path / "modulelist.done").read_text() == "3 42 json\n"
+    assert db_stubs.read_skip() == (3, 42)
+    # progress written by a previous version only holds the count
+    (tmp_path / "modulelist.done").write_text("5\n")
+    assert db_stubs.read_skip() == (5, 0)
+
+
+@pytest.mark.parametrize("mem_free, checkpoints, recorded", [(1_000_000, 1, 8), (1_000, len(MODULES), 1)])
+def test_main_checkpoints(db_stubs, tmp_path: Path, mocker: MockerFixture, mem_free: int, checkpoints: int, recorded: int):
+    """Benchmark: the progress is written every few modules, or after each module when memory runs low.
+    Up to the first checkpoint the module is recorded before it is stubbed."""
+    mocker.patch.object(db_stubs.gc, "mem_free", return_value=mem_free, create=True)
+    spy = mocker.spy(db_stubs, "write_skip")
+    db_stubs.main()
+    modules = [c.args[2] for c in spy.call_args_list if len(c.args) > 2]
+    assert spy.call_count - len(modules) == checkpoints
+    assert modules == MODULES[:recorded]
+    report = json.loads(next(tmp_path.rglob("modules.json")).read_text())
+    assert [m["module"] for m in report["modules"]] == MODULES
+
+
+def test_main_continue(db_stubs, tmp_path: Path):
+    "continue a run from the last checkpoint, as done after a reset"
+    db_stubs.main()
+    json_file = next(tmp_path.rglob("modules.json"))
+    report = json.loads(json_file.read_text())
+    # truncate the report and the progress to a checkpoint after the first 8 modules
+    offset = [o for _, o in db_stubs.get_modules()][7]
+    db_stubs.write_skip(8, offset)
+    lines = json_file.read_text().splitlines()
+    first = [i for i, l in enumerate(lines) if '"module": "{}"'.format(MODULES[8]) in l][0]
+    json_file.write_text("\n".join(lines[:first]).rstrip(","))
+
+    db_stubs.main()
+    assert json.loads(json_file.read_text()) == report
+
+
+class Reset(Exception):
+    "the board is reset, and createstubs is started again"
+
+
+@pytest.fixture
+def machine(mocker: MockerFixture):
+    machine = mocker.MagicMock()
+    machine.reset.side_effect = machine.soft_reset.side_effect = Reset
+    mocker.patch.dict("sys.modules", {"machine": machine})
+    return machine
+
+
+def reported(tmp_path: Path):
+    return [m["module"] for m in json.loads(next(tmp_path.rglob("modules.json")).read_text())["modules"]]
+
+
+def test_get_modules_schedule(db_stubs, tmp_path: Path):
+    "the modules in modulelist.sched are used instead of modulelist.txt"
+    (tmp_path / db_stubs.SCHEDULE_FILE).write_text("json 5000\nos -1\nsys 0\nio\n")
+    assert [db_stubs.read_need(line) for line, _ in db_stubs.get_modules()] == [("json", 5000), ("os", -1), ("sys", 0), ("io", 0)]
+
+
+def test_main_reset_before_heavy_module(db_stubs, tmp_path: Path, mocker: MockerFixture, machine):
+    "reset the board before a module that needs more memory than is free, and skip the modules that are known to crash"
+    mocker.patch.object(db_stubs.gc, "mem_free", return_value=20_000, create=True)
+    schedule = ["json 1000", "sys 0", "math 50000", "os -1", "time 0"]
+    (tmp_path / db_stubs.SCHEDULE_FILE).write_text("\n".join(schedule) + "\n")
+    with pytest.raises(Reset):
+        db_stubs.main()
+    assert machine.soft_reset.call_count == 1
+    assert db_stubs.read_skip()[0] == 2
+    # continue with the heavy module on a clean heap
+    db_stubs.main()
+    assert machine.soft_reset.call_count == 1
+    assert reported(tmp_path) == ["json", "sys", "math", "time"]
+
+
+def test_main_crash_before_checkpoint(db_stubs, tmp_path: Path, mocker: MockerFixture):
+    "the module that crashes the board is recorded for the host, and a run without a checkpoint starts over"
+    create_one_stub = db_stubs.Stubber.create_one_stub
+
+    def crash(self, module_name: str):
+        if module_name == "errno":
+            raise Reset
+        return create_one_stub(self, module_name)
+
+    mocker.patch.object(db_stubs.Stubber, "create_one_stub", crash)
+    with pytest.raises(Reset):
+        db_stubs.main()
+    assert (tmp_path / "modulelist.done").read_text() == "0 0 errno\n"
+    mocker.patch.object(db_stubs.Stubber, "create_one_stub", create_one_stub)
+    db_stubs.main()
+    assert reported(tmp_path) == MODULES
+
+
+def test_main_out_of_memory_on_clean_heap(db_stubs, tmp_path: Path, mocker: MockerFixture, machine):
+    "a module that runs out of memory is retried once on a clean heap, and then skipped"
+    create_one_stub = db_stubs.Stubber.create_one_stub
+
+    def out_of_memory(self, module_name: str):
+        if module_name == "io":
+            raise MemoryError
+        return create_one_stub(self, module_name)
+
+    mocker.patch.object(db_stubs.Stubber, "create_one_stub", out_of_memory)
+    for _ in range(2):
+        with pytest.raises(Reset):
+            db_stubs.main()
+    assert machine.reset.call_count == 2
+    assert (tmp_path / db_stubs.CRASH_FILE).read_text() == "io\n"
+    db_stubs.main()
+    assert reported(tmp_path) == [m for m in MODULES if m != "io"]
@@ -0,0 +1,117 @@
+# type: ignore reportGeneralTypeIssues
+import json
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Generator
+
+import pytest
+
+from shared import VARIANTS, import_variant, no_boardname
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+MODULES = ["sys", "json", "fp_sample"]
+
+
+@pytest.fixture
+def fp_sample(monkeypatch) -> ModuleType:
+    "a module that can be changed between runs"
+
+    class Sample:
+        MODE = 1
+
+        def method(self):
+            pass
+
+    mod = ModuleType("fp_sample")
+    mod.Sample = Sample
+    mod.VERSION = "1.0"
+    monkeypatch.setitem(sys.modules, "fp_sample", mod)
+    return mod
+
+
+def run_stubber(createstubs, tmp_path: Path):
+    stubber = createstubs.Stubber(path=str(tmp_path), firmware_id="MyCustomID")
+    stubber.modules = MODULES
+    stubber.create_all_stubs()
+    report = json.loads(Path(stubber.path, "modules.json").read_text())
+    return stubber, {m["module"]: m for m in report["modules"]}
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_fingerprint(variant: str, fp_sample: ModuleType, tmp_path: Path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    stubber = createstubs.Stubber(path=str(tmp_path), firmware_id="MyCustomID")
+    crc = stubber.fingerprint(fp_sample)
+    assert crc == stubber.fingerprint(fp_sample)
+    fp_sample.VERSION = "1.1"
+    assert stubber.fingerprint(fp_sample) != crc
+    fp_sample.VERSION = "1.0"
+    assert stubber.fingerprint(fp_sample) == crc
+    # the literals and types of the class members
+    fp_sample.Sample.MODE = 2
+    assert stubber.fingerprint(fp_sample) != crc
+    fp_sample.Sample.MODE = 1.0
+    assert stubber.fingerprint(fp_sample) != crc
+    fp_sample.Sample.MODE = 1
+    assert stubber.fingerprint(fp_sample) == crc
+    fp_sample.Sample.new_method = lambda self: None
+    assert stubber.fingerprint(fp_sample) != crc
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_skip_unchanged(
+    variant: str, fp_sample: ModuleType, tmp_path: Path, monkeypatch, mock_micropython_path: Generator[str, None, None]
+):
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    monkeypatch.chdir(tmp_path)
+    # without a fingerprint file the modules are not fingerprinted
+    stubber, first = run_stubber(createstubs, tmp_path)
+    assert stubber.fingerprints is None
+    assert not any("crc" in m for m in first.values())
+    # the host asks for the fingerprints with an empty list
+    Path("modulelist.crc").write_text("# fingerprints of the previous stubs\n")
+    stubber, first = run_stubber(createstubs, tmp_path)
+    assert all(m["crc"] and not m.get("unchanged") for m in first.values())
+
+    # the host provides the fingerprints of the previous run
+    Path("modulelist.crc").write_text("".join(f"{m['module']} {m['crc']}\n" for m in first.values()))
+    for m in first.values():
+        Path(m["file"]).unlink()
+    fp_sample.VERSION = "2.0"
+    stubber, second = run_stubber(createstubs, tmp_path)
+    assert len(stubber.fingerprints) == len(MODULES)
+    assert second["sys"]["unchanged"] and second["json"]["unchanged"]
+    assert not Path(second["sys"]["file"]).exists()
+    assert "unchanged" not in second["fp_sample"]
+    assert second["fp_sample"]["crc"] != first["fp_sample"]["crc"]
+    assert "VERSION: Final[str] = '2.0'" in Path(second["fp_sample"]["file"]).read_text()
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_no_fingerprints(variant: str, tmp_path: Path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    monkeypatch.chdir(tmp_path)
+    Path("modulelist.crc").write_text("# no fingerprints\nsys not_a_crc\n")
+    assert createstubs.read_fingerprints() == {}
+    Path("modulelist.crc").unlink()
+    assert createstubs.read_fingerprints() is None
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_unchanged_depth(variant: str, tmp_path: Path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    stubber = createstubs.Stubber(path=str(tmp_path), firmware_id="MyCustomID")
+    stubber.fingerprints = {"sys": stubber.fingerprint(sys)}
+    stubber.modules = ["sys"]
+    # the depth of a previous module with a class that was not expanded
+    stubber._depth = 0
+    stubber.create_all_stubs()
+    report = json.loads(Path(stubber.path, "modules.json").read_text())
+    assert report["modules"][0]["unchanged"]
+    assert report["modules"][0]["depth"] == createstubs._MAX_CLASS_LEVEL + 1
@@ -0,0 +1,73 @@
+# type: ignore reportGeneralTypeIssues
+from pathlib import Path
+from typing import Generator, List
+
+import pytest
+
+from shared import VARIANTS, import_variant, no_boardname
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+
+def count_stat(createstubs, monkeypatch) -> List[str]:
+    "record the os.stat calls on the (relative) stub folders"
+    calls = []
+    stat = createstubs.os.stat
+
+    def counting_stat(path, **kwargs):
+        if isinstance(path, str) and not path.startswith("/"):
+            calls.append(path)
+        return stat(path, **kwargs)
+
+    monkeypatch.setattr(createstubs.os, "stat", counting_stat)
+    createstubs._folders.clear()
+    return calls
+
+
+@pytest.mark.parametrize("variant", [*VARIANTS, "createstubs_bin", "createstubs_lvgl"])
+def test_ensure_folder_cached(variant: str, tmp_path: Path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    monkeypatch.chdir(tmp_path)
+    createstubs = import_variant("board", variant)
+    stat_calls = count_stat(createstubs, monkeypatch)
+    createstubs.ensure_folder("stubs/fw/umqtt/simple.pyi")
+    assert Path("stubs/fw/umqtt").is_dir()
+    assert len(stat_calls) == 3
+    # nested packages in the same run, only the new folder is checked
+    createstubs.ensure_folder("stubs/fw/umqtt/robust.pyi")
+    createstubs.ensure_folder("stubs/fw/aioble/core.pyi")
+    createstubs.ensure_folder("stubs/fw/aioble/client.pyi")
+    createstubs.ensure_folder("stubs/fw/modules.json")
+    assert stat_calls == ["stubs", "stubs/fw", "stubs/fw/umqtt", "stubs/fw/aioble"]
+    assert Path("stubs/fw/aioble").is_dir()
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_clean_invalidates_cache(variant: str, tmp_path: Path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    monkeypatch.chdir(tmp_path)
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    stat_calls = count_stat(createstubs, monkeypatch)
+    stubber = createstubs.Stubber(path=".", firmware_id="MyCustomID")
+    createstubs.ensure_folder(stubber.path + "/umqtt/simple.pyi")
+    stubber.clean()
+    assert not Path(stubber.path, "umqtt").exists()
+    stat_calls.clear()
+    createstubs.ensure_folder(stubber.path + "/umqtt/simple.pyi")
+    assert Path(stubber.path, "umqtt").is_dir()
+    assert stat_calls
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_stat_calls_per_run(variant: str, tmp_path: Path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    "a run of createstubs checks each stub folder only once"
+    monkeypatch.chdir(tmp_path)
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    stubber = createstubs.Stubber(path="", firmware_id="MyCustomID")
+    stubber.path = "stubs/fw"
+    stat_calls = count_stat(createstubs, monkeypatch)
+    stubber.modules = ["sys", "json", "collections", "os.path"]
+    stubber.create_all_stubs()
+    assert Path("stubs/fw/os/path.pyi").exists()
+    folder_stats = [p for p in stat_calls if not p.endswith((".pyi", ".avail", ".txt"))]
+    assert sorted(folder_stats) == ["stubs", "stubs/fw", "stubs/fw/os"]
@@ -0,0 +1,112 @@
+# type: ignore reportGeneralTypeIssues
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Generator
+
+import pytest
+
+from shared import import_variant, no_boardname
+from stubber.bulk.stub_parts import join_stub_parts
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+
+@pytest.fixture
+def fake_lvgl(monkeypatch):
+    "a small stand-in for the lvgl module, with constants, functions and classes"
+    lvgl = ModuleType("lvgl")
+    lvgl.ALIGN_CENTER = 9
+    lvgl.DPI = 130
+    lvgl.init = lambda: None
+    lvgl.version_major = lambda: 8
+    for n in range(6):
+        members = {"STATE_{}".format(n): n, "set_x": lambda self, x: None, "get_x": lambda self: 0}
+        setattr(lvgl, "obj_{}".format(n), type("obj_{}".format(n), (), members))
+    lvgl.LvReferenceError = type("LvReferenceError", (Exception,), {})
+    lvgl.color_white = 0xFFFFFF
+    monkeypatch.setitem(sys.modules, "lvgl", lvgl)
+    return lvgl
+
+
+@pytest.fixture
+def createstubs_lvgl(mock_micropython_path: Generator[str, None, None], tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    createstubs = import_variant("board", "createstubs_lvgl")
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    return createstubs
+
+
+def new_stubber(createstubs, path: str):
+    stubber = createstubs.ChunkedStubber(path=path, firmware_id="lvgl-test")
+    stubber.modules = ["lvgl"]
+    return stubber
+
+
+def test_parts_same_as_single_file(createstubs_lvgl, fake_lvgl, tmp_path: Path):
+    "joining the parts on the host gives the same stub as stubbing the module in one go"
+    single = new_stubber(createstubs_lvgl, "single")
+    single.create_all_stubs()
+    chunked = new_stubber(createstubs_lvgl, "chunked")
+    chunked.chunked = ["lvgl"]
+    chunked.create_all_stubs()
+
+    parts = sorted(p.name for p in Path(chunked.path, "lvgl.pyi.parts").iterdir())
+    # header, the literals and functions, and a part per class
+    assert len(parts) == 9
+    assert not Path(createstubs_lvgl._PARTS_PROGRESS).exists()
+    assert '"file": "{}/lvgl.pyi"'.format(chunked.path) in Path(chunked.path, "modules.json").read_text()
+
+    assert join_stub_parts(tmp_path / "chunked") == [tmp_path / chunked.path / "lvgl.pyi"]
+    assert not Path(chunked.path, "lvgl.pyi.parts").exists()
+    assert Path(chunked.path, "lvgl.pyi").read_text() == Path(single.path, "lvgl.pyi").read_text()
+
+
+def test_parts_resume_after_reset(createstubs_lvgl, fake_lvgl, tmp_path: Path, monkeypatch):
+    "after running out of memory, createstubs continues with the part that failed"
+    single = new_stubber(createstubs_lvgl, "single")
+    single.create_all_stubs()
+
+    written = []
+
+    def run(fail_on: str = ""):
+        stubber = new_stubber(createstubs_lvgl, "chunked")
+        stubber.chunked = ["lvgl"]
+        write_item_stub = stubber.write_item_stub
+
+        def tracked(fp, item_name, *args):
+            if item_name == fail_on:
+                # running out of memory
+                raise MemoryError
+            if args[2] == "lvgl":
+                written.append(item_name)
+            write_item_stub(fp, item_name, *args)
+
+        monkeypatch.setattr(stubber, "write_item_stub", tracked)
+        stubber.create_all_stubs()
+        return stubber
+
+    with pytest.raises(MemoryError):
+        run(fail_on="obj_3")
+    # continue with member 9 (obj_3), in part 6
+    assert Path(createstubs_lvgl._PARTS_PROGRESS).read_text().split() == ["lvgl", "9", "6"]
+
+    # after the reset, only the remaining members are stubbed
+    written.clear()
+    stubber = run()
+    assert written == ["obj_3", "obj_4", "obj_5"]
+    assert not Path(createstubs_lvgl._PARTS_PROGRESS).exists()
+
+    join_stub_parts(tmp_path / "chunked")
+    assert Path(stubber.path, "lvgl.pyi").read_text() == Path(single.path, "lvgl.pyi").read_text()
+
+
+def test_join_stub_parts(tmp_path: Path):
+    parts = tmp_path / "stubs" / "lvgl.py.parts"
+    parts.mkdir(parents=True)
+    for n, text in enumerate(["# header\n", "class a():\n    ...\n", "class b():\n    ...\n"]):
+        (parts / "{:04d}.py".format(n)).write_text(text)
+    assert join_stub_parts(tmp_path, keep=True) == [tmp_path / "stubs" / "lvgl.py"]
+    assert (tmp_path / "stubs" / "lvgl.py").read_text() == "# header\nclass a():\n    ...\nclass b():\n    ...\n"
+    assert parts.exists()
+    assert join_stub_parts(tmp_path / "empty") == []
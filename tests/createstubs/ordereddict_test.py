@@ -0,0 +1,76 @@
+# type: ignore reportGeneralTypeIssues
+from typing import Generator
+
+import pytest
+
+from shared import import_variant
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+
+@pytest.fixture
+def OrderedDict(mock_micropython_path: Generator[str, None, None]):
+    "the OrderedDict implementation for ports without a native one"
+    return import_variant("board", "createstubs")._OrderedDict
+
+
+def test_ordereddict_order(OrderedDict):
+    od = OrderedDict({"family": "micropython", "version": ""}, port="esp32")
+    od.update([("board", "GENERIC")])
+    od["version"] = "1.24.0"
+    assert list(od) == ["family", "version", "port", "board"]
+    assert list(od.items()) == [("family", "micropython"), ("version", "1.24.0"), ("port", "esp32"), ("board", "GENERIC")]
+    assert list(od.values()) == ["micropython", "1.24.0", "esp32", "GENERIC"]
+    assert "{family}-v{version}-{port}".format(**od) == "micropython-v1.24.0-esp32"
+
+
+def test_ordereddict_delete(OrderedDict):
+    od = OrderedDict((str(n), n) for n in range(10))
+    del od["3"]
+    assert od.pop("5") == 5
+    assert od.pop("5", None) is None
+    with pytest.raises(KeyError):
+        del od["3"]
+    od["3"] = 33
+    assert list(od) == ["0", "1", "2", "4", "6", "7", "8", "9", "3"]
+    for n in range(9):
+        od.pop(str(n), None)
+    # compacted after removing most keys
+    assert list(od.items()) == [("9", 9)]
+    assert len(od._keys) < 10
+    od.clear()
+    assert not od and list(od) == []
+
+
+class Key:
+    "a key that counts how often it is compared"
+
+    compares = 0
+
+    def __init__(self, n: int):
+        self.n = n
+
+    def __hash__(self):
+        return self.n
+
+    def __eq__(self, other):
+        Key.compares += 1
+        return isinstance(other, Key) and self.n == other.n
+
+
+@pytest.mark.parametrize("n", [1_000, 8_000])
+def test_ordereddict_compares_per_operation(OrderedDict, n: int):
+    """Inserting and deleting keys compares a constant number of keys per operation, not all keys."""
+    od = OrderedDict()
+    Key.compares = 0
+    # new key objects each time, so the lookups cannot match on identity
+    for i in range(n):
+        od[Key(i)] = i
+    for i in range(0, n, 2):
+        del od[Key(i)]
+    for i in range(0, n, 2):
+        od[Key(i)] = i
+    assert [k.n for k in od][-3:] == [n - 6, n - 4, n - 2]
+    operations = n + n // 2 + n // 2
+    # the list backed implementation compared with ~n/2 keys per operation
+    assert Key.compares <= 4 * operations
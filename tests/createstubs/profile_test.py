@@ -0,0 +1,46 @@
+# type: ignore reportGeneralTypeIssues
+import json
+from pathlib import Path
+from typing import Generator
+
+import pytest
+
+from shared import VARIANTS, import_variant, no_boardname
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+PROFILE_KEYS = {"import_ms", "mem_before", "mem_import", "mem_after", "mem_min", "size"}
+
+
+def run_stubber(createstubs, tmp_path: Path):
+    stubber = createstubs.Stubber(path=str(tmp_path), firmware_id="MyCustomID")
+    stubber.modules = ["sys", "json", "collections"]
+    stubber.create_all_stubs()
+    return stubber, json.loads(Path(stubber.path, "modules.json").read_text())
+
+
+@pytest.mark.parametrize("variant", [*VARIANTS, "createstubs_bin"])
+def test_profile_in_report(variant: str, tmp_path: Path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    monkeypatch.chdir(tmp_path)
+    Path("profile_stubber.txt").touch()
+    stubber, report = run_stubber(createstubs, tmp_path)
+    assert stubber.profile
+    assert len(report["modules"]) == 3
+    for module in report["modules"]:
+        profile = module["profile"]
+        assert set(profile) == PROFILE_KEYS
+        assert all(isinstance(v, int) for v in profile.values())
+        assert profile["size"] == Path(tmp_path, module["file"]).stat().st_size
+        assert profile["size"] > 0
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_no_profile_by_default(variant: str, tmp_path: Path, monkeypatch, mock_micropython_path: Generator[str, None, None]):
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    monkeypatch.chdir(tmp_path)
+    stubber, report = run_stubber(createstubs, tmp_path)
+    assert not stubber.profile
+    assert all("profile" not in module for module in report["modules"])
@@ -0,0 +1,101 @@
+# type: ignore reportGeneralTypeIssues
+import builtins
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Generator
+
+import pytest
+from pytest_mock import MockerFixture
+
+from shared import LOCATIONS, VARIANTS, import_variant, no_boardname
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+MODULES = ["array", "binascii", "errno", "gc", "io", "json", "math", "os", "select", "struct", "sys", "time"]
+
+
+class FsCounter:
+    "Count the filesystem operations done by createstubs"
+
+    def __init__(self, mocker: MockerFixture, createstubs):
+        self.ops = 0
+        real_open = builtins.open
+
+        def counting_open(*args, **kwargs):
+            self.ops += 1
+            return real_open(*args, **kwargs)
+
+        mocker.patch.object(createstubs, "open", counting_open, create=True)
+        for name in ("stat", "mkdir", "listdir", "remove"):
+            mocker.patch.object(createstubs.os, name, self._counted(getattr(os, name)))
+
+    def _counted(self, fn):
+        def wrapper(*args, **kwargs):
+            self.ops += 1
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+
+def run_stubber(createstubs, path: Path, batch: int):
+    stubber = createstubs.Stubber(path=str(path), firmware_id="MyCustomID")
+    stubber.report_batch = batch
+    stubber.modules = MODULES
+    stubber.create_all_stubs()
+    return stubber
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+@pytest.mark.parametrize("location", LOCATIONS[:1])
+def test_report_fs_ops_per_module(
+    location: Any,
+    variant: str,
+    tmp_path: Path,
+    mocker: MockerFixture,
+    monkeypatch: pytest.MonkeyPatch,
+    mock_micropython_path: Generator[str, None, None],
+):
+    """Benchmark: count the filesystem operations per stubbed module, one report write per module vs batched."""
+    createstubs = import_variant(location, variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    ops = {}
+    for batch in (1, createstubs._REPORT_BATCH):
+        counter = FsCounter(mocker, createstubs)
+        stubber = run_stubber(createstubs, tmp_path / str(batch), batch)
+        mocker.stopall()
+        report = json.loads(Path(stubber._json_name).read_text())
+        assert [m["module"] for m in report["modules"]] == MODULES
+        ops[batch] = counter.ops
+    # each report write that is saved by the batch, is a file operation less
+    batch = createstubs._REPORT_BATCH
+    saved_writes = len(MODULES) - math.ceil(len(MODULES) / batch)
+    assert ops[batch] <= ops[1] - saved_writes
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_report_flush_before_progress(
+    variant: str,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    mock_micropython_path: Generator[str, None, None],
+):
+    """After a flush, the report holds all modules so far, and can be continued after a restart."""
+    createstubs = import_variant("board", variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    stubber = createstubs.Stubber(path=str(tmp_path), firmware_id="MyCustomID")
+    stubber.report_start()
+    stubber.create_one_stub("json")
+    stubber.create_one_stub("array")
+    assert '"array"' not in Path(stubber._json_name).read_text(), "entries should be kept in memory"
+    stubber.report_flush()
+    assert '"array"' in Path(stubber._json_name).read_text()
+
+    # continue the report from a new Stubber, as done after a reset
+    stubber = createstubs.Stubber(path=str(tmp_path), firmware_id="MyCustomID")
+    stubber._json_name = "{}/{}".format(stubber.path, "modules.json")
+    stubber.create_one_stub("math")
+    stubber.report_end()
+    report = json.loads(Path(stubber._json_name).read_text())
+    assert [m["module"] for m in report["modules"]] == ["json", "array", "math"]
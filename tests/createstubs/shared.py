@@ -15,3 +15,8 @@ def import_variant(location: str, variant: str, minified: bool = False):
     else:
         mod_name = f".board.{variant}"
     return import_module(mod_name, "stubber")  # type: ignore
+
+
+def no_boardname(info: dict):
+    "createstubs.py reads the board_id from the QuecPython uname, which is not available on CPython"
+    info.update(board_id="", board="")
@@ -0,0 +1,77 @@
+# type: ignore reportGeneralTypeIssues
+import io
+from typing import Any, Generator
+
+import pytest
+
+from shared import LOCATIONS, VARIANTS, import_variant, no_boardname
+
+pytestmark = [pytest.mark.stubber, pytest.mark.micropython]
+
+
+class CountingFile(io.BytesIO):
+    "Binary file that counts the number of write calls"
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, b):
+        self.writes += 1
+        return super().write(b)
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_stubwriter_chunks(variant: str, mock_micropython_path: Generator[str, None, None]):
+    createstubs = import_variant("board", variant)
+    f = CountingFile()
+    w = createstubs.StubWriter(f, 64)
+    expected = ""
+    for n in range(100):
+        w.write("    ", "name_{}".format(n), ": int = ", str(n), "\n")
+        expected += "    name_{}: int = {}\n".format(n, n)
+    w.flush()
+    assert f.getvalue().decode() == expected
+    # one write per 64 byte chunk, instead of one per attribute ( + 1 for the probe)
+    assert f.writes <= len(expected) // 64 + 2
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_stubwriter_large_and_text(variant: str, mock_micropython_path: Generator[str, None, None]):
+    createstubs = import_variant("board", variant)
+    # parts larger than the buffer are written directly
+    f = io.BytesIO()
+    w = createstubs.StubWriter(f, 16)
+    w.write("a" * 10, "b" * 40, b"c" * 3)
+    w.flush()
+    assert f.getvalue() == b"a" * 10 + b"b" * 40 + b"c" * 3
+
+    # text files are supported as well
+    t = io.StringIO()
+    w = createstubs.StubWriter(t, 16)
+    w.write("class Foo():\n", "    ...\n")
+    w.flush()
+    assert t.getvalue() == "class Foo():\n    ...\n"
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+@pytest.mark.parametrize("location", LOCATIONS[:1])
+def test_create_module_stub_buffer_size(
+    location: Any,
+    variant: str,
+    tmp_path,
+    monkeypatch: pytest.MonkeyPatch,
+    mock_micropython_path: Generator[str, None, None],
+):
+    createstubs = import_variant(location, variant)
+    monkeypatch.setattr(createstubs, "get_boardname", no_boardname)
+    stubber = createstubs.Stubber(path=str(tmp_path), firmware_id="MyCustomID")
+    stubber.report_start()
+    stubber.buffer_size = 32
+    stubber.create_module_stub("json", str(tmp_path / "json_small.pyi"))
+    stubber.buffer_size = 4096
+    stubber.create_module_stub("json", str(tmp_path / "json_large.pyi"))
+    small = (tmp_path / "json_small.pyi").read_text()
+    large = (tmp_path / "json_large.pyi").read_text()
+    assert small == large
+    assert "def dumps(" in small
@@ -79,3 +79,15 @@ def test_minification_quick(tmp_path: Path, source: str, mocker: MockerFixture,
     m_minify.assert_called_once()
     assert m_spr.call_count == 0
     # -----------------------------------------
+
+
+@pytest.mark.parametrize("source", ["createstubs.py", "createstubs_mem.py", "createstubs_db.py", "createstubs_lvgl.py"])
+@pytest.mark.slow
+def test_minified_script_current(tmp_path: Path, source: str, pytestconfig: pytest.Config):
+    "the minified script that is installed on the boards, is minified from the current script"
+    if not python_minifier:
+        pytest.skip("Python minifier not available")
+
+    board_path = pytestconfig.rootpath / "src" / "stubber" / "board"
+    assert minify(source=board_path / source, target=tmp_path, keep_report=False) == 0
+    assert (tmp_path / source).read_text() == (board_path / source.replace(".py", "_min.py")).read_text()